@@ -0,0 +1,194 @@
+"""
+紧凑的账户存储
+
+CompactAccountStore 是 BankingSystem 的另一种账户存储后端。余额以整数
+“分”保存在连续的 array('q') 中，账户ID和所有者姓名经过驻留（intern）后
+保存在列表里，再通过一个 ID -> 槽位 的索引字典定位账户。每个账户只占
+一个数组元素和几个列表指针，而不是一个带 __dict__ 的 Python 对象。
+
+get_account() 返回的是 AccountView —— 一个只记录槽位的轻量视图，
+接口与 BankAccount 相同。
+"""
+
+import sys
+import threading
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+from money import from_cents, to_cents
+
+
+class AccountView:
+    """指向 CompactAccountStore 中某个槽位的轻量账户视图。"""
+    
+    __slots__ = ('_store', '_slot')
+    
+    def __init__(self, store: 'CompactAccountStore', slot: int):
+        self._store = store
+        self._slot = slot
+    
+    @property
+    def account_id(self) -> str:
+        """账户的唯一标识符。"""
+        return self._store._ids[self._slot]
+    
+    @property
+    def owner_name(self) -> str:
+        """账户所有者的姓名。"""
+        return self._store._names[self._slot]
+    
+    @property
+    def balance(self) -> Decimal:
+        """获取账户的当前余额。"""
+        return from_cents(self._store._cents[self._slot])
+    
+    def deposit(self, amount: Decimal) -> bool:
+        """
+        向账户存款。
+        
+        参数:
+            amount: 存款金额（必须为正数且为整分）
+        
+        返回:
+            如果存款成功返回True，否则返回False
+        """
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        if cents <= 0:
+            return False
+        
+        balances = self._store._cents
+        try:
+            balances[self._slot] += cents
+        except OverflowError:
+            return False
+        return True
+    
+    def withdraw(self, amount: Decimal) -> bool:
+        """
+        从账户取款。
+        
+        参数:
+            amount: 取款金额（必须为正数、为整分且小于等于余额）
+        
+        返回:
+            如果取款成功返回True，否则返回False
+        """
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        
+        balances = self._store._cents
+        if cents <= 0 or cents > balances[self._slot]:
+            return False
+        balances[self._slot] -= cents
+        return True
+    
+    def to_dict(self) -> Dict:
+        """将账户转换为字典以便存储。"""
+        return {
+            'account_id': self.account_id,
+            'owner_name': self.owner_name,
+            'balance': str(self.balance)
+        }
+    
+    def __eq__(self, other):
+        if isinstance(other, AccountView):
+            return self._store is other._store and self._slot == other._slot
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash((id(self._store), self._slot))
+
+
+class CompactAccountStore:
+    """
+    以数组保存余额的账户存储，可替代 BankingSystem 中的账户字典。
+    
+    支持字典的常用接口（取值、赋值、in、len、迭代、get、values、items、
+    clear）。赋值时接受任何带 owner_name 和 balance 属性的账户对象，余额
+    必须为整分。账户只增不删，因此已发出的视图始终指向正确的槽位。
+    """
+    
+    def __init__(self):
+        """创建一个空的账户存储。"""
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._cents = array('q')
+        self._lock = threading.Lock()  # 保护槽位的分配
+    
+    def empty_like(self) -> 'CompactAccountStore':
+        """返回一个同类型的空存储。"""
+        return CompactAccountStore()
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, account_id) -> bool:
+        return account_id in self._index
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ids))
+    
+    def __getitem__(self, account_id: str) -> AccountView:
+        return AccountView(self, self._index[account_id])
+    
+    def get(self, account_id: str, default=None):
+        slot = self._index.get(account_id)
+        if slot is None:
+            return default
+        return AccountView(self, slot)
+    
+    def __setitem__(self, account_id: str, account):
+        cents = to_cents(account.balance)
+        owner_name = sys.intern(account.owner_name)
+        with self._lock:
+            slot = self._index.get(account_id)
+            if slot is None:
+                # 先写入数据再登记索引，并发读取者不会看到未初始化的槽位
+                account_id = sys.intern(account_id)
+                self._ids.append(account_id)
+                self._names.append(owner_name)
+                self._cents.append(cents)
+                self._index[account_id] = len(self._ids) - 1
+            else:
+                self._names[slot] = owner_name
+                self._cents[slot] = cents
+    
+    def slot_of(self, account_id: str) -> int:
+        """返回账户所在的槽位，不存在时返回-1。"""
+        return self._index.get(account_id, -1)
+    
+    def account_id_at(self, slot: int) -> str:
+        """返回槽位上的账户ID。"""
+        return self._ids[slot]
+    
+    def balance_buffer(self) -> array:
+        """
+        返回保存余额（整数分）的底层数组，下标即槽位。
+        
+        供批量过账等向量化操作直接读写；调用方负责加锁，且不得改变数组长度。
+        """
+        return self._cents
+    
+    def keys(self) -> List[str]:
+        return list(self._ids)
+    
+    def values(self) -> Iterator[AccountView]:
+        # 按需创建视图，避免一次性为所有账户分配对象
+        return (AccountView(self, slot) for slot in range(len(self._ids)))
+    
+    def items(self) -> Iterator:
+        return ((account_id, AccountView(self, slot)) for slot, account_id in enumerate(list(self._ids)))
+    
+    def clear(self):
+        with self._lock:
+            self._index = {}
+            self._ids = []
+            self._names = []
+            self._cents = array('q')
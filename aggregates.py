@@ -0,0 +1,116 @@
+"""
+运行中的汇总统计
+
+Aggregates 维护总余额以及每天的存款、取款、转账金额和笔数。每次变更只做
+常数时间的累加，查询时直接读取，不需要遍历账户。
+
+日期按本地时间划分；每笔操作只比较一次当前时间与当天结束时间，跨天时才
+计算新的日期。成交量只在内存中统计（进程启动以来，包括恢复时重放的操作）。
+
+并发模式下累加值按银行系统的锁分段拆成多份：每次变更只累加到调用方已经
+持有锁的那个分段上，不需要额外的全局锁，互不相关的转账仍可并行；读取时
+把各分段相加。
+"""
+
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from money import ZERO
+
+DEPOSIT = 0
+WITHDRAW = 1
+TRANSFER = 2
+
+# 某一天的成交量：三种操作的金额合计和笔数
+DailyVolume = namedtuple('DailyVolume', [
+    'deposits', 'withdrawals', 'transfers',
+    'deposit_count', 'withdraw_count', 'transfer_count'
+])
+
+
+class _Partial:
+    """一个锁分段上的累加值。"""
+    
+    __slots__ = ('total_balance', 'volumes', 'current', 'day_end')
+    
+    def __init__(self):
+        self.total_balance = ZERO
+        self.volumes: Dict[date, List] = {}
+        self.current: Optional[List] = None  # 当天的 [金额×3, 笔数×3]
+        self.day_end = 0.0
+
+
+class Aggregates:
+    """
+    总余额和每日成交量的累加器。
+    
+    参数:
+        stripes: 分段数量，与银行系统的锁分段数量相同（非并发模式为1）。
+            更新第 i 个分段时调用方必须持有第 i 把分段锁（或全部锁）
+    """
+    
+    def __init__(self, stripes: int = 1):
+        if stripes < 1:
+            raise ValueError("分段数必须为正数")
+        self._partials = [_Partial() for _ in range(stripes)]
+    
+    @property
+    def total_balance(self) -> Decimal:
+        partials = self._partials
+        if len(partials) == 1:
+            return partials[0].total_balance
+        return sum((partial.total_balance for partial in partials), ZERO)
+    
+    def reset(self, total_balance: Decimal):
+        """账户集合整体替换后设置新的总余额（成交量保留；调用方持有全部锁）。"""
+        for partial in self._partials:
+            partial.total_balance = ZERO
+        self._partials[0].total_balance = total_balance
+    
+    def add_balance(self, delta: Decimal, stripe: int = 0):
+        """总余额变化但不计入成交量（例如新建账户的初始余额）。"""
+        self._partials[stripe].total_balance += delta
+    
+    def record(self, kind: int, amount: Decimal, balance_delta: Decimal, count: int = 1, stripe: int = 0):
+        """
+        记录一次（或一批同类）操作。
+        
+        参数:
+            kind: DEPOSIT、WITHDRAW 或 TRANSFER
+            amount: 成交金额
+            balance_delta: 总余额的变化（转账为0）
+            count: 操作笔数
+            stripe: 调用方持有锁的分段
+        """
+        partial = self._partials[stripe]
+        now = time.time()
+        if now >= partial.day_end:
+            self._roll(partial, now)
+        current = partial.current
+        current[kind] += amount
+        current[kind + 3] += count
+        if balance_delta:
+            partial.total_balance += balance_delta
+    
+    def volumes(self, day: Optional[date] = None) -> DailyVolume:
+        """返回某一天（默认今天）的成交量。"""
+        if day is None:
+            day = date.today()
+        totals = [ZERO, ZERO, ZERO, 0, 0, 0]
+        for partial in self._partials:
+            values = partial.volumes.get(day)
+            if values is not None:
+                # 列表只会原地累加，读到的每一项都是完整的数值
+                for index, value in enumerate(values):
+                    totals[index] += value
+        return DailyVolume(*totals)
+    
+    @staticmethod
+    def _roll(partial: _Partial, now: float):
+        """把分段切换到 now 所在的日期（调用方持有该分段的锁）。"""
+        today = date.fromtimestamp(now)
+        partial.current = partial.volumes.setdefault(today, [ZERO, ZERO, ZERO, 0, 0, 0])
+        partial.day_end = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
@@ -0,0 +1,332 @@
+"""
+余额顺序统计索引
+
+BalanceIndex 按（余额，账户ID）有序地保存所有账户，支持前N名、余额区间、
+排名和百分位数查询，而不需要每次对全部账户排序。
+
+底层是“分块有序列表”：若干个长度不超过 2*load 的有序小列表，加上每块的
+最大值数组和块长度的树状数组（Fenwick树）。插入和删除先二分定位到块，
+再在块内二分插入；按位置访问通过树状数组在 O(log n) 时间内定位。相比
+跳表，这种结构在纯Python中常数更小、内存更省。
+
+余额变更只记录到一个按账户合并的待处理字典中（O(1)），在下一次查询前
+统一应用；待处理的变更很多时直接合并重建，比逐个删除插入更快。这样存取款
+的热路径几乎不受索引影响，而查询看到的始终是最新状态。
+"""
+
+import bisect
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Greatest:
+    """比任何字符串都大的哨兵，用于构造区间上界 (余额, _GREATEST)。"""
+    
+    def __lt__(self, other):
+        return False
+    
+    def __gt__(self, other):
+        return True
+
+
+_GREATEST = _Greatest()
+
+
+class SortedKeyList:
+    """支持按位置访问的分块有序列表。"""
+    
+    def __init__(self, load: int = 512):
+        self._load = load
+        self._lists: List[list] = []
+        self._maxes: list = []
+        self._tree: List[int] = []  # 块长度的树状数组；为空表示需要重建
+        self._len = 0
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def reset(self, values: Iterable):
+        """用一组值（无需有序）替换全部内容。"""
+        values = sorted(values)
+        load = self._load
+        self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._len = len(values)
+        self._tree = []
+    
+    def add(self, value):
+        lists, maxes = self._lists, self._maxes
+        if not maxes:
+            lists.append([value])
+            maxes.append(value)
+            self._len = 1
+            self._tree = []
+            return
+        
+        pos = bisect.bisect_right(maxes, value)
+        if pos == len(maxes):
+            pos -= 1
+            lists[pos].append(value)
+            maxes[pos] = value
+        else:
+            bisect.insort(lists[pos], value)
+        self._len += 1
+        
+        if len(lists[pos]) > 2 * self._load:
+            # 块过大时一分为二，块数量改变后需要重建树状数组
+            sub = lists[pos]
+            half = len(sub) // 2
+            lists.insert(pos + 1, sub[half:])
+            del sub[half:]
+            maxes.insert(pos, sub[-1])
+            self._tree = []
+        elif self._tree:
+            self._tree_add(pos, 1)
+    
+    def remove(self, value):
+        """删除一个值；不存在时抛出 ValueError。"""
+        lists, maxes = self._lists, self._maxes
+        pos = bisect.bisect_left(maxes, value)
+        if pos == len(maxes):
+            raise ValueError(f"{value!r} 不在列表中")
+        sub = lists[pos]
+        offset = bisect.bisect_left(sub, value)
+        if sub[offset] != value:
+            raise ValueError(f"{value!r} 不在列表中")
+        
+        del sub[offset]
+        self._len -= 1
+        if not sub:
+            del lists[pos]
+            del maxes[pos]
+            self._tree = []
+            return
+        if offset == len(sub):
+            maxes[pos] = sub[-1]
+        if self._tree:
+            self._tree_add(pos, -1)
+    
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("索引超出范围")
+        pos, offset = self._locate(index)
+        return self._lists[pos][offset]
+    
+    def bisect_left(self, value) -> int:
+        """返回第一个不小于 value 的元素的位置。"""
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect.bisect_left(self._lists[pos], value)
+    
+    def bisect_right(self, value) -> int:
+        """返回第一个大于 value 的元素的位置。"""
+        pos = bisect.bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect.bisect_right(self._lists[pos], value)
+    
+    def islice(self, start: int, stop: int, reverse: bool = False) -> Iterator:
+        """按位置区间 [start, stop) 遍历元素。"""
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return
+        if reverse:
+            pos, offset = self._locate(stop - 1)
+            remaining = stop - start
+            while remaining:
+                sub = self._lists[pos]
+                take = min(offset + 1, remaining)
+                yield from reversed(sub[offset + 1 - take:offset + 1])
+                remaining -= take
+                pos -= 1
+                if pos >= 0:
+                    offset = len(self._lists[pos]) - 1
+        else:
+            pos, offset = self._locate(start)
+            remaining = stop - start
+            while remaining:
+                sub = self._lists[pos]
+                take = min(len(sub) - offset, remaining)
+                yield from sub[offset:offset + take]
+                remaining -= take
+                pos += 1
+                offset = 0
+    
+    def page(self, after, count: int, reverse: bool = False) -> list:
+        """
+        返回紧接在 after 之后的最多 count 个元素（reverse 时为紧接在之前的，
+        从大到小）；after 为None时从头（尾）开始。定位只需二分查找。
+        """
+        if reverse:
+            stop = self._len if after is None else self.bisect_left(after)
+            return list(self.islice(stop - count, stop, reverse=True))
+        start = 0 if after is None else self.bisect_right(after)
+        return list(self.islice(start, start + count))
+    
+    # 树状数组：第 i 块之前的元素总数及按位置定位
+    
+    def _build_tree(self):
+        tree = [len(sub) for sub in self._lists]
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+    
+    def _tree_add(self, pos: int, delta: int):
+        tree = self._tree
+        while pos < len(tree):
+            tree[pos] += delta
+            pos |= pos + 1
+    
+    def _prefix(self, pos: int) -> int:
+        """前 pos 块的元素总数。"""
+        if not self._tree:
+            self._build_tree()
+        tree = self._tree
+        total = 0
+        while pos > 0:
+            total += tree[pos - 1]
+            pos &= pos - 1
+        return total
+    
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """把全局位置转换为（块号，块内偏移）。"""
+        if not self._tree:
+            self._build_tree()
+        tree = self._tree
+        pos = 0
+        step = 1 << (len(tree).bit_length() - 1) if tree else 0
+        while step:
+            nxt = pos + step
+            if nxt <= len(tree) and tree[nxt - 1] <= index:
+                index -= tree[nxt - 1]
+                pos = nxt
+            step >>= 1
+        return pos, index
+
+
+class BalanceIndex:
+    """按余额排序的账户索引。"""
+    
+    def __init__(self, load: int = 512):
+        self._lock = threading.Lock()
+        self._keys = SortedKeyList(load)
+        # 账户ID -> (索引中的旧余额或None, 最新余额)，查询前统一应用
+        self._pending: Dict[str, Tuple[Optional[Decimal], Decimal]] = {}
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._apply_pending()
+            return len(self._keys)
+    
+    def rebuild(self, accounts: Iterable):
+        """根据账户集合重建索引。"""
+        keys = [(account.balance, account.account_id) for account in accounts]
+        with self._lock:
+            self._keys.reset(keys)
+            self._pending = {}
+    
+    def add(self, account_id: str, balance: Decimal):
+        """登记一个新账户。"""
+        with self._lock:
+            self._pending[account_id] = (None, balance)
+    
+    def update(self, account_id: str, old_balance: Decimal, new_balance: Decimal):
+        """账户余额从 old_balance 变为 new_balance。"""
+        with self._lock:
+            pending = self._pending.get(account_id)
+            if pending is not None:
+                old_balance = pending[0]
+            self._pending[account_id] = (old_balance, new_balance)
+    
+    def top(self, n: int) -> List[Tuple[Decimal, str]]:
+        """余额最高的 n 个（余额，账户ID），从高到低。"""
+        with self._lock:
+            self._apply_pending()
+            size = len(self._keys)
+            return list(self._keys.islice(size - n, size, reverse=True))
+    
+    def bottom(self, n: int) -> List[Tuple[Decimal, str]]:
+        """余额最低的 n 个（余额，账户ID），从低到高。"""
+        with self._lock:
+            self._apply_pending()
+            return list(self._keys.islice(0, n))
+    
+    def between(self, low: Decimal, high: Decimal, limit: Optional[int] = None) -> List[Tuple[Decimal, str]]:
+        """余额在 [low, high] 之间的（余额，账户ID），从低到高，最多 limit 个。"""
+        with self._lock:
+            self._apply_pending()
+            start, stop = self._bounds(low, high)
+            if limit is not None:
+                stop = min(stop, start + limit)
+            return list(self._keys.islice(start, stop))
+    
+    def page(self, after: Optional[Tuple[Decimal, str]], count: int,
+             descending: bool = False) -> List[Tuple[Decimal, str]]:
+        """紧接在键 after 之后（降序时为之前）的最多 count 个（余额，账户ID）。"""
+        with self._lock:
+            self._apply_pending()
+            return self._keys.page(after, count, descending)
+    
+    def count_between(self, low: Decimal, high: Decimal) -> int:
+        """余额在 [low, high] 之间的账户数量。"""
+        with self._lock:
+            self._apply_pending()
+            start, stop = self._bounds(low, high)
+            return max(stop - start, 0)
+    
+    def rank(self, balance: Decimal) -> int:
+        """余额低于 balance 的账户数量。"""
+        with self._lock:
+            self._apply_pending()
+            return self._keys.bisect_left((balance,))
+    
+    def percentile(self, percent: float) -> Decimal:
+        """
+        返回余额的第 percent 百分位数（最近秩法）。
+        
+        参数:
+            percent: 0到100之间的百分比
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError("百分比必须在0到100之间")
+        with self._lock:
+            self._apply_pending()
+            size = len(self._keys)
+            if not size:
+                raise ValueError("没有账户")
+            # 最近秩法：第 ceil(p/100 * n) 小的值
+            rank = -(-percent * size // 100)
+            return self._keys[max(int(rank) - 1, 0)][0]
+    
+    def _apply_pending(self):
+        """把待处理的变更应用到有序列表（调用方持有锁）。"""
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = {}
+        keys = self._keys
+        
+        changes = [(old, new, account_id) for account_id, (old, new) in pending.items() if old != new]
+        if len(changes) * 5 < len(keys):
+            for old, new, account_id in changes:
+                if old is not None:
+                    keys.remove((old, account_id))
+                keys.add((new, account_id))
+            return
+        
+        # 变更很多时整体重建：按账户ID过滤掉旧键（字符串的哈希值有缓存，比按
+        # 余额元组查找快得多），再与排好序的新键合并。两段各自有序时 Timsort
+        # 只需一次线性合并。
+        changed = {account_id for _, _, account_id in changes}
+        merged = [key for key in keys.islice(0, len(keys)) if key[1] not in changed]
+        merged.extend(sorted((new, account_id) for _, new, account_id in changes))
+        keys.reset(merged)
+    
+    def _bounds(self, low: Decimal, high: Decimal) -> Tuple[int, int]:
+        return self._keys.bisect_left((low,)), self._keys.bisect_right((high, _GREATEST))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+银行系统网络服务
+
+基于 asyncio 的TCP服务，使用按行分隔的JSON协议。每个请求占一行，例如：
+
+    {"id": 1, "op": "deposit", "account_id": "1", "amount": "10.00"}
+
+服务器对每个请求返回一行响应，顺序与请求一致：
+
+    {"id": 1, "ok": true, "error": null}
+
+支持的操作：create_account、get_account、deposit、withdraw、transfer、list。
+金额可以是字符串或数字，按 Decimal 精确解析。deposit、withdraw 和 transfer
+可以带 "idempotency_key"，超时重试时用同一个键不会重复记账。list 按创建
+顺序分页返回账户：可选的 "cursor"（上一页响应中的 "next_cursor"）和
+"page_size"（默认100，最多1000），响应中 "next_cursor" 为 null 表示没有
+更多账户。
+
+客户端可以连续发送多个请求而不必等待响应（流水线）。同一连接上的请求
+按顺序执行；内存操作直接在事件循环中完成，启用事务日志时等待落盘的
+操作交给线程池执行，事件循环本身不做阻塞的磁盘I/O。并发模式的银行系统上
+list 也在线程池中执行（第一次分页要遍历一次全部账户来建立分页索引）。
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+from banking_system import BankingSystem, _StripedLocks
+
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class RequestError(Exception):
+    """请求格式错误，错误信息会原样返回给客户端。"""
+
+
+def _required(request: Dict, name: str) -> str:
+    value = request.get(name)
+    if value is None:
+        raise RequestError(f"缺少参数 '{name}'")
+    return str(value)
+
+
+def _amount(request: Dict, name: str = 'amount') -> Decimal:
+    value = request.get(name)
+    if value is None:
+        raise RequestError(f"缺少参数 '{name}'")
+    if isinstance(value, bool):
+        raise RequestError("无效的金额")
+    try:
+        amount = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise RequestError("无效的金额")
+    if not amount.is_finite():
+        raise RequestError("无效的金额")
+    return amount
+
+
+def _page_argument(request: Dict, name: str, default: Optional[int], minimum: int,
+                   maximum: Optional[int] = None) -> Optional[int]:
+    value = request.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum or \
+            (maximum is not None and value > maximum):
+        raise RequestError(f"无效的分页参数 '{name}'")
+    return value
+
+
+def _idempotency_key(request: Dict) -> Optional[str]:
+    value = request.get('idempotency_key')
+    return None if value is None else str(value)
+
+
+class BankServer:
+    """通过TCP对外提供 BankingSystem 的操作。"""
+    
+    def __init__(self, banking: BankingSystem, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 max_pipeline: int = 128, workers: int = 8):
+        """
+        创建服务器（调用 start() 后开始监听）。
+        
+        参数:
+            banking: 要提供服务的银行系统
+            host: 监听地址
+            port: 监听端口（0表示由系统分配）
+            max_pipeline: 每个连接最多缓存的未处理请求数，超过后暂停读取
+            workers: 执行需要等待落盘的操作的线程数；银行系统不是并发模式时固定为1
+        """
+        self.banking = banking
+        self.host = host
+        self.port = port
+        self.max_pipeline = max_pipeline
+        # 非并发模式的银行系统不能被多个线程同时访问
+        self._concurrent = isinstance(banking._locks, _StripedLocks)
+        if not self._concurrent:
+            workers = 1
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bank-server")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers = {
+            'create_account': self._create_account,
+            'get_account': self._get_account,
+            'deposit': self._deposit,
+            'withdraw': self._withdraw,
+            'transfer': self._transfer,
+            'list': self._list,
+        }
+    
+    async def start(self):
+        """开始监听；port 为0时启动后可从 self.port 读取实际端口。"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self):
+        """停止监听并关闭线程池。"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """读取请求放入队列，由另一个协程按顺序执行并写回响应。"""
+        queue: asyncio.Queue = asyncio.Queue(self.max_pipeline)
+        processor = asyncio.ensure_future(self._process(queue, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await queue.put(line)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            await queue.put(None)
+            await processor
+            writer.close()
+    
+    async def _process(self, queue: asyncio.Queue, writer: asyncio.StreamWriter):
+        while True:
+            line = await queue.get()
+            if line is None:
+                return
+            response = await self._execute(line)
+            writer.write(json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            # 队列中还有请求时先积累响应，减少系统调用
+            if queue.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    # 连接已断开，丢弃剩余请求，让读取协程能够结束
+                    while await queue.get() is not None:
+                        pass
+                    return
+    
+    async def _execute(self, line: bytes) -> Dict:
+        """解析并执行一个请求，返回响应字典。"""
+        try:
+            request = json.loads(line, parse_float=Decimal)
+        except ValueError:
+            return {'id': None, 'ok': False, 'error': "无效的JSON请求"}
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': "请求必须是JSON对象"}
+        
+        response = {'id': request.get('id'), 'ok': False, 'error': None}
+        handler = self._handlers.get(request.get('op'))
+        if handler is None:
+            response['error'] = f"未知的操作 '{request.get('op')}'"
+            return response
+        
+        try:
+            call, extra = handler(request)
+            # 启用事务日志时操作会等待落盘，不能在事件循环中执行
+            if self.banking._journal is not None or (handler == self._list and self._concurrent):
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+            else:
+                result = call()
+        except RequestError as e:
+            response['error'] = str(e)
+            return response
+        except Exception as e:
+            response['error'] = f"服务器内部错误: {str(e)}"
+            return response
+        
+        if extra is not None:
+            response['ok'] = True
+            response.update(extra(result))
+        else:
+            response['ok'], response['error'] = result
+        return response
+    
+    # 以下处理函数返回 (调用, 结果转换)；结果转换为None时调用返回 (成功, 错误) 元组
+    
+    def _create_account(self, request: Dict):
+        account_id = _required(request, 'account_id')
+        owner_name = _required(request, 'owner_name')
+        initial_balance = _amount(request, 'initial_balance') if 'initial_balance' in request else Decimal('0.00')
+        return lambda: self.banking.create_account(account_id, owner_name, initial_balance), None
+    
+    def _get_account(self, request: Dict):
+        account_id = _required(request, 'account_id')
+        
+        def convert(account):
+            if account is None:
+                return {'ok': False, 'error': f"未找到账户 '{account_id}'"}
+            return {'account': account.to_dict()}
+        
+        return lambda: self.banking.get_account(account_id), convert
+    
+    def _deposit(self, request: Dict):
+        account_id = _required(request, 'account_id')
+        amount = _amount(request)
+        key = _idempotency_key(request)
+        return lambda: self.banking.deposit(account_id, amount, key), None
+    
+    def _withdraw(self, request: Dict):
+        account_id = _required(request, 'account_id')
+        amount = _amount(request)
+        key = _idempotency_key(request)
+        return lambda: self.banking.withdraw(account_id, amount, key), None
+    
+    def _transfer(self, request: Dict):
+        from_account_id = _required(request, 'from_account_id')
+        to_account_id = _required(request, 'to_account_id')
+        amount = _amount(request)
+        key = _idempotency_key(request)
+        return lambda: self.banking.transfer(from_account_id, to_account_id, amount, key), None
+    
+    def _list(self, request: Dict):
+        cursor = _page_argument(request, 'cursor', None, 0)
+        page_size = _page_argument(request, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        
+        def convert(page):
+            return {
+                'accounts': [account.to_dict() for account in page.accounts],
+                'next_cursor': page.next_cursor,
+                'total': page.total,
+            }
+        
+        return lambda: self.banking.get_accounts_page(cursor, page_size), convert
+
+
+def main():
+    parser = argparse.ArgumentParser(description="银行系统网络服务")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument('--data', default=None, help="启动时加载的CSV文件（启用事务日志时作为快照）")
+    parser.add_argument('--journal', default=None, help="事务日志文件，指定后每个变更在落盘后才返回")
+    parser.add_argument('--sample', action='store_true', help="创建示例账户")
+    args = parser.parse_args()
+    
+    banking = BankingSystem(concurrent=True)
+    if args.journal:
+        success, error = banking.recover(args.data or "accounts.csv", args.journal)
+    elif args.data:
+        success, error = banking.load_from_csv(args.data)
+    else:
+        success, error = True, None
+    if not success:
+        print(f"加载数据失败: {error}")
+        return 1
+    
+    if args.sample:
+        banking.create_account("1", "张三", Decimal("1000.00"))
+        banking.create_account("2", "李四", Decimal("500.00"))
+    
+    server = BankServer(banking, args.host, args.port)
+    print(f"银行服务正在监听 {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n服务已停止。")
+    finally:
+        banking.close_journal()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,10 @@
 简易银行系统图形用户界面
 
 此脚本提供了一个基于tkinter的图形界面来与银行系统交互。
+
+所有对银行系统的调用都在后台工作线程中执行（见 gui_tasks.py），结果通过
+after() 轮询交回主线程，因此保存、加载大文件或排序大量账户时界面不会
+卡住。工作线程只有一个，银行系统的调用按提交顺序依次执行，不需要加锁。
 """
 
 import os
@@ -12,6 +16,42 @@ from tkinter import ttk, messagebox, simpledialog
 from decimal import Decimal, InvalidOperation
 
 from banking_system import BankingSystem
+from gui_tasks import TaskRunner
+
+
+class ProgressDialog(tk.Toplevel):
+    """显示后台任务进度的窗口，可以取消任务"""
+    
+    def __init__(self, parent, title: str, text: str):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("360x150")
+        self.transient(parent)
+        self.task = None
+        
+        ttk.Label(self, text=text).pack(pady=10)
+        self.bar = ttk.Progressbar(self, length=300, mode='determinate', maximum=100)
+        self.bar.pack(pady=5)
+        self.detail_var = tk.StringVar(value="正在开始...")
+        ttk.Label(self, textvariable=self.detail_var).pack()
+        self.cancel_button = ttk.Button(self, text="取消", command=self.cancel)
+        self.cancel_button.pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+    
+    def update_progress(self, done: int, total: int):
+        """更新进度条（在主线程中调用）"""
+        percent = done * 100 / total if total else 100
+        self.bar['value'] = percent
+        self.detail_var.set(f"{percent:.0f}%")
+    
+    def cancel(self):
+        """请求取消任务；任务停止后由回调关闭窗口"""
+        if self.task is not None and not self.task.finished:
+            self.task.cancel()
+            self.cancel_button.state(['disabled'])
+            self.detail_var.set("正在取消...")
+        else:
+            self.destroy()
 
 
 class BankingApp(tk.Tk):
@@ -29,6 +69,8 @@ class BankingApp(tk.Tk):
         
         # 初始化银行系统
         self.banking = BankingSystem()
+        self.banking.enable_metrics()
+        self.tasks = TaskRunner(self)
         
         # 初始化界面
         self._init_ui()
@@ -60,11 +102,13 @@ class BankingApp(tk.Tk):
             ("创建新账户", self.create_account_window),
             ("查看账户详情", self.view_account_window),
             ("列出所有账户", self.list_accounts_window),
+            ("按姓名查找账户", self.search_accounts_window),
             ("存款", self.deposit_window),
             ("取款", self.withdraw_window),
             ("转账", self.transfer_window),
             ("保存账户到文件", self.save_accounts_window),
             ("从文件加载账户", self.load_accounts_window),
+            ("运行统计", self.metrics_window),
             ("退出", self.exit_app)
         ]
         
@@ -88,6 +132,44 @@ class BankingApp(tk.Tk):
         )
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def run_task(self, function, *args, on_done=None, status: str = None):
+        """在工作线程中执行 function，完成后在主线程中以返回值调用 on_done"""
+        if status:
+            self.status_var.set(status)
+        return self.tasks.submit(function, *args, on_done=on_done, on_error=self._show_task_error)
+    
+    def run_task_with_progress(self, title: str, text: str, function, *args, on_done=None):
+        """
+        在工作线程中执行长时间操作，并显示带取消按钮的进度窗口。
+        
+        function 必须接受关键字参数 progress（参数为已完成数量和总数量）。
+        """
+        dialog = ProgressDialog(self, title, text)
+        
+        def finish(result):
+            dialog.destroy()
+            if on_done is not None:
+                on_done(result)
+        
+        def cancelled():
+            dialog.destroy()
+            self.status_var.set(f"{title}已取消")
+        
+        def failed(error):
+            dialog.destroy()
+            self._show_task_error(error)
+        
+        dialog.task = self.tasks.submit(
+            function, *args, on_done=finish, on_progress=dialog.update_progress,
+            on_error=failed, on_cancel=cancelled, with_progress=True
+        )
+        self.status_var.set(f"正在{title}...")
+        return dialog.task
+    
+    def _show_task_error(self, error: Exception):
+        messagebox.showerror("错误", f"操作失败: {error}")
+        self.status_var.set("操作失败")
+    
     def _create_sample_accounts(self):
         """创建示例账户"""
         self.banking.create_account("1", "张三", Decimal("1000.00"))
@@ -131,11 +213,12 @@ class BankingApp(tk.Tk):
             
             try:
                 initial_balance = Decimal(balance_entry.get().strip())
+            except InvalidOperation:
+                messagebox.showerror("错误", "请输入有效的余额数字")
+                return
                 
-                success, error = self.banking.create_account(
-                    account_id, owner_name, initial_balance
-                )
-                
+            def done(result):
+                success, error = result
                 if success:
                     messagebox.showinfo(
                         "成功", 
@@ -146,8 +229,7 @@ class BankingApp(tk.Tk):
                 else:
                     messagebox.showerror("错误", f"账户创建失败: {error}")
             
-            except InvalidOperation:
-                messagebox.showerror("错误", "请输入有效的余额数字")
+            self.run_task(self.banking.create_account, account_id, owner_name, initial_balance, on_done=done)
         
         button_frame = ttk.Frame(window)
         button_frame.pack(pady=10)
@@ -162,8 +244,11 @@ class BankingApp(tk.Tk):
         if not account_id:
             return
         
-        account = self.banking.get_account(account_id)
+        self.run_task(self.banking.get_account, account_id,
+                      on_done=lambda account: self._show_account(account_id, account))
         
+    def _show_account(self, account_id: str, account):
+        """显示账户信息窗口"""
         if not account:
             messagebox.showerror("错误", f"未找到ID为 '{account_id}' 的账户")
             return
@@ -193,9 +278,9 @@ class BankingApp(tk.Tk):
         
         self.status_var.set(f"正在查看账户: {account_id}")
     
-    def list_accounts_window(self):
-        """打开账户列表窗口"""
-        accounts = self.banking.get_all_accounts()
+    def list_accounts_window(self, page_size: int = 200):
+        """打开账户列表窗口（滚动到底部时按需加载下一页，点击列标题排序）"""
+        total = self.banking.account_count()
         
         window = tk.Toplevel(self)
         window.title("所有账户")
@@ -204,35 +289,169 @@ class BankingApp(tk.Tk):
         
         ttk.Label(window, text="所有账户", font=("黑体", 16)).pack(pady=10)
         
-        if not accounts:
+        if not total:
             ttk.Label(window, text="系统中没有找到账户").pack(pady=20)
-        else:
-            # 创建表格
-            columns = ("账户ID", "所有者", "余额")
-            tree = ttk.Treeview(window, columns=columns, show="headings")
+            ttk.Button(window, text="关闭", command=window.destroy).pack(pady=10)
+            self.status_var.set("列出账户: 0个")
+            return
             
-            # 设置列标题
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
+        # 创建表格
+        columns = ("账户ID", "所有者", "余额")
+        sort_fields = {"账户ID": 'account_id', "所有者": 'owner_name', "余额": 'balance'}
+        tree = ttk.Treeview(window, columns=columns, show="headings")
             
-            # 添加数据
-            for account in accounts:
-                tree.insert("", tk.END, values=(
-                    account.account_id,
-                    account.owner_name,
-                    f"¥{account.balance}"
-                ))
+        # 当前排序方式、分页游标和加载进度；generation 在重新排序时递增，
+        # 用于丢弃排序前提交、排序后才返回的页
+        state = {'sort_by': None, 'descending': False, 'cursor': None, 'done': False, 'loaded': 0,
+                 'loading': False, 'generation': 0}
+        
+        def load_page():
+            """在后台加载下一页，完成后追加到表格末尾"""
+            if state['done'] or state['loading']:
+                return
+            state['loading'] = True
+            generation = state['generation']
+            
+            def show(page):
+                if generation != state['generation']:
+                    return
+                state['loading'] = False
+                if not window.winfo_exists():
+                    return
+                for account in page.accounts:
+                    tree.insert("", tk.END, values=(
+                        account.account_id,
+                        account.owner_name,
+                        f"¥{account.balance}"
+                    ))
+                state['loaded'] += len(page.accounts)
+                state['cursor'] = page.next_cursor
+                state['done'] = page.next_cursor is None
+                self.status_var.set(f"列出账户: 已加载 {state['loaded']}/{page.total}个")
             
-            # 添加滚动条
-            scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
-            tree.configure(yscrollcommand=scrollbar.set)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            self.run_task(self.banking.get_accounts_page, state['cursor'], page_size,
+                          state['sort_by'], state['descending'], on_done=show, status="正在加载账户...")
+            
+        def sort_by_column(column):
+            """按列排序；再次点击同一列时切换升降序"""
+            field = sort_fields[column]
+            state['descending'] = not state['descending'] if state['sort_by'] == field else False
+            state.update(sort_by=field, cursor=None, done=False, loaded=0, loading=False)
+            state['generation'] += 1
+            tree.delete(*tree.get_children())
+            tree.yview_moveto(0)
+            load_page()
+        
+        def on_scroll(first, last):
+            """滚动接近底部时加载下一页"""
+            scrollbar.set(first, last)
+            if float(last) > 0.9 and not state['done']:
+                window.after_idle(load_page)
+        
+        # 设置列标题
+        for col in columns:
+            tree.heading(col, text=col, command=lambda c=col: sort_by_column(c))
+            tree.column(col, width=100)
+        
+        # 添加滚动条
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=on_scroll)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        load_page()
         
         ttk.Button(window, text="关闭", command=window.destroy).pack(pady=10)
+    
+    def search_accounts_window(self):
+        """打开按所有者姓名查找账户的窗口"""
+        window = tk.Toplevel(self)
+        window.title("查找账户")
+        window.geometry("600x400")
+        window.transient(self)
+        
+        ttk.Label(window, text="按姓名查找账户", font=("黑体", 16)).pack(pady=10)
         
-        self.status_var.set(f"列出账户: {len(accounts)}个")
+        form_frame = ttk.Frame(window)
+        form_frame.pack(pady=5, fill=tk.X, padx=10)
+        
+        ttk.Label(form_frame, text="姓名:").pack(side=tk.LEFT)
+        query_entry = ttk.Entry(form_frame, width=20)
+        query_entry.pack(side=tk.LEFT, padx=5)
+        
+        mode_var = tk.StringVar(value='prefix')
+        for text, mode in (("精确", 'exact'), ("前缀", 'prefix'), ("模糊", 'fuzzy')):
+            ttk.Radiobutton(form_frame, text=text, variable=mode_var, value=mode).pack(side=tk.LEFT)
+        
+        columns = ("账户ID", "所有者", "余额")
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        
+        def on_search(event=None):
+            query = query_entry.get().strip()
+            if not query:
+                messagebox.showerror("错误", "请输入姓名")
+                return
+            
+            def show(accounts):
+                if not window.winfo_exists():
+                    return
+                tree.delete(*tree.get_children())
+                for account in accounts:
+                    tree.insert("", tk.END, values=(
+                        account.account_id,
+                        account.owner_name,
+                        f"¥{account.balance}"
+                    ))
+                self.status_var.set(f"查找 '{query}': 找到 {len(accounts)} 个账户")
+            
+            self.run_task(self.banking.search_accounts, query, mode_var.get(), on_done=show,
+                          status=f"正在查找 '{query}'...")
+        
+        ttk.Button(form_frame, text="查找", command=on_search).pack(side=tk.LEFT, padx=5)
+        query_entry.bind("<Return>", on_search)
+        query_entry.focus_set()
+        
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        ttk.Button(window, text="关闭", command=window.destroy).pack(pady=10)
+    
+    def metrics_window(self, interval_ms: int = 1000):
+        """打开运行统计窗口（每秒刷新一次）"""
+        window = tk.Toplevel(self)
+        window.title("运行统计")
+        window.geometry("700x400")
+        window.transient(self)
+        
+        ttk.Label(window, text="运行统计", font=("黑体", 16)).pack(pady=10)
+        summary_var = tk.StringVar()
+        ttk.Label(window, textvariable=summary_var).pack()
+        
+        columns = ("操作", "调用", "失败", "p50(us)", "p99(us)", "失败原因")
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=90 if col != "失败原因" else 200)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            summary_var.set(f"账户数: {self.banking.account_count()}  总余额: ¥{self.banking.total_balance()}")
+            snapshot = self.banking.metrics.snapshot() if self.banking.metrics is not None else {}
+            tree.delete(*tree.get_children())
+            for name, stats in snapshot.items():
+                reasons = ", ".join(f"{reason}={count}" for reason, count in stats['reasons'].items())
+                tree.insert("", tk.END, values=(
+                    name, stats['calls'], stats['failures'],
+                    f"{stats['p50_us']:.1f}", f"{stats['p99_us']:.1f}", reasons
+                ))
+            window.after(interval_ms, refresh)
+        
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        ttk.Button(window, text="关闭", command=window.destroy).pack(pady=10)
+        refresh()
+        self.status_var.set("正在查看运行统计")
     
     def deposit_window(self):
         """打开存款窗口"""
@@ -265,28 +484,34 @@ class BankingApp(tk.Tk):
                 messagebox.showerror("错误", "请输入账户ID")
                 return
             
-            if not self.banking.get_account(account_id):
-                messagebox.showerror("错误", f"未找到ID为 '{account_id}' 的账户")
-                return
-            
             try:
                 amount = Decimal(amount_entry.get().strip())
-                
+            except InvalidOperation:
+                messagebox.showerror("错误", "请输入有效的金额数字")
+                return
+            
+            def work():
+                if not self.banking.get_account(account_id):
+                    return None
                 success, error = self.banking.deposit(account_id, amount)
+                return success, error, self.banking.get_account(account_id).balance
                 
+            def done(result):
+                if result is None:
+                    messagebox.showerror("错误", f"未找到ID为 '{account_id}' 的账户")
+                    return
+                success, error, balance = result
                 if success:
-                    account = self.banking.get_account(account_id)
                     messagebox.showinfo(
                         "成功", 
-                        f"存款成功！\n新余额: ¥{account.balance}"
+                        f"存款成功！\n新余额: ¥{balance}"
                     )
                     window.destroy()
                     self.status_var.set(f"已向账户 {account_id} 存款 ¥{amount}")
                 else:
                     messagebox.showerror("错误", f"存款失败: {error}")
             
-            except InvalidOperation:
-                messagebox.showerror("错误", "请输入有效的金额数字")
+            self.run_task(work, on_done=done)
         
         button_frame = ttk.Frame(window)
         button_frame.pack(pady=10)
@@ -325,28 +550,34 @@ class BankingApp(tk.Tk):
                 messagebox.showerror("错误", "请输入账户ID")
                 return
             
-            if not self.banking.get_account(account_id):
-                messagebox.showerror("错误", f"未找到ID为 '{account_id}' 的账户")
-                return
-            
             try:
                 amount = Decimal(amount_entry.get().strip())
-                
+            except InvalidOperation:
+                messagebox.showerror("错误", "请输入有效的金额数字")
+                return
+            
+            def work():
+                if not self.banking.get_account(account_id):
+                    return None
                 success, error = self.banking.withdraw(account_id, amount)
+                return success, error, self.banking.get_account(account_id).balance
                 
+            def done(result):
+                if result is None:
+                    messagebox.showerror("错误", f"未找到ID为 '{account_id}' 的账户")
+                    return
+                success, error, balance = result
                 if success:
-                    account = self.banking.get_account(account_id)
                     messagebox.showinfo(
                         "成功", 
-                        f"取款成功！\n新余额: ¥{account.balance}"
+                        f"取款成功！\n新余额: ¥{balance}"
                     )
                     window.destroy()
                     self.status_var.set(f"已从账户 {account_id} 取款 ¥{amount}")
                 else:
                     messagebox.showerror("错误", f"取款失败: {error}")
             
-            except InvalidOperation:
-                messagebox.showerror("错误", "请输入有效的金额数字")
+            self.run_task(work, on_done=done)
         
         button_frame = ttk.Frame(window)
         button_frame.pack(pady=10)
@@ -391,34 +622,38 @@ class BankingApp(tk.Tk):
                 messagebox.showerror("错误", "请输入来源和目标账户ID")
                 return
             
-            if not self.banking.get_account(from_account_id):
-                messagebox.showerror("错误", f"未找到ID为 '{from_account_id}' 的来源账户")
-                return
-            
-            if not self.banking.get_account(to_account_id):
-                messagebox.showerror("错误", f"未找到ID为 '{to_account_id}' 的目标账户")
-                return
-            
             try:
                 amount = Decimal(amount_entry.get().strip())
-                
+            except InvalidOperation:
+                messagebox.showerror("错误", "请输入有效的金额数字")
+                return
+            
+            def work():
+                if not self.banking.get_account(from_account_id):
+                    return f"未找到ID为 '{from_account_id}' 的来源账户"
+                if not self.banking.get_account(to_account_id):
+                    return f"未找到ID为 '{to_account_id}' 的目标账户"
                 success, error = self.banking.transfer(from_account_id, to_account_id, amount)
-                
+                return (success, error, self.banking.get_account(from_account_id).balance,
+                        self.banking.get_account(to_account_id).balance)
+            
+            def done(result):
+                if isinstance(result, str):
+                    messagebox.showerror("错误", result)
+                    return
+                success, error, from_balance, to_balance = result
                 if success:
-                    from_account = self.banking.get_account(from_account_id)
-                    to_account = self.banking.get_account(to_account_id)
                     messagebox.showinfo(
                         "成功", 
-                        f"转账成功！\n来源账户 ({from_account_id}) 新余额: ¥{from_account.balance}\n"
-                        f"目标账户 ({to_account_id}) 新余额: ¥{to_account.balance}"
+                        f"转账成功！\n来源账户 ({from_account_id}) 新余额: ¥{from_balance}\n"
+                        f"目标账户 ({to_account_id}) 新余额: ¥{to_balance}"
                     )
                     window.destroy()
                     self.status_var.set(f"已从账户 {from_account_id} 转账 ¥{amount} 到账户 {to_account_id}")
                 else:
                     messagebox.showerror("错误", f"转账失败: {error}")
             
-            except InvalidOperation:
-                messagebox.showerror("错误", "请输入有效的金额数字")
+            self.run_task(work, on_done=done)
         
         button_frame = ttk.Frame(window)
         button_frame.pack(pady=10)
@@ -428,7 +663,7 @@ class BankingApp(tk.Tk):
     
     def save_accounts_window(self):
         """保存账户到文件"""
-        if not self.banking.get_all_accounts():
+        if not self.banking.account_count():
             messagebox.showwarning("警告", "当前没有账户可以保存")
             return
         
@@ -441,13 +676,16 @@ class BankingApp(tk.Tk):
         if not filename:
             return
         
-        success, error = self.banking.save_to_csv(filename)
+        def done(result):
+            success, error = result
+            if success:
+                messagebox.showinfo("成功", f"账户已成功保存到 '{filename}'")
+                self.status_var.set(f"已保存账户到 {filename}")
+            else:
+                messagebox.showerror("错误", f"保存账户失败: {error}")
         
-        if success:
-            messagebox.showinfo("成功", f"账户已成功保存到 '{filename}'")
-            self.status_var.set(f"已保存账户到 {filename}")
-        else:
-            messagebox.showerror("错误", f"保存账户失败: {error}")
+        self.run_task_with_progress("保存账户", f"正在保存到 '{filename}'...",
+                                    self.banking.save_to_csv, filename, on_done=done)
     
     def load_accounts_window(self):
         """从文件加载账户"""
@@ -464,17 +702,26 @@ class BankingApp(tk.Tk):
             messagebox.showerror("错误", f"未找到文件 '{filename}'")
             return
         
-        success, error = self.banking.load_from_csv(filename)
+        def load(progress):
+            # 按已读取的字节数报告进度；取消时原有账户保持不变
+            return self.banking.load_from_csv_streaming(
+                filename, progress=lambda loaded, position, size: progress(position, size)
+            )
         
-        if success:
-            messagebox.showinfo("成功", f"账户已成功从 '{filename}' 加载")
-            self.status_var.set(f"已从 {filename} 加载账户")
-        else:
-            messagebox.showerror("错误", f"加载账户失败: {error}")
+        def done(result):
+            success, error = result
+            if success:
+                messagebox.showinfo("成功", f"账户已成功从 '{filename}' 加载")
+                self.status_var.set(f"已从 {filename} 加载账户")
+            else:
+                messagebox.showerror("错误", f"加载账户失败: {error}")
+        
+        self.run_task_with_progress("加载账户", f"正在加载 '{filename}'...", load, on_done=done)
     
     def exit_app(self):
         """退出应用程序"""
         if messagebox.askyesno("退出", "确定要退出应用程序吗？"):
+            self.tasks.shutdown()
             self.destroy()
             sys.exit(0)
 
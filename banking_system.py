@@ -1,13 +1,35 @@
 import csv
+import heapq
 import os
+import threading
+from collections import namedtuple
+from datetime import date
 from decimal import Decimal
-from typing import Dict, List, Optional, Tuple
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from aggregates import DEPOSIT, TRANSFER, WITHDRAW, Aggregates, DailyVolume
+from money import INT64_MAX, ZERO, from_cents, to_cents
+
+# 可选的子系统在第一次使用时才导入，只做简单存取款的进程（例如命令行的
+# 单条命令）不必为它们付出导入时间
+if TYPE_CHECKING:
+    from balance_index import BalanceIndex
+    from history import HistoryEntry, TransactionHistory
+    from idempotency import IdempotencyCache
+    from journal import TransactionJournal
+    from metrics import Metrics
+    from owner_index import OwnerIndex
+    from page_index import PageIndex
+    from snapshot import SnapshotStore
 
 
 class BankAccount:
     """表示银行系统中的一个银行账户。"""
+    
+    __slots__ = ('account_id', 'owner_name', '_balance')
 
-    def __init__(self, account_id: str, owner_name: str, balance: Decimal = Decimal('0.00')):
+    def __init__(self, account_id: str, owner_name: str, balance: Decimal = ZERO):
         """
         初始化一个新的银行账户。
         
@@ -18,10 +40,10 @@ class BankAccount:
         """
         self.account_id = account_id
         self.owner_name = owner_name
-        self._balance = Decimal('0.00')  # 从零开始，然后存款
+        self._balance = ZERO  # 从零开始，然后存款
         
         # 如果提供了初始余额，则存入
-        if balance > Decimal('0.00'):
+        if balance > ZERO:
             self.deposit(balance)
     
     @property
@@ -39,7 +61,7 @@ class BankAccount:
         返回:
             如果存款成功返回True，否则返回False
         """
-        if amount <= Decimal('0.00'):
+        if amount <= ZERO:
             return False
         
         self._balance += amount
@@ -55,7 +77,7 @@ class BankAccount:
         返回:
             如果取款成功返回True，否则返回False
         """
-        if amount <= Decimal('0.00') or amount > self._balance:
+        if amount <= ZERO or amount > self._balance:
             return False
         
         self._balance -= amount
@@ -77,17 +99,266 @@ class BankAccount:
             owner_name=data['owner_name'],
             balance=Decimal(data['balance'])
         )
+    
+    @classmethod
+    def _restore(cls, account_id: str, owner_name: str, balance: Decimal) -> 'BankAccount':
+        """
+        直接设置余额创建账户，跳过构造函数和存款逻辑。
+        
+        仅用于加载已保存的数据；调用方需保证余额已按构造函数的规则处理
+        （非正数余额记为0）。
+        """
+        account = cls.__new__(cls)
+        account.account_id = account_id
+        account.owner_name = owner_name
+        account._balance = balance
+        return account
+
+
+class CentsBankAccount(BankAccount):
+    """
+    以整数分保存余额的银行账户。
+    
+    对外接口与 BankAccount 相同（金额仍为 Decimal），内部以int64范围内的
+    整数运算；deposit_cents() 和 withdraw_cents() 供批量接口直接使用整数分。
+    金额必须为整分，否则操作失败。
+    """
+    
+    __slots__ = ('_cents',)
+    
+    def __init__(self, account_id: str, owner_name: str, balance: Decimal = ZERO):
+        """
+        初始化一个新的银行账户。
+        
+        参数:
+            account_id: 账户的唯一标识符
+            owner_name: 账户所有者的姓名
+            balance: 初始账户余额（默认为0，必须为整分）
+        
+        异常:
+            ValueError: 初始余额不是整分
+            OverflowError: 初始余额超出int64范围
+        """
+        self.account_id = account_id
+        self.owner_name = owner_name
+        self._cents = to_cents(balance) if balance > ZERO else 0
+    
+    @property
+    def balance(self) -> Decimal:
+        """获取账户的当前余额。"""
+        return from_cents(self._cents)
+    
+    @property
+    def cents(self) -> int:
+        """以分为单位的当前余额。"""
+        return self._cents
+    
+    def deposit(self, amount: Decimal) -> bool:
+        """向账户存款，金额必须为正数且为整分。"""
+        try:
+            return self.deposit_cents(to_cents(amount))
+        except (ValueError, OverflowError):
+            return False
+    
+    def withdraw(self, amount: Decimal) -> bool:
+        """从账户取款，金额必须为正数、为整分且小于等于余额。"""
+        try:
+            return self.withdraw_cents(to_cents(amount))
+        except (ValueError, OverflowError):
+            return False
+    
+    def deposit_cents(self, cents: int) -> bool:
+        """以整数分存款；金额非正或余额将超出int64范围时返回False。"""
+        if cents <= 0 or self._cents > INT64_MAX - cents:
+            return False
+        self._cents += cents
+        return True
+    
+    def withdraw_cents(self, cents: int) -> bool:
+        """以整数分取款；金额非正或超过余额时返回False。"""
+        if cents <= 0 or cents > self._cents:
+            return False
+        self._cents -= cents
+        return True
+    
+    def to_dict(self) -> Dict:
+        """将账户转换为字典以便存储。"""
+        return {
+            'account_id': self.account_id,
+            'owner_name': self.owner_name,
+            'balance': str(from_cents(self._cents))
+        }
+    
+    @classmethod
+    def _restore(cls, account_id: str, owner_name: str, balance: Decimal) -> 'CentsBankAccount':
+        """直接设置余额创建账户，跳过构造函数和存款逻辑。"""
+        account = cls.__new__(cls)
+        account.account_id = account_id
+        account.owner_name = owner_name
+        account._cents = to_cents(balance)
+        return account
+
+
+def _file_digest(filename: str) -> str:
+    """计算文件内容的SHA-256摘要。"""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _NullContext:
+    """不做任何事情的上下文管理器，用于非并发模式。"""
+    
+    stripe = 0  # 与 _HeldLocks 一致：汇总统计累加到的分段
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class _NullLocks:
+    """非并发模式下的锁占位对象，所有操作均为空操作。"""
+    
+    def hold(self, *account_ids: str) -> _NullContext:
+        return _NULL_CONTEXT
+    
+    def hold_all(self) -> _NullContext:
+        return _NULL_CONTEXT
+
+
+class _HeldLocks:
+    """
+    按固定顺序获取一组锁，并按相反顺序释放。
+    
+    stripe 是持有的分段之一，持有期间可以更新汇总统计中的这个分段。
+    """
+    
+    def __init__(self, locks: List[threading.Lock], stripe: int = 0):
+        self._locks = locks
+        self.stripe = stripe
+    
+    def __enter__(self):
+        for lock in self._locks:
+            lock.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        for lock in reversed(self._locks):
+            lock.release()
+        return False
+
+
+class _StripedLocks:
+    """
+    按账户ID分段的锁（lock striping）。
+    
+    每个账户ID通过哈希映射到固定数量的锁之一。需要多把锁时总是按
+    分段下标升序获取，因此并发转账不会死锁；互不相关的账户大多落在
+    不同的分段上，可以并行执行。
+    """
+    
+    def __init__(self, stripes: int):
+        if stripes < 1:
+            raise ValueError("锁分段数必须为正数")
+        self._locks = [threading.Lock() for _ in range(stripes)]
+    
+    def hold(self, *account_ids: str) -> _HeldLocks:
+        """返回同时持有给定账户所在分段锁的上下文管理器。"""
+        count = len(self._locks)
+        indices = sorted({hash(account_id) % count for account_id in account_ids})
+        return _HeldLocks([self._locks[i] for i in indices], indices[0] if indices else 0)
+    
+    def hold_all(self) -> _HeldLocks:
+        """返回持有全部分段锁的上下文管理器，用于整体替换或导出账户。"""
+        return _HeldLocks(self._locks)
+
+
+# apply_batch() 返回的每个操作的状态码
+BATCH_OK = 0
+BATCH_NOT_FOUND = 1
+BATCH_INVALID_AMOUNT = 2
+BATCH_INSUFFICIENT_FUNDS = 3
+BATCH_SAME_ACCOUNT = 4
+BATCH_UNKNOWN_OP = 5
+BATCH_APPLY_FAILED = 6
+
+BATCH_MESSAGES = {
+    BATCH_OK: None,
+    BATCH_NOT_FOUND: "未找到账户",
+    BATCH_INVALID_AMOUNT: "金额必须为正数",
+    BATCH_INSUFFICIENT_FUNDS: "余额不足",
+    BATCH_SAME_ACCOUNT: "不能向同一账户转账",
+    BATCH_UNKNOWN_OP: "未知的操作类型",
+    BATCH_APPLY_FAILED: "应用余额变更失败",
+}
+
+# applied: 是否已应用整批操作；statuses: 每个操作一个字节的状态码
+BatchResult = namedtuple('BatchResult', ['applied', 'statuses'])
+
+# get_accounts_page() 的返回值；next_cursor 为None表示没有更多账户
+AccountPage = namedtuple('AccountPage', ['accounts', 'next_cursor', 'total'])
+
+# enable_metrics() 统计的方法
+INSTRUMENTED_OPERATIONS = (
+    'create_account', 'get_account', 'deposit', 'withdraw', 'transfer', 'apply_batch',
+    'save_to_csv', 'load_from_csv', 'get_all_accounts',
+)
+
+# 分页支持的排序字段
+SORT_KEYS = {
+    'account_id': lambda account: account.account_id,
+    'owner_name': lambda account: account.owner_name,
+    'balance': lambda account: account.balance,
+}
 
 
 class BankingSystem:
     """管理系统中的所有银行账户和操作。"""
     
-    def __init__(self):
-        """初始化一个没有账户的新银行系统。"""
-        self.accounts: Dict[str, BankAccount] = {}
+    def __init__(self, concurrent: bool = False, lock_stripes: int = 64, store=None,
+                 account_class: type = BankAccount, owner_index: bool = True):
+        """
+        初始化一个没有账户的新银行系统。
+        
+        参数:
+            concurrent: 是否启用并发模式（可从多个线程安全调用）
+            lock_stripes: 并发模式下的锁分段数量
+            store: 可选的账户存储后端（例如 CompactAccountStore），默认使用字典
+            account_class: 新建和加载账户时使用的账户类（例如 CentsBankAccount）
+            owner_index: 是否提供所有者姓名索引（用于 search_accounts）；索引在第一次
+                查找时建立，之后增量维护，打开很大的外部存储时不必遍历所有账户
+        """
+        self.accounts: Dict[str, BankAccount] = store if store is not None else {}
+        self._account_class = account_class
+        self._locks = _StripedLocks(lock_stripes) if concurrent else _NullLocks()
+        self._journal: Optional['TransactionJournal'] = None
+        self._dirty = set()  # 自上次增量检查点以来变更过的账户ID
+        self._all_dirty = False  # 为True时视所有账户为已变更（例如刚从CSV加载）
+        self._owner_index_enabled = owner_index
+        self._owner_index: Optional['OwnerIndex'] = None  # 第一次查找时建立
+        self._balance_index: Optional['BalanceIndex'] = None  # 由 enable_balance_index() 启用
+        self._page_index: Optional['PageIndex'] = None  # 第一次分页时创建
+        self._aggregates = Aggregates(lock_stripes if concurrent else 1)
+        self._history: Optional['TransactionHistory'] = None  # 由 enable_history() 启用
+        self._idempotency: Optional['IdempotencyCache'] = None  # 第一次使用幂等键时创建
+        self._lock_stripes = lock_stripes
+        self._lazy_lock = threading.Lock()  # 保护按需创建的子系统
+        self._metrics: Optional['Metrics'] = None  # 由 enable_metrics() 启用
+        self._owns_store = False  # 账户存储是否由 load_from_binary() 打开（替换时需要关闭）
+        if len(self.accounts):
+            # 传入已有数据的存储（例如打开已有的SQLite数据库）
+            self._rebuild_derived_state()
     
     def create_account(self, account_id: str, owner_name: str, 
-                       initial_balance: Decimal = Decimal('0.00')) -> Tuple[bool, Optional[str]]:
+                       initial_balance: Decimal = ZERO) -> Tuple[bool, Optional[str]]:
         """
         创建一个新的银行账户。
         
@@ -103,75 +374,161 @@ class BankingSystem:
         if not account_id or not owner_name:
             return False, "账户ID和所有者姓名不能为空"
             
-        if account_id in self.accounts:
-            return False, f"账户ID '{account_id}' 已存在"
+        with self._locks.hold(account_id) as held:
+            if account_id in self.accounts:
+                return False, f"账户ID '{account_id}' 已存在"
+                
+            if initial_balance < ZERO:
+                return False, "初始余额不能为负数"
             
-        if initial_balance < Decimal('0.00'):
-            return False, "初始余额不能为负数"
-        
-        # 创建账户
-        account = BankAccount(account_id, owner_name, initial_balance)
-        self.accounts[account_id] = account
+            # 创建账户（整分账户和外部存储的初始余额必须为整分且在int64范围内）
+            try:
+                if not isinstance(self.accounts, dict):
+                    # 外部存储插入时才转换为整数分，先检查以免插入中途失败
+                    to_cents(initial_balance)
+                account = self._account_class(account_id, owner_name, initial_balance)
+            except ValueError:
+                return False, "初始余额必须为整分"
+            except OverflowError:
+                return False, "金额超出范围"
+            self.accounts[account_id] = account
+            self._dirty.add(account_id)
+            if self._owner_index is not None:
+                self._owner_index.add(owner_name, account_id)
+            if self._balance_index is not None:
+                self._balance_index.add(account_id, account.balance)
+            if self._page_index is not None:
+                self._page_index.add(account)
+            self._aggregates.add_balance(account.balance, held.stripe)
+            if self._history is not None:
+                self._history.record(account_id, 'open', account.balance, account.balance)
+            
+            seq = 0
+            if self._journal is not None:
+                seq = self._journal.append({
+                    'op': 'create',
+                    'account_id': account_id,
+                    'owner_name': owner_name,
+                    'amount': str(initial_balance)
+                })
         
+        if seq:
+            self._journal.wait(seq)
         return True, None
     
     def get_account(self, account_id: str) -> Optional[BankAccount]:
         """通过ID获取账户，如果不存在则返回None。"""
         return self.accounts.get(account_id)
     
-    def deposit(self, account_id: str, amount: Decimal) -> Tuple[bool, Optional[str]]:
+    def deposit(self, account_id: str, amount: Decimal,
+                idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         向账户存款。
         
         参数:
             account_id: 要存款的账户ID
             amount: 存款金额（必须为正数）
+            idempotency_key: 可选的幂等键；有效期内重复的键直接返回第一次的结果
             
         返回:
             包含（成功状态，错误信息（如果有））的元组
         """
-        account = self.get_account(account_id)
-        if not account:
-            return False, f"未找到账户 '{account_id}'"
+        if idempotency_key is not None:
+            return self._idempotent(idempotency_key, 'deposit', account_id, amount)
+        return self._deposit(account_id, amount)
+        
+    def _deposit(self, account_id: str, amount: Decimal,
+                 idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """执行存款；idempotency_key 是 _idempotent() 正在执行的键，随日志记录保存。"""
+        seq = 0
+        # 在账户锁内查找账户，与并发的删除或整体替换（加载、恢复）互斥
+        with self._locks.hold(account_id) as held:
+            account = self.accounts.get(account_id)
+            if not account:
+                return False, f"未找到账户 '{account_id}'"
         
-        if amount <= Decimal('0.00'):
-            return False, "存款金额必须为正数"
+            if amount <= ZERO:
+                return False, "存款金额必须为正数"
         
-        success = account.deposit(amount)
+            balance_index = self._balance_index
+            old_balance = account.balance if balance_index is not None else None
+            success = account.deposit(amount)
+            if success:
+                self._dirty.add(account_id)
+                self._aggregates.record(DEPOSIT, amount, amount, 1, held.stripe)
+                if balance_index is not None:
+                    balance_index.update(account_id, old_balance, account.balance)
+                if self._history is not None:
+                    self._history.record(account_id, 'deposit', amount, account.balance)
+            if success and self._journal is not None:
+                record = {'op': 'deposit', 'account_id': account_id, 'amount': str(amount)}
+                if idempotency_key is not None:
+                    record['key'] = self._idempotency.journal_key(idempotency_key)
+                seq = self._journal.append(record)
+        
+        if seq:
+            self._journal.wait(seq)
         if success:
             return True, None
         else:
             return False, "存款失败"
     
-    def withdraw(self, account_id: str, amount: Decimal) -> Tuple[bool, Optional[str]]:
+    def withdraw(self, account_id: str, amount: Decimal,
+                 idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         从账户取款。
         
         参数:
             account_id: 要取款的账户ID
             amount: 取款金额（必须为正数且小于等于余额）
+            idempotency_key: 可选的幂等键；有效期内重复的键直接返回第一次的结果
             
         返回:
             包含（成功状态，错误信息（如果有））的元组
         """
-        account = self.get_account(account_id)
-        if not account:
-            return False, f"未找到账户 '{account_id}'"
-        
-        if amount <= Decimal('0.00'):
-            return False, "取款金额必须为正数"
+        if idempotency_key is not None:
+            return self._idempotent(idempotency_key, 'withdraw', account_id, amount)
+        return self._withdraw(account_id, amount)
         
-        if amount > account.balance:
-            return False, "余额不足"
+    def _withdraw(self, account_id: str, amount: Decimal,
+                  idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """执行取款；idempotency_key 是 _idempotent() 正在执行的键，随日志记录保存。"""
+        seq = 0
+        with self._locks.hold(account_id) as held:
+            account = self.accounts.get(account_id)
+            if not account:
+                return False, f"未找到账户 '{account_id}'"
+            
+            if amount <= ZERO:
+                return False, "取款金额必须为正数"
+            
+            old_balance = account.balance
+            if amount > old_balance:
+                return False, "余额不足"
+            
+            success = account.withdraw(amount)
+            if success:
+                self._dirty.add(account_id)
+                self._aggregates.record(WITHDRAW, amount, -amount, 1, held.stripe)
+                if self._balance_index is not None:
+                    self._balance_index.update(account_id, old_balance, account.balance)
+                if self._history is not None:
+                    self._history.record(account_id, 'withdraw', amount, account.balance)
+            if success and self._journal is not None:
+                record = {'op': 'withdraw', 'account_id': account_id, 'amount': str(amount)}
+                if idempotency_key is not None:
+                    record['key'] = self._idempotency.journal_key(idempotency_key)
+                seq = self._journal.append(record)
         
-        success = account.withdraw(amount)
+        if seq:
+            self._journal.wait(seq)
         if success:
             return True, None
         else:
             return False, "取款失败"
     
     def transfer(self, from_account_id: str, to_account_id: str, 
-                 amount: Decimal) -> Tuple[bool, Optional[str]]:
+                 amount: Decimal, idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         在账户之间转账。
         
@@ -179,83 +536,1105 @@ class BankingSystem:
             from_account_id: 来源账户的ID
             to_account_id: 目标账户的ID
             amount: 转账金额
+            idempotency_key: 可选的幂等键；有效期内重复的键直接返回第一次的结果
             
         返回:
             包含（成功状态，错误信息（如果有））的元组
         """
+        if idempotency_key is not None:
+            return self._idempotent(idempotency_key, 'transfer', from_account_id, to_account_id, amount)
+        return self._transfer(from_account_id, to_account_id, amount)
+        
+    def _transfer(self, from_account_id: str, to_account_id: str, amount: Decimal,
+                  idempotency_key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """执行转账；idempotency_key 是 _idempotent() 正在执行的键，随日志记录保存。"""
         if from_account_id == to_account_id:
             return False, "不能向同一账户转账"
             
-        source = self.get_account(from_account_id)
-        destination = self.get_account(to_account_id)
+        seq = 0
+        with self._locks.hold(from_account_id, to_account_id) as held, self._transaction():
+            source = self.accounts.get(from_account_id)
+            destination = self.accounts.get(to_account_id)
+            
+            if not source:
+                return False, f"未找到来源账户 '{from_account_id}'"
+            
+            if not destination:
+                return False, f"未找到目标账户 '{to_account_id}'"
+            
+            if amount <= ZERO:
+                return False, "转账金额必须为正数"
+            
+            source_balance = source.balance
+            if amount > source_balance:
+                return False, "转账资金不足"
+            
+            # 执行转账；存入失败时把已取出的金额退回来源账户
+            if not source.withdraw(amount):
+                return False, "转账失败"
+            if not destination.deposit(amount):
+                source.deposit(amount)
+                return False, "转账失败"
+            
+            self._dirty.add(from_account_id)
+            self._dirty.add(to_account_id)
+            self._aggregates.record(TRANSFER, amount, ZERO, 1, held.stripe)
+            if self._balance_index is not None:
+                self._balance_index.update(from_account_id, source_balance, source.balance)
+                self._balance_index.update(to_account_id, destination.balance - amount, destination.balance)
+            if self._history is not None:
+                self._history.record(from_account_id, 'transfer_out', amount, source.balance, to_account_id)
+                self._history.record(to_account_id, 'transfer_in', amount, destination.balance, from_account_id)
+            if self._journal is not None:
+                record = {
+                    'op': 'transfer',
+                    'from_account_id': from_account_id,
+                    'to_account_id': to_account_id,
+                    'amount': str(amount)
+                }
+                if idempotency_key is not None:
+                    record['key'] = self._idempotency.journal_key(idempotency_key)
+                seq = self._journal.append(record)
+        
+        if seq:
+            self._journal.wait(seq)
+        return True, None
+    
+    def _idempotent(self, key: str, operation: str, *args) -> Tuple[bool, Optional[str]]:
+        """
+        按幂等键执行一次变更：键已有结果时直接返回，否则执行并记住结果。
+        
+        键的过期时间和请求指纹由缓存保存，执行中的方法通过 journal_key()
+        取得写入日志的键；键已用于不同的请求时返回错误。
+        
+        参数:
+            key: 幂等键
+            operation: 'deposit'、'withdraw' 或 'transfer'
+            args: 传给该方法的参数
+        """
+        from idempotency import fingerprint
+        
+        # 调用不带指标包装的内部方法，启用指标时不会把同一次调用记录两次
+        method = getattr(self, '_' + operation)
+        cache = self._idempotency_cache()
+        request = fingerprint(operation, *args)
+        result = cache.get(key, request)
+        if result is not None:
+            return result
+        with cache.claim(key):
+            result = cache.get(key, request)
+            if result is None:
+                cache.begin(key, request)
+                try:
+                    result = method(*args, idempotency_key=key)
+                finally:
+                    cache.finish(key, result)
+        return result
+    
+    def _idempotency_cache(self) -> 'IdempotencyCache':
+        """返回幂等键缓存，第一次调用时创建。"""
+        if self._idempotency is None:
+            from idempotency import IdempotencyCache
+            with self._lazy_lock:
+                if self._idempotency is None:
+                    self._idempotency = IdempotencyCache(concurrent=isinstance(self._locks, _StripedLocks),
+                                                         stripes=self._lock_stripes)
+        return self._idempotency
+    
+    def enable_metrics(self) -> 'Metrics':
+        """
+        开始统计各操作的调用次数、失败原因和延迟，返回指标对象。
+        
+        在实例上用包装函数覆盖 INSTRUMENTED_OPERATIONS 中的方法；未启用时
+        这些方法没有任何额外开销。重复调用返回同一个指标对象。
+        """
+        if self._metrics is None:
+            from metrics import Metrics
+            self._metrics = Metrics(concurrent=isinstance(self._locks, _StripedLocks))
+            cls = type(self)
+            for name in INSTRUMENTED_OPERATIONS:
+                setattr(self, name, self._metrics.wrap(name, getattr(cls, name).__get__(self, cls)))
+        return self._metrics
+    
+    def disable_metrics(self):
+        """停止统计并恢复未包装的方法。"""
+        for name in INSTRUMENTED_OPERATIONS:
+            self.__dict__.pop(name, None)
+        self._metrics = None
+    
+    @property
+    def metrics(self) -> Optional['Metrics']:
+        """当前的指标对象，未启用时为None。"""
+        return self._metrics
+    
+    def metrics_text(self) -> str:
+        """以 Prometheus 文本格式导出指标，包括账户数量、总余额和按需加载存储的缓存统计（未启用指标时只有这些瞬时值）。"""
+        from metrics import Metrics
+        metrics = self._metrics if self._metrics is not None else Metrics()
+        gauges = {
+            'accounts': self.account_count(),
+            'total_balance': self.total_balance(),
+        }
+        cache_stats = getattr(self.accounts, 'cache_stats', None)
+        if cache_stats is not None:
+            # 按需加载的账户存储：缓存命中、未命中和淘汰次数
+            for name, value in cache_stats().items():
+                gauges[f'account_cache_{name}'] = value
+        return metrics.prometheus_text(gauges)
+    
+    def configure_idempotency(self, capacity: int, ttl: float):
+        """
+        设置幂等键缓存的容量和有效期（秒）。
         
-        if not source:
-            return False, f"未找到来源账户 '{from_account_id}'"
+        只有成功的变更会写入事务日志，因此重启后失败操作的键可以重新执行；
+        失败的操作没有改变任何状态，重新执行是安全的。
+        """
+        self._idempotency_cache().resize(capacity, ttl)
+    
+    def apply_batch(self, ops: Sequence[Tuple]) -> BatchResult:
+        """
+        原子地应用一批操作：要么全部成功，要么一个都不应用。
+        
+        每个操作是以下元组之一：
+            ('deposit', account_id, amount)
+            ('withdraw', account_id, amount)
+            ('transfer', from_account_id, to_account_id, amount)
+        
+        操作按顺序在模拟余额上校验（透支检查与逐个调用单笔方法时一致），
+        全部通过后把每个账户的净变化一次性写入账户。
+        
+        参数:
+            ops: 操作序列
             
-        if not destination:
-            return False, f"未找到目标账户 '{to_account_id}'"
+        返回:
+            BatchResult(applied, statuses)，statuses 是与 ops 等长的
+            bytearray，元素为 BATCH_* 状态码（可通过 BATCH_MESSAGES 查询说明）
+        """
+        statuses = bytearray(len(ops))
         
-        if amount <= Decimal('0.00'):
-            return False, "转账金额必须为正数"
+        # 并发模式下需要先知道涉及哪些账户才能加锁
+        touched = ()
+        if isinstance(self._locks, _StripedLocks):
+            touched = set()
+            for op in ops:
+                touched.update(op[1:-1])
         
-        if amount > source.balance:
-            return False, "转账资金不足"
+        seq = 0
+        with self._locks.hold(*touched) as held, self._transaction():
+            accounts = self.accounts
+            balances: Dict[str, Decimal] = {}  # 模拟余额，只包含涉及的账户
+            failed = False
+            
+            for index, op in enumerate(ops):
+                kind = op[0] if op else None
+                if kind == 'transfer' and len(op) == 4:
+                    _, source_id, destination_id, amount = op
+                    source_balance = balances.get(source_id)
+                    if source_balance is None and source_id in accounts:
+                        source_balance = balances[source_id] = accounts[source_id].balance
+                    if destination_id not in balances and destination_id in accounts:
+                        balances[destination_id] = accounts[destination_id].balance
+                    
+                    if source_id == destination_id:
+                        status = BATCH_SAME_ACCOUNT
+                    elif source_balance is None or destination_id not in balances:
+                        status = BATCH_NOT_FOUND
+                    elif amount <= ZERO:
+                        status = BATCH_INVALID_AMOUNT
+                    elif amount > source_balance:
+                        status = BATCH_INSUFFICIENT_FUNDS
+                    else:
+                        balances[source_id] = source_balance - amount
+                        balances[destination_id] += amount
+                        continue
+                elif (kind == 'deposit' or kind == 'withdraw') and len(op) == 3:
+                    _, account_id, amount = op
+                    balance = balances.get(account_id)
+                    if balance is None and account_id in accounts:
+                        balance = balances[account_id] = accounts[account_id].balance
+                    
+                    if balance is None:
+                        status = BATCH_NOT_FOUND
+                    elif amount <= ZERO:
+                        status = BATCH_INVALID_AMOUNT
+                    elif kind == 'deposit':
+                        balances[account_id] = balance + amount
+                        continue
+                    elif amount > balance:
+                        status = BATCH_INSUFFICIENT_FUNDS
+                    else:
+                        balances[account_id] = balance - amount
+                        continue
+                else:
+                    status = BATCH_UNKNOWN_OP
+                
+                statuses[index] = status
+                failed = True
+            
+            if failed:
+                return BatchResult(False, statuses)
+            
+            # 写入每个账户的净变化；任何一步失败都回滚已写入的部分
+            applied = []
+            for account_id, balance in balances.items():
+                account = accounts[account_id]
+                delta = balance - account.balance
+                if delta > ZERO:
+                    ok = account.deposit(delta)
+                elif delta < ZERO:
+                    ok = account.withdraw(-delta)
+                else:
+                    continue
+                if not ok:
+                    for applied_account, applied_delta in reversed(applied):
+                        if applied_delta > ZERO:
+                            applied_account.withdraw(applied_delta)
+                        else:
+                            applied_account.deposit(-applied_delta)
+                    statuses[:] = bytes([BATCH_APPLY_FAILED]) * len(ops)
+                    return BatchResult(False, statuses)
+                applied.append((account, delta))
+            
+            self._dirty.update(balances)
+            if self._balance_index is not None:
+                for account, delta in applied:
+                    self._balance_index.update(account.account_id, account.balance - delta, account.balance)
+            self._record_batch_volumes(ops, sum((delta for _, delta in applied), ZERO), held.stripe)
+            if self._history is not None:
+                self._record_batch_history(ops, balances)
+            if self._journal is not None:
+                seq = self._journal.append({
+                    'op': 'batch',
+                    'ops': [list(op[:-1]) + [str(op[-1])] for op in ops]
+                })
         
-        # 执行转账
-        if source.withdraw(amount) and destination.deposit(amount):
-            return True, None
-        else:
-            return False, "转账失败"
+        if seq:
+            self._journal.wait(seq)
+        return BatchResult(True, statuses)
     
-    def save_to_csv(self, filename: str) -> Tuple[bool, Optional[str]]:
+    def save_to_csv(self, filename: str, progress: Optional[Callable[[int, int], None]] = None,
+                    workers: int = 1) -> Tuple[bool, Optional[str]]:
         """
         将所有账户保存到CSV文件。
         
+        提供 progress 时先写入临时文件，全部写完后再替换目标文件，因此进度
+        回调抛出异常（例如取消保存）时原有文件保持不变。
+        
+        workers 大于1且账户足够多时由多个进程并行格式化（见 parallel_csv.py），
+        输出与单进程保存逐字节一致。
+        
         参数:
             filename: 保存CSV文件的路径
+            progress: 进度回调，参数为（已写入账户数，账户总数）
+            workers: 工作进程数量
             
         返回:
             包含（成功状态，错误信息（如果有））的元组
         """
         try:
-            with open(filename, 'w', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=['account_id', 'owner_name', 'balance'])
-                writer.writeheader()
-                
+            with self._locks.hold_all():
+                parallel = False
+                if workers > 1:
+                    import parallel_csv
+                    parallel = len(self.accounts) >= parallel_csv.MIN_PARALLEL_ROWS
+                if progress is None and not parallel:
+                    self._write_csv(filename)
+                else:
+                    temp_name = filename + '.tmp'
+                    try:
+                        if parallel:
+                            parallel_csv.write_csv(temp_name, list(self.accounts.values()), workers, progress)
+                        else:
+                            self._write_csv(temp_name, progress=progress)
+                        os.replace(temp_name, filename)
+                    finally:
+                        if os.path.exists(temp_name):
+                            os.remove(temp_name)
+            
+            return True, None
+        except Exception as e:
+            return False, f"保存数据时出错: {str(e)}"
+    
+    def _write_csv(self, filename: str, durable: bool = False,
+                   progress: Optional[Callable[[int, int], None]] = None, chunk_size: int = 10000):
+        """把所有账户写入CSV文件（调用方负责加锁）。durable为True时在返回前fsync。"""
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['account_id', 'owner_name', 'balance'])
+            writer.writeheader()
+            
+            if progress is None:
                 for account in self.accounts.values():
                     writer.writerow(account.to_dict())
+            else:
+                total = len(self.accounts)
+                written = 0
+                for account in self.accounts.values():
+                    writer.writerow(account.to_dict())
+                    written += 1
+                    if written % chunk_size == 0:
+                        progress(written, total)
+                progress(written, total)
             
+            if durable:
+                file.flush()
+                os.fsync(file.fileno())
+    
+    def save_to_binary(self, filename: str) -> Tuple[bool, Optional[str]]:
+        """
+        将所有账户保存为定长二进制文件（见 binary_format.py）。
+        
+        余额必须为整分。文件先写入临时文件并落盘，再原子地替换目标文件。
+        
+        参数:
+            filename: 保存二进制文件的路径
+        
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        from binary_format import iter_records, write_accounts
+        try:
+            with self._locks.hold_all():
+                write_accounts(filename, list(iter_records(self.accounts.values())))
+                # 当前映射的文件已被替换，改为映射新文件，之后的原地修改才会写入它
+                reopen = getattr(self.accounts, 'reopen', None)
+                if reopen is not None and os.path.abspath(self.accounts.filename) == os.path.abspath(filename):
+                    reopen()
             return True, None
         except Exception as e:
             return False, f"保存数据时出错: {str(e)}"
     
-    def load_from_csv(self, filename: str) -> Tuple[bool, Optional[str]]:
+    def load_from_binary(self, filename: str, cache_size: Optional[int] = None) -> Tuple[bool, Optional[str]]:
+        """
+        通过 mmap 打开二进制账户文件，替换现有账户。
+        
+        打开时只读取文件头，账户在访问时才从映射中读取，存取款直接修改
+        映射中的余额（调用 accounts.flush() 落盘）。所有者姓名索引和分页
+        索引在第一次使用时才建立，因此启动时间与账户数量无关。
+        
+        提供 cache_size 时不映射文件，改用 LazyAccountStore（见 lazy_store.py）：
+        账户按需读入最多 cache_size 个账户的LRU缓存，修改的余额在淘汰或
+        accounts.flush() 时写回文件，内存占用与工作集而不是账户总数成正比。
+        
+        参数:
+            filename: 二进制账户文件路径
+            cache_size: 按需加载时缓存的账户数量；为None时使用 mmap
+        
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        if self._journal is not None:
+            return False, "事务日志已打开，不能整体加载账户"
+        
+        if not os.path.exists(filename):
+            return False, f"未找到文件 '{filename}'"
+        
+        with self._locks.hold_all():
+            try:
+                if self._owns_store:
+                    # 之前打开的存储可能就是这个文件，先写回修改，新存储才能读到
+                    self.accounts.flush()
+                if cache_size is None:
+                    from binary_format import BinaryAccountStore
+                    store = BinaryAccountStore(filename)
+                else:
+                    from lazy_store import LazyAccountStore
+                    store = LazyAccountStore(filename, cache_size)
+            except Exception as e:
+                return False, f"加载数据时出错: {str(e)}"
+        
+            self._install_accounts(store, owned=True)
+            self._dirty = set()
+            self._all_dirty = True
+        return True, None
+    
+    def load_from_csv(self, filename: str, workers: int = 1) -> Tuple[bool, Optional[str]]:
         """
         从CSV文件加载账户。
         
+        workers 大于1且文件足够大时由多个进程并行解析（见 parallel_csv.py）；
+        文件包含加引号的字段时自动改用单进程加载。
+        
         参数:
             filename: 要加载的CSV文件路径
+            workers: 工作进程数量
             
         返回:
             包含（成功状态，错误信息（如果有））的元组
         """
+        if self._journal is not None:
+            # 整体替换的账户不会记入事务日志，之后的日志记录将无法在恢复时重放
+            return False, "事务日志已打开，不能整体加载账户"
+        
         if not os.path.exists(filename):
             return False, f"未找到文件 '{filename}'"
+        
+        if workers > 1:
+            import parallel_csv
+            if os.path.getsize(filename) >= parallel_csv.MIN_PARALLEL_BYTES:
+                try:
+                    return self._load_from_csv_parallel(filename, workers)
+                except parallel_csv.UnsplittableFile:
+                    pass
+                except Exception as e:
+                    return False, f"加载数据时出错: {str(e)}"
+            
+        try:
+            with self._locks.hold_all():
+                accounts = self._new_accounts()
+                
+                with open(filename, 'r', newline='') as file:
+                    reader = csv.DictReader(file)
+                    
+                    for row in reader:
+                        account = self._account_class.from_dict(row)
+                        accounts[account.account_id] = account
+                
+                # 从CSV加载的账户尚未写入任何增量快照
+                self._install_accounts(accounts)
+                self._dirty = set()
+                self._all_dirty = True
+            
+            return True, None
+        except Exception as e:
+            return False, f"加载数据时出错: {str(e)}"
+    
+    def _load_from_csv_parallel(self, filename: str, workers: int) -> Tuple[bool, Optional[str]]:
+        """并行解析CSV文件，在主进程中构造账户（与 load_from_csv_streaming 的快速路径相同）。"""
+        import parallel_csv
+        accounts = self._new_accounts()
+        zero = ZERO
+        restore = self._account_class._restore
+        for ids, names, balances in parallel_csv.read_csv(filename, workers):
+            for account_id, owner_name, balance in zip(ids, names, balances):
+                balance = Decimal(balance)
+                # 与构造函数一致：正数余额存入零余额账户，其余记为0
+                balance = zero + balance if balance > zero else zero
+                accounts[account_id] = restore(account_id, owner_name, balance)
+        
+        with self._locks.hold_all():
+            self._install_accounts(accounts)
+            self._dirty = set()
+            self._all_dirty = True
+        return True, None
+    
+    def load_from_csv_streaming(self, filename: str, chunk_size: int = 10000,
+                                progress: Optional[Callable[[int, int, int], None]] = None,
+                                fast: bool = True) -> Tuple[bool, Optional[str]]:
+        """
+        分块流式地从CSV文件加载账户，适用于数百万行的大文件。
+        
+        与 load_from_csv 不同，每行按元组解析而不构造字典；fast为True时
+        直接设置余额，不经过构造函数和 deposit()。新账户先载入一个新字典，
+        全部成功后才替换现有账户，因此加载失败时原有数据保持不变。
+        
+        参数:
+            filename: 要加载的CSV文件路径
+            chunk_size: 每块处理的行数，每块结束时报告一次进度
+            progress: 进度回调，参数为（已加载行数，已读取字节数，文件总字节数）
+            fast: 是否使用直接设置余额的快速路径
             
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        if self._journal is not None:
+            return False, "事务日志已打开，不能整体加载账户"
+        
+        if not os.path.exists(filename):
+            return False, f"未找到文件 '{filename}'"
+        
         try:
-            self.accounts = {}  # 清除现有账户
+            total_bytes = os.path.getsize(filename)
+            accounts = self._new_accounts()
+            zero = ZERO
+            restore = self._account_class._restore
             
             with open(filename, 'r', newline='') as file:
-                reader = csv.DictReader(file)
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if header is None:
+                    header = ['account_id', 'owner_name', 'balance']
+                id_col = header.index('account_id')
+                name_col = header.index('owner_name')
+                balance_col = header.index('balance')
                 
-                for row in reader:
-                    account = BankAccount.from_dict(row)
-                    self.accounts[account.account_id] = account
+                loaded = 0
+                while True:
+                    chunk = list(islice(reader, chunk_size))
+                    if not chunk:
+                        break
+                    
+                    if fast and (id_col, name_col, balance_col) == (0, 1, 2):
+                        for account_id, owner_name, balance in chunk:
+                            balance = Decimal(balance)
+                            # 与构造函数一致：正数余额存入零余额账户，其余记为0
+                            balance = zero + balance if balance > zero else zero
+                            accounts[account_id] = restore(account_id, owner_name, balance)
+                    elif fast:
+                        for row in chunk:
+                            balance = Decimal(row[balance_col])
+                            balance = zero + balance if balance > zero else zero
+                            accounts[row[id_col]] = restore(row[id_col], row[name_col], balance)
+                    else:
+                        for row in chunk:
+                            accounts[row[id_col]] = self._account_class(
+                                row[id_col], row[name_col], Decimal(row[balance_col])
+                            )
+                    
+                    loaded += len(chunk)
+                    if progress is not None:
+                        progress(loaded, file.buffer.tell(), total_bytes)
+            
+            with self._locks.hold_all():
+                self._install_accounts(accounts)
+                self._dirty = set()
+                self._all_dirty = True
             
             return True, None
         except Exception as e:
             return False, f"加载数据时出错: {str(e)}"
     
+    def save_incremental(self, store: 'SnapshotStore') -> Tuple[bool, Optional[str]]:
+        """
+        只把自上次增量检查点以来变更过的账户写入快照存储。
+        
+        参数:
+            store: 增量快照存储
+            
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        try:
+            with self._locks.hold_all():
+                self._write_delta(store)
+            return True, None
+        except Exception as e:
+            return False, f"保存增量快照时出错: {str(e)}"
+    
+    def _write_delta(self, store: 'SnapshotStore', before_commit=None):
+        """把变更过的账户写入新的增量文件并清空变更集合（调用方负责加锁）。"""
+        if self._all_dirty:
+            rows = [account.to_dict() for account in self.accounts.values()]
+        else:
+            rows = [self.accounts[account_id].to_dict() for account_id in self._dirty
+                    if account_id in self.accounts]
+        store.write_delta(rows, before_commit)
+        self._dirty = set()
+        self._all_dirty = False
+    
+    def load_from_snapshot(self, store: 'SnapshotStore') -> Tuple[bool, Optional[str]]:
+        """
+        从增量快照存储加载账户（基础文件加所有增量）。
+        
+        参数:
+            store: 增量快照存储
+            
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        if self._journal is not None:
+            return False, "事务日志已打开，不能整体加载账户"
+        
+        try:
+            with self._locks.hold_all():
+                accounts = self._new_accounts()
+                for row in store.iter_rows():
+                    accounts[row['account_id']] = self._account_class.from_dict(row)
+                self._install_accounts(accounts)
+                self._dirty = set()
+                self._all_dirty = False
+            return True, None
+        except Exception as e:
+            return False, f"加载增量快照时出错: {str(e)}"
+    
+    def recover(self, snapshot: Union[str, 'SnapshotStore'], journal_filename: str,
+                commit_delay: float = 0.0) -> Tuple[bool, Optional[str]]:
+        """
+        从快照和事务日志恢复系统状态，并开始把之后的变更写入日志。
+        
+        先加载快照（如果存在），再把快照之后的日志记录重放到其上。
+        
+        参数:
+            snapshot: 快照CSV文件路径或增量快照存储
+            journal_filename: 事务日志文件路径
+            commit_delay: 组提交前额外等待的秒数
+            
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        if self._journal is not None:
+            return False, "事务日志已打开"
+        
+        digest = None
+        if not isinstance(snapshot, str):
+            success, error = self.load_from_snapshot(snapshot)
+            if not success:
+                return False, error
+            digest = snapshot.state_id
+        elif os.path.exists(snapshot):
+            success, error = self.load_from_csv(snapshot)
+            if not success:
+                return False, error
+            digest = _file_digest(snapshot)
+        else:
+            self._install_accounts(self._new_accounts())
+        
+        from journal import TransactionJournal, read_journal
+        try:
+            records = read_journal(journal_filename)
+            
+            # 从与快照内容匹配的最后一个检查点之后开始重放
+            start = 0
+            for index, record in enumerate(records):
+                if record['op'] == 'checkpoint' and record['digest'] == digest:
+                    start = index + 1
+            
+            # 检查点中保存了截断日志时仍然有效的幂等键
+            if self._idempotency is not None:
+                self._idempotency.clear()
+            if start and records[start - 1].get('idempotency'):
+                self._idempotency_cache().load(records[start - 1]['idempotency'])
+            
+            # 日志以检查点开头说明更早的记录已被截断，必须有匹配的快照
+            if start == 0 and records and records[0]['op'] == 'checkpoint':
+                return False, "快照与事务日志中的检查点不匹配"
+            
+            for record in records[start:]:
+                success, error = self._replay(record)
+                if not success:
+                    return False, f"重放事务日志失败 (seq={record.get('seq')}): {error}"
+            
+            self._journal = TransactionJournal(journal_filename, commit_delay)
+            return True, None
+        except Exception as e:
+            return False, f"恢复数据时出错: {str(e)}"
+    
+    def _replay(self, record: Dict) -> Tuple[bool, Optional[str]]:
+        """把一条日志记录重新应用到当前状态上（不再写入交易历史）。"""
+        history, self._history = self._history, None
+        try:
+            return self._replay_record(record)
+        finally:
+            self._history = history
+    
+    def _replay_record(self, record: Dict) -> Tuple[bool, Optional[str]]:
+        op = record['op']
+        key = record.get('key')
+        if key is not None and op in ('deposit', 'withdraw', 'transfer'):
+            from idempotency import fingerprint
+            
+            method = getattr(self, '_' + op)
+            if op == 'transfer':
+                args = (record['from_account_id'], record['to_account_id'], Decimal(record['amount']))
+            else:
+                args = (record['account_id'], Decimal(record['amount']))
+            # 日志中的记录都已执行过，必须重新应用（即使键仍在检查点导入的缓存中）
+            cache = self._idempotency_cache()
+            cache.begin(key[0], fingerprint(op, *args), key[1])
+            result = None
+            try:
+                result = method(*args, idempotency_key=key[0])
+            finally:
+                cache.finish(key[0], result)
+            return result
+        if op == 'create':
+            return self.create_account(record['account_id'], record['owner_name'], Decimal(record['amount']))
+        if op == 'deposit':
+            return self.deposit(record['account_id'], Decimal(record['amount']))
+        if op == 'withdraw':
+            return self.withdraw(record['account_id'], Decimal(record['amount']))
+        if op == 'transfer':
+            return self.transfer(record['from_account_id'], record['to_account_id'], Decimal(record['amount']))
+        if op == 'batch':
+            ops = [tuple(item[:-1]) + (Decimal(item[-1]),) for item in record['ops']]
+            if self.apply_batch(ops).applied:
+                return True, None
+            return False, "批量操作未能应用"
+        if op == 'checkpoint':
+            return True, None
+        return False, f"未知的日志记录类型 '{op}'"
+    
+    def checkpoint(self, snapshot: Union[str, 'SnapshotStore']) -> Tuple[bool, Optional[str]]:
+        """
+        写入新的快照并截断事务日志。
+        
+        快照先写入临时文件，日志中记录其摘要后再原子地替换旧快照，
+        因此任何时刻崩溃都能通过 recover() 得到一致的状态。传入增量
+        快照存储时只写入变更过的账户。
+        
+        参数:
+            snapshot: 快照CSV文件路径或增量快照存储
+            
+        返回:
+            包含（成功状态，错误信息（如果有））的元组
+        """
+        if self._journal is None:
+            return False, "尚未打开事务日志"
+        
+        try:
+            with self._locks.hold_all():
+                keys = self._idempotency.export() if self._idempotency is not None else []
+                if not isinstance(snapshot, str):
+                    record = {'op': 'checkpoint'}
+                    if keys:
+                        record['idempotency'] = keys
+                    
+                    def log_checkpoint(state_id):
+                        record['digest'] = state_id
+                        self._journal.wait(self._journal.append(record))
+                    
+                    self._write_delta(snapshot, log_checkpoint)
+                else:
+                    temp_name = snapshot + '.tmp'
+                    self._write_csv(temp_name, durable=True)
+                    
+                    record = {'op': 'checkpoint', 'digest': _file_digest(temp_name)}
+                    if keys:
+                        record['idempotency'] = keys
+                    self._journal.wait(self._journal.append(record))
+                    os.replace(temp_name, snapshot)
+                self._journal.reset([record])
+            
+            return True, None
+        except Exception as e:
+            return False, f"写入检查点时出错: {str(e)}"
+    
+    def close_journal(self):
+        """等待所有日志记录落盘并关闭事务日志。"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+    
+    @property
+    def journal_enabled(self) -> bool:
+        """是否正在把变更写入事务日志。"""
+        return self._journal is not None
+    
+    def search_accounts(self, query: str, mode: str = 'exact', limit: int = 100) -> List[BankAccount]:
+        """
+        按所有者姓名查找账户。
+        
+        参数:
+            query: 姓名或姓名片段（忽略大小写、空白和全角半角差异）
+            mode: 'exact' 精确匹配，'prefix' 前缀匹配，'fuzzy' 模糊匹配（按相似度排序）
+            limit: 最多返回的账户数量
+        
+        返回:
+            匹配的账户列表
+        """
+        if not self._owner_index_enabled:
+            raise ValueError("未启用所有者姓名索引")
+        if mode not in ('exact', 'prefix', 'fuzzy'):
+            raise ValueError(f"不支持的查找方式 '{mode}'")
+        index = self._owner_index
+        if index is None:
+            from owner_index import OwnerIndex
+            with self._locks.hold_all():
+                if self._owner_index is None:
+                    index = OwnerIndex()
+                    index.rebuild(self.accounts.values())
+                    self._owner_index = index
+                index = self._owner_index
+        if mode == 'exact':
+            account_ids = index.find_exact(query)[:limit]
+        elif mode == 'prefix':
+            account_ids = index.find_prefix(query, limit)
+        else:
+            account_ids = [account_id for account_id, _ in index.find_fuzzy(query, limit)]
+        
+        accounts = (self.accounts.get(account_id) for account_id in account_ids)
+        return [account for account in accounts if account is not None]
+    
+    def enable_balance_index(self):
+        """
+        启用余额索引，之后的余额变更会增量地更新它。
+        
+        启用后 top_balances、accounts_in_balance_range 和 balance_percentile
+        以对数时间回答，不再对全部账户排序；代价是每次余额变更多一次索引更新。
+        """
+        from balance_index import BalanceIndex
+        with self._locks.hold_all():
+            index = BalanceIndex()
+            index.rebuild(self.accounts.values())
+            self._balance_index = index
+    
+    def enable_history(self, directory: Optional[str] = None, capacity: int = 64):
+        """
+        启用按账户的交易历史，之后的每笔变更都会记录下来。
+        
+        每个账户最近的 capacity 条记录保存在内存中；指定目录时更早的记录
+        溢出到该目录下的段文件，不指定时直接丢弃。恢复时重放的日志记录
+        不会重复写入历史。
+        
+        参数:
+            directory: 段文件目录
+            capacity: 每个账户内存缓冲区的容量
+        """
+        with self._locks.hold_all():
+            from history import TransactionHistory
+            if self._history is not None:
+                self._history.close()
+            self._history = TransactionHistory(directory, capacity)
+    
+    def get_statement(self, account_id: str, start: Optional[float] = None,
+                      end: Optional[float] = None) -> List['HistoryEntry']:
+        """
+        返回账户在 [start, end] 时间范围内的交易记录。
+        
+        参数:
+            account_id: 账户ID
+            start: 起始时间戳（秒，包含），None表示不限
+            end: 结束时间戳（秒，包含），None表示不限
+        
+        返回:
+            按时间顺序排列的 HistoryEntry 列表
+        """
+        if self._history is None:
+            raise ValueError("未启用交易历史")
+        return self._history.statement(account_id, start, end)
+    
+    def close_history(self):
+        """把内存中的交易历史写入段文件并关闭。"""
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+    
+    @property
+    def history_enabled(self) -> bool:
+        """是否启用了交易历史。"""
+        return self._history is not None
+    
+    def top_balances(self, n: int = 100) -> List[BankAccount]:
+        """返回余额最高的 n 个账户，从高到低（余额相同时按账户ID从大到小）。"""
+        if self._balance_index is None:
+            return heapq.nlargest(n, self.accounts.values(), key=lambda account: (account.balance, account.account_id))
+        return self._accounts_for(self._balance_index.top(n))
+    
+    def accounts_in_balance_range(self, low: Decimal, high: Decimal,
+                                  limit: Optional[int] = None) -> List[BankAccount]:
+        """返回余额在 [low, high] 之间的账户，按余额从低到高，最多 limit 个。"""
+        if self._balance_index is None:
+            matches = sorted(
+                (account for account in self.accounts.values() if low <= account.balance <= high),
+                key=lambda account: (account.balance, account.account_id)
+            )
+            return matches[:limit]
+        return self._accounts_for(self._balance_index.between(low, high, limit))
+    
+    def balance_percentile(self, percent: float) -> Decimal:
+        """
+        返回余额的第 percent 百分位数（最近秩法）。
+        
+        参数:
+            percent: 0到100之间的百分比
+        """
+        if self._balance_index is not None:
+            return self._balance_index.percentile(percent)
+        if not 0 <= percent <= 100:
+            raise ValueError("百分比必须在0到100之间")
+        balances = sorted(account.balance for account in self.accounts.values())
+        if not balances:
+            raise ValueError("没有账户")
+        rank = -(-percent * len(balances) // 100)
+        return balances[max(int(rank) - 1, 0)]
+    
+    def _accounts_for(self, keys: List[Tuple[Decimal, str]]) -> List[BankAccount]:
+        accounts = (self.accounts.get(account_id) for _, account_id in keys)
+        return [account for account in accounts if account is not None]
+    
+    def _install_accounts(self, accounts, owned: bool = False):
+        """
+        用新加载的账户存储替换当前账户，并重建派生状态（调用方持有全部锁）。
+        
+        之前由本系统打开的存储（二进制文件的 mmap 或文件句柄）在替换后关闭；
+        调用方传入的存储由调用方负责关闭。owned 表示新存储由本系统打开。
+        """
+        finish_load = getattr(accounts, 'finish_load', None)
+        if finish_load is not None:
+            finish_load()
+        previous, previously_owned = self.accounts, self._owns_store
+        self.accounts = accounts
+        self._owns_store = owned
+        self._rebuild_derived_state()
+        if previously_owned and previous is not accounts:
+            previous.close()
+    
+    def _rebuild_derived_state(self):
+        """账户集合整体替换后重建二级索引和汇总统计。"""
+        self._owner_index = None  # 下一次查找时重建
+        if self._balance_index is not None:
+            self._balance_index.rebuild(self.accounts.values())
+        self._page_index = None  # 下一次分页时重建
+        if hasattr(self.accounts, 'total_balance'):
+            # 存储可以自行汇总（例如由数据库计算），无需逐个访问账户
+            self._aggregates.reset(self.accounts.total_balance())
+        else:
+            self._aggregates.reset(sum((account.balance for account in self.accounts.values()), ZERO))
+    
+    def _transaction(self):
+        """返回存储的事务上下文（若存储支持），使多账户变更原子地生效。"""
+        transaction = getattr(self.accounts, 'transaction', None)
+        if transaction is None:
+            return _NULL_CONTEXT
+        return transaction()
+    
+    def total_balance(self) -> Decimal:
+        """所有账户的余额合计（常数时间）。"""
+        return self._aggregates.total_balance
+    
+    def account_count(self) -> int:
+        """账户数量（常数时间）。"""
+        return len(self.accounts)
+    
+    def daily_volumes(self, day: Optional[date] = None) -> DailyVolume:
+        """
+        返回某一天（默认今天）的存款、取款和转账金额及笔数。
+        
+        成交量只统计本进程中执行（包括恢复时重放）的操作。
+        """
+        return self._aggregates.volumes(day)
+    
+    def verify_aggregates(self, repair: bool = False) -> Tuple[bool, Optional[str]]:
+        """
+        从头重新计算总余额，检查与运行中的汇总是否一致。
+        
+        参数:
+            repair: 不一致时是否用重新计算的值修正汇总
+        
+        返回:
+            包含（是否一致，差异说明（如果有））的元组
+        """
+        with self._locks.hold_all():
+            actual = sum((account.balance for account in self.accounts.values()), ZERO)
+            recorded = self._aggregates.total_balance
+            if actual == recorded:
+                return True, None
+            if repair:
+                self._aggregates.reset(actual)
+            return False, f"总余额不一致: 汇总为 {recorded}，实际为 {actual}"
+    
+    def _record_batch_history(self, ops: Sequence[Tuple], final_balances: Dict[str, Decimal]):
+        """为一批已应用的操作逐笔写入交易历史，余额按操作顺序倒推。"""
+        net: Dict[str, Decimal] = {}
+        for op in ops:
+            if op[0] == 'transfer':
+                net[op[1]] = net.get(op[1], ZERO) - op[3]
+                net[op[2]] = net.get(op[2], ZERO) + op[3]
+            else:
+                net[op[1]] = net.get(op[1], ZERO) + (op[2] if op[0] == 'deposit' else -op[2])
+        running = {account_id: final_balances[account_id] - delta for account_id, delta in net.items()}
+        
+        history = self._history
+        for op in ops:
+            if op[0] == 'transfer':
+                _, source_id, destination_id, amount = op
+                running[source_id] -= amount
+                running[destination_id] += amount
+                history.record(source_id, 'transfer_out', amount, running[source_id], destination_id)
+                history.record(destination_id, 'transfer_in', amount, running[destination_id], source_id)
+            else:
+                kind, account_id, amount = op
+                running[account_id] += amount if kind == 'deposit' else -amount
+                history.record(account_id, kind, amount, running[account_id])
+    
+    def _record_batch_volumes(self, ops: Sequence[Tuple], balance_delta: Decimal, stripe: int):
+        """把一批已应用操作按类型计入成交量（累加到调用方持有锁的分段 stripe）。"""
+        totals = {'deposit': ZERO, 'withdraw': ZERO, 'transfer': ZERO}
+        counts = {'deposit': 0, 'withdraw': 0, 'transfer': 0}
+        for op in ops:
+            totals[op[0]] += op[-1]
+            counts[op[0]] += 1
+        if balance_delta:
+            self._aggregates.add_balance(balance_delta, stripe)
+        for kind, code in (('deposit', DEPOSIT), ('withdraw', WITHDRAW), ('transfer', TRANSFER)):
+            if counts[kind]:
+                self._aggregates.record(code, totals[kind], ZERO, counts[kind], stripe)
+    
+    def _new_accounts(self):
+        """创建与当前账户存储同类型的空存储。"""
+        if isinstance(self.accounts, dict):
+            return {}
+        return self.accounts.empty_like()
+    
     def get_all_accounts(self) -> List[BankAccount]:
-        """获取系统中所有账户的列表。"""
-        return list(self.accounts.values()) 
\ No newline at end of file
+        """获取系统中所有账户的列表（账户很多时请使用 get_accounts_page 或 iter_accounts）。"""
+        return list(self.accounts.values())
+    
+    def get_accounts_page(self, cursor=None, page_size: int = 100, sort_by: Optional[str] = None,
+                          descending: bool = False) -> AccountPage:
+        """
+        分页获取账户。
+        
+        按字段排序时使用（字段值，账户ID）作为游标，翻页期间新建的账户不会
+        导致已返回的账户重复出现；按创建顺序时游标是已返回的账户数量。
+        
+        游标在有序索引中二分定位，每页的代价与翻到第几页无关，也不持有
+        全局锁。每种顺序的索引在第一次按它分页时建立（遍历一次全部账户），
+        之后增量维护；按余额分页会启用余额索引（见 enable_balance_index）。
+        
+        参数:
+            cursor: 上一页返回的 next_cursor，None表示第一页
+            page_size: 每页的账户数量
+            sort_by: 排序字段（'account_id'、'owner_name'、'balance'），None表示按创建顺序
+            descending: 是否降序（按创建顺序时忽略）
+        
+        返回:
+            AccountPage(accounts, next_cursor, total)
+        """
+        if page_size <= 0:
+            raise ValueError("每页数量必须为正数")
+        if sort_by is not None and sort_by not in SORT_KEYS:
+            raise ValueError(f"不支持的排序字段 '{sort_by}'")
+        
+        if sort_by == 'balance':
+            if self._balance_index is None:
+                self.enable_balance_index()
+            index = self._balance_index
+        else:
+            index = self._page_index
+            if index is None or not index.has(sort_by):
+                from page_index import PageIndex
+                with self._locks.hold_all():
+                    if self._page_index is None:  # 等待锁期间可能重新加载过
+                        self._page_index = PageIndex()
+                    index = self._page_index
+                    if not index.has(sort_by):
+                        index.build(sort_by, self.accounts.values(), SORT_KEYS.get(sort_by))
+        accounts = self.accounts
+        total = len(accounts)
+            
+        if sort_by is None:
+            offset = cursor or 0
+            ids = index.slice(offset, page_size + 1)
+            page = [account for account in map(accounts.get, ids[:page_size]) if account is not None]
+            return AccountPage(page, offset + page_size if len(ids) > page_size else None, total)
+            
+        # 多取一个用来判断是否还有下一页
+        after = tuple(cursor) if cursor is not None else None
+        if sort_by == 'balance':
+            keys = index.page(after, page_size + 1, descending)
+        else:
+            keys = index.page(sort_by, after, page_size + 1, descending)
+        next_cursor = None
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            next_cursor = keys[-1]
+        page = [account for account in (accounts.get(account_id) for _, account_id in keys) if account is not None]
+        return AccountPage(page, next_cursor, total)
+    
+    def iter_accounts(self, sort_by: Optional[str] = None, descending: bool = False,
+                      page_size: int = 1000) -> Iterator[BankAccount]:
+        """
+        按顺序逐页遍历账户。
+        
+        参数:
+            sort_by: 排序字段，含义同 get_accounts_page
+            descending: 是否降序
+            page_size: 每次获取的账户数量
+        """
+        cursor = None
+        while True:
+            page = self.get_accounts_page(cursor, page_size, sort_by, descending)
+            yield from page.accounts
+            cursor = page.next_cursor
+            if cursor is None:
+                return 
\ No newline at end of file
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+账户存储内存基准测试
+
+比较三种布局保存N个账户所需的Python堆内存：
+- 带 __dict__ 的账户对象字典（BankAccount 增加 __slots__ 之前的布局）
+- 带 __slots__ 的 BankAccount 对象字典
+- CompactAccountStore（数组保存余额）
+
+同时测量 get_account() + 读取余额 的耗时。
+
+用法:
+    python benchmarks/bench_account_store.py --accounts 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_store import CompactAccountStore
+from banking_system import BankAccount, BankingSystem
+
+
+class LegacyAccount:
+    """与旧版 BankAccount 相同的布局：每个实例带一个 __dict__。"""
+    
+    def __init__(self, account_id, owner_name, balance):
+        self.account_id = account_id
+        self.owner_name = owner_name
+        self._balance = balance
+    
+    @property
+    def balance(self):
+        return self._balance
+
+
+def build(layout: str, count: int) -> BankingSystem:
+    """按指定布局创建包含 count 个账户的银行系统。"""
+    if layout == 'compact':
+        banking = BankingSystem(store=CompactAccountStore())
+    else:
+        banking = BankingSystem()
+    account_class = LegacyAccount if layout == 'legacy' else BankAccount._restore
+    accounts = banking.accounts
+    
+    for i in range(count):
+        # 姓名有大量重复，与真实数据相近
+        account_id = str(i)
+        accounts[account_id] = account_class(account_id, f"用户{i % 5000}",
+                                             Decimal(i % 100000).scaleb(-2))
+    return banking
+
+
+def main():
+    parser = argparse.ArgumentParser(description="账户存储内存基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    args = parser.parse_args()
+    count = args.accounts
+    
+    print(f"{'布局':<22} {'内存':>12} {'每账户':>12} {'查询耗时':>14}")
+    for layout in ('legacy', 'slots', 'compact'):
+        gc.collect()
+        tracemalloc.start()
+        banking = build(layout, count)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        ids = [str(i) for i in range(0, count, max(1, count // 100000))]
+        start = time.perf_counter()
+        for account_id in ids:
+            banking.get_account(account_id).balance
+        lookup = (time.perf_counter() - start) / len(ids)
+        
+        print(f"{layout:<22} {current / 2**20:>9.1f} MiB {current / count:>9.0f} B {lookup * 1e9:>11.0f} ns")
+        del banking
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
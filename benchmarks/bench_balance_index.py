@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+余额索引基准测试
+
+在大量账户上比较启用余额索引前后的前N名、区间计数和百分位数查询耗时，
+以及索引给存取款带来的额外开销。
+
+用法:
+    python benchmarks/bench_balance_index.py --accounts 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="余额索引基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    parser.add_argument('--ops', type=int, default=200000, help="存取款次数")
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    banking = BankingSystem(owner_index=False)
+    for i in range(args.accounts):
+        banking.create_account(str(i), f"用户{i}", Decimal(rng.randint(0, 10000000)).scaleb(-2))
+    
+    low, high = Decimal('1000.00'), Decimal('1010.00')
+    queries = [
+        ("前100名", lambda: banking.top_balances(100)),
+        ("区间查询", lambda: banking.accounts_in_balance_range(low, high)),
+        ("百分位数", lambda: banking.balance_percentile(99)),
+    ]
+    
+    scan = {name: timed(query, 1) for name, query in queries}
+    
+    start = time.perf_counter()
+    banking.enable_balance_index()
+    build = time.perf_counter() - start
+    indexed = {name: timed(query, 1000) for name, query in queries}
+    
+    print(f"账户数 {args.accounts:,}，建立索引 {build:.2f}s")
+    print(f"{'查询':<10} {'全量排序':>12} {'索引':>12} {'加速比':>10}")
+    for name, _ in queries:
+        print(f"{name:<8} {scan[name] * 1000:>10.1f}ms {indexed[name] * 1000:>10.3f}ms "
+              f"{scan[name] / indexed[name]:>9,.0f}x")
+    
+    ops = [(str(rng.randrange(args.accounts)), Decimal(rng.randint(1, 10000)).scaleb(-2))
+           for _ in range(args.ops)]
+    
+    def run_ops():
+        for account_id, amount in ops:
+            banking.deposit(account_id, amount)
+    
+    with_index = timed(run_ops, 1)
+    # 存款只登记待处理变更，下一次查询时统一应用
+    flush = timed(lambda: banking.top_balances(100), 1)
+    banking._balance_index = None
+    without_index = timed(run_ops, 1)
+    print(f"存款吞吐量: 无索引 {args.ops / without_index:,.0f} 次/秒，"
+          f"有索引 {args.ops / with_index:,.0f} 次/秒")
+    print(f"之后第一次查询（应用 {args.ops:,} 笔待处理变更）: {flush:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
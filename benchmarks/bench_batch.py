@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+批量操作基准测试
+
+比较逐个调用 deposit/withdraw/transfer 与一次 apply_batch() 处理同样
+一批随机过账的耗时。
+
+用法:
+    python benchmarks/bench_batch.py --accounts 10000 --ops 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+
+
+def make_system(accounts: int) -> BankingSystem:
+    banking = BankingSystem()
+    for i in range(accounts):
+        banking.create_account(str(i), f"用户{i}", Decimal('1000000.00'))
+    return banking
+
+
+def make_ops(accounts: int, count: int, seed: int = 42):
+    """生成一批随机操作，余额足够大，保证全部成功。"""
+    rng = random.Random(seed)
+    amounts = [Decimal(rng.randint(1, 10000)).scaleb(-2) for _ in range(1000)]
+    ops = []
+    for i in range(count):
+        kind = rng.random()
+        a = str(rng.randrange(accounts))
+        amount = amounts[i % len(amounts)]
+        if kind < 0.6:
+            b = str(rng.randrange(accounts))
+            while b == a:
+                b = str(rng.randrange(accounts))
+            ops.append(('transfer', a, b, amount))
+        elif kind < 0.8:
+            ops.append(('deposit', a, amount))
+        else:
+            ops.append(('withdraw', a, amount))
+    return ops
+
+
+def run_single(banking: BankingSystem, ops):
+    deposit, withdraw, transfer = banking.deposit, banking.withdraw, banking.transfer
+    for op in ops:
+        if op[0] == 'transfer':
+            transfer(op[1], op[2], op[3])
+        elif op[0] == 'deposit':
+            deposit(op[1], op[2])
+        else:
+            withdraw(op[1], op[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量操作基准测试")
+    parser.add_argument('--accounts', type=int, default=10000, help="账户数量")
+    parser.add_argument('--ops', type=int, default=1000000, help="操作数量")
+    args = parser.parse_args()
+    
+    ops = make_ops(args.accounts, args.ops)
+    
+    banking = make_system(args.accounts)
+    start = time.perf_counter()
+    run_single(banking, ops)
+    single = time.perf_counter() - start
+    expected = {acc.account_id: acc.balance for acc in banking.get_all_accounts()}
+    
+    banking = make_system(args.accounts)
+    start = time.perf_counter()
+    result = banking.apply_batch(ops)
+    batch = time.perf_counter() - start
+    assert result.applied
+    assert {acc.account_id: acc.balance for acc in banking.get_all_accounts()} == expected
+    
+    print(f"{'方式':<16} {'耗时':>10} {'吞吐量':>16}")
+    print(f"{'逐个调用':<14} {single:>9.2f}s {args.ops / single:>12,.0f} 次/秒")
+    print(f"{'apply_batch':<16} {batch:>9.2f}s {args.ops / batch:>12,.0f} 次/秒")
+    print(f"加速比: {single / batch:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
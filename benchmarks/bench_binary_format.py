@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+二进制账户文件基准测试
+
+比较CSV文件与 mmap 二进制文件的保存时间、文件大小、启动（加载）时间和
+单点查询速度。二进制文件启动时只读取文件头，因此启动时间与账户数量无关。
+
+用法:
+    python benchmarks/bench_binary_format.py --accounts 1000000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_store import CompactAccountStore
+from banking_system import BankingSystem
+
+
+def lookups_per_second(banking: BankingSystem, ids) -> float:
+    start = time.perf_counter()
+    for account_id in ids:
+        banking.get_account(account_id).balance
+    return len(ids) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="二进制账户文件基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    parser.add_argument('--lookups', type=int, default=200000, help="单点查询次数")
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    banking = BankingSystem(store=CompactAccountStore(), owner_index=False)
+    for i in range(args.accounts):
+        banking.create_account(str(i), f"用户{i}", Decimal(rng.randint(0, 10000000)).scaleb(-2))
+    ids = [str(rng.randrange(args.accounts)) for _ in range(args.lookups)]
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(temp_dir, "accounts.csv")
+        bin_path = os.path.join(temp_dir, "accounts.bin")
+        
+        start = time.perf_counter()
+        banking.save_to_csv(csv_path)
+        csv_save = time.perf_counter() - start
+        start = time.perf_counter()
+        banking.save_to_binary(bin_path)
+        bin_save = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        from_csv = BankingSystem(store=CompactAccountStore(), owner_index=False)
+        from_csv.load_from_csv_streaming(csv_path)
+        csv_load = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        from_binary = BankingSystem(owner_index=False)
+        from_binary.load_from_binary(bin_path)
+        bin_load = time.perf_counter() - start
+        
+        rows = [
+            ("保存", f"{csv_save:.2f}s", f"{bin_save:.2f}s"),
+            ("文件大小", f"{os.path.getsize(csv_path) / 2 ** 20:.1f}MB", f"{os.path.getsize(bin_path) / 2 ** 20:.1f}MB"),
+            ("启动", f"{csv_load:.2f}s", f"{bin_load * 1000:.1f}ms"),
+            ("单点查询", f"{lookups_per_second(from_csv, ids):,.0f}/s",
+             f"{lookups_per_second(from_binary, ids):,.0f}/s"),
+        ]
+        from_binary.accounts.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    print(f"账户数 {args.accounts:,}（启动时间包括取得总余额）")
+    print(f"{'项目':<10} {'CSV':>14} {'二进制':>14}")
+    for name, csv_value, bin_value in rows:
+        print(f"{name:<8} {csv_value:>14} {bin_value:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+热点账户操作合并基准测试
+
+付款的收款方按 Zipf 分布选择（排名第 k 的账户被选中的概率与 1/k^s 成正比），
+少数商户账户收到大部分付款；付款方均匀分布。比较直接调用 BankingSystem
+与通过 CoalescingBank 合并排名最前的热点账户时的吞吐量，可以选择多线程
+（并发模式）和启用交易历史（每笔变更的额外开销更大）。不启用交易历史时
+CoalescingBank 默认不合并，测得的是直接转发的开销。
+
+用法:
+    python benchmarks/bench_coalescing.py --accounts 10000 --ops 200000 --zipf 1.1 --hot 10 --threads 1,4
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from decimal import Decimal
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+from coalescing import CoalescingBank
+
+
+def make_ops(accounts: int, count: int, exponent: float, seed: int):
+    """生成（付款方，收款方，金额）列表，收款方服从 Zipf 分布。"""
+    rng = random.Random(seed)
+    weights = list(accumulate(1 / rank ** exponent for rank in range(1, accounts + 1)))
+    payees = rng.choices(range(accounts), cum_weights=weights, k=count)
+    ops = []
+    for payee in payees:
+        payer = rng.randrange(accounts)
+        if payer == payee:
+            payer = (payer + 1) % accounts
+        ops.append((str(payer), str(payee), Decimal(rng.randint(1, 500)).scaleb(-2)))
+    return ops
+
+
+def make_bank(accounts: int, threads: int, history: bool) -> BankingSystem:
+    banking = BankingSystem(concurrent=threads > 1, owner_index=False)
+    for i in range(accounts):
+        banking.create_account(str(i), f"用户{i}", Decimal('1000000.00'))
+    if history:
+        banking.enable_history()
+    return banking
+
+
+def run(transfer, ops, threads: int) -> float:
+    """用 threads 个线程执行全部转账，返回每秒转账数。"""
+    parts = [ops[i::threads] for i in range(threads)]
+    
+    def work(part):
+        for payer, payee, amount in part:
+            transfer(payer, payee, amount)
+    
+    start = time.perf_counter()
+    if threads == 1:
+        work(ops)
+    else:
+        workers = [threading.Thread(target=work, args=(part,)) for part in parts]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return len(ops) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点账户操作合并基准测试")
+    parser.add_argument('--accounts', type=int, default=10000, help="账户数量")
+    parser.add_argument('--ops', type=int, default=200000, help="转账次数")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf 分布的指数")
+    parser.add_argument('--hot', type=int, default=10, help="合并的热点账户数量（按排名）")
+    parser.add_argument('--max-pending', type=int, default=1000, help="每个热点账户积累多少笔后合并")
+    parser.add_argument('--threads', default='1,4', help="逗号分隔的线程数")
+    parser.add_argument('--history', action='store_true', help="启用交易历史")
+    parser.add_argument('--seed', type=int, default=42, help="随机数种子")
+    args = parser.parse_args()
+    
+    ops = make_ops(args.accounts, args.ops, args.zipf, args.seed)
+    hot = [str(rank) for rank in range(args.hot)]
+    share = sum(1 for _, payee, _ in ops if payee in set(hot)) / len(ops)
+    print(f"账户数 {args.accounts:,}，转账 {args.ops:,} 次，Zipf s={args.zipf}，"
+          f"前 {args.hot} 个账户收到 {share:.0%} 的付款" +
+          ("，启用交易历史" if args.history else "，未启用交易历史（直接转发）"))
+    print(f"{'线程':>4} {'直接(次/秒)':>14} {'合并(次/秒)':>14} {'加速':>7}")
+    
+    for threads in (int(value) for value in args.threads.split(',') if value.strip()):
+        banking = make_bank(args.accounts, threads, args.history)
+        direct = run(banking.transfer, ops, threads)
+        expected = banking.total_balance()
+        
+        banking = make_bank(args.accounts, threads, args.history)
+        bank = CoalescingBank(banking, hot, max_pending=args.max_pending, concurrent=threads > 1)
+        coalesced = run(bank.transfer, ops, threads)
+        bank.close()
+        if banking.total_balance() != expected:
+            raise RuntimeError("合并后的总余额与直接执行不一致")
+        print(f"{threads:>4} {direct:>14,.0f} {coalesced:>14,.0f} {coalesced / direct:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+CSV加载基准测试
+
+比较 load_from_csv 与 load_from_csv_streaming（快速路径和校验路径）的
+加载耗时和Python堆内存峰值。
+
+用法:
+    python benchmarks/bench_csv_loader.py --rows 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+
+
+def write_sample_csv(filename: str, rows: int):
+    """生成包含指定行数的示例账户文件。"""
+    with open(filename, 'w', newline='') as file:
+        file.write("account_id,owner_name,balance\r\n")
+        for i in range(rows):
+            file.write(f"{i},用户{i % 10000},{i % 100000}.{i % 100:02d}\r\n")
+
+
+def measure(label: str, load, filename: str):
+    """分别测量一次加载的耗时和内存峰值（两次独立运行，避免tracemalloc影响计时）。"""
+    gc.collect()
+    start = time.perf_counter()
+    banking = BankingSystem()
+    success, error = load(banking, filename)
+    elapsed = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(error)
+    count = len(banking.accounts)
+    del banking
+    gc.collect()
+    
+    tracemalloc.start()
+    banking = BankingSystem()
+    load(banking, filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del banking
+    gc.collect()
+    
+    print(f"{label:<28} {elapsed:>9.2f}s {count / elapsed:>12,.0f} 行/秒 {peak / 2**20:>10.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV加载基准测试")
+    parser.add_argument('--rows', type=int, default=1000000, help="生成的账户行数")
+    parser.add_argument('--file', help="使用已有的CSV文件而不是生成新文件")
+    args = parser.parse_args()
+    
+    temp_dir = None
+    filename = args.file
+    if filename is None:
+        temp_dir = tempfile.mkdtemp()
+        filename = os.path.join(temp_dir, "accounts.csv")
+        print(f"生成 {args.rows:,} 行示例数据...")
+        write_sample_csv(filename, args.rows)
+    
+    try:
+        print(f"{'加载方式':<28} {'耗时':>10} {'吞吐量':>16} {'内存峰值':>13}")
+        measure("load_from_csv", lambda b, f: b.load_from_csv(f), filename)
+        measure("streaming (fast=False)", lambda b, f: b.load_from_csv_streaming(f, fast=False), filename)
+        measure("streaming (fast=True)", lambda b, f: b.load_from_csv_streaming(f), filename)
+    finally:
+        if temp_dir is not None:
+            os.unlink(filename)
+            os.rmdir(temp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+按需加载账户存储基准测试
+
+把大量账户写入二进制账户文件，然后分别用普通字典（全部读入内存）、
+mmap（BinaryAccountStore）和不同缓存容量的 LazyAccountStore 执行同样的
+随机存取款：大部分操作落在一小部分“热”账户上。每种方式在独立的子进程中
+运行，比较吞吐量、缓存命中率和内存峰值（RSS）。
+
+用法:
+    python benchmarks/bench_lazy_store.py --accounts 1000000 --hot 10000 --caches 1000,10000,100000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem, CentsBankAccount
+from binary_format import write_accounts
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def make_ops(accounts: int, hot: int, count: int, seed: int):
+    """90%的操作落在前 hot 个账户上，其余均匀分布。"""
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(count):
+        account = rng.randrange(hot) if rng.random() < 0.9 else rng.randrange(accounts)
+        ops.append((str(account), Decimal(rng.randint(1, 500)).scaleb(-2), rng.random() < 0.5))
+    return ops
+
+
+def run(path: str, mode: str, cache_size: int, ops, connection):
+    banking = BankingSystem(owner_index=False, account_class=CentsBankAccount)
+    if mode == 'dict':
+        banking.load_from_binary(path)
+        banking.accounts = {account_id: CentsBankAccount(account_id, account.owner_name, account.balance)
+                            for account_id, account in banking.accounts.items()}
+    else:
+        banking.load_from_binary(path, cache_size=cache_size if mode == 'lazy' else None)
+    start = time.perf_counter()
+    for account_id, amount, is_deposit in ops:
+        if is_deposit:
+            banking.deposit(account_id, amount)
+        else:
+            banking.withdraw(account_id, amount)
+    elapsed = time.perf_counter() - start
+    stats = banking.accounts.cache_stats() if mode == 'lazy' else {}
+    connection.send((len(ops) / elapsed, stats.get('hit_rate'), peak_rss_mb()))
+    connection.close()
+
+
+def run_isolated(*args):
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=run, args=args + (child,))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按需加载账户存储基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    parser.add_argument('--hot', type=int, default=10000, help="热账户数量")
+    parser.add_argument('--ops', type=int, default=200000, help="存取款次数")
+    parser.add_argument('--caches', default='1000,10000,100000', help="逗号分隔的缓存容量")
+    parser.add_argument('--seed', type=int, default=42, help="随机数种子")
+    args = parser.parse_args()
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, "accounts.bin")
+        write_accounts(path, [(str(i), f"用户{i}", 100000) for i in range(args.accounts)])
+        ops = make_ops(args.accounts, args.hot, args.ops, args.seed)
+        
+        print(f"账户数 {args.accounts:,}，热账户 {args.hot:,}，操作 {args.ops:,} 次")
+        print(f"{'存储':<18} {'次/秒':>12} {'命中率':>8} {'内存峰值(MB)':>14}")
+        runs = [('dict', 'dict', 0), ('mmap', 'mmap', 0)]
+        runs += [(f"lazy({size:,})", 'lazy', size) for size in (int(value) for value in args.caches.split(',') if value)]
+        for label, mode, size in runs:
+            throughput, hit_rate, rss = run_isolated(path, mode, size, ops)
+            hits = f"{hit_rate:.1%}" if hit_rate is not None else "-"
+            print(f"{label:<18} {throughput:>12,.0f} {hits:>8} {rss if rss is not None else 0:>14,.1f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+金额运算微基准测试
+
+比较以下实现的存款、取款、转账吞吐量（次/秒）：
+- before: 每次比较都新建 Decimal('0.00') 的旧实现
+- decimal: 当前的 BankAccount（使用模块级常量 ZERO）
+- cents: CentsBankAccount，Decimal 接口（在边界处转换为整数分）
+- cents-int: CentsBankAccount，直接使用整数分接口
+
+用法:
+    python benchmarks/bench_money.py --ops 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankAccount, BankingSystem, CentsBankAccount
+from money import ZERO, to_cents
+
+
+class LegacyBankAccount:
+    """旧版 BankAccount 的存取款实现。"""
+    
+    def __init__(self, balance):
+        self._balance = balance
+    
+    @property
+    def balance(self):
+        return self._balance
+    
+    def deposit(self, amount):
+        if amount <= Decimal('0.00'):
+            return False
+        self._balance += amount
+        return True
+    
+    def withdraw(self, amount):
+        if amount <= Decimal('0.00') or amount > self._balance:
+            return False
+        self._balance -= amount
+        return True
+
+
+def legacy_transfer(source, destination, amount):
+    """旧版 BankingSystem.transfer 中的校验与执行部分。"""
+    if amount <= Decimal('0.00'):
+        return False, "转账金额必须为正数"
+    if amount > source.balance:
+        return False, "转账资金不足"
+    if source.withdraw(amount) and destination.deposit(amount):
+        return True, None
+    return False, "转账失败"
+
+
+def decimal_transfer(source, destination, amount):
+    """当前实现：与 legacy_transfer 相同的步骤，但使用常量 ZERO。"""
+    if amount <= ZERO:
+        return False, "转账金额必须为正数"
+    if amount > source.balance:
+        return False, "转账资金不足"
+    if source.withdraw(amount) and destination.deposit(amount):
+        return True, None
+    return False, "转账失败"
+
+
+def cents_transfer(source, destination, cents):
+    """整数分实现：金额只在边界处转换一次。"""
+    if cents <= 0:
+        return False, "转账金额必须为正数"
+    if cents > source.cents:
+        return False, "转账资金不足"
+    if source.withdraw_cents(cents) and destination.deposit_cents(cents):
+        return True, None
+    return False, "转账失败"
+
+
+def rate(func, ops: int) -> float:
+    """执行 func(i) ops 次，返回每秒次数。"""
+    start = time.perf_counter()
+    for i in range(ops):
+        func(i)
+    return ops / (time.perf_counter() - start)
+
+
+def account_benchmarks(ops: int):
+    amount = Decimal('1.25')
+    cents = 125
+    big = Decimal('100000000.00')
+    
+    rows = []
+    legacy = LegacyBankAccount(big)
+    current = BankAccount("1", "张三", big)
+    cents_account = CentsBankAccount("1", "张三", big)
+    rows.append(("deposit", [
+        rate(lambda i: legacy.deposit(amount), ops),
+        rate(lambda i: current.deposit(amount), ops),
+        rate(lambda i: cents_account.deposit(amount), ops),
+        rate(lambda i: cents_account.deposit_cents(cents), ops),
+    ]))
+    rows.append(("withdraw", [
+        rate(lambda i: legacy.withdraw(amount), ops),
+        rate(lambda i: current.withdraw(amount), ops),
+        rate(lambda i: cents_account.withdraw(amount), ops),
+        rate(lambda i: cents_account.withdraw_cents(cents), ops),
+    ]))
+    
+    legacy_a, legacy_b = LegacyBankAccount(big), LegacyBankAccount(big)
+    a, b = BankAccount("a", "甲", big), BankAccount("b", "乙", big)
+    ca, cb = CentsBankAccount("a", "甲", big), CentsBankAccount("b", "乙", big)
+    rows.append(("transfer", [
+        rate(lambda i: legacy_transfer(legacy_a, legacy_b, amount), ops),
+        rate(lambda i: decimal_transfer(a, b, amount), ops),
+        rate(lambda i: cents_transfer(ca, cb, to_cents(amount)), ops),
+        rate(lambda i: cents_transfer(ca, cb, cents), ops),
+    ]))
+    return rows
+
+
+def system_benchmarks(ops: int):
+    amount = Decimal('1.25')
+    rows = []
+    systems = []
+    for account_class in (BankAccount, CentsBankAccount):
+        banking = BankingSystem(account_class=account_class)
+        banking.create_account("a", "甲", Decimal('100000000.00'))
+        banking.create_account("b", "乙", Decimal('100000000.00'))
+        systems.append(banking)
+    
+    for name in ("deposit", "withdraw", "transfer"):
+        results = []
+        for banking in systems:
+            if name == "transfer":
+                results.append(rate(lambda i: banking.transfer("a", "b", amount), ops))
+            else:
+                method = getattr(banking, name)
+                results.append(rate(lambda i: method("a", amount), ops))
+        rows.append((f"system.{name}", results))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="金额运算微基准测试")
+    parser.add_argument('--ops', type=int, default=200000, help="每项测试的操作次数")
+    args = parser.parse_args()
+    
+    print("账户级操作（次/秒）")
+    print(f"{'操作':<12} {'before':>12} {'decimal':>12} {'cents':>12} {'cents-int':>12}")
+    for name, results in account_benchmarks(args.ops):
+        print(f"{name:<12} " + " ".join(f"{r:>12,.0f}" for r in results))
+    
+    print("\nBankingSystem 操作（次/秒）")
+    print(f"{'操作':<18} {'decimal':>12} {'cents':>12}")
+    for name, results in system_benchmarks(args.ops):
+        print(f"{name:<18} " + " ".join(f"{r:>12,.0f}" for r in results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
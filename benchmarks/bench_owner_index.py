@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+所有者姓名索引基准测试
+
+比较用 OwnerIndex 查找与扫描 get_all_accounts() 的耗时，包括精确、前缀和
+模糊三种查询。姓名由常见姓氏和随机名字组成。
+
+用法:
+    python benchmarks/bench_owner_index.py --accounts 1000000 --queries 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+from owner_index import normalize_name
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华建国文玉兰红梅志强海燕鹏飞晓东宇航婷欣怡子轩浩然"
+
+
+def make_names(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN) for _ in range(rng.randint(1, 2)))
+            for _ in range(count)]
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="所有者姓名索引基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    parser.add_argument('--queries', type=int, default=1000, help="每种查询的次数")
+    args = parser.parse_args()
+    
+    names = make_names(args.accounts)
+    banking = BankingSystem()
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        banking.create_account(str(i), name, Decimal('1.00'))
+    print(f"创建 {args.accounts:,} 个账户（含索引维护）: {time.perf_counter() - start:.2f}s")
+    
+    rng = random.Random(7)
+    exact = [rng.choice(names) for _ in range(args.queries)]
+    prefix = [name[:2] for name in exact]
+    fuzzy = [name[:-1] + rng.choice(GIVEN) for name in exact]
+    # 线性扫描很慢，只测少量查询
+    scan_queries = exact[:max(1, args.queries // 100)]
+    
+    def scan(query):
+        key = normalize_name(query)
+        return [acc for acc in banking.get_all_accounts() if normalize_name(acc.owner_name) == key]
+    
+    print(f"{'查询':<12} {'平均耗时':>12}")
+    print(f"{'线性扫描':<10} {timed(scan, scan_queries) * 1000:>10.3f}ms")
+    print(f"{'精确':<11} {timed(lambda q: banking.search_accounts(q), exact) * 1000:>10.3f}ms")
+    print(f"{'前缀':<11} {timed(lambda q: banking.search_accounts(q, 'prefix'), prefix) * 1000:>10.3f}ms")
+    print(f"{'模糊':<11} {timed(lambda q: banking.search_accounts(q, 'fuzzy'), fuzzy) * 1000:>10.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+并行CSV导出和导入基准测试
+
+比较 save_to_csv / load_from_csv 在单进程和多个工作进程下的耗时，并检查
+并行保存的文件与单进程保存的文件逐字节一致。
+
+导出时格式化全部在工作进程中完成，接近线性加速；导入时解析在工作进程中
+完成，但构造账户对象仍在主进程中进行，加速比受这部分串行工作限制。工作
+进程只有在机器有多个CPU核心时才能真正并行。
+
+用法:
+    python benchmarks/bench_parallel_csv.py --accounts 2000000 --workers 1,2,4,8
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+
+
+def timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    success, error = function(*args, **kwargs)
+    if not success:
+        raise RuntimeError(error)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行CSV导出和导入基准测试")
+    parser.add_argument('--accounts', type=int, default=1000000, help="账户数量")
+    parser.add_argument('--workers', default='1,2,4', help="逗号分隔的工作进程数量")
+    args = parser.parse_args()
+    
+    banking = BankingSystem()
+    initial = Decimal('1000.00')
+    for i in range(args.accounts):
+        banking.create_account(str(i), f"用户{i}", initial + i % 997)
+    
+    print(f"账户数 {args.accounts:,}，CPU核心数 {os.cpu_count()}")
+    print(f"{'进程数':>6} {'保存(秒)':>10} {'加速':>6} {'加载(秒)':>10} {'加速':>6}")
+    temp_dir = tempfile.mkdtemp()
+    try:
+        reference = os.path.join(temp_dir, "serial.csv")
+        base_save = timed(banking.save_to_csv, reference)
+        base_load = timed(BankingSystem().load_from_csv, reference)
+        with open(reference, 'rb') as file:
+            expected = file.read()
+        
+        for workers in (int(value) for value in args.workers.split(',') if value.strip()):
+            if workers <= 1:
+                save, load = base_save, base_load
+            else:
+                path = os.path.join(temp_dir, f"parallel-{workers}.csv")
+                save = timed(banking.save_to_csv, path, workers=workers)
+                with open(path, 'rb') as file:
+                    if file.read() != expected:
+                        raise RuntimeError(f"{workers} 个进程保存的文件与单进程不一致")
+                load = timed(BankingSystem().load_from_csv, path, workers=workers)
+            print(f"{workers:>6} {save:>10.2f} {base_save / save:>5.2f}x {load:>10.2f} {base_load / load:>5.2f}x")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
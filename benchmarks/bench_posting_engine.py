@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+向量化过账引擎基准测试
+
+比较逐个调用 transfer/deposit/withdraw、apply_batch() 与
+PostingEngine.post() 处理同样一批随机过账的耗时。部分账户余额较低，
+因此会有少量操作因余额不足被拒绝。
+
+用法:
+    python benchmarks/bench_posting_engine.py --accounts 100000 --ops 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_store import CompactAccountStore
+from banking_system import BankingSystem
+from money import from_cents
+from posting_engine import EXTERNAL, PostingEngine, np
+
+
+def make_system(accounts: int, balances) -> BankingSystem:
+    banking = BankingSystem(store=CompactAccountStore())
+    for i in range(accounts):
+        banking.create_account(str(i), f"用户{i}", from_cents(balances[i]))
+    return banking
+
+
+def make_ops(accounts: int, count: int, low: float, seed: int = 42):
+    """生成随机过账数组：60%转账、20%存款、20%取款；比例为 low 的账户余额很低。"""
+    rng = random.Random(seed)
+    balances = [1000 if rng.random() < low else 100000000 for _ in range(accounts)]
+    sources, destinations, amounts = [], [], []
+    for _ in range(count):
+        kind = rng.random()
+        a = rng.randrange(accounts)
+        if kind < 0.6:
+            b = rng.randrange(accounts)
+            while b == a:
+                b = rng.randrange(accounts)
+        elif kind < 0.8:
+            a, b = EXTERNAL, a
+        else:
+            b = EXTERNAL
+        sources.append(a)
+        destinations.append(b)
+        amounts.append(rng.randint(1, 10000))
+    return balances, sources, destinations, amounts
+
+
+def to_tuples(sources, destinations, amounts):
+    ops = []
+    for s, d, a in zip(sources, destinations, amounts):
+        amount = from_cents(a)
+        if s == EXTERNAL:
+            ops.append(('deposit', str(d), amount))
+        elif d == EXTERNAL:
+            ops.append(('withdraw', str(s), amount))
+        else:
+            ops.append(('transfer', str(s), str(d), amount))
+    return ops
+
+
+def run_single(banking: BankingSystem, ops):
+    deposit, withdraw, transfer = banking.deposit, banking.withdraw, banking.transfer
+    for op in ops:
+        if op[0] == 'transfer':
+            transfer(op[1], op[2], op[3])
+        elif op[0] == 'deposit':
+            deposit(op[1], op[2])
+        else:
+            withdraw(op[1], op[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化过账引擎基准测试")
+    parser.add_argument('--accounts', type=int, default=100000, help="账户数量")
+    parser.add_argument('--ops', type=int, default=1000000, help="操作数量")
+    parser.add_argument('--low', type=float, default=0.01, help="低余额账户比例（决定被拒绝的操作数量）")
+    args = parser.parse_args()
+    
+    if np is None:
+        print("需要安装 numpy")
+        return 1
+    
+    balances, sources, destinations, amounts = make_ops(args.accounts, args.ops, args.low)
+    ops = to_tuples(sources, destinations, amounts)
+    
+    banking = make_system(args.accounts, balances)
+    start = time.perf_counter()
+    run_single(banking, ops)
+    single = time.perf_counter() - start
+    expected = list(banking.accounts.balance_buffer())
+    
+    # apply_batch 是全有或全无的，有操作被拒绝时不会应用，只计时校验过程
+    banking = make_system(args.accounts, balances)
+    start = time.perf_counter()
+    banking.apply_batch(ops)
+    batch = time.perf_counter() - start
+    
+    banking = make_system(args.accounts, balances)
+    src = np.array(sources, dtype=np.int64)
+    dst = np.array(destinations, dtype=np.int64)
+    amt = np.array(amounts, dtype=np.int64)
+    start = time.perf_counter()
+    result = PostingEngine(banking).post(src, dst, amt)
+    vectorized = time.perf_counter() - start
+    assert list(banking.accounts.balance_buffer()) == expected
+    
+    print(f"接受 {result.accepted:,} / {args.ops:,} 笔")
+    print(f"{'方式':<16} {'耗时':>10} {'吞吐量':>16}")
+    print(f"{'逐个调用':<14} {single:>9.2f}s {args.ops / single:>12,.0f} 次/秒")
+    print(f"{'apply_batch':<16} {batch:>9.2f}s {args.ops / batch:>12,.0f} 次/秒")
+    print(f"{'PostingEngine':<16} {vectorized:>9.2f}s {args.ops / vectorized:>12,.0f} 次/秒")
+    print(f"加速比（相对逐个调用）: {single / vectorized:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
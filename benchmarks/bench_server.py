@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+银行网络服务负载测试
+
+启动（或连接到已有的）bank_server，用多个连接并发发送随机的存款、取款、
+转账和查询请求，每个连接保持固定数量的在途请求（流水线深度），统计
+吞吐量和延迟分位数。
+
+用法:
+    python benchmarks/bench_server.py --connections 16 --depth 32 --requests 200000
+    python benchmarks/bench_server.py --port 8765          # 连接到已运行的服务
+    python benchmarks/bench_server.py --journal            # 启动带事务日志的服务
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_request(rng: random.Random, accounts: int) -> dict:
+    kind = rng.random()
+    a = str(rng.randrange(accounts))
+    amount = f"{rng.randint(1, 10000) / 100:.2f}"
+    if kind < 0.4:
+        b = str(rng.randrange(accounts))
+        return {'op': 'transfer', 'from_account_id': a, 'to_account_id': b, 'amount': amount}
+    if kind < 0.6:
+        return {'op': 'deposit', 'account_id': a, 'amount': amount}
+    if kind < 0.8:
+        return {'op': 'withdraw', 'account_id': a, 'amount': amount}
+    return {'op': 'get_account', 'account_id': a}
+
+
+async def setup_accounts(host: str, port: int, accounts: int):
+    reader, writer = await asyncio.open_connection(host, port)
+    for i in range(accounts):
+        request = {'op': 'create_account', 'account_id': str(i), 'owner_name': f"用户{i}",
+                   'initial_balance': "1000000.00"}
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+    await writer.drain()
+    for _ in range(accounts):
+        await reader.readline()
+    writer.close()
+
+
+async def run_connection(host: str, port: int, count: int, depth: int, accounts: int,
+                         seed: int, latencies: list):
+    """在一个连接上发送 count 个请求，最多保持 depth 个在途请求。"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = {}
+    sent = 0
+    
+    def send(n):
+        nonlocal sent
+        for _ in range(n):
+            request = make_request(rng, accounts)
+            request['id'] = sent
+            sent_at[sent] = time.perf_counter()
+            writer.write(json.dumps(request).encode('utf-8') + b'\n')
+            sent += 1
+    
+    send(min(depth, count))
+    await writer.drain()
+    for _ in range(count):
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent_at.pop(response['id']))
+        if sent < count:
+            send(1)
+            await writer.drain()
+    writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(args):
+    await setup_accounts(args.host, args.port, args.accounts)
+    
+    latencies = []
+    per_connection = args.requests // args.connections
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_connection(args.host, args.port, per_connection, args.depth, args.accounts, seed, latencies)
+        for seed in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    total = per_connection * args.connections
+    print(f"连接数 {args.connections}，流水线深度 {args.depth}，请求数 {total:,}")
+    print(f"{'吞吐量':<10} {total / elapsed:>12,.0f} 次/秒")
+    for name, fraction in (('p50', 0.5), ('p99', 0.99), ('p99.9', 0.999)):
+        print(f"{name + ' 延迟':<10} {percentile(latencies, fraction) * 1000:>12.2f} 毫秒")
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("服务未能启动")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="银行网络服务负载测试")
+    parser.add_argument('--host', default='127.0.0.1', help="服务地址")
+    parser.add_argument('--port', type=int, default=None, help="连接到已运行的服务；不指定时自动启动一个")
+    parser.add_argument('--journal', action='store_true', help="自动启动的服务启用事务日志")
+    parser.add_argument('--connections', type=int, default=16, help="并发连接数")
+    parser.add_argument('--depth', type=int, default=32, help="每个连接的流水线深度")
+    parser.add_argument('--requests', type=int, default=200000, help="请求总数")
+    parser.add_argument('--accounts', type=int, default=1000, help="账户数量")
+    args = parser.parse_args()
+    
+    process = None
+    temp_dir = None
+    if args.port is None:
+        args.port = 18765
+        command = [sys.executable, os.path.join(ROOT, 'bank_server.py'), '--port', str(args.port)]
+        if args.journal:
+            temp_dir = tempfile.mkdtemp()
+            command += ['--data', os.path.join(temp_dir, 'accounts.csv'),
+                        '--journal', os.path.join(temp_dir, 'journal.log')]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        wait_for_port(args.host, args.port)
+    
+    try:
+        asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+多进程分片基准测试
+
+在 1..N 个分片（工作进程）上执行同样的随机存款、取款和转账，比较每秒
+处理的操作数，并以单进程 BankingSystem.apply_batch 作为基准。跨分片转账的
+比例可调，用来观察两阶段提交的额外开销。
+
+分片之间只有在机器有多个CPU核心时才能真正并行；单核机器上分片数增加
+只会带来进程间通信的开销。
+
+用法:
+    python benchmarks/bench_sharding.py --max-shards 8 --cross 0.1
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+from sharding import ShardedBankingSystem, shard_of
+
+
+def make_ops(count: int, accounts: int, shards: int, cross: float, rng: random.Random):
+    """生成随机操作；转账中约 cross 比例的来源和目标位于不同分片。"""
+    by_shard = [[] for _ in range(shards)]
+    for i in range(accounts):
+        by_shard[shard_of(str(i), shards)].append(str(i))
+    ops = []
+    for _ in range(count):
+        amount = Decimal(rng.randint(1, 1000)).scaleb(-2)
+        roll = rng.random()
+        source = str(rng.randrange(accounts))
+        if roll < 0.25:
+            ops.append(('deposit', source, amount))
+        elif roll < 0.5:
+            ops.append(('withdraw', source, amount))
+        else:
+            if shards > 1 and rng.random() < cross:
+                home = shard_of(source, shards)
+                other = rng.choice([s for s in range(shards) if s != home])
+                destination = rng.choice(by_shard[other])
+            else:
+                destination = rng.choice(by_shard[shard_of(source, shards)])
+            ops.append(('transfer', source, destination, amount))
+    return ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程分片基准测试")
+    parser.add_argument('--accounts', type=int, default=100000, help="账户数量")
+    parser.add_argument('--ops', type=int, default=200000, help="操作数量")
+    parser.add_argument('--batch', type=int, default=5000, help="每批操作数")
+    parser.add_argument('--max-shards', type=int, default=os.cpu_count() or 1, help="最大分片数")
+    parser.add_argument('--cross', type=float, default=0.1, help="跨分片转账比例")
+    args = parser.parse_args()
+    
+    initial = Decimal('1000.00')
+    rows = []
+    
+    # 基准：同一进程内直接调用单个 BankingSystem 的方法
+    rng = random.Random(1)
+    ops = make_ops(args.ops, args.accounts, 1, 0.0, rng)
+    banking = BankingSystem(owner_index=False)
+    for i in range(args.accounts):
+        banking.create_account(str(i), "用户", initial)
+    methods = {'deposit': banking.deposit, 'withdraw': banking.withdraw, 'transfer': banking.transfer}
+    start = time.perf_counter()
+    for op in ops:
+        methods[op[0]](*op[1:])
+    rows.append(("单进程", args.ops / (time.perf_counter() - start)))
+    
+    for shards in range(1, args.max_shards + 1):
+        rng = random.Random(1)
+        ops = make_ops(args.ops, args.accounts, shards, args.cross, rng)
+        system = ShardedBankingSystem(shards)
+        try:
+            for offset in range(0, args.accounts, args.batch):
+                system.execute([('create', str(i), "用户", initial)
+                                for i in range(offset, min(offset + args.batch, args.accounts))])
+            start = time.perf_counter()
+            for offset in range(0, len(ops), args.batch):
+                system.execute(ops[offset:offset + args.batch])
+            elapsed = time.perf_counter() - start
+        finally:
+            system.close()
+        rows.append((f"{shards} 个分片", args.ops / elapsed))
+    
+    print(f"账户数 {args.accounts:,}，操作数 {args.ops:,}，每批 {args.batch}，"
+          f"跨分片转账比例 {args.cross:.0%}，CPU核心数 {os.cpu_count()}")
+    print(f"{'配置':<10} {'操作/秒':>12} {'相对单进程':>10}")
+    for name, rate in rows:
+        print(f"{name:<10} {rate:>12,.0f} {rate / rows[0][1]:>10.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+SQLite 存储基准测试
+
+比较“内存字典 + CSV文件”与 SQLite 存储的冷启动时间、单点查询和转账吞吐量。
+内存字典的转账本身不落盘，因此另外列出启用事务日志（组提交）后的吞吐量，
+作为同样持久化的对照。
+
+用法:
+    python benchmarks/bench_sqlite_store.py --accounts 1000000
+    python benchmarks/bench_sqlite_store.py --synchronous FULL
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+from sqlite_store import SQLiteAccountStore
+
+
+def write_csv(path: str, accounts: int):
+    rng = random.Random(42)
+    with open(path, 'w', newline='') as file:
+        file.write("account_id,owner_name,balance\r\n")
+        for i in range(accounts):
+            file.write(f"{i},用户{i},{rng.randint(100000, 10000000) / 100:.2f}\r\n")
+
+
+def lookups_per_second(banking: BankingSystem, ids) -> float:
+    start = time.perf_counter()
+    for account_id in ids:
+        banking.get_account(account_id).balance
+    return len(ids) / (time.perf_counter() - start)
+
+
+def transfers_per_second(banking: BankingSystem, pairs) -> float:
+    amount = Decimal('0.01')
+    start = time.perf_counter()
+    for source, destination in pairs:
+        banking.transfer(source, destination, amount)
+    return len(pairs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 存储基准测试")
+    parser.add_argument('--accounts', type=int, default=200000, help="账户数量")
+    parser.add_argument('--lookups', type=int, default=100000, help="单点查询次数")
+    parser.add_argument('--transfers', type=int, default=20000, help="转账次数")
+    parser.add_argument('--synchronous', default='NORMAL', choices=['OFF', 'NORMAL', 'FULL'],
+                        help="SQLite 的 synchronous 设置")
+    args = parser.parse_args()
+    
+    rng = random.Random(7)
+    ids = [str(rng.randrange(args.accounts)) for _ in range(args.lookups)]
+    pairs = [(str(rng.randrange(args.accounts)), str(rng.randrange(args.accounts)))
+             for _ in range(args.transfers)]
+    pairs = [(a, b) for a, b in pairs if a != b]
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(temp_dir, "accounts.csv")
+        db_path = os.path.join(temp_dir, "accounts.db")
+        write_csv(csv_path, args.accounts)
+        
+        # 内存字典：每次启动都要读入整个CSV文件
+        start = time.perf_counter()
+        memory = BankingSystem(owner_index=False)
+        memory.load_from_csv_streaming(csv_path)
+        csv_start = time.perf_counter() - start
+        
+        # 把CSV导入SQLite一次，之后的启动只需打开数据库
+        store = SQLiteAccountStore(db_path, synchronous=args.synchronous)
+        importer = BankingSystem(store=store, owner_index=False)
+        start = time.perf_counter()
+        importer.load_from_csv_streaming(csv_path)
+        sqlite_import = time.perf_counter() - start
+        importer.accounts.close()
+        
+        start = time.perf_counter()
+        store = SQLiteAccountStore(db_path, synchronous=args.synchronous)
+        sqlite = BankingSystem(store=store, owner_index=False)
+        sqlite_start = time.perf_counter() - start
+        
+        results = [
+            ("冷启动", f"{csv_start:.2f}s", f"{sqlite_start * 1000:.1f}ms"),
+            ("单点查询", f"{lookups_per_second(memory, ids):,.0f}/s", f"{lookups_per_second(sqlite, ids):,.0f}/s"),
+            ("转账", f"{transfers_per_second(memory, pairs):,.0f}/s", f"{transfers_per_second(sqlite, pairs):,.0f}/s"),
+        ]
+        
+        start = time.perf_counter()
+        memory.save_to_csv(csv_path)
+        csv_save = time.perf_counter() - start
+        
+        memory.recover(csv_path, os.path.join(temp_dir, "journal.log"))
+        journaled = transfers_per_second(memory, pairs)
+        memory.close_journal()
+        store.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    print(f"账户数 {args.accounts:,}，SQLite synchronous={args.synchronous}，"
+          f"CSV导入SQLite {sqlite_import:.2f}s")
+    print(f"{'项目':<10} {'内存字典+CSV':>16} {'SQLite':>16}")
+    for name, memory_value, sqlite_value in results:
+        print(f"{name:<8} {memory_value:>16} {sqlite_value:>16}")
+    print(f"内存字典保存整个CSV {csv_save:.2f}s；启用事务日志后转账 {journaled:,.0f}/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
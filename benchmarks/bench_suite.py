@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+BankingSystem 基准测试套件
+
+在不同的账户数量下测量 create_account、get_account、deposit、withdraw、
+transfer、save_to_csv、load_from_csv 和 get_all_accounts 的吞吐量（每秒
+调用次数）和延迟分位数，以及进程的内存峰值（RSS）。每个账户数量在独立的
+子进程中运行，因此内存峰值互不影响。
+
+计时噪声较大的机器上可以增加 --rounds：每轮都在新的子进程中运行，每项
+操作取吞吐量最高的一轮。
+
+结果可以保存为JSON文件，并与之前保存的基准结果比较：任何一项吞吐量比
+基准低出阈值以上时以退出码1结束，便于在持续集成中发现性能退化。
+
+用法:
+    python benchmarks/bench_suite.py --sizes 1000,10000,100000 --output results.json
+    python benchmarks/bench_suite.py --baseline results.json --threshold 0.15
+    python benchmarks/bench_suite.py --sizes 1000,10000,100000,1000000,10000000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_system import BankingSystem
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 单次调用很快的操作最多记录这么多个延迟样本，避免千万级账户时样本列表本身占用大量内存
+MAX_SAMPLES = 100000
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的内存峰值（MB），平台不支持时返回None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(calls: int, elapsed: float, samples: List[int]) -> Dict:
+    """把一项操作的总耗时和延迟样本（纳秒）整理成结果字典。"""
+    samples.sort()
+    return {
+        'calls': calls,
+        'ops_per_sec': calls / elapsed if elapsed > 0 else 0.0,
+        'p50_us': percentile(samples, 0.50) / 1000,
+        'p90_us': percentile(samples, 0.90) / 1000,
+        'p99_us': percentile(samples, 0.99) / 1000,
+        'max_us': (samples[-1] if samples else 0) / 1000,
+    }
+
+
+def measure(call: Callable, args_list: List[tuple]) -> Dict:
+    """逐个执行调用并记录延迟；调用次数很多时按固定间隔抽样。"""
+    clock = time.perf_counter_ns
+    step = max(1, len(args_list) // MAX_SAMPLES)
+    samples = []
+    start = clock()
+    for index, args in enumerate(args_list):
+        if index % step:
+            call(*args)
+        else:
+            begin = clock()
+            call(*args)
+            samples.append(clock() - begin)
+    elapsed = (clock() - start) / 1e9
+    return summarize(len(args_list), elapsed, samples)
+
+
+def run_size(size: int, ops: int, seed: int) -> Dict:
+    """在一个全新的银行系统上按账户数量 size 运行所有操作。"""
+    rng = random.Random(seed)
+    results = {}
+    banking = BankingSystem()
+    
+    initial = Decimal('1000.00')
+    results['create_account'] = measure(
+        banking.create_account, [(str(i), f"用户{i}", initial) for i in range(size)])
+    
+    ids = [str(rng.randrange(size)) for _ in range(ops)]
+    amounts = [Decimal(rng.randint(1, 1000)).scaleb(-2) for _ in range(ops)]
+    results['get_account'] = measure(banking.get_account, [(account_id,) for account_id in ids])
+    results['deposit'] = measure(banking.deposit, list(zip(ids, amounts)))
+    results['withdraw'] = measure(banking.withdraw, list(zip(ids, amounts)))
+    pairs = []
+    for source in ids:
+        destination = str(rng.randrange(size))
+        if size > 1:
+            while destination == source:
+                destination = str(rng.randrange(size))
+        pairs.append((source, destination))
+    results['transfer'] = measure(banking.transfer, [pair + (amount,) for pair, amount in zip(pairs, amounts)])
+    
+    # 整体操作耗时与账户数量成正比，小规模时多重复几次以减少噪声
+    repeats = max(1, min(5, 200000 // size))
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, "accounts.csv")
+        results['save_to_csv'] = measure(banking.save_to_csv, [(path,)] * repeats)
+        
+        def load(filename):
+            loaded = BankingSystem()
+            success, error = loaded.load_from_csv(filename)
+            if not success:
+                raise RuntimeError(error)
+        
+        results['load_from_csv'] = measure(load, [(path,)] * repeats)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    results['get_all_accounts'] = measure(banking.get_all_accounts, [()] * repeats)
+    
+    return {'operations': results, 'peak_rss_mb': peak_rss_mb()}
+
+
+def _child(connection, size: int, ops: int, seed: int):
+    try:
+        connection.send(run_size(size, ops, seed))
+    except Exception as e:
+        connection.send(e)
+    connection.close()
+
+
+def run_isolated(size: int, ops: int, seed: int) -> Dict:
+    """在独立的子进程中运行一个账户数量，返回其结果。"""
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_child, args=(child, size, ops, seed))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def run_best(size: int, ops: int, seed: int, rounds: int) -> Dict:
+    """运行 rounds 轮，每项操作保留吞吐量最高的一轮结果。"""
+    best = run_isolated(size, ops, seed)
+    for _ in range(rounds - 1):
+        result = run_isolated(size, ops, seed)
+        for name, stats in result['operations'].items():
+            if stats['ops_per_sec'] > best['operations'][name]['ops_per_sec']:
+                best['operations'][name] = stats
+        if result['peak_rss_mb'] is not None:
+            best['peak_rss_mb'] = max(best['peak_rss_mb'], result['peak_rss_mb'])
+    return best
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    与基准结果比较吞吐量。
+    
+    参数:
+        results: 本次运行的结果
+        baseline: 之前保存的结果
+        threshold: 允许的相对下降比例（例如0.1表示10%）
+    
+    返回:
+        退化项目的说明列表（为空表示没有退化）
+    """
+    regressions = []
+    for size, current in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if previous is None:
+            continue
+        for name, stats in current['operations'].items():
+            before = previous['operations'].get(name)
+            if before is None or before['ops_per_sec'] <= 0:
+                continue
+            change = stats['ops_per_sec'] / before['ops_per_sec'] - 1
+            if change < -threshold:
+                regressions.append(f"{size} 个账户 {name}: {before['ops_per_sec']:,.0f}/s -> "
+                                   f"{stats['ops_per_sec']:,.0f}/s ({change:+.1%})")
+    return regressions
+
+
+def print_results(results: Dict, baseline: Optional[Dict]):
+    for size, current in results['sizes'].items():
+        rss = current['peak_rss_mb']
+        print(f"\n账户数 {int(size):,}" + (f"，内存峰值 {rss:,.1f}MB" if rss is not None else ""))
+        print(f"{'操作':<18} {'次/秒':>12} {'p50(us)':>10} {'p90(us)':>10} {'p99(us)':>10} {'对比基准':>9}")
+        previous = (baseline or {}).get('sizes', {}).get(size, {}).get('operations', {})
+        for name, stats in current['operations'].items():
+            change = ""
+            if name in previous and previous[name]['ops_per_sec'] > 0:
+                change = f"{stats['ops_per_sec'] / previous[name]['ops_per_sec'] - 1:+.1%}"
+            print(f"{name:<18} {stats['ops_per_sec']:>12,.1f} {stats['p50_us']:>10.1f} "
+                  f"{stats['p90_us']:>10.1f} {stats['p99_us']:>10.1f} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BankingSystem 基准测试套件")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="逗号分隔的账户数量（例如 1000,10000,100000,1000000,10000000）")
+    parser.add_argument('--ops', type=int, default=20000, help="每项单账户操作的调用次数")
+    parser.add_argument('--seed', type=int, default=42, help="随机数种子")
+    parser.add_argument('--rounds', type=int, default=3, help="每个账户数量运行的轮数（取最好的一轮）")
+    parser.add_argument('--output', help="把结果保存为JSON文件")
+    parser.add_argument('--baseline', help="与之比较的基准结果JSON文件")
+    parser.add_argument('--threshold', type=float, default=0.15, help="判定为退化的吞吐量下降比例")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    if not sizes or min(sizes) < 2:
+        parser.error("账户数量必须至少为2")
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'ops': args.ops,
+            'rounds': args.rounds,
+        },
+        'sizes': {},
+    }
+    for size in sizes:
+        results['sizes'][str(size)] = run_best(size, args.ops, args.seed, max(1, args.rounds))
+    
+    print_results(results, baseline)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n吞吐量下降超过 {args.threshold:.0%} 的项目:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n与基准相比没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+定长二进制账户文件
+
+与CSV相比，二进制格式不需要在启动时解析整个文件：文件通过 mmap 映射到
+内存，查询某个账户时直接按哈希表定位它的定长记录并读出余额。无论账户有
+多少，打开文件都只需要读取文件头；余额还可以在映射上原地修改。
+
+文件布局（小端序）::
+
+    文件头     64 字节：魔数、版本、记录数、哈希槽数、各区的偏移和长度、
+               所有余额的合计（分），修改余额时同步更新
+    记录区     每个账户 32 字节，按写入顺序排列：
+               id哈希 u64 | id偏移 u32 | 姓名偏移 u32 | id长度 u16 |
+               姓名长度 u16 | 保留 4 字节 | 余额（分）i64
+    哈希索引   槽数为2的幂、至少是记录数的两倍；每槽 u32，0 表示空，
+               否则为记录下标加1；线性探测
+    字符串堆   账户ID和所有者姓名的UTF-8字节
+
+哈希使用 8 字节的 blake2b，与进程无关（内置 hash() 每次启动都不同）。
+记录区和索引通过 memoryview 按本机字节序直接读写，因此只支持小端序平台。
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from money import INT64_MAX, from_cents, to_cents
+
+MAGIC = b'BANKACCT'
+VERSION = 2  # 版本1的文件头没有余额合计，打开时计算一次并升级
+
+_HEADER = struct.Struct('<8sIIQQQQQq')  # 魔数、版本、记录长度、记录数、槽数、索引偏移、堆偏移、堆长度、余额合计
+_HEADER_SIZE = 64
+_VERSION_OFFSET = 8
+_TOTAL = struct.Struct('<q')
+_TOTAL_OFFSET = _HEADER.size - _TOTAL.size  # 余额合计在文件头中的字节偏移
+_RECORD = struct.Struct('<QIIHH4xq')
+_RECORD_SIZE = _RECORD.size             # 32
+_CENTS_FIELD = 3                        # 余额在记录中的下标（以8字节为单位）
+_MAX_FIELD = 0xFFFF
+
+
+def _check_platform():
+    if sys.byteorder != 'little':
+        raise ValueError("二进制账户文件只支持小端序平台")
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def write_accounts(filename: str, accounts: List[Tuple[str, str, int]]):
+    """
+    把账户写入二进制文件（先写临时文件并落盘，再原子地替换）。
+    
+    参数:
+        filename: 目标文件路径
+        accounts: （账户ID，所有者姓名，余额（分））列表，账户ID不得重复
+    """
+    _check_platform()
+    count = len(accounts)
+    slots = 8
+    while slots < count * 2:
+        slots *= 2
+    mask = slots - 1
+    
+    records = bytearray(count * _RECORD_SIZE)
+    index = array('I', [0]) * slots
+    heap = bytearray()
+    pack_into = _RECORD.pack_into
+    
+    for number, (account_id, owner_name, cents) in enumerate(accounts):
+        id_bytes = account_id.encode('utf-8')
+        name_bytes = owner_name.encode('utf-8')
+        if len(id_bytes) > _MAX_FIELD or len(name_bytes) > _MAX_FIELD:
+            raise ValueError(f"账户 '{account_id}' 的ID或姓名过长")
+        id_hash = _hash(id_bytes)
+        id_offset = len(heap)
+        heap += id_bytes
+        name_offset = len(heap)
+        heap += name_bytes
+        pack_into(records, number * _RECORD_SIZE, id_hash, id_offset, name_offset,
+                  len(id_bytes), len(name_bytes), cents)
+        
+        slot = id_hash & mask
+        while index[slot]:
+            slot = (slot + 1) & mask
+        index[slot] = number + 1
+    
+    if len(heap) > 0xFFFFFFFF:
+        raise ValueError("字符串堆超过4GB")
+    total = sum(cents for _, _, cents in accounts)
+    if total > INT64_MAX:
+        raise ValueError("余额合计超出范围")
+    
+    index_offset = _HEADER_SIZE + len(records)
+    heap_offset = index_offset + 4 * slots
+    header = _HEADER.pack(MAGIC, VERSION, _RECORD_SIZE, count, slots, index_offset, heap_offset, len(heap), total)
+    
+    temp_name = filename + '.tmp'
+    with open(temp_name, 'wb') as file:
+        file.write(header.ljust(_HEADER_SIZE, b'\0'))
+        file.write(records)
+        file.write(index.tobytes())
+        file.write(heap)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_name, filename)
+
+
+class BinaryAccountFile:
+    """以 mmap 打开的二进制账户文件，按需读取和原地修改余额。"""
+    
+    def __init__(self, filename: str):
+        """
+        打开二进制账户文件，只读取并校验文件头。
+        
+        异常:
+            ValueError: 文件不是有效的账户文件
+        """
+        _check_platform()
+        self.filename = filename
+        self._file = open(filename, 'r+b')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"'{filename}' 不是有效的账户文件")
+        
+        magic, version, record_size, count, slots, index_offset, heap_offset, heap_size, _ = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in (1, VERSION) or record_size != _RECORD_SIZE \
+                or heap_offset + heap_size > len(self._map):
+            self.close()
+            raise ValueError(f"'{filename}' 不是有效的账户文件")
+        
+        self.count = count
+        self._slots = slots
+        self._heap_offset = heap_offset
+        view = memoryview(self._map)
+        # 记录区按8字节解释：下标 4*i 是第 i 条记录的哈希，4*i+3 是余额
+        self._words = view[_HEADER_SIZE:_HEADER_SIZE + count * _RECORD_SIZE].cast('q')
+        self._hashes = view[_HEADER_SIZE:_HEADER_SIZE + count * _RECORD_SIZE].cast('Q')
+        self._index = view[index_offset:index_offset + 4 * slots].cast('I')
+        self._header = view[:_HEADER_SIZE].cast('q')
+        if version == 1:
+            _TOTAL.pack_into(self._map, _TOTAL_OFFSET, sum(self._words[_CENTS_FIELD::4]))
+            struct.pack_into('<I', self._map, _VERSION_OFFSET, VERSION)
+    
+    def find(self, account_id: str) -> int:
+        """返回账户记录的下标，不存在时返回-1。"""
+        id_bytes = account_id.encode('utf-8')
+        id_hash = _hash(id_bytes)
+        index, hashes = self._index, self._hashes
+        mask = self._slots - 1
+        slot = id_hash & mask
+        while True:
+            number = index[slot]
+            if not number:
+                return -1
+            number -= 1
+            if hashes[number * 4] == id_hash and self._id_bytes(number) == id_bytes:
+                return number
+            slot = (slot + 1) & mask
+    
+    def account_id(self, number: int) -> str:
+        return self._id_bytes(number).decode('utf-8')
+    
+    def owner_name(self, number: int) -> str:
+        _, _, name_offset, _, name_length, _ = _RECORD.unpack_from(self._map, _HEADER_SIZE + number * _RECORD_SIZE)
+        start = self._heap_offset + name_offset
+        return self._map[start:start + name_length].decode('utf-8')
+    
+    def cents(self, number: int) -> int:
+        return self._words[number * 4 + _CENTS_FIELD]
+    
+    def set_cents(self, number: int, cents: int):
+        """修改余额并同步更新文件头中的余额合计；合计将超出int64范围时抛出 OverflowError。"""
+        words, header = self._words, self._header
+        position = number * 4 + _CENTS_FIELD
+        total = header[_TOTAL_OFFSET // 8] + cents - words[position]
+        if total > INT64_MAX:
+            raise OverflowError("余额合计超出范围")
+        words[position] = cents
+        header[_TOTAL_OFFSET // 8] = total
+    
+    def total_cents(self) -> int:
+        """所有余额的合计（从文件头读取，常数时间）。"""
+        return self._header[_TOTAL_OFFSET // 8]
+    
+    def flush(self):
+        """把原地修改的余额写回磁盘。"""
+        self._map.flush()
+    
+    def close(self):
+        # 先释放所有 memoryview，mmap 才能关闭
+        for name in ('_words', '_hashes', '_index', '_header'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+    
+    def _id_bytes(self, number: int) -> bytes:
+        _, id_offset, _, id_length, _, _ = _RECORD.unpack_from(self._map, _HEADER_SIZE + number * _RECORD_SIZE)
+        start = self._heap_offset + id_offset
+        return self._map[start:start + id_length]
+
+
+class BinaryAccount:
+    """二进制文件中一条记录的视图，接口与 BankAccount 相同，余额直接读写映射。"""
+    
+    __slots__ = ('_file', '_number')
+    
+    def __init__(self, file: BinaryAccountFile, number: int):
+        self._file = file
+        self._number = number
+    
+    @property
+    def account_id(self) -> str:
+        """账户的唯一标识符。"""
+        return self._file.account_id(self._number)
+    
+    @property
+    def owner_name(self) -> str:
+        """账户所有者的姓名。"""
+        return self._file.owner_name(self._number)
+    
+    @property
+    def balance(self) -> Decimal:
+        """获取账户的当前余额。"""
+        return from_cents(self._file.cents(self._number))
+    
+    def deposit(self, amount: Decimal) -> bool:
+        """向账户存款，金额必须为正数且为整分；余额将超出int64范围时失败。"""
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        file = self._file
+        balance = file.cents(self._number)
+        if cents <= 0 or balance > INT64_MAX - cents or file.total_cents() > INT64_MAX - cents:
+            return False
+        file.set_cents(self._number, balance + cents)
+        return True
+    
+    def withdraw(self, amount: Decimal) -> bool:
+        """从账户取款，金额必须为正数、为整分且小于等于余额。"""
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        balance = self._file.cents(self._number)
+        if cents <= 0 or cents > balance:
+            return False
+        self._file.set_cents(self._number, balance - cents)
+        return True
+    
+    def to_dict(self) -> Dict:
+        """将账户转换为字典以便存储。"""
+        return {
+            'account_id': self.account_id,
+            'owner_name': self.owner_name,
+            'balance': str(self.balance)
+        }
+    
+    def __eq__(self, other):
+        if isinstance(other, BinaryAccount):
+            return self._file is other._file and self._number == other._number
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash((id(self._file), self._number))
+
+
+class BinaryAccountStore:
+    """
+    以二进制账户文件为底层的账户存储，可替代 BankingSystem 中的账户字典。
+    
+    文件中的账户通过 BinaryAccount 视图访问，存取款原地修改映射中的余额
+    （flush() 后落盘）。定长文件不能追加记录，因此打开后新建的账户保存在
+    内存中，直到下一次 save_to_binary 把所有账户写入新文件。
+    """
+    
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file: Optional[BinaryAccountFile] = BinaryAccountFile(filename)
+        self._extra: Dict[str, object] = {}  # 打开文件后新建的账户
+    
+    def empty_like(self) -> dict:
+        """加载其他格式时使用普通字典保存账户。"""
+        return {}
+    
+    def __len__(self) -> int:
+        return (self._file.count if self._file is not None else 0) + len(self._extra)
+    
+    def __contains__(self, account_id) -> bool:
+        return account_id in self._extra or (self._file is not None and self._file.find(account_id) >= 0)
+    
+    def __iter__(self) -> Iterator[str]:
+        return (account_id for account_id, _ in self.items())
+    
+    def __getitem__(self, account_id: str):
+        account = self.get(account_id)
+        if account is None:
+            raise KeyError(account_id)
+        return account
+    
+    def get(self, account_id: str, default=None):
+        account = self._extra.get(account_id)
+        if account is not None:
+            return account
+        if self._file is not None:
+            number = self._file.find(account_id)
+            if number >= 0:
+                return BinaryAccount(self._file, number)
+        return default
+    
+    def __setitem__(self, account_id: str, account):
+        number = self._file.find(account_id) if self._file is not None else -1
+        if number < 0:
+            self._extra[account_id] = account
+        elif account.owner_name == self._file.owner_name(number):
+            self._file.set_cents(number, to_cents(account.balance))
+        else:
+            raise ValueError("二进制账户文件中的所有者姓名不能修改")
+    
+    def keys(self) -> List[str]:
+        return list(self)
+    
+    def values(self) -> Iterator:
+        return (account for _, account in self.items())
+    
+    def items(self) -> Iterator:
+        file = self._file
+        if file is not None:
+            for number in range(file.count):
+                yield file.account_id(number), BinaryAccount(file, number)
+        yield from list(self._extra.items())
+    
+    def total_balance(self) -> Decimal:
+        """所有账户的余额合计（文件中的账户读取文件头中的合计）。"""
+        total = self._file.total_cents() if self._file is not None else 0
+        return from_cents(total) + sum((account.balance for account in self._extra.values()), Decimal('0.00'))
+    
+    def flush(self):
+        """把原地修改的余额写回磁盘（打开后新建的账户不包括在内）。"""
+        if self._file is not None:
+            self._file.flush()
+    
+    def reopen(self):
+        """
+        重新映射同名文件（save_to_binary 用新文件替换了它之后调用）。
+        
+        新文件已包含内存中新建的账户，因此清空这部分。之前取得的视图失效。
+        """
+        file = BinaryAccountFile(self.filename)
+        self.close()
+        self._file = file
+        self._extra = {}
+    
+    def clear(self):
+        self.close()
+        self._extra = {}
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def iter_records(accounts: Iterable) -> Iterator[Tuple[str, str, int]]:
+    """把账户对象转换为 write_accounts 使用的（ID，姓名，分）元组。"""
+    for account in accounts:
+        yield account.account_id, account.owner_name, to_cents(account.balance)
@@ -0,0 +1,159 @@
+"""
+图形界面的后台任务
+
+tkinter 的所有界面操作都必须在主线程中进行，而保存、加载大文件或对大量
+账户排序可能需要几秒钟。TaskRunner 把这些调用交给工作线程执行，工作线程
+只把结果、进度和异常放入队列，主线程用 after() 定时取出队列中的消息并调用
+回调，因此回调中可以安全地更新界面。
+
+任务可以报告进度，也可以被取消：取消只设置一个标志，任务在下一次报告
+进度时抛出 TaskCancelled 停止执行。
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class TaskCancelled(Exception):
+    """任务已被取消（在任务报告进度时抛出）。"""
+
+
+class Task:
+    """一个提交给 TaskRunner 的后台任务。"""
+    
+    def __init__(self, runner: 'TaskRunner', on_done: Optional[Callable], on_progress: Optional[Callable],
+                 on_error: Optional[Callable], on_cancel: Optional[Callable]):
+        self._runner = runner
+        self._cancelled = threading.Event()
+        self._last_report = 0.0
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.finished = False
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        """请求取消任务；任务在下一次报告进度时停止。"""
+        self._cancelled.set()
+    
+    def progress(self, done: int, total: int):
+        """
+        在工作线程中报告进度（已完成数量，总数量）。
+        
+        每隔 TaskRunner.progress_interval 秒最多向主线程发送一次进度，避免
+        队列被大量进度消息占满。任务已被取消时抛出 TaskCancelled。
+        """
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+        now = time.monotonic()
+        if now - self._last_report >= self._runner.progress_interval or done >= total:
+            self._last_report = now
+            self._runner._messages.put(('progress', self, (done, total)))
+
+
+class TaskRunner:
+    """
+    在工作线程中执行任务，并在主线程中调用回调。
+    
+    参数:
+        root: 提供 after(ms, callback) 的对象（通常是 tk.Tk）
+        workers: 工作线程数量；为1时任务按提交顺序依次执行
+        poll_ms: 主线程检查消息队列的间隔（毫秒）
+    """
+    
+    def __init__(self, root, workers: int = 1, poll_ms: int = 50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.progress_interval = 0.1
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bank-ui')
+        self._messages: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._polling = False
+    
+    @property
+    def pending(self) -> int:
+        """已提交但回调尚未执行的任务数量。"""
+        return self._pending
+    
+    def submit(self, function: Callable, *args, on_done: Optional[Callable] = None,
+               on_progress: Optional[Callable] = None, on_error: Optional[Callable] = None,
+               on_cancel: Optional[Callable] = None, with_progress: bool = False) -> Task:
+        """
+        提交一个任务（必须在主线程中调用）。
+        
+        参数:
+            function: 在工作线程中执行的函数
+            args: 传给 function 的参数
+            on_done: 完成时以返回值调用
+            on_progress: 收到进度时以（已完成，总数）调用
+            on_error: function 抛出异常时以异常调用；未提供时异常被忽略
+            on_cancel: 任务被取消时调用
+            with_progress: 是否把 task.progress 作为关键字参数 progress 传给 function
+        
+        返回:
+            可用于取消的 Task
+        """
+        task = Task(self, on_done, on_progress, on_error, on_cancel)
+        kwargs = {'progress': task.progress} if with_progress else {}
+        self._pending += 1
+        self._executor.submit(self._run, task, function, args, kwargs)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return task
+    
+    def _run(self, task: Task, function: Callable, args, kwargs):
+        """工作线程：执行任务并把结果放入队列。"""
+        try:
+            if task.cancelled:
+                raise TaskCancelled()
+            result = function(*args, **kwargs)
+        except TaskCancelled:
+            self._messages.put(('cancelled', task, None))
+        except Exception as e:
+            self._messages.put(('error', task, e))
+        else:
+            # 取消请求可能被任务内部捕获（例如转成失败的返回值）
+            self._messages.put(('cancelled' if task.cancelled else 'done', task, result))
+    
+    def poll(self):
+        """处理队列中的所有消息（在主线程中调用）。"""
+        while True:
+            try:
+                kind, task, value = self._messages.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'progress':
+                if task.on_progress is not None and not task.finished:
+                    task.on_progress(*value)
+                continue
+            
+            task.finished = True
+            self._pending -= 1
+            callback = {'done': task.on_done, 'error': task.on_error, 'cancelled': task.on_cancel}[kind]
+            if callback is not None:
+                if kind == 'cancelled':
+                    callback()
+                else:
+                    callback(value)
+    
+    def _poll(self):
+        try:
+            self.poll()
+        finally:
+            # 回调抛出异常时也要继续轮询，否则之后的任务永远收不到结果
+            if self._pending:
+                self.root.after(self.poll_ms, self._poll)
+            else:
+                self._polling = False
+    
+    def shutdown(self, wait: bool = False):
+        """停止接受新任务；wait为True时等待正在执行的任务结束。"""
+        self._executor.shutdown(wait=wait)
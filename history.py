@@ -0,0 +1,228 @@
+"""
+账户交易历史
+
+TransactionHistory 为每个账户保存交易记录。最近的记录放在内存中的环形
+缓冲区里；缓冲区满时，把较旧的一半作为一个“块”追加到段文件末尾，并在
+稀疏索引中记下这个块的时间范围和位置（每个块一条，而不是每条记录一条）。
+
+查询某段时间的对账单时，先在该账户的块索引上二分找到与时间范围重叠的
+块，只读取这些块，再合并内存中的记录。近期记录直接从内存返回，长期的
+历史只占用磁盘，内存占用与账户数量乘以缓冲区容量成正比。
+
+段文件格式：每个块是一行JSON头（账户ID、记录数、起止时间、正文字节数），
+后面跟若干行JSON记录。段文件超过 segment_size 字节后切换到新的段文件。
+重新打开目录时扫描块头重建索引，并截掉崩溃时写了一半的块。
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from decimal import Decimal
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 一条交易记录：时间戳（秒）、类型、金额、操作后的余额、对方账户ID（转账时）
+HistoryEntry = namedtuple('HistoryEntry', ['timestamp', 'kind', 'amount', 'balance', 'counterparty'])
+
+_SEGMENT_SUFFIX = '.seg'
+
+
+def _encode_entries(entries: List[HistoryEntry]) -> bytes:
+    lines = [
+        json.dumps([entry.timestamp, entry.kind, str(entry.amount), str(entry.balance), entry.counterparty],
+                   ensure_ascii=False)
+        for entry in entries
+    ]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _decode_entries(data: bytes) -> List[HistoryEntry]:
+    entries = []
+    for line in data.decode('utf-8').splitlines():
+        timestamp, kind, amount, balance, counterparty = json.loads(line)
+        entries.append(HistoryEntry(timestamp, kind, Decimal(amount), Decimal(balance), counterparty))
+    return entries
+
+
+class TransactionHistory:
+    """按账户保存交易记录的环形缓冲区，可选地把旧记录溢出到段文件。"""
+    
+    def __init__(self, directory: Optional[str] = None, capacity: int = 64,
+                 segment_size: int = 64 * 1024 * 1024):
+        """
+        创建交易历史。
+        
+        参数:
+            directory: 段文件目录；为None时只在内存中保留每个账户最近的 capacity 条记录
+            capacity: 每个账户内存缓冲区的容量
+            segment_size: 单个段文件的最大字节数
+        """
+        if capacity < 2:
+            raise ValueError("缓冲区容量至少为2")
+        self.capacity = capacity
+        self.directory = directory
+        self.segment_size = segment_size
+        
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, Deque[HistoryEntry]] = {}
+        # 稀疏索引：账户ID -> 按时间排列的块 (首条时间, 末条时间, 段号, 偏移, 字节数)
+        self._blocks: Dict[str, List[Tuple[float, float, int, int, int]]] = {}
+        self._block_ends: Dict[str, List[float]] = {}  # 各块的末条时间，用于二分
+        self._file = None
+        self._segment = 0
+        
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+    
+    def record(self, account_id: str, kind: str, amount: Decimal, balance: Decimal,
+               counterparty: Optional[str] = None, timestamp: Optional[float] = None):
+        """
+        追加一条交易记录。
+        
+        参数:
+            account_id: 账户ID
+            kind: 交易类型（'open'、'deposit'、'withdraw'、'transfer_in'、'transfer_out'）
+            amount: 交易金额
+            balance: 交易后的余额
+            counterparty: 转账的对方账户ID
+            timestamp: 交易时间，默认为当前时间
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        entry = HistoryEntry(timestamp, kind, amount, balance, counterparty)
+        with self._lock:
+            buffer = self._buffers.get(account_id)
+            if buffer is None:
+                # 不溢出到磁盘时由 deque 自动丢弃最旧的记录
+                maxlen = self.capacity if self._file is None else None
+                buffer = self._buffers[account_id] = deque(maxlen=maxlen)
+            buffer.append(entry)
+            if self._file is not None and len(buffer) >= self.capacity:
+                self._spill(account_id, buffer, self.capacity // 2)
+    
+    def statement(self, account_id: str, start: Optional[float] = None,
+                  end: Optional[float] = None) -> List[HistoryEntry]:
+        """
+        返回账户在 [start, end] 时间范围内的交易记录，按时间顺序排列。
+        
+        参数:
+            account_id: 账户ID
+            start: 起始时间戳（包含），None表示不限
+            end: 结束时间戳（包含），None表示不限
+        
+        返回:
+            交易记录列表
+        """
+        low = float('-inf') if start is None else start
+        high = float('inf') if end is None else end
+        
+        with self._lock:
+            blocks = self._blocks.get(account_id, ())
+            spilled = []
+            if blocks:
+                # 第一个末条时间不早于 start 的块开始，直到首条时间晚于 end
+                first = bisect.bisect_left(self._block_ends[account_id], low)
+                for block in blocks[first:]:
+                    if block[0] > high:
+                        break
+                    spilled.append(block)
+                if spilled:
+                    self._file.flush()
+            recent = list(self._buffers.get(account_id, ()))
+        
+        result = []
+        for _, _, segment, offset, size in spilled:
+            with open(self._segment_path(segment), 'rb') as file:
+                file.seek(offset)
+                entries = _decode_entries(file.read(size))
+            result.extend(entry for entry in entries if low <= entry.timestamp <= high)
+        result.extend(entry for entry in recent if low <= entry.timestamp <= high)
+        return result
+    
+    def in_memory(self) -> int:
+        """内存缓冲区中的记录总数。"""
+        with self._lock:
+            return sum(len(buffer) for buffer in self._buffers.values())
+    
+    def flush(self):
+        """把所有内存中的记录写入段文件并落盘（不溢出到磁盘时为空操作）。"""
+        with self._lock:
+            if self._file is None:
+                return
+            for account_id, buffer in self._buffers.items():
+                if buffer:
+                    self._spill(account_id, buffer, len(buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        """写出内存中的记录并关闭段文件。"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _spill(self, account_id: str, buffer: Deque[HistoryEntry], count: int):
+        """把缓冲区中最旧的 count 条记录作为一个块写入段文件（调用方持有锁）。"""
+        entries = [buffer.popleft() for _ in range(count)]
+        body = _encode_entries(entries)
+        header = json.dumps({
+            'account_id': account_id, 'count': count,
+            'first': entries[0].timestamp, 'last': entries[-1].timestamp, 'size': len(body)
+        }, ensure_ascii=False).encode('utf-8') + b'\n'
+        
+        position = self._file.tell()
+        if position and position + len(header) + len(body) > self.segment_size:
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+            position = 0
+        self._file.write(header)
+        self._file.write(body)
+        
+        block = (entries[0].timestamp, entries[-1].timestamp, self._segment, position + len(header), len(body))
+        self._blocks.setdefault(account_id, []).append(block)
+        self._block_ends.setdefault(account_id, []).append(block[1])
+    
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:06d}{_SEGMENT_SUFFIX}")
+    
+    def _load_index(self):
+        """扫描已有段文件的块头重建稀疏索引，并打开最后一个段文件用于追加。"""
+        segments = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+        for segment in segments:
+            path = self._segment_path(segment)
+            valid = 0
+            with open(path, 'rb') as file:
+                file_size = os.fstat(file.fileno()).st_size
+                while True:
+                    line = file.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        header = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break
+                    offset = file.tell()
+                    if offset + header['size'] > file_size:
+                        break
+                    file.seek(header['size'], os.SEEK_CUR)
+                    valid = file.tell()
+                    account_id = header['account_id']
+                    self._blocks.setdefault(account_id, []).append(
+                        (header['first'], header['last'], segment, offset, header['size']))
+                    self._block_ends.setdefault(account_id, []).append(header['last'])
+            # 崩溃时可能留下写了一半的块，截掉以免新块追加在损坏的数据之后
+            if valid != os.path.getsize(path):
+                with open(path, 'r+b') as file:
+                    file.truncate(valid)
+        
+        self._segment = segments[-1] if segments else 0
+        self._file = open(self._segment_path(self._segment), 'ab')
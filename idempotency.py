@@ -0,0 +1,205 @@
+"""
+幂等键去重缓存
+
+客户端在超时后重试存款、取款或转账时，可以为变更附带一个幂等键。
+IdempotencyCache 记住每个键第一次执行的结果，重复的键直接返回原结果而
+不会再次记账。每个键同时记住请求的指纹（操作名和参数），同一个键被用于
+不同的请求时返回错误，而不是把另一个请求的结果当作成功返回。
+
+缓存同时受容量（LRU淘汰）和有效期（TTL）限制，查找和插入都是 O(1)。
+过期时间使用墙上时间，因此随事务日志和检查点一起保存后，重启不会重新
+打开重复执行的窗口。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_TTL = 24 * 60 * 60.0
+
+
+class _NullLock:
+    """非并发模式下的空锁。"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_LOCK = _NullLock()
+
+# 同一个键被用于不同请求时返回的结果
+KEY_REUSED = (False, "幂等键已用于不同的请求")
+
+
+def fingerprint(operation: str, *args) -> str:
+    """
+    计算请求的指纹。
+    
+    参数:
+        operation: 'deposit'、'withdraw' 或 'transfer'
+        args: 请求的参数；金额先规范化，'10' 和 '10.00' 是同一个请求
+    
+    返回:
+        指纹字符串
+    """
+    return repr((operation,) + tuple(arg.normalize() if isinstance(arg, Decimal) else arg for arg in args))
+
+
+class IdempotencyCache:
+    """
+    有容量和有效期上限的幂等键缓存。
+    
+    参数:
+        capacity: 最多保留的键数量，超出时淘汰最久未使用的键
+        ttl: 键的有效期（秒）
+        concurrent: 是否可能被多个线程同时使用；为False时不加锁
+        stripes: 并发模式下按键分段的执行锁数量
+    """
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, ttl: float = DEFAULT_TTL,
+                 concurrent: bool = False, stripes: int = 64):
+        if capacity < 1:
+            raise ValueError("幂等键缓存容量必须为正数")
+        if ttl <= 0:
+            raise ValueError("幂等键有效期必须为正数")
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Optional[str], Tuple[bool, Optional[str]]]]' = OrderedDict()
+        # 正在执行的键 -> (过期时间, 指纹)；同一个键在 claim() 的锁内执行，不会同时出现两次
+        self._pending: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock() if concurrent else None
+        self._claims = [threading.Lock() for _ in range(stripes)] if concurrent else None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str, fingerprint: Optional[str] = None,
+            now: Optional[float] = None) -> Optional[Tuple[bool, Optional[str]]]:
+        """
+        返回键第一次执行的结果；键不存在或已过期时返回None。
+        
+        给出 fingerprint 且与键第一次执行的请求不同时返回 KEY_REUSED。
+        """
+        if now is None:
+            now = time.time()
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            if fingerprint is not None and entry[1] is not None and entry[1] != fingerprint:
+                return KEY_REUSED
+            self._entries.move_to_end(key)
+            return entry[2]
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def put(self, key: str, result: Tuple[bool, Optional[str]], expires: float,
+            fingerprint: Optional[str] = None):
+        """记录键的执行结果，expires 为过期时间（time.time() 时间戳），fingerprint 为请求的指纹。"""
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            entries = self._entries
+            entries[key] = (expires, fingerprint, result)
+            entries.move_to_end(key)
+            while len(entries) > self.capacity:
+                entries.popitem(last=False)
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def expiry(self, now: Optional[float] = None) -> float:
+        """现在开始执行的键的过期时间。"""
+        return (time.time() if now is None else now) + self.ttl
+    
+    def begin(self, key: str, fingerprint: str, expires: Optional[float] = None):
+        """
+        开始执行键对应的请求（调用方已持有 claim(key)）。
+        
+        参数:
+            key: 幂等键
+            fingerprint: 请求的指纹
+            expires: 过期时间；为None时从现在开始计算（重放日志时使用记录中的时间）
+        """
+        self._pending[key] = (self.expiry() if expires is None else expires, fingerprint)
+    
+    def journal_key(self, key: str) -> list:
+        """正在执行的键写入事务日志的形式：[键, 过期时间]。"""
+        return [key, self._pending[key][0]]
+    
+    def finish(self, key: str, result: Optional[Tuple[bool, Optional[str]]]):
+        """结束 begin() 开始的请求并记住结果；result 为None（执行出错）时不记录。"""
+        expires, fingerprint = self._pending.pop(key)
+        if result is not None:
+            self.put(key, result, expires, fingerprint)
+    
+    def claim(self, key: str):
+        """
+        返回键的执行锁。
+        
+        同一个键的两次并发重试在锁内先后执行，后一次能看到前一次的结果；
+        非并发模式下返回空锁。
+        """
+        if self._claims is None:
+            return _NULL_LOCK
+        return self._claims[hash(key) % len(self._claims)]
+    
+    def export(self, now: Optional[float] = None) -> List[list]:
+        """以 [键, 过期时间, 成功状态, 错误信息, 指纹] 列表的形式导出未过期的键（按使用顺序）。"""
+        if now is None:
+            now = time.time()
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            return [[key, expires, result[0], result[1], fingerprint]
+                    for key, (expires, fingerprint, result) in self._entries.items() if expires > now]
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def load(self, rows: List[list], now: Optional[float] = None):
+        """导入 export() 导出的键（跳过已过期的键）；旧格式的行没有指纹，不检查请求是否相同。"""
+        if now is None:
+            now = time.time()
+        for row in rows:
+            key, expires, success, error = row[:4]
+            if expires > now:
+                self.put(key, (success, error), expires, row[4] if len(row) > 4 else None)
+    
+    def resize(self, capacity: int, ttl: float):
+        """修改容量和有效期；已有的键保留原来的过期时间，超出容量的最旧键被淘汰。"""
+        if capacity < 1:
+            raise ValueError("幂等键缓存容量必须为正数")
+        if ttl <= 0:
+            raise ValueError("幂等键有效期必须为正数")
+        self.capacity = capacity
+        self.ttl = ttl
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def clear(self):
+        """删除所有键。"""
+        self._entries.clear()
+        self._pending.clear()
@@ -0,0 +1,188 @@
+"""
+事务日志（预写日志）
+
+每一笔成功的变更都以一行JSON的形式追加到日志文件中。写入由后台线程
+完成，多个操作共享一次fsync（组提交），调用方可以在释放账户锁之后再
+等待自己的记录落盘。
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def read_journal(filename: str) -> List[Dict]:
+    """
+    读取日志文件中的全部完整记录。
+    
+    崩溃时可能留下写了一半的最后一行，遇到无法解析的行即停止读取。
+    
+    参数:
+        filename: 日志文件路径
+    
+    返回:
+        按写入顺序排列的记录列表
+    """
+    records = []
+    if not os.path.exists(filename):
+        return records
+    
+    with open(filename, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line.decode('utf-8')))
+            except ValueError:
+                break
+    return records
+
+
+def _valid_length(filename: str) -> int:
+    """返回日志文件中完整记录所占的字节数。"""
+    length = 0
+    with open(filename, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                json.loads(line.decode('utf-8'))
+            except ValueError:
+                break
+            length += len(line)
+    return length
+
+
+class TransactionJournal:
+    """追加写入的事务日志，支持组提交。"""
+    
+    def __init__(self, filename: str, commit_delay: float = 0.0):
+        """
+        打开（或创建）一个事务日志。
+        
+        参数:
+            filename: 日志文件路径
+            commit_delay: 每次提交前额外等待的秒数，用于聚合更多记录
+        """
+        self.filename = filename
+        self.commit_delay = commit_delay
+        
+        # 截掉崩溃时残留的不完整记录，避免新记录被追加在损坏的行之后
+        if os.path.exists(filename):
+            valid_length = _valid_length(filename)
+            if valid_length != os.path.getsize(filename):
+                with open(filename, 'r+b') as file:
+                    file.truncate(valid_length)
+        
+        records = read_journal(filename)
+        self._file = open(filename, 'ab')
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._last_seq = records[-1].get('seq', 0) if records else 0
+        self._durable_seq = self._last_seq
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        
+        self._flusher = threading.Thread(target=self._run, name="journal-flusher", daemon=True)
+        self._flusher.start()
+    
+    @property
+    def last_seq(self) -> int:
+        """最近一次追加的记录序号。"""
+        return self._last_seq
+    
+    def append(self, record: Dict) -> int:
+        """
+        追加一条记录，不等待落盘。
+        
+        参数:
+            record: 要写入的记录（会被加上 seq 字段）
+        
+        返回:
+            记录的序号，可传给 wait() 等待其落盘
+        """
+        with self._cond:
+            if self._closed:
+                raise ValueError("事务日志已关闭")
+            self._last_seq += 1
+            record['seq'] = self._last_seq
+            self._pending.append(
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            )
+            self._cond.notify_all()
+            return self._last_seq
+    
+    def wait(self, seq: int):
+        """阻塞直到序号不大于 seq 的记录全部落盘。"""
+        with self._cond:
+            while self._durable_seq < seq and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise IOError(f"写入事务日志失败: {self._error}")
+    
+    def flush(self):
+        """等待所有已追加的记录落盘。"""
+        self.wait(self._last_seq)
+    
+    def reset(self, records: List[Dict]):
+        """
+        用给定记录原子地替换日志内容（记录保留原有的 seq 字段）。
+        
+        调用前应保证没有并发的追加操作。
+        """
+        self.flush()
+        temp_name = self.filename + '.tmp'
+        with open(temp_name, 'wb') as temp:
+            for record in records:
+                temp.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            temp.flush()
+            os.fsync(temp.fileno())
+        
+        with self._cond:
+            self._file.close()
+            os.replace(temp_name, self.filename)
+            self._file = open(self.filename, 'ab')
+    
+    def close(self):
+        """落盘所有记录并关闭日志。"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._file.close()
+    
+    def _run(self):
+        """后台提交线程：把积累的记录一次写入并fsync。"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+            
+            if self.commit_delay > 0:
+                time.sleep(self.commit_delay)
+            
+            with self._cond:
+                batch = self._pending
+                self._pending = []
+                batch_seq = self._last_seq
+                file = self._file
+            
+            try:
+                file.write(b''.join(batch))
+                file.flush()
+                os.fsync(file.fileno())
+            except BaseException as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            
+            with self._cond:
+                self._durable_seq = batch_seq
+                self._cond.notify_all()
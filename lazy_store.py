@@ -0,0 +1,394 @@
+"""
+按需加载的账户存储
+
+LazyAccountStore 以 binary_format.py 的定长二进制账户文件为底层，但不
+映射整个文件：查询账户时按哈希索引用普通文件读取定位它的记录，构造一个
+LazyAccount 放入容量有限的LRU缓存。存取款只修改缓存中的对象并把它标记为
+脏，对象被淘汰（或 flush()）时才把余额写回文件中的记录。因此常驻内存的
+账户数量取决于缓存容量和正在使用的账户，而不是账户总数。
+
+同一个账户在内存中始终只有一个对象：被淘汰但仍被调用方持有的对象登记在
+弱引用字典中，再次查询时直接复用；它之后被修改时重新放回缓存。
+
+定长文件不能追加记录，打开后新建的账户与 BinaryAccountStore 一样保存在
+内存中，直到下一次 save_to_binary 把所有账户写入新文件。
+"""
+
+import os
+import struct
+import threading
+import weakref
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from binary_format import (
+    MAGIC, VERSION, _HEADER, _HEADER_SIZE, _RECORD, _RECORD_SIZE, _TOTAL, _TOTAL_OFFSET, _VERSION_OFFSET,
+    _check_platform, _hash
+)
+from money import INT64_MAX, from_cents, to_cents
+
+DEFAULT_CAPACITY = 100000
+
+# 顺序遍历时每次读取的记录数
+SCAN_CHUNK = 4096
+
+_CENTS = struct.Struct('<q')
+_CENTS_OFFSET = _RECORD_SIZE - _CENTS.size   # 余额在记录中的字节偏移
+_SLOT = struct.Struct('<I')
+
+
+class LazyAccount:
+    """从账户文件读入的账户，接口与 BankAccount 相同，修改后由存储写回文件。"""
+    
+    __slots__ = ('account_id', 'owner_name', '_cents', '_saved', '_store', '_number', '__weakref__')
+    
+    def __init__(self, store: 'LazyAccountStore', number: int, account_id: str, owner_name: str, cents: int):
+        self._store = store
+        self._number = number
+        self.account_id = account_id
+        self.owner_name = owner_name
+        self._cents = cents
+        self._saved = cents  # 文件中记录的余额
+    
+    @property
+    def balance(self) -> Decimal:
+        """获取账户的当前余额。"""
+        return from_cents(self._cents)
+    
+    def deposit(self, amount: Decimal) -> bool:
+        """向账户存款，金额必须为正数且为整分；余额将超出int64范围时失败。"""
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        if cents <= 0 or self._cents > INT64_MAX - cents or self._store._total > INT64_MAX - cents:
+            return False
+        self._cents += cents
+        self._store._modified(self, cents)
+        return True
+    
+    def withdraw(self, amount: Decimal) -> bool:
+        """从账户取款，金额必须为正数、为整分且小于等于余额。"""
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        if cents <= 0 or cents > self._cents:
+            return False
+        self._cents -= cents
+        self._store._modified(self, -cents)
+        return True
+    
+    def to_dict(self) -> Dict:
+        """将账户转换为字典以便存储。"""
+        return {
+            'account_id': self.account_id,
+            'owner_name': self.owner_name,
+            'balance': str(self.balance)
+        }
+
+
+class LazyAccountStore:
+    """
+    按需从二进制账户文件读取账户的存储，可替代 BankingSystem 中的账户字典。
+    
+    参数:
+        filename: 二进制账户文件路径（由 write_accounts 或 save_to_binary 写入）
+        capacity: LRU缓存最多保留的账户数量
+    """
+    
+    def __init__(self, filename: str, capacity: int = DEFAULT_CAPACITY):
+        _check_platform()
+        if capacity < 1:
+            raise ValueError("缓存容量必须为正数")
+        self.filename = filename
+        self.capacity = capacity
+        self._lock = threading.Lock()  # 保护文件位置、缓存和统计
+        self._cache: 'OrderedDict[str, LazyAccount]' = OrderedDict()
+        self._dirty = set()  # 缓存中余额尚未写回文件的账户ID
+        self._live = weakref.WeakValueDictionary()  # 内存中仍存在的账户对象（包括已淘汰的）
+        self._extra: Dict[str, object] = {}  # 打开文件后新建的账户
+        self._file = None
+        self.count = 0
+        self._total = 0        # 文件中所有账户的余额合计（分），包括尚未写回的修改
+        self._saved_total = 0  # 文件头中记录的余额合计，即文件中记录的余额之和
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        self._open()
+    
+    def _open(self):
+        # 不带缓冲：写回的余额直接进入操作系统的页缓存，与 mmap 的原地修改一样
+        # 在进程崩溃后仍然存在，其他进程打开文件也能立即看到
+        file = open(self.filename, 'r+b', buffering=0)
+        header = file.read(_HEADER_SIZE)
+        size = os.fstat(file.fileno()).st_size
+        valid = len(header) == _HEADER_SIZE
+        if valid:
+            magic, version, record_size, count, slots, index_offset, heap_offset, heap_size, total = \
+                _HEADER.unpack_from(header, 0)
+            valid = magic == MAGIC and version in (1, VERSION) and record_size == _RECORD_SIZE \
+                and heap_offset + heap_size <= size
+        if not valid:
+            file.close()
+            raise ValueError(f"'{self.filename}' 不是有效的账户文件")
+        self._file = file
+        self.count = count
+        self._slots = slots
+        self._index_offset = index_offset
+        self._heap_offset = heap_offset
+        if version == 1:
+            # 旧文件头没有余额合计：按块求和一次，写入文件头并升级版本
+            total = 0
+            for start in range(0, count, SCAN_CHUNK):
+                chunk = min(SCAN_CHUNK, count - start)
+                words = memoryview(self._read(_HEADER_SIZE + start * _RECORD_SIZE, chunk * _RECORD_SIZE)).cast('q')
+                total += sum(words[_CENTS_OFFSET // 8::_RECORD_SIZE // 8])
+            self._saved_total = total
+            self._write_total()
+            file.seek(_VERSION_OFFSET)
+            file.write(struct.pack('<I', VERSION))
+        self._total = self._saved_total = total
+    
+    def _read(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+    
+    def _find(self, account_id: str) -> Optional[LazyAccount]:
+        """从文件中读取账户记录（调用方持有锁），不存在时返回None。"""
+        id_bytes = account_id.encode('utf-8')
+        id_hash = _hash(id_bytes)
+        mask = self._slots - 1
+        slot = id_hash & mask
+        while True:
+            number = _SLOT.unpack(self._read(self._index_offset + 4 * slot, 4))[0]
+            if not number:
+                return None
+            number -= 1
+            record_hash, id_offset, name_offset, id_length, name_length, cents = \
+                _RECORD.unpack(self._read(_HEADER_SIZE + number * _RECORD_SIZE, _RECORD_SIZE))
+            if record_hash == id_hash and id_length == len(id_bytes) \
+                    and self._read(self._heap_offset + id_offset, id_length) == id_bytes:
+                owner_name = self._read(self._heap_offset + name_offset, name_length).decode('utf-8')
+                return LazyAccount(self, number, account_id, owner_name, cents)
+            slot = (slot + 1) & mask
+    
+    def _load(self, account_id: str) -> Optional[LazyAccount]:
+        """从缓存或文件取得账户并放到缓存的最近使用端（调用方持有锁）。"""
+        account = self._cache.get(account_id)
+        if account is not None:
+            self.hits += 1
+            self._cache.move_to_end(account_id)
+            return account
+        
+        self.misses += 1
+        if self._file is None:
+            return None
+        account = self._live.get(account_id)
+        if account is None:
+            account = self._find(account_id)
+            if account is None:
+                return None
+            self._live[account_id] = account
+        self._insert(account)
+        return account
+    
+    def _insert(self, account: LazyAccount):
+        """把账户放入缓存，超出容量时淘汰最久未使用的账户并写回其余额。"""
+        cache = self._cache
+        cache[account.account_id] = account
+        cache.move_to_end(account.account_id)
+        written = False
+        while len(cache) > self.capacity:
+            _, evicted = cache.popitem(last=False)
+            self.evictions += 1
+            if evicted.account_id in self._dirty:
+                self._write_back(evicted)
+                written = True
+        if written:
+            self._write_total()
+    
+    def _write_back(self, account: LazyAccount):
+        """把账户余额写回记录（调用方随后调用 _write_total 更新文件头）。"""
+        self._file.seek(_HEADER_SIZE + account._number * _RECORD_SIZE + _CENTS_OFFSET)
+        self._file.write(_CENTS.pack(account._cents))
+        self._saved_total += account._cents - account._saved
+        account._saved = account._cents
+        self._dirty.discard(account.account_id)
+        self.writebacks += 1
+    
+    def _write_total(self):
+        self._file.seek(_TOTAL_OFFSET)
+        self._file.write(_TOTAL.pack(self._saved_total))
+    
+    def _modified(self, account: LazyAccount, delta: int):
+        """账户余额被修改了 delta 分后调用：标记为脏，已被淘汰时重新放回缓存。"""
+        with self._lock:
+            if account._number < 0:
+                return
+            self._total += delta
+            self._dirty.add(account.account_id)
+            if account.account_id in self._cache:
+                self._cache.move_to_end(account.account_id)
+            else:
+                self._insert(account)
+    
+    def empty_like(self) -> dict:
+        """加载其他格式时使用普通字典保存账户。"""
+        return {}
+    
+    def __len__(self) -> int:
+        return self.count + len(self._extra)
+    
+    def __contains__(self, account_id) -> bool:
+        return self.get(account_id) is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        return (account_id for account_id, _ in self.items())
+    
+    def __getitem__(self, account_id: str):
+        account = self.get(account_id)
+        if account is None:
+            raise KeyError(account_id)
+        return account
+    
+    def get(self, account_id: str, default=None):
+        account = self._extra.get(account_id)
+        if account is not None:
+            return account
+        with self._lock:
+            account = self._load(account_id)
+        return default if account is None else account
+    
+    def __setitem__(self, account_id: str, account):
+        with self._lock:
+            existing = self._load(account_id) if account_id not in self._extra else None
+            if existing is None:
+                self._extra[account_id] = account
+                return
+            if existing is not account:
+                if account.owner_name != existing.owner_name:
+                    raise ValueError("二进制账户文件中的所有者姓名不能修改")
+                cents = to_cents(account.balance)
+                self._total += cents - existing._cents
+                existing._cents = cents
+            self._dirty.add(account_id)
+    
+    def keys(self) -> List[str]:
+        return list(self)
+    
+    def values(self) -> Iterator:
+        return (account for _, account in self.items())
+    
+    def items(self) -> Iterator:
+        """
+        按文件顺序遍历所有账户，再遍历打开后新建的账户。
+        
+        遍历时成块读取记录，且不放入缓存，不会挤掉缓存中的常用账户。
+        """
+        start = 0
+        while True:
+            with self._lock:
+                if self._file is None or start >= self.count:
+                    break
+                chunk = self._read_chunk(start, min(SCAN_CHUNK, self.count - start))
+            yield from chunk
+            start += len(chunk)
+        yield from list(self._extra.items())
+    
+    def _read_chunk(self, start: int, count: int) -> List[Tuple[str, LazyAccount]]:
+        """读取从 start 开始的 count 条记录（调用方持有锁）。"""
+        records = list(_RECORD.iter_unpack(self._read(_HEADER_SIZE + start * _RECORD_SIZE, count * _RECORD_SIZE)))
+        low = min(min(record[1], record[2]) for record in records)
+        high = max(max(record[1] + record[3], record[2] + record[4]) for record in records)
+        heap = self._read(self._heap_offset + low, high - low)
+        
+        live = self._live
+        result = []
+        for number, (_, id_offset, name_offset, id_length, name_length, cents) in enumerate(records, start):
+            account_id = heap[id_offset - low:id_offset - low + id_length].decode('utf-8')
+            account = live.get(account_id)
+            if account is None:
+                owner_name = heap[name_offset - low:name_offset - low + name_length].decode('utf-8')
+                account = live[account_id] = LazyAccount(self, number, account_id, owner_name, cents)
+            result.append((account_id, account))
+        return result
+    
+    def total_balance(self) -> Decimal:
+        """所有账户的余额合计（文件中的账户使用维护的合计，常数时间）。"""
+        with self._lock:
+            total = self._total
+        return from_cents(total) + sum((account.balance for account in self._extra.values()), Decimal('0.00'))
+    
+    def cache_stats(self) -> Dict[str, float]:
+        """
+        返回缓存统计。
+        
+        返回:
+            包含 capacity、size、hits、misses、hit_rate、evictions、
+            writebacks 和 dirty 的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'capacity': self.capacity,
+                'size': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'writebacks': self.writebacks,
+                'dirty': len(self._dirty),
+            }
+    
+    def _write_back_all(self):
+        if self._dirty:
+            for account_id in list(self._dirty):
+                self._write_back(self._cache[account_id])
+            self._write_total()
+    
+    def flush(self):
+        """把所有脏账户的余额写回文件并落盘（打开后新建的账户不包括在内）。"""
+        with self._lock:
+            if self._file is not None:
+                self._write_back_all()
+                self._file.flush()
+                os.fsync(self._file.fileno())
+    
+    def reopen(self):
+        """
+        重新打开同名文件（save_to_binary 用新文件替换了它之后调用）。
+        
+        新文件已包含所有账户的当前余额，因此清空缓存和内存中新建的账户。
+        之前取得的账户对象失效，之后对它们的修改不再写入文件。
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._reset()
+            self._open()
+    
+    def clear(self):
+        self.close()
+    
+    def close(self):
+        """写回脏账户并关闭文件。"""
+        with self._lock:
+            if self._file is not None:
+                self._write_back_all()
+                self._file.close()
+            self._reset()
+    
+    def _reset(self):
+        # 已取得的账户对象不再对应任何记录
+        for account in list(self._live.values()):
+            account._number = -1
+        self._file = None
+        self.count = 0
+        self._total = self._saved_total = 0
+        self._cache = OrderedDict()
+        self._dirty = set()
+        self._live = weakref.WeakValueDictionary()
+        self._extra = {}
@@ -2,14 +2,47 @@
 """
 简易银行系统命令行界面
 
-此脚本提供了一个命令行界面来与银行系统交互。
+此脚本提供了一个命令行界面来与银行系统交互。不带命令运行时显示交互式
+菜单；带命令运行时（例如 main.py transfer 1 2 10）以非交互方式执行，只加载
+和保存一次数据文件，适合定时任务批量处理：
+
+    python main.py [--data 文件] create ID 姓名 [初始余额]
+    python main.py [--data 文件] deposit ID 金额
+    python main.py [--data 文件] withdraw ID 金额
+    python main.py [--data 文件] transfer 来源ID 目标ID 金额
+    python main.py [--data 文件] show ID
+    python main.py [--data 文件] list
+    python main.py [--data 文件] [--atomic] run 脚本文件|-
+
+脚本文件（- 表示标准输入）每行一条命令，格式与上面相同（不含
+python main.py），# 之后为注释。--atomic 用 apply_batch 原子地执行整个
+脚本（只支持 deposit、withdraw 和 transfer）。退出码：0 全部成功，1 有操作
+失败，2 用法、脚本或数据文件错误。
+
+图形界面（tkinter）只在切换到图形界面时才导入。
 """
 
 import os
 import sys
 from decimal import Decimal, InvalidOperation
+from typing import List, Optional, Tuple
+
+from banking_system import BATCH_MESSAGES, BankingSystem
+
+DEFAULT_DATA_FILE = "accounts.csv"
 
-from banking_system import BankingSystem
+# 命令 -> (最少参数数, 最多参数数)
+COMMAND_ARGS = {
+    'create': (2, 3),
+    'deposit': (2, 2),
+    'withdraw': (2, 2),
+    'transfer': (3, 3),
+    'show': (1, 1),
+    'list': (0, 0),
+}
+
+# 会修改账户的命令（执行成功后需要保存数据文件）
+MUTATING_COMMANDS = ('create', 'deposit', 'withdraw', 'transfer')
 
 
 def display_menu():
@@ -25,6 +58,8 @@ def display_menu():
     print("8. 从文件加载账户")
     print("9. 退出程序")
     print("0. 切换到图形界面")
+    print("10. 按姓名查找账户")
+    print("11. 查看运行统计")
     print("========================")
 
 
@@ -82,22 +117,87 @@ def view_account(banking: BankingSystem):
         print(f"未找到ID为 '{account_id}' 的账户。")
 
 
-def list_accounts(banking: BankingSystem):
-    """列出系统中的所有账户。"""
-    accounts = banking.get_all_accounts()
-    
-    if not accounts:
+def list_accounts(banking: BankingSystem, page_size: int = 20):
+    """分页列出系统中的所有账户。"""
+    if not banking.accounts:
         print("\n系统中没有找到账户。")
         return
     
-    print(f"\n----- 所有账户 ({len(accounts)}) -----")
+    print("排序方式: 1. 账户ID  2. 所有者  3. 余额（从高到低）  其他. 创建顺序")
+    sort_choice = input("请选择排序方式: ").strip()
+    sort_by, descending = {
+        "1": ('account_id', False),
+        "2": ('owner_name', False),
+        "3": ('balance', True),
+    }.get(sort_choice, (None, False))
+    
+    page = banking.get_accounts_page(page_size=page_size, sort_by=sort_by, descending=descending)
+    
+    print(f"\n----- 所有账户 ({page.total}) -----")
     print(f"{'ID':<10} {'所有者':<20} {'余额':<10}")
     print("-" * 40)
     
+    shown = 0
+    while True:
+        for account in page.accounts:
+            print(f"{account.account_id:<10} {account.owner_name:<20} ¥{account.balance:<10}")
+        shown += len(page.accounts)
+        
+        if page.next_cursor is None:
+            break
+        if input(f"已显示 {shown}/{page.total}，按回车显示下一页，输入 q 返回: ").strip().lower() == 'q':
+            break
+        page = banking.get_accounts_page(page.next_cursor, page_size, sort_by, descending)
+
+
+def search_accounts(banking: BankingSystem):
+    """按所有者姓名查找账户。"""
+    print("\n----- 按姓名查找账户 -----")
+    
+    query = input("输入姓名或姓名的一部分: ").strip()
+    if not query:
+        print("姓名不能为空。")
+        return
+    
+    print("查找方式: 1. 精确  2. 前缀（默认）  3. 模糊")
+    mode = {"1": 'exact', "3": 'fuzzy'}.get(input("请选择查找方式: ").strip(), 'prefix')
+    
+    accounts = banking.search_accounts(query, mode)
+    if not accounts:
+        print("没有找到匹配的账户。")
+        return
+    
+    print(f"\n----- 找到 {len(accounts)} 个账户 -----")
+    print(f"{'ID':<10} {'所有者':<20} {'余额':<10}")
+    print("-" * 40)
     for account in accounts:
         print(f"{account.account_id:<10} {account.owner_name:<20} ¥{account.balance:<10}")
 
 
+def print_metrics(banking: BankingSystem):
+    """打印各操作的调用次数、失败次数和延迟分位数。"""
+    snapshot = banking.metrics.snapshot() if banking.metrics is not None else {}
+    print(f"\n账户数: {banking.account_count()}  总余额: ¥{banking.total_balance()}")
+    if not snapshot:
+        print("还没有记录任何操作。")
+        return
+    print(f"{'操作':<18} {'调用':>8} {'失败':>6} {'p50(us)':>9} {'p99(us)':>9}  失败原因")
+    print("-" * 72)
+    for name, stats in snapshot.items():
+        reasons = ", ".join(f"{reason}={count}" for reason, count in stats['reasons'].items())
+        print(f"{name:<18} {stats['calls']:>8} {stats['failures']:>6} "
+              f"{stats['p50_us']:>9.1f} {stats['p99_us']:>9.1f}  {reasons}")
+
+
+def show_metrics(banking: BankingSystem):
+    """显示运行统计，按回车刷新。"""
+    print("\n----- 运行统计 -----")
+    while True:
+        print_metrics(banking)
+        if input("\n按回车刷新，输入 q 返回: ").strip().lower() == "q":
+            return
+
+
 def deposit(banking: BankingSystem):
     """处理向账户存款。"""
     print("\n----- 存款 -----")
@@ -249,9 +349,192 @@ def switch_to_gui():
         return False
 
 
+def parse_command(words: List[str]) -> Tuple:
+    """
+    把一条命令的单词列表转换为操作元组。
+    
+    参数:
+        words: 命令名和参数，例如 ['transfer', '1', '2', '10']
+    
+    返回:
+        操作元组，例如 ('transfer', '1', '2', Decimal('10'))
+    
+    异常:
+        ValueError: 未知命令、参数数量或金额无效
+    """
+    if not words:
+        raise ValueError("缺少命令")
+    name, args = words[0], list(words[1:])
+    arity = COMMAND_ARGS.get(name)
+    if arity is None:
+        raise ValueError(f"未知命令 '{name}'")
+    low, high = arity
+    if not low <= len(args) <= high:
+        count = str(low) if low == high else f"{low}到{high}"
+        raise ValueError(f"命令 '{name}' 需要{count}个参数")
+    
+    # create 的初始余额可以省略，其他修改命令的最后一个参数都是金额
+    if name in MUTATING_COMMANDS and (name != 'create' or len(args) == 3):
+        try:
+            args[-1] = Decimal(args[-1])
+        except InvalidOperation:
+            raise ValueError(f"无效的金额 '{args[-1]}'")
+        if not args[-1].is_finite():
+            raise ValueError(f"无效的金额 '{args[-1]}'")
+    return (name, *args)
+
+
+def read_script(filename: str) -> List[Tuple[int, Tuple]]:
+    """
+    读取脚本文件（- 表示标准输入）中的命令。
+    
+    返回:
+        (行号, 操作元组) 列表
+    
+    异常:
+        ValueError: 任何一行格式错误（信息中包含所有错误行）
+    """
+    import shlex
+    
+    if filename == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(filename, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+    
+    commands = []
+    errors = []
+    for number, line in enumerate(lines, 1):
+        try:
+            words = shlex.split(line, comments=True)
+            if words:
+                commands.append((number, parse_command(words)))
+        except ValueError as e:
+            errors.append(f"第{number}行: {e}")
+    if errors:
+        raise ValueError("\n".join(errors))
+    return commands
+
+
+def execute_command(banking: BankingSystem, op: Tuple) -> Tuple[bool, Optional[str]]:
+    """执行一条命令，show 和 list 把结果打印到标准输出。"""
+    name = op[0]
+    if name == 'create':
+        return banking.create_account(*op[1:])
+    if name == 'deposit':
+        return banking.deposit(op[1], op[2])
+    if name == 'withdraw':
+        return banking.withdraw(op[1], op[2])
+    if name == 'transfer':
+        return banking.transfer(op[1], op[2], op[3])
+    if name == 'show':
+        account = banking.get_account(op[1])
+        if account is None:
+            return False, f"未找到账户 '{op[1]}'"
+        print(f"{account.account_id}\t{account.owner_name}\t{account.balance}")
+        return True, None
+    for account in banking.iter_accounts():
+        print(f"{account.account_id}\t{account.owner_name}\t{account.balance}")
+    return True, None
+
+
+def _location(number: int) -> str:
+    return f"第{number}行: " if number else ""
+
+
+def run_commands(banking: BankingSystem, commands: List[Tuple[int, Tuple]],
+                 atomic: bool = False) -> Tuple[int, bool]:
+    """
+    依次执行命令，失败的命令把错误信息（带行号）打印到标准错误。
+    
+    参数:
+        banking: 银行系统实例
+        commands: (行号, 操作元组) 列表，直接从命令行执行的命令行号为0
+        atomic: 是否用 apply_batch 原子地执行（任何一条失败时都不执行）
+    
+    返回:
+        （失败的命令数，是否修改了账户）的元组
+    """
+    if atomic:
+        result = banking.apply_batch([op for _, op in commands])
+        if result.applied:
+            return 0, bool(commands)
+        for (number, _), status in zip(commands, result.statuses):
+            if status:
+                print(f"{_location(number)}{BATCH_MESSAGES[status]}", file=sys.stderr)
+        return sum(1 for status in result.statuses if status), False
+    
+    failures = 0
+    modified = False
+    for number, op in commands:
+        success, error = execute_command(banking, op)
+        if success:
+            modified = modified or op[0] in MUTATING_COMMANDS
+        else:
+            failures += 1
+            print(f"{_location(number)}{error}", file=sys.stderr)
+    return failures, modified
+
+
+def command_main(argv: List[str]) -> int:
+    """
+    非交互模式：解析命令行，加载一次数据文件，执行命令，有修改时保存一次。
+    
+    参数:
+        argv: 不含程序名的命令行参数
+    
+    返回:
+        退出码
+    """
+    data = DEFAULT_DATA_FILE
+    atomic = False
+    while argv and argv[0].startswith('--'):
+        option = argv.pop(0)
+        if option == '--data' and argv:
+            data = argv.pop(0)
+        elif option == '--atomic':
+            atomic = True
+        else:
+            print(f"未知选项 '{option}'\n{__doc__}", file=sys.stderr)
+            return 2
+    
+    try:
+        if argv and argv[0] == 'run':
+            if len(argv) != 2:
+                raise ValueError("命令 'run' 需要1个参数")
+            commands = read_script(argv[1])
+        else:
+            commands = [(0, parse_command(argv))]
+        if atomic and any(op[0] not in ('deposit', 'withdraw', 'transfer') for _, op in commands):
+            raise ValueError("--atomic 只支持 deposit、withdraw 和 transfer 命令")
+    except (OSError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    
+    # 非交互模式不启用指标，也不维护用不到的所有者姓名索引
+    banking = BankingSystem(owner_index=False)
+    if os.path.exists(data):
+        success, error = banking.load_from_csv_streaming(data)
+        if not success:
+            print(f"错误: {error}", file=sys.stderr)
+            return 2
+    
+    failures, modified = run_commands(banking, commands, atomic)
+    if modified:
+        success, error = banking.save_to_csv(data)
+        if not success:
+            print(f"错误: {error}", file=sys.stderr)
+            return 2
+    return 1 if failures else 0
+
+
 def main():
     """主程序函数。"""
+    if len(sys.argv) > 1 and sys.argv[1] != "--sample":
+        return command_main(sys.argv[1:])
+    
     banking = BankingSystem()
+    banking.enable_metrics()
     
     # 如果需要，创建示例账户
     if len(sys.argv) > 1 and sys.argv[1] == "--sample":
@@ -264,7 +547,7 @@ def main():
         display_menu()
         
         try:
-            choice = input("\n请输入您的选择 (0-9): ")
+            choice = input("\n请输入您的选择 (0-11): ")
             
             if choice == "1":
                 create_account(banking)
@@ -285,13 +568,17 @@ def main():
             elif choice == "9":
                 if exit_app():
                     break
+            elif choice == "10":
+                search_accounts(banking)
+            elif choice == "11":
+                show_metrics(banking)
             elif choice == "0":
                 if switch_to_gui():
                     # 导入并启动图形界面
                     from bank_ui import main as start_gui
                     return start_gui()
             else:
-                print("无效选择。请输入0到9之间的数字。")
+                print("无效选择。请输入0到11之间的数字。")
                 
         except KeyboardInterrupt:
             print("\n\n操作已取消。返回主菜单。")
@@ -0,0 +1,332 @@
+"""
+操作指标
+
+Metrics 为银行系统的每种操作统计调用次数、按原因分类的失败次数和延迟
+直方图，可以通过 snapshot() 读取，或用 prometheus_text() 导出为
+Prometheus 文本格式。
+
+延迟直方图采用HDR风格的对数-线性分桶：每个2的幂区间再均分为16个子桶，
+相对误差不超过1/16，整个纳秒到小时的范围只需几百个计数器，记录一次
+延迟只是一次位运算加一次列表累加。
+
+指标默认关闭。BankingSystem.enable_metrics() 用包装函数覆盖实例上的方法，
+关闭时删除这些实例属性，未启用时调用路径与没有指标完全相同。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+# 失败原因（Prometheus 标签值）
+UNKNOWN_ACCOUNT = 'unknown_account'
+INSUFFICIENT_FUNDS = 'insufficient_funds'
+INVALID_AMOUNT = 'invalid_amount'
+DUPLICATE_ACCOUNT = 'duplicate_account'
+SAME_ACCOUNT = 'same_account'
+INVALID_INPUT = 'invalid_input'
+REJECTED = 'rejected'
+EXCEPTION = 'exception'
+OTHER = 'other'
+
+# 错误信息中的关键字 -> 失败原因，按顺序匹配
+_REASON_PATTERNS = [
+    ("未找到", UNKNOWN_ACCOUNT),
+    ("不足", INSUFFICIENT_FUNDS),
+    ("必须为正数", INVALID_AMOUNT),
+    ("不能为负数", INVALID_AMOUNT),
+    ("已存在", DUPLICATE_ACCOUNT),
+    ("同一账户", SAME_ACCOUNT),
+    ("不能为空", INVALID_INPUT),
+]
+
+
+def classify_error(message: Optional[str]) -> str:
+    """把银行系统返回的错误信息归类为失败原因。"""
+    if message:
+        for pattern, reason in _REASON_PATTERNS:
+            if pattern in message:
+                return reason
+    return OTHER
+
+
+def failure_reason(result) -> Optional[str]:
+    """
+    根据方法的返回值判断是否失败。
+    
+    (False, 错误信息) 元组按错误信息归类；BatchResult(False, ...) 为
+    REJECTED；get_account 返回None为 UNKNOWN_ACCOUNT；其他返回值视为成功。
+    """
+    if result is None:
+        return UNKNOWN_ACCOUNT
+    if isinstance(result, tuple) and len(result) == 2 and result[0] is False:
+        return classify_error(result[1]) if isinstance(result[1], str) else REJECTED
+    return None
+
+
+def bucket_index(nanoseconds: int) -> int:
+    """延迟（纳秒）所在的直方图桶。"""
+    if nanoseconds < 2 * SUB_BUCKETS:
+        return max(nanoseconds, 0)
+    shift = nanoseconds.bit_length() - SUB_BUCKET_BITS - 1
+    return min(shift * SUB_BUCKETS + (nanoseconds >> shift), BUCKET_COUNT - 1)
+
+
+def bucket_upper_bound(index: int) -> int:
+    """直方图桶的上界（纳秒，不含）。"""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS + 1) << shift
+
+
+class LatencyHistogram:
+    """对数-线性分桶的延迟直方图（纳秒）。"""
+    
+    __slots__ = ('counts', 'count', 'total', 'max')
+    
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def reset(self):
+        self.counts[:] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def record(self, nanoseconds: int):
+        self.counts[bucket_index(nanoseconds)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+    
+    def percentile(self, fraction: float) -> int:
+        """返回不小于 fraction 比例样本的延迟上界（纳秒）；没有样本时返回0。"""
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * fraction + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+    
+    def cumulative(self, bounds: List[int]) -> List[int]:
+        """返回延迟小于每个上界的样本数；上界为2的幂时结果是精确的。"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            end = bucket_index(bound)
+            while index < end:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class _OperationStats:
+    """一种操作的计数和延迟。"""
+    
+    __slots__ = ('calls', 'failures', 'reasons', 'latency')
+    
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.reasons: Dict[str, int] = {}
+        self.latency = LatencyHistogram()
+    
+    def reset(self):
+        self.calls = 0
+        self.failures = 0
+        self.reasons = {}
+        self.latency.reset()
+
+
+class Metrics:
+    """
+    按操作名称统计的调用次数、失败原因和延迟。
+    
+    参数:
+        concurrent: 是否可能被多个线程同时更新；为False时不加锁
+    """
+    
+    def __init__(self, concurrent: bool = False):
+        self._lock = threading.Lock() if concurrent else None
+        self._operations: Dict[str, _OperationStats] = {}
+        self.started = time.time()
+    
+    def wrap(self, name: str, method: Callable) -> Callable:
+        """
+        返回记录 method 每次调用的包装函数。
+        
+        非并发模式下成功调用的记录直接内联在包装函数中（不经过 observe()），
+        尽量减少启用指标后的额外开销。
+        """
+        observe = self.observe
+        clock = time.perf_counter_ns
+        stats = self._stats(name)
+        latency = stats.latency
+        counts = latency.counts
+        last = BUCKET_COUNT - 1
+        
+        def instrumented(*args, **kwargs):
+            start = clock()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                observe(name, clock() - start, EXCEPTION)
+                raise
+            elapsed = clock() - start
+            if self._lock is not None or result.__class__ is not tuple or result[0] is not True:
+                observe(name, elapsed, failure_reason(result))
+                return result
+            # 与 bucket_index() 相同的计算
+            shift = elapsed.bit_length() - SUB_BUCKET_BITS - 1
+            counts[elapsed if shift <= 0 else min((shift << SUB_BUCKET_BITS) + (elapsed >> shift), last)] += 1
+            stats.calls += 1
+            latency.count += 1
+            latency.total += elapsed
+            if elapsed > latency.max:
+                latency.max = elapsed
+            return result
+        
+        instrumented.__name__ = getattr(method, '__name__', name)
+        instrumented.__doc__ = getattr(method, '__doc__', None)
+        instrumented.__wrapped__ = method
+        return instrumented
+    
+    def observe(self, name: str, nanoseconds: int, reason: Optional[str] = None):
+        """
+        记录一次调用。
+        
+        参数:
+            name: 操作名称
+            nanoseconds: 耗时（纳秒）
+            reason: 失败原因，成功时为None
+        """
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            stats = self._stats(name)
+            stats.calls += 1
+            stats.latency.record(nanoseconds)
+            if reason is not None:
+                stats.failures += 1
+                stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def _stats(self, name: str) -> _OperationStats:
+        stats = self._operations.get(name)
+        if stats is None:
+            stats = self._operations[name] = _OperationStats()
+        return stats
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        返回当前指标的副本。
+        
+        返回:
+            操作名称 -> {calls, failures, reasons, mean_us, p50_us, p90_us,
+            p99_us, max_us} 的字典，按操作名称排序
+        """
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            result = {}
+            for name in sorted(self._operations):
+                stats = self._operations[name]
+                if not stats.calls:
+                    continue
+                latency = stats.latency
+                result[name] = {
+                    'calls': stats.calls,
+                    'failures': stats.failures,
+                    'reasons': dict(stats.reasons),
+                    'mean_us': latency.total / latency.count / 1000 if latency.count else 0.0,
+                    'p50_us': latency.percentile(0.50) / 1000,
+                    'p90_us': latency.percentile(0.90) / 1000,
+                    'p99_us': latency.percentile(0.99) / 1000,
+                    'max_us': latency.max / 1000,
+                }
+            return result
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def reset(self):
+        """清空所有指标。"""
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            # 包装函数持有各操作统计对象的引用，因此原地清零
+            for stats in self._operations.values():
+                stats.reset()
+            self.started = time.time()
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def prometheus_text(self, gauges: Optional[Dict[str, float]] = None, prefix: str = 'bank') -> str:
+        """
+        以 Prometheus 文本格式导出指标。
+        
+        参数:
+            gauges: 额外导出的瞬时值（名称 -> 数值），例如账户数量
+            prefix: 指标名称前缀
+        
+        返回:
+            Prometheus 文本格式（version 0.0.4）的字符串
+        """
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            operations = sorted(item for item in self._operations.items() if item[1].calls)
+            lines = [
+                f"# HELP {prefix}_operations_total 按操作统计的调用次数",
+                f"# TYPE {prefix}_operations_total counter",
+            ]
+            for name, stats in operations:
+                lines.append(f'{prefix}_operations_total{{operation="{name}"}} {stats.calls}')
+            
+            lines.append(f"# HELP {prefix}_operation_failures_total 按操作和原因统计的失败次数")
+            lines.append(f"# TYPE {prefix}_operation_failures_total counter")
+            for name, stats in operations:
+                for reason, count in sorted(stats.reasons.items()):
+                    lines.append(f'{prefix}_operation_failures_total'
+                                 f'{{operation="{name}",reason="{reason}"}} {count}')
+            
+            lines.append(f"# HELP {prefix}_operation_duration_seconds 操作耗时")
+            lines.append(f"# TYPE {prefix}_operation_duration_seconds histogram")
+            for name, stats in operations:
+                latency = stats.latency
+                # 以2的幂纳秒为上界（与直方图桶边界对齐），从256ns到覆盖最大值为止
+                bounds = [1 << exponent for exponent in range(8, max(9, latency.max.bit_length() + 1))]
+                metric = f"{prefix}_operation_duration_seconds"
+                for bound, count in zip(bounds, latency.cumulative(bounds)):
+                    lines.append(f'{metric}_bucket{{operation="{name}",le="{bound / 1e9:.9g}"}} {count}')
+                lines.append(f'{metric}_bucket{{operation="{name}",le="+Inf"}} {latency.count}')
+                lines.append(f'{metric}_sum{{operation="{name}"}} {latency.total / 1e9:.9g}')
+                lines.append(f'{metric}_count{{operation="{name}"}} {latency.count}')
+        finally:
+            if lock is not None:
+                lock.release()
+        
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,63 @@
+"""
+金额表示与转换
+
+系统对外统一使用 Decimal 表示金额；需要高速运算的地方（紧凑存储、
+CentsBankAccount、批量接口）在内部使用 int64 范围内的整数“分”。本模块
+提供两种表示之间带int64溢出检测的精确转换。
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def to_cents(amount: Decimal, rounding: Optional[str] = None) -> int:
+    """
+    把金额转换为整数分。
+    
+    参数:
+        amount: 金额
+        rounding: 舍入方式（例如 decimal.ROUND_HALF_EVEN）；为None时金额必须
+                  恰好是整分，否则抛出 ValueError
+    
+    返回:
+        以分为单位的整数
+    
+    异常:
+        ValueError: 金额无效，或在未指定舍入方式时不是整分
+        OverflowError: 结果超出int64范围
+    """
+    # 先按数量级过滤，避免极端指数构造出巨大的整数
+    adjusted = amount.adjusted()
+    if adjusted > 18:
+        raise OverflowError(f"金额 {amount} 超出范围")
+    if adjusted < -3:
+        if not amount:
+            return 0
+        if rounding is None:
+            raise ValueError(f"金额 {amount} 不是整分")
+    
+    try:
+        if rounding is not None:
+            amount = amount.quantize(CENT, rounding=rounding)
+        numerator, denominator = amount.as_integer_ratio()
+    except (InvalidOperation, ValueError, OverflowError):
+        raise ValueError(f"无效的金额: {amount}")
+    
+    cents, remainder = divmod(numerator * 100, denominator)
+    if remainder:
+        raise ValueError(f"金额 {amount} 不是整分")
+    if not INT64_MIN <= cents <= INT64_MAX:
+        raise OverflowError(f"金额 {amount} 超出范围")
+    return cents
+
+
+def from_cents(cents: int) -> Decimal:
+    """把整数分转换为保留两位小数的 Decimal。"""
+    # int64范围内的值不超过19位，在默认28位精度下乘法是精确的
+    return Decimal(cents) * CENT
@@ -0,0 +1,143 @@
+"""
+所有者姓名二级索引
+
+OwnerIndex 维护“所有者姓名 -> 账户ID”的映射，支持三种查询：
+
+- 精确查询：字典查找
+- 前缀查询：在排序后的姓名数组上二分查找
+- 模糊查询：按字符二元组（bigram）建立倒排索引，只对至少共享一个二元组
+  的候选姓名计算相似度
+
+姓名先经过 NFKC 规范化（全角字母数字转为半角）并忽略大小写和空白。
+中文姓名没有空格分词且通常只有两三个字，因此按字符而不是按单词切分，
+并在首尾加上边界标记，使“张三”与“张山”这样只差一个字的姓名也能匹配。
+"""
+
+import bisect
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+_BOUNDARY = '\x00'
+
+
+def normalize_name(name: str) -> str:
+    """把姓名规范化为索引使用的键。"""
+    return ''.join(unicodedata.normalize('NFKC', name).casefold().split())
+
+
+def _bigrams(key: str) -> Set[str]:
+    padded = _BOUNDARY + key + _BOUNDARY
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class OwnerIndex:
+    """所有者姓名到账户ID的索引。"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, List[str]] = {}      # 规范化姓名 -> 账户ID列表
+        self._sorted: List[str] = []              # 已排序的规范化姓名
+        self._pending: List[str] = []             # 尚未并入 _sorted 的新姓名
+        self._grams: Dict[str, Set[str]] = {}     # 二元组 -> 包含它的规范化姓名
+    
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids.values())
+    
+    def add(self, owner_name: str, account_id: str):
+        """登记一个账户。"""
+        key = normalize_name(owner_name)
+        with self._lock:
+            ids = self._ids.get(key)
+            if ids is not None:
+                ids.append(account_id)
+                return
+            self._ids[key] = [account_id]
+            # 新姓名先放入待合并列表，避免每次插入都移动整个排序数组
+            self._pending.append(key)
+            for gram in _bigrams(key):
+                self._grams.setdefault(gram, set()).add(key)
+    
+    def rebuild(self, accounts: Iterable):
+        """根据账户集合重建索引（加载文件后调用）。"""
+        ids: Dict[str, List[str]] = {}
+        for account in accounts:
+            ids.setdefault(normalize_name(account.owner_name), []).append(account.account_id)
+        grams: Dict[str, Set[str]] = {}
+        for key in ids:
+            for gram in _bigrams(key):
+                grams.setdefault(gram, set()).add(key)
+        
+        with self._lock:
+            self._ids = ids
+            self._sorted = sorted(ids)
+            self._pending = []
+            self._grams = grams
+    
+    def find_exact(self, owner_name: str) -> List[str]:
+        """返回姓名（规范化后）完全相同的账户ID。"""
+        with self._lock:
+            return list(self._ids.get(normalize_name(owner_name), ()))
+    
+    def find_prefix(self, prefix: str, limit: int = 100) -> List[str]:
+        """返回姓名以 prefix 开头的账户ID，按姓名排序，最多 limit 个。"""
+        prefix = normalize_name(prefix)
+        result = []
+        with self._lock:
+            self._merge_pending()
+            names = self._sorted
+            position = bisect.bisect_left(names, prefix)
+            while position < len(names) and names[position].startswith(prefix) and len(result) < limit:
+                result.extend(self._ids[names[position]])
+                position += 1
+        return result[:limit]
+    
+    def find_fuzzy(self, query: str, limit: int = 20, min_score: float = 0.3) -> List[Tuple[str, float]]:
+        """
+        返回与 query 相似的账户。
+        
+        相似度为两个姓名二元组集合的 Dice 系数（0到1之间）。
+        
+        参数:
+            query: 查询的姓名或姓名片段
+            limit: 最多返回的账户数量
+            min_score: 最低相似度
+        
+        返回:
+            按相似度从高到低排列的（账户ID，相似度）列表
+        """
+        key = normalize_name(query)
+        if not key:
+            return []
+        query_grams = _bigrams(key)
+        
+        with self._lock:
+            # 只统计至少共享一个二元组的姓名，不扫描整个索引
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self._grams.get(gram, ()))
+            
+            scored = []
+            for name, common in shared.items():
+                score = 2 * common / (len(query_grams) + len(_bigrams(name)))
+                if score >= min_score:
+                    scored.append((score, name))
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            
+            result = []
+            for score, name in scored:
+                for account_id in self._ids[name]:
+                    result.append((account_id, round(score, 3)))
+                if len(result) >= limit:
+                    break
+        return result[:limit]
+    
+    def _merge_pending(self):
+        """把新增的姓名并入排序数组（调用方持有锁）。"""
+        if self._pending:
+            # 两段都已有序时 Timsort 只需线性时间合并
+            self._pending.sort()
+            self._sorted += self._pending
+            self._sorted.sort()
+            self._pending = []
@@ -0,0 +1,67 @@
+"""
+分页索引
+
+PageIndex 为 get_accounts_page 保存账户的创建顺序和按字段排序的键，
+翻页时按游标二分定位，每页的代价只与页大小和 log N 有关，不再随着
+翻页深入而扫描越来越多的账户。
+
+每种顺序在第一次按它分页时才建立（需要遍历一次全部账户），之后新建
+账户时增量维护；账户集合整体替换（加载文件）后由银行系统丢弃重建。
+余额会不断变化，按余额分页使用 BalanceIndex，不在这里维护。
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from balance_index import SortedKeyList
+
+
+class PageIndex:
+    """账户的创建顺序和（字段值，账户ID）有序键。"""
+    
+    def __init__(self, load: int = 512):
+        self._lock = threading.Lock()
+        self._load = load
+        self._order: Optional[List[str]] = None  # 按创建顺序的账户ID，未建立时为None
+        self._keys: Dict[str, Tuple[Callable, SortedKeyList]] = {}  # 字段 -> (取值函数, 有序键)
+    
+    def has(self, field: Optional[str]) -> bool:
+        """是否已经建立了该顺序（None表示创建顺序）。"""
+        return self._order is not None if field is None else field in self._keys
+    
+    def build(self, field: Optional[str], accounts: Iterable, key: Optional[Callable] = None):
+        """
+        遍历账户建立一种顺序（调用方需保证期间没有新建账户）。
+        
+        参数:
+            field: 排序字段，None表示创建顺序
+            accounts: 按创建顺序排列的全部账户
+            key: 从账户取字段值的函数（field 不为None时必需）
+        """
+        if field is None:
+            order = [account.account_id for account in accounts]
+            with self._lock:
+                self._order = order
+            return
+        keys = SortedKeyList(self._load)
+        keys.reset((key(account), account.account_id) for account in accounts)
+        with self._lock:
+            self._keys[field] = (key, keys)
+    
+    def add(self, account):
+        """登记一个新建的账户。"""
+        with self._lock:
+            if self._order is not None:
+                self._order.append(account.account_id)
+            for key, keys in self._keys.values():
+                keys.add((key(account), account.account_id))
+    
+    def slice(self, offset: int, count: int) -> List[str]:
+        """按创建顺序从 offset 开始的最多 count 个账户ID。"""
+        with self._lock:
+            return self._order[offset:offset + count]
+    
+    def page(self, field: str, after: Optional[Tuple], count: int, descending: bool = False) -> List[Tuple]:
+        """紧接在键 after 之后（降序时为之前）的最多 count 个（字段值，账户ID）。"""
+        with self._lock:
+            return self._keys[field][1].page(after, count, descending)
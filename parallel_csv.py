@@ -0,0 +1,180 @@
+"""
+多进程并行的CSV导出和导入
+
+账户数达到数百万时，save_to_csv 和 load_from_csv 的大部分时间花在逐行
+格式化和解析CSV上，只能用满一个CPU核心。这里把这部分工作分给进程池：
+
+- 导出：账户列表按顺序切分为若干分区，每个工作进程把一个分区格式化为
+  CSV文本，主进程按分区顺序写入同一个文件。格式化方式与 csv.DictWriter
+  相同，因此输出与 save_to_csv 逐字节一致。
+- 导入：文件按字节切分为若干对齐到行首的区间，每个工作进程读取并解析
+  一个区间，按列返回账户编号、户主姓名和余额字符串，主进程按区间顺序
+  构造账户。
+
+加引号的字段中可以包含换行，只有不含引号的文件才能安全地按换行切分，
+否则抛出 UnsplittableFile，由调用方改用顺序加载。
+
+支持 fork 的平台上，导出的工作进程直接继承主进程中的账户列表，不需要
+序列化账户；其他平台把每个分区的行发送给工作进程。
+"""
+
+import csv
+import io
+import locale
+import os
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+FIELDNAMES = ['account_id', 'owner_name', 'balance']
+
+# 低于这些规模时进程池的启动开销大于收益，调用方应使用顺序读写
+MIN_PARALLEL_ROWS = 100000
+MIN_PARALLEL_BYTES = 4 * 2 ** 20
+
+# 每个工作进程分到的分区数；分区越多负载越均衡，主进程也能更早开始写入
+PARTITIONS_PER_WORKER = 4
+
+# fork 出的导出工作进程从这里读取账户列表
+_export_accounts: Optional[Sequence] = None
+
+
+class UnsplittableFile(ValueError):
+    """文件不能按行切分并行解析（表头不是标准格式或包含加引号的字段）。"""
+
+
+def default_workers() -> int:
+    """默认的工作进程数量（CPU核心数）。"""
+    return os.cpu_count() or 1
+
+
+def partitions(total: int, parts: int) -> List[Tuple[int, int]]:
+    """把 [0, total) 切分为最多 parts 个连续的非空区间。"""
+    parts = max(1, min(parts, total))
+    return [(total * i // parts, total * (i + 1) // parts) for i in range(parts) if total]
+
+
+def _format_rows(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _account_rows(accounts):
+    # 与 DictWriter.writerow(account.to_dict()) 取值完全相同
+    for account in accounts:
+        data = account.to_dict()
+        yield data['account_id'], data['owner_name'], data['balance']
+
+
+def _format_inherited(bounds: Tuple[int, int]) -> Tuple[str, int]:
+    start, end = bounds
+    return _format_rows(_account_rows(_export_accounts[start:end])), end - start
+
+
+def _format_sent(rows: List[tuple]) -> Tuple[str, int]:
+    return _format_rows(rows), len(rows)
+
+
+def write_csv(filename: str, accounts: Sequence, workers: int,
+              progress: Optional[Callable[[int, int], None]] = None):
+    """
+    用 workers 个进程把账户写入CSV文件，输出与 save_to_csv 逐字节一致。
+    
+    参数:
+        filename: CSV文件路径
+        accounts: 按写入顺序排列的账户列表
+        workers: 工作进程数量
+        progress: 进度回调，参数为（已写入账户数，账户总数）
+    """
+    global _export_accounts
+    # multiprocessing 导入较慢，只在真正并行时导入（不拖慢命令行的启动）
+    import multiprocessing
+    total = len(accounts)
+    bounds = partitions(total, workers * PARTITIONS_PER_WORKER)
+    
+    with open(filename, 'w', newline='') as file:
+        csv.writer(file).writerow(FIELDNAMES)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            function, tasks = _format_inherited, bounds
+            _export_accounts = accounts
+        else:
+            context = multiprocessing.get_context()
+            function = _format_sent
+            tasks = (list(_account_rows(accounts[start:end])) for start, end in bounds)
+        
+        try:
+            with context.Pool(workers) as pool:
+                written = 0
+                for text, count in pool.imap(function, tasks):
+                    file.write(text)
+                    written += count
+                    if progress is not None:
+                        progress(written, total)
+        finally:
+            _export_accounts = None
+        if progress is not None and not total:
+            progress(0, 0)
+
+
+def split_file(filename: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    把CSV文件表头之后的部分切分为最多 parts 个对齐到行首的字节区间。
+    
+    表头不是 account_id,owner_name,balance 时抛出 UnsplittableFile。
+    """
+    with open(filename, 'rb') as file:
+        header = file.readline()
+        encoding = locale.getpreferredencoding(False)
+        if next(csv.reader([header.decode(encoding)]), None) != FIELDNAMES:
+            raise UnsplittableFile("CSV表头不是标准格式")
+        start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+        
+        offsets = [start]
+        for i in range(1, parts):
+            position = start + (size - start) * i // parts
+            if position <= offsets[-1]:
+                continue
+            file.seek(position - 1)
+            file.readline()
+            position = file.tell()
+            if offsets[-1] < position < size:
+                offsets.append(position)
+        offsets.append(size)
+    return [(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1) if offsets[i] < offsets[i + 1]]
+
+
+def _parse_range(task) -> Optional[Tuple[List[str], List[str], List[str]]]:
+    filename, start, end, encoding = task
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    if b'"' in data:
+        return None
+    
+    ids = []
+    names = []
+    balances = []
+    for account_id, owner_name, balance in filter(None, csv.reader(io.StringIO(data.decode(encoding), newline=''))):
+        ids.append(account_id)
+        names.append(owner_name)
+        balances.append(balance)
+    return ids, names, balances
+
+
+def read_csv(filename: str, workers: int) -> Iterator[Tuple[List[str], List[str], List[str]]]:
+    """
+    用 workers 个进程解析CSV文件，按文件顺序逐块产生（编号列表，姓名列表，余额字符串列表）。
+    
+    文件包含引号时抛出 UnsplittableFile（可能在已经产生部分数据之后），
+    调用方应丢弃已产生的数据并改用顺序加载。
+    """
+    import multiprocessing
+    ranges = split_file(filename, workers * PARTITIONS_PER_WORKER)
+    encoding = locale.getpreferredencoding(False)
+    tasks = [(filename, start, end, encoding) for start, end in ranges]
+    with multiprocessing.Pool(workers) as pool:
+        for columns in pool.imap(_parse_range, tasks):
+            if columns is None:
+                raise UnsplittableFile("CSV文件包含加引号的字段")
+            yield columns
@@ -0,0 +1,280 @@
+"""
+向量化批量过账引擎
+
+PostingEngine 接受三个平行数组（来源槽位、目标槽位、以分为单位的金额），
+用 NumPy 一次性计算每个账户的余额变化并检查透支，然后直接写回
+CompactAccountStore 的余额数组。槽位 EXTERNAL（-1）表示银行外部：来源为
+EXTERNAL 的是存款，目标为 EXTERNAL 的是取款。
+
+结果与按顺序逐笔调用 transfer/deposit/withdraw 完全一致：被拒绝的操作不
+影响后续操作的校验。向量化检查发现第一笔透支后，它之前的操作全部接受，
+这一笔被拒绝，再从下一笔继续；透支密集的区段改为逐笔的确定性回退路径。
+
+需要安装 numpy。
+"""
+
+from collections import namedtuple
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy是可选依赖
+    np = None
+
+from banking_system import (
+    BankingSystem, BATCH_APPLY_FAILED, BATCH_INSUFFICIENT_FUNDS, BATCH_INVALID_AMOUNT,
+    BATCH_NOT_FOUND, BATCH_OK, BATCH_SAME_ACCOUNT, BATCH_UNKNOWN_OP
+)
+from aggregates import DEPOSIT, TRANSFER, WITHDRAW
+from money import INT64_MAX, from_cents
+
+EXTERNAL = -1   # 银行外部（存款的来源、取款的目标）
+UNKNOWN = -2    # slots() 对不存在的账户返回的槽位
+
+# accepted: 被接受的操作数量；statuses: 每个操作的 BATCH_* 状态码（uint8数组）
+PostingResult = namedtuple('PostingResult', ['accepted', 'statuses'])
+
+
+class PostingEngine:
+    """对 CompactAccountStore 中的余额进行向量化批量过账。"""
+    
+    def __init__(self, banking: BankingSystem, min_window: int = 512):
+        """
+        创建过账引擎。
+        
+        参数:
+            banking: 使用 CompactAccountStore 的银行系统
+            min_window: 向量化检查的最小窗口，透支密集时更小的窗口逐笔处理
+        """
+        if np is None:
+            raise ImportError("PostingEngine 需要安装 numpy")
+        if not hasattr(banking.accounts, 'balance_buffer'):
+            raise TypeError("PostingEngine 需要使用 CompactAccountStore 的银行系统")
+        self.banking = banking
+        self.min_window = min_window
+    
+    def slots(self, account_ids: Sequence[str]) -> 'np.ndarray':
+        """把账户ID映射为槽位数组，不存在的账户映射为 UNKNOWN。"""
+        slot_of = self.banking.accounts.slot_of
+        result = np.fromiter((slot_of(account_id) for account_id in account_ids),
+                             dtype=np.int64, count=len(account_ids))
+        result[result < 0] = UNKNOWN
+        return result
+    
+    def post(self, sources, destinations, amounts) -> PostingResult:
+        """
+        按顺序语义应用一批过账。
+        
+        参数:
+            sources: 来源槽位（EXTERNAL 表示存款）
+            destinations: 目标槽位（EXTERNAL 表示取款）
+            amounts: 金额（整数分）
+        
+        返回:
+            PostingResult(accepted, statuses)
+        """
+        src = np.asarray(sources, dtype=np.int64)
+        dst = np.asarray(destinations, dtype=np.int64)
+        amt = np.asarray(amounts, dtype=np.int64)
+        if not (src.shape == dst.shape == amt.shape) or src.ndim != 1:
+            raise ValueError("来源、目标和金额必须是等长的一维数组")
+        
+        banking = self.banking
+        store = banking.accounts
+        with banking._locks.hold_all():
+            balances = np.frombuffer(store.balance_buffer(), dtype=np.int64)
+            statuses = self._validate(src, dst, amt, len(balances))
+            working = balances.copy()
+            
+            candidates = np.flatnonzero(statuses == BATCH_OK)
+            if len(candidates) and self._may_overflow(working, amt[candidates]):
+                self._sequential(working, src, dst, amt, statuses, candidates)
+            else:
+                self._vectorized(working, src, dst, amt, statuses, candidates)
+            
+            accepted = statuses == BATCH_OK
+            touched = np.zeros(len(balances), dtype=bool)
+            touched[src[accepted & (src >= 0)]] = True
+            touched[dst[accepted & (dst >= 0)]] = True
+            touched = np.flatnonzero(touched)
+            old_cents = balances[touched].tolist()
+            balances[touched] = working[touched]
+            
+            account_id_at = store.account_id_at
+            banking._dirty.update(account_id_at(int(slot)) for slot in touched)
+            if banking._balance_index is not None:
+                for slot, old, new in zip(touched.tolist(), old_cents, working[touched].tolist()):
+                    banking._balance_index.update(account_id_at(slot), from_cents(old), from_cents(new))
+            self._record_volumes(src[accepted], dst[accepted], amt[accepted])
+            if banking._history is not None:
+                self._record_history(src[accepted], dst[accepted], amt[accepted],
+                                     dict(zip(touched.tolist(), old_cents)))
+            
+            seq = 0
+            if banking._journal is not None and accepted.any():
+                seq = banking._journal.append({
+                    'op': 'batch',
+                    'ops': self._journal_ops(src[accepted], dst[accepted], amt[accepted])
+                })
+        
+        if seq:
+            banking._journal.wait(seq)
+        return PostingResult(int(accepted.sum()), statuses)
+    
+    @staticmethod
+    def _validate(src, dst, amt, count: int) -> 'np.ndarray':
+        """不依赖余额的静态校验，优先级与 apply_batch 相同。"""
+        statuses = np.zeros(len(amt), dtype=np.uint8)
+        statuses[amt <= 0] = BATCH_INVALID_AMOUNT
+        statuses[(src < EXTERNAL) | (src >= count) | (dst < EXTERNAL) | (dst >= count)] = BATCH_NOT_FOUND
+        statuses[(src == dst) & (src >= 0)] = BATCH_SAME_ACCOUNT
+        statuses[(src == EXTERNAL) & (dst == EXTERNAL)] = BATCH_UNKNOWN_OP
+        return statuses
+    
+    @staticmethod
+    def _may_overflow(working, amounts) -> bool:
+        """保守估计向量化计算中是否可能超出int64范围。"""
+        largest = float(np.abs(working).max(initial=0))
+        return largest + float(amounts.sum(dtype=np.float64)) >= 2.0 ** 62
+    
+    def _vectorized(self, working, src, dst, amt, statuses, candidates):
+        """
+        分窗口向量化处理：每次检查一个窗口，接受第一笔透支之前的所有操作。
+        
+        窗口大小随上一次透支出现的位置自适应调整；透支密集、窗口小于
+        min_window 时，该窗口改为逐笔处理，避免大量小数组运算的开销。
+        """
+        position = 0
+        window = len(candidates)
+        while position < len(candidates):
+            chunk = candidates[position:position + window]
+            if len(chunk) < self.min_window:
+                self._sequential(working, src, dst, amt, statuses, chunk)
+                position += len(chunk)
+                window *= 2
+                continue
+            
+            s, d, a = src[chunk], dst[chunk], amt[chunk]
+            first = self._first_overdraft(working, s, d, a)
+            if first < 0:
+                self._apply(working, s, d, a)
+                position += len(chunk)
+                window *= 2
+                continue
+            
+            self._apply(working, s[:first], d[:first], a[:first])
+            statuses[chunk[first]] = BATCH_INSUFFICIENT_FUNDS
+            position += first + 1
+            window = 2 * (first + 1)
+    
+    @staticmethod
+    def _first_overdraft(working, s, d, a) -> int:
+        """
+        假设全部接受，返回第一笔导致来源余额为负的操作位置；没有则返回-1。
+        
+        把每笔操作拆成来源的借记和目标的贷记事件，按（账户，操作顺序）排序
+        后分组累加，即可得到每个事件发生后的账户余额。
+        """
+        order_index = np.arange(len(a))
+        debit = s >= 0
+        credit = d >= 0
+        account = np.concatenate([s[debit], d[credit]])
+        op_index = np.concatenate([order_index[debit], order_index[credit]])
+        delta = np.concatenate([-a[debit], a[credit]])
+        is_debit = np.concatenate([np.ones(int(debit.sum()), dtype=bool),
+                                   np.zeros(int(credit.sum()), dtype=bool)])
+        if not len(account):
+            return -1
+        
+        # 操作序号小于len(a)，组合成唯一的排序键，比 lexsort 快
+        order = np.argsort(account * len(a) + op_index)
+        account, op_index, delta, is_debit = account[order], op_index[order], delta[order], is_debit[order]
+        
+        running = np.cumsum(delta)
+        group_start = np.empty(len(account), dtype=bool)
+        group_start[0] = True
+        group_start[1:] = account[1:] != account[:-1]
+        starts = np.flatnonzero(group_start)
+        offsets = np.where(starts > 0, running[starts - 1], 0)
+        running -= offsets[np.cumsum(group_start) - 1]
+        running += working[account]
+        
+        overdraft = is_debit & (running < 0)
+        if not overdraft.any():
+            return -1
+        return int(op_index[overdraft].min())
+    
+    @staticmethod
+    def _apply(working, s, d, a):
+        """把一组已接受的操作累加到工作余额上。"""
+        debit = s >= 0
+        np.subtract.at(working, s[debit], a[debit])
+        credit = d >= 0
+        np.add.at(working, d[credit], a[credit])
+    
+    @staticmethod
+    def _sequential(working, src, dst, amt, statuses, candidates):
+        """逐笔的确定性处理路径，在Python整数上运算并检测溢出。"""
+        slots = np.concatenate([src[candidates], dst[candidates]])
+        balances = dict(zip(slots.tolist(), working[slots].tolist()))
+        balances.pop(EXTERNAL, None)
+        for i, s, d, a in zip(candidates.tolist(), src[candidates].tolist(),
+                              dst[candidates].tolist(), amt[candidates].tolist()):
+            if s >= 0 and balances[s] < a:
+                statuses[i] = BATCH_INSUFFICIENT_FUNDS
+                continue
+            if d >= 0 and balances[d] > INT64_MAX - a:
+                statuses[i] = BATCH_APPLY_FAILED
+                continue
+            if s >= 0:
+                balances[s] -= a
+            if d >= 0:
+                balances[d] += a
+        working[list(balances)] = list(balances.values())
+    
+    def _record_volumes(self, src, dst, amt):
+        """把已接受的过账按类型计入银行系统的汇总统计。"""
+        aggregates = self.banking._aggregates
+        deposits = amt[src == EXTERNAL]
+        withdrawals = amt[dst == EXTERNAL]
+        transfers = amt[(src >= 0) & (dst >= 0)]
+        deposit_total = from_cents(int(deposits.sum(dtype=object)))
+        withdraw_total = from_cents(int(withdrawals.sum(dtype=object)))
+        if len(deposits):
+            aggregates.record(DEPOSIT, deposit_total, deposit_total, len(deposits))
+        if len(withdrawals):
+            aggregates.record(WITHDRAW, withdraw_total, -withdraw_total, len(withdrawals))
+        if len(transfers):
+            aggregates.record(TRANSFER, from_cents(int(transfers.sum(dtype=object))), 0, len(transfers))
+    
+    def _record_history(self, src, dst, amt, running):
+        """为已接受的过账逐笔写入交易历史；running 是槽位到过账前余额（分）的映射。"""
+        history = self.banking._history
+        account_id_at = self.banking.accounts.account_id_at
+        for s, d, a in zip(src.tolist(), dst.tolist(), amt.tolist()):
+            amount = from_cents(a)
+            if s != EXTERNAL:
+                running[s] -= a
+            if d != EXTERNAL:
+                running[d] += a
+            if s == EXTERNAL:
+                history.record(account_id_at(d), 'deposit', amount, from_cents(running[d]))
+            elif d == EXTERNAL:
+                history.record(account_id_at(s), 'withdraw', amount, from_cents(running[s]))
+            else:
+                history.record(account_id_at(s), 'transfer_out', amount, from_cents(running[s]), account_id_at(d))
+                history.record(account_id_at(d), 'transfer_in', amount, from_cents(running[d]), account_id_at(s))
+    
+    def _journal_ops(self, src, dst, amt):
+        """把已接受的过账转换为 apply_batch 格式的日志操作，便于无numpy时重放。"""
+        account_id_at = self.banking.accounts.account_id_at
+        ops = []
+        for s, d, a in zip(src.tolist(), dst.tolist(), amt.tolist()):
+            amount = str(from_cents(a))
+            if s == EXTERNAL:
+                ops.append(['deposit', account_id_at(d), amount])
+            elif d == EXTERNAL:
+                ops.append(['withdraw', account_id_at(s), amount])
+            else:
+                ops.append(['transfer', account_id_at(s), account_id_at(d), amount])
+        return ops
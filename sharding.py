@@ -0,0 +1,318 @@
+"""
+多进程分片银行系统
+
+ShardedBankingSystem 按账户ID的哈希把账户分配到若干个工作进程，每个进程
+拥有一个独立的 BankingSystem 分片，因此不同分片上的操作可以在不同的CPU
+核心上并行执行，不受同一个解释器中GIL的限制。
+
+主进程通过管道与各分片通信。操作按批提交：同一分片内的存款、取款和转账
+直接发给该分片执行；跨分片转账使用两阶段提交：
+
+1. 准备阶段：来源分片检查余额并把金额从账户中预留（扣除并登记）；目标
+   分片确认账户存在并登记待入账。与同一批的分片内操作一起发送。
+2. 提交阶段：两边都准备成功时，来源分片删除预留、目标分片入账；任一边
+   失败时，来源分片退回预留、目标分片丢弃待入账。
+
+每批只需要两轮消息往返，各分片在每一轮中并行工作。预留的金额在提交前
+已从来源账户扣除，因此不会被同时进行的其他操作重复使用。
+"""
+
+import multiprocessing
+import zlib
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from banking_system import BankAccount, BankingSystem
+
+# 操作类型 -> 允许的元组长度；账户ID的位置
+_OP_SHAPES = {
+    'deposit': ((3,), (1,)),
+    'withdraw': ((3,), (1,)),
+    'transfer': ((4,), (1, 2)),
+    'create': ((3, 4), (1,)),
+}
+
+
+def shard_of(account_id: str, shards: int) -> int:
+    """返回账户所在的分片（与进程无关的稳定哈希）。"""
+    return zlib.crc32(account_id.encode('utf-8')) % shards
+
+
+def _invalid_op(op) -> Optional[str]:
+    """检查操作的格式，格式正确时返回None，否则返回错误信息。"""
+    shape = _OP_SHAPES.get(op[0]) if isinstance(op, (tuple, list)) and op else None
+    if shape is None:
+        return f"未知的操作 {op!r}"
+    lengths, id_positions = shape
+    if len(op) not in lengths or not all(isinstance(op[i], str) for i in id_positions):
+        return f"操作格式错误 {op!r}"
+    return None
+
+
+class _Shard:
+    """工作进程中的一个分片：一个 BankingSystem 加上两阶段提交的状态。"""
+    
+    def __init__(self):
+        self.banking = BankingSystem(owner_index=False)
+        self.holds: Dict[int, Tuple[str, Decimal]] = {}     # 事务ID -> 已预留的（来源账户，金额）
+        self.credits: Dict[int, Tuple[str, Decimal]] = {}   # 事务ID -> 待入账的（目标账户，金额）
+    
+    def run(self, ops: Sequence[Tuple]) -> List[Tuple[bool, Optional[str]]]:
+        """按顺序执行一批分片内操作和准备请求。"""
+        results = []
+        for op in ops:
+            # 单个操作出错只让它自己失败，这一批其余操作和预留的状态不受影响
+            try:
+                results.append(self._run_one(op))
+            except Exception as e:
+                results.append((False, f"操作执行出错: {e}"))
+        return results
+    
+    def _run_one(self, op: Tuple) -> Tuple[bool, Optional[str]]:
+        banking = self.banking
+        kind = op[0]
+        if kind == 'deposit':
+            return banking.deposit(op[1], op[2])
+        if kind == 'withdraw':
+            return banking.withdraw(op[1], op[2])
+        if kind == 'transfer':
+            return banking.transfer(op[1], op[2], op[3])
+        if kind == 'prepare_debit':
+            _, txid, account_id, amount = op
+            if banking.get_account(account_id) is None:
+                return False, f"未找到来源账户 '{account_id}'"
+            if amount <= 0:
+                return False, "转账金额必须为正数"
+            if not banking.withdraw(account_id, amount)[0]:
+                return False, "转账资金不足"
+            self.holds[txid] = (account_id, amount)
+            return True, None
+        if kind == 'prepare_credit':
+            _, txid, account_id, amount = op
+            if banking.get_account(account_id) is None:
+                return False, f"未找到目标账户 '{account_id}'"
+            self.credits[txid] = (account_id, amount)
+            return True, None
+        if kind == 'create':
+            return banking.create_account(*op[1:])
+        return False, f"未知的操作类型 '{kind}'"
+    
+    def finish(self, decisions: Sequence[Tuple[int, bool]]):
+        """第二阶段：按决定提交或回滚已准备的跨分片转账。"""
+        for txid, commit in decisions:
+            hold = self.holds.pop(txid, None)
+            if hold is not None and not commit:
+                self.banking.deposit(*hold)
+            credit = self.credits.pop(txid, None)
+            if credit is not None and commit:
+                self.banking.deposit(*credit)
+    
+    def accounts(self) -> List[Dict]:
+        """以字典形式返回分片内的所有账户（便于通过管道传回主进程）。"""
+        return [account.to_dict() for account in self.banking.get_all_accounts()]
+
+
+def _shard_main(connection):
+    """工作进程入口：循环处理主进程发来的（命令，参数）消息。"""
+    shard = _Shard()
+    while True:
+        command, payload = connection.recv()
+        try:
+            if command == 'run':
+                reply = shard.run(payload)
+            elif command == 'finish':
+                reply = shard.finish(payload)
+            elif command == 'get':
+                account = shard.banking.get_account(payload)
+                reply = account.to_dict() if account is not None else None
+            elif command == 'accounts':
+                reply = shard.accounts()
+            elif command == 'stats':
+                reply = (shard.banking.account_count(), shard.banking.total_balance())
+            elif command == 'stop':
+                connection.send(None)
+                return
+            else:
+                reply = RuntimeError(f"未知的命令 '{command}'")
+        except Exception as e:
+            reply = e
+        connection.send(reply)
+
+
+class ShardedBankingSystem:
+    """按账户ID分片到多个工作进程的银行系统。"""
+    
+    def __init__(self, shards: int = 4, context: Optional[str] = None):
+        """
+        启动分片工作进程。
+        
+        参数:
+            shards: 分片（工作进程）数量
+            context: multiprocessing 启动方式（'fork'、'spawn' 等），默认为平台默认值
+        """
+        if shards < 1:
+            raise ValueError("分片数必须为正数")
+        self.shards = shards
+        self._next_txid = 0
+        self._connections = []
+        self._processes = []
+        ctx = multiprocessing.get_context(context)
+        for _ in range(shards):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_shard_main, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+    
+    def execute(self, ops: Sequence[Tuple]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        执行一批操作，返回与 ops 等长的（成功状态，错误信息）列表。
+        
+        操作格式与 BankingSystem.apply_batch 相同，另外支持
+        ('create', account_id, owner_name, initial_balance)。与 apply_batch
+        不同，每个操作独立成功或失败；同一分片内的操作按提交顺序执行，
+        不同分片之间的顺序不作保证。格式错误的操作直接失败，不发送给分片。
+        """
+        shards = self.shards
+        per_shard: List[List[Tuple]] = [[] for _ in range(shards)]
+        origin: List[List[int]] = [[] for _ in range(shards)]   # 分片内第k个请求对应的 ops 下标
+        cross: Dict[int, Tuple[int, int, int]] = {}              # 事务ID -> (ops下标, 来源分片, 目标分片)
+        
+        results: List[Tuple[bool, Optional[str]]] = [(True, None)] * len(ops)
+        for index, op in enumerate(ops):
+            error = _invalid_op(op)
+            if error is not None:
+                results[index] = (False, error)
+                continue
+            if op[0] == 'transfer':
+                _, source_id, destination_id, amount = op
+                source = shard_of(source_id, shards)
+                destination = shard_of(destination_id, shards)
+                if source != destination:
+                    txid = self._next_txid
+                    self._next_txid += 1
+                    cross[txid] = (index, source, destination)
+                    per_shard[source].append(('prepare_debit', txid, source_id, amount))
+                    origin[source].append(index)
+                    per_shard[destination].append(('prepare_credit', txid, destination_id, amount))
+                    origin[destination].append(-1 - txid)
+                    continue
+            target = shard_of(op[1], shards)
+            per_shard[target].append(op)
+            origin[target].append(index)
+        
+        try:
+            replies = self._exchange('run', {shard: work for shard, work in enumerate(per_shard) if work})
+        except Exception:
+            # 这一轮失败时无法知道哪些跨分片转账已准备，全部回滚（未准备的事务ID会被忽略）
+            if cross:
+                aborts: Dict[int, List[Tuple[int, bool]]] = {}
+                for txid, (_, source, destination) in cross.items():
+                    aborts.setdefault(source, []).append((txid, False))
+                    aborts.setdefault(destination, []).append((txid, False))
+                self._exchange('finish', aborts)
+            raise
+        
+        # 收集准备阶段的结果：来源一侧的结果即转账的结果，目标一侧失败时改为失败
+        credit_ok: Dict[int, Tuple[bool, Optional[str]]] = {}
+        for shard, reply in replies.items():
+            for position, result in zip(origin[shard], reply):
+                if position >= 0:
+                    results[position] = result
+                else:
+                    credit_ok[-1 - position] = result
+        
+        if cross:
+            decisions: Dict[int, List[Tuple[int, bool]]] = {}
+            for txid, (index, source, destination) in cross.items():
+                commit = results[index][0] and credit_ok[txid][0]
+                if results[index][0] and not commit:
+                    results[index] = credit_ok[txid]
+                decisions.setdefault(source, []).append((txid, commit))
+                decisions.setdefault(destination, []).append((txid, commit))
+            self._exchange('finish', decisions)
+        return results
+    
+    def create_account(self, account_id: str, owner_name: str,
+                       initial_balance: Decimal = Decimal('0.00')) -> Tuple[bool, Optional[str]]:
+        """在账户所在的分片上创建账户。"""
+        return self.execute([('create', account_id, owner_name, initial_balance)])[0]
+    
+    def deposit(self, account_id: str, amount: Decimal) -> Tuple[bool, Optional[str]]:
+        """向账户存款。"""
+        return self.execute([('deposit', account_id, amount)])[0]
+    
+    def withdraw(self, account_id: str, amount: Decimal) -> Tuple[bool, Optional[str]]:
+        """从账户取款。"""
+        return self.execute([('withdraw', account_id, amount)])[0]
+    
+    def transfer(self, from_account_id: str, to_account_id: str,
+                 amount: Decimal) -> Tuple[bool, Optional[str]]:
+        """在两个账户之间转账（跨分片时使用两阶段提交）。"""
+        return self.execute([('transfer', from_account_id, to_account_id, amount)])[0]
+    
+    def get_account(self, account_id: str) -> Optional[BankAccount]:
+        """返回账户当前状态的副本，不存在时返回None。"""
+        connection = self._connections[shard_of(account_id, self.shards)]
+        connection.send(('get', account_id))
+        row = self._receive(connection)
+        return BankAccount.from_dict(row) if row is not None else None
+    
+    def get_all_accounts(self) -> List[BankAccount]:
+        """返回所有分片上账户的副本（按分片排列）。"""
+        replies = self._exchange('accounts', dict.fromkeys(range(self.shards)))
+        return [BankAccount.from_dict(row) for shard in range(self.shards) for row in replies[shard]]
+    
+    def account_count(self) -> int:
+        """所有分片的账户数量之和。"""
+        return sum(count for count, _ in self._exchange('stats', dict.fromkeys(range(self.shards))).values())
+    
+    def total_balance(self) -> Decimal:
+        """所有分片的余额合计。"""
+        stats = self._exchange('stats', dict.fromkeys(range(self.shards))).values()
+        return sum((total for _, total in stats), Decimal('0.00'))
+    
+    def close(self):
+        """停止所有工作进程。"""
+        for connection in self._connections:
+            try:
+                connection.send(('stop', None))
+                connection.recv()
+            except (OSError, EOFError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+        self._connections = []
+        self._processes = []
+    
+    def _exchange(self, command: str, payloads: Dict[int, object]) -> Dict[int, object]:
+        """
+        向给定分片各发送一条消息并收集回复。
+        
+        先把消息全部发出再依次接收，各分片因此并行处理。即使某个分片
+        返回了异常，也先收完所有分片的回复再抛出，管道中不会残留回复。
+        """
+        sent = []
+        error = None
+        for shard, payload in payloads.items():
+            try:
+                self._connections[shard].send((command, payload))
+            except Exception as e:  # 例如参数无法序列化：没有写入管道，不会有回复
+                error = e
+                break
+            sent.append(shard)
+        replies = {shard: self._connections[shard].recv() for shard in sent}
+        if error is None:
+            error = next((reply for reply in replies.values() if isinstance(reply, Exception)), None)
+        if error is not None:
+            raise error
+        return replies
+    
+    @staticmethod
+    def _receive(connection):
+        reply = connection.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
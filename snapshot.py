@@ -0,0 +1,220 @@
+"""
+增量快照存储
+
+快照由一个基础文件和若干增量文件组成，格式都与 save_to_csv 输出的CSV
+相同。每次增量检查点只写入变更过的账户；后台压缩线程定期把增量合并成
+新的基础文件。清单文件（MANIFEST）记录当前有效的文件列表，所有文件都
+先写入临时文件再原子地重命名，因此任何时刻崩溃都不会留下半个快照。
+压缩淘汰的旧文件要等到所有正在进行的读取（iter_rows）结束后才删除。
+"""
+
+import csv
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+FIELDNAMES = ['account_id', 'owner_name', 'balance']
+MANIFEST = 'MANIFEST'
+
+
+def _fsync_directory(directory: str):
+    """尽力fsync目录，使重命名操作持久化（部分平台不支持）。"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SnapshotStore:
+    """由基础快照和增量文件组成的快照目录。"""
+    
+    def __init__(self, directory: str):
+        """
+        打开（或创建）一个快照目录。
+        
+        参数:
+            directory: 存放快照文件的目录
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._readers = 0  # 正在进行的 iter_rows 数量
+        self._obsolete: List[str] = []  # 压缩淘汰、等读取结束后删除的文件
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compactor = threading.Event()
+        
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                self._manifest = json.load(file)
+        else:
+            self._manifest = {'generation': 0, 'base': None, 'deltas': [], 'next_file': 1}
+    
+    @property
+    def state_id(self) -> str:
+        """标识快照逻辑内容的字符串；压缩不会改变它。"""
+        return f"snapshot:{self._manifest['generation']}"
+    
+    @property
+    def delta_count(self) -> int:
+        """当前尚未合并到基础文件的增量文件数量。"""
+        return len(self._manifest['deltas'])
+    
+    def iter_rows(self) -> Iterator[Dict[str, str]]:
+        """
+        按顺序产生基础文件和增量文件中的所有行，后出现的行覆盖先出现的行。
+        
+        读取开始时的清单中的文件在读取结束（或生成器被关闭）之前不会被
+        压缩删除，期间后台压缩可以照常进行。
+        """
+        with self._lock:
+            manifest = self._manifest
+            self._readers += 1
+        files = ([manifest['base']] if manifest['base'] else []) + manifest['deltas']
+        
+        try:
+            for name in files:
+                with open(os.path.join(self.directory, name), 'r', newline='') as file:
+                    for row in csv.DictReader(file):
+                        yield row
+        finally:
+            with self._lock:
+                self._readers -= 1
+                obsolete = self._obsolete if not self._readers else []
+                if obsolete:
+                    self._obsolete = []
+            self._remove(obsolete)
+    
+    def write_delta(self, rows: List[Dict[str, str]],
+                    before_commit: Optional[Callable[[str], None]] = None):
+        """
+        把变更过的账户写入一个新的增量文件。
+        
+        参数:
+            rows: 账户字典列表（BankAccount.to_dict() 的结果）
+            before_commit: 在更新清单之前调用的回调，参数为提交后的 state_id
+        """
+        with self._lock:
+            name = self._allocate_name('delta')
+            self._write_rows(name, rows)
+            
+            manifest = dict(self._manifest)
+            manifest['generation'] += 1
+            manifest['deltas'] = manifest['deltas'] + [name]
+            if before_commit is not None:
+                before_commit(f"snapshot:{manifest['generation']}")
+            self._commit_manifest(manifest)
+    
+    def compact(self) -> bool:
+        """
+        把基础文件和当前所有增量合并为新的基础文件。
+        
+        合并期间仍可写入新的增量，它们会保留在新的清单中。
+        
+        返回:
+            如果进行了合并返回True，没有增量可合并时返回False
+        """
+        with self._compact_lock:
+            with self._lock:
+                manifest = self._manifest
+                if not manifest['deltas']:
+                    return False
+                name = self._allocate_name('base')
+            
+            merged: Dict[str, Dict[str, str]] = {}
+            for part in ([manifest['base']] if manifest['base'] else []) + manifest['deltas']:
+                with open(os.path.join(self.directory, part), 'r', newline='') as file:
+                    for row in csv.DictReader(file):
+                        merged[row['account_id']] = row
+            self._write_rows(name, merged.values())
+            
+            with self._lock:
+                current = self._manifest
+                compacted = manifest['deltas']
+                new_manifest = dict(current)
+                new_manifest['base'] = name
+                new_manifest['deltas'] = current['deltas'][len(compacted):]
+                self._commit_manifest(new_manifest)
+            
+                obsolete = ([manifest['base']] if manifest['base'] else []) + compacted
+                if self._readers:
+                    # 正在读取的清单可能还引用这些文件，由最后一个读取者删除
+                    self._obsolete.extend(obsolete)
+                    obsolete = []
+            self._remove(obsolete)
+            return True
+    
+    def start_compactor(self, interval: float = 60.0, min_deltas: int = 4):
+        """
+        启动后台压缩线程。
+        
+        参数:
+            interval: 检查间隔（秒）
+            min_deltas: 增量文件达到此数量时才进行合并
+        """
+        if self._compactor is not None:
+            return
+        self._stop_compactor.clear()
+        
+        def run():
+            while not self._stop_compactor.wait(interval):
+                if self.delta_count >= min_deltas:
+                    self.compact()
+        
+        self._compactor = threading.Thread(target=run, name="snapshot-compactor", daemon=True)
+        self._compactor.start()
+    
+    def stop_compactor(self):
+        """停止后台压缩线程并等待其退出。"""
+        if self._compactor is None:
+            return
+        self._stop_compactor.set()
+        self._compactor.join()
+        self._compactor = None
+    
+    def _remove(self, names: List[str]):
+        """尽力删除快照目录中的文件。"""
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+    
+    def _allocate_name(self, kind: str) -> str:
+        """分配一个新的文件名（调用方需持有 self._lock）。"""
+        number = self._manifest['next_file']
+        self._manifest = dict(self._manifest, next_file=number + 1)
+        return f"{kind}-{number:06d}.csv"
+    
+    def _write_rows(self, name: str, rows):
+        """把行写入临时文件，fsync后重命名为目标文件。"""
+        path = os.path.join(self.directory, name)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    
+    def _commit_manifest(self, manifest: Dict):
+        """原子地写入新的清单（调用方需持有 self._lock）。"""
+        path = os.path.join(self.directory, MANIFEST)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        _fsync_directory(self.directory)
+        self._manifest = manifest
@@ -0,0 +1,396 @@
+"""
+SQLite 账户存储
+
+SQLiteAccountStore 是 BankingSystem 的另一种账户存储后端：账户保存在
+WAL 模式的 SQLite 数据库中，而不是内存字典加 CSV 文件。启动时只打开数据库，
+不把账户读入内存；每次存取款直接更新对应的行。
+
+- 只有一个写连接，由写锁串行化；transaction() 把转账、批量操作等多条
+  更新放在同一个事务中，要么全部生效，要么全部回滚
+- 读取使用一个小的只读连接池；WAL 模式下读取不会阻塞写入
+- 所有 SQL 都是固定的参数化语句，sqlite3 模块按语句文本缓存预编译结果，
+  因此热路径上不会重复解析 SQL
+
+余额以整数“分”保存。load_from_csv 等整体加载先写入同一数据库中的暂存表，
+加载成功后在一个事务中替换正式表。
+"""
+
+import sqlite3
+import threading
+from collections import deque
+from decimal import Decimal
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from money import INT64_MAX, from_cents, to_cents
+
+_TABLE = 'accounts'
+_STAGING_TABLE = 'accounts_staging'
+_BULK_ROWS = 10000
+
+
+class SQLiteAccount:
+    """SQLite 存储中一个账户的轻量视图，接口与 BankAccount 相同。"""
+    
+    __slots__ = ('_store', 'account_id', 'owner_name', '_cents')
+    
+    def __init__(self, store: 'SQLiteAccountStore', account_id: str, owner_name: str,
+                 cents: Optional[int] = None):
+        self._store = store
+        self.account_id = account_id
+        self.owner_name = owner_name
+        self._cents = cents  # 遍历时读到的余额；为None时每次访问都查询数据库
+    
+    @property
+    def balance(self) -> Decimal:
+        """获取账户的当前余额。"""
+        cents = self._cents
+        if cents is None:
+            cents = self._store._balance_cents(self.account_id)
+        return from_cents(cents)
+    
+    def deposit(self, amount: Decimal) -> bool:
+        """
+        向账户存款。
+        
+        参数:
+            amount: 存款金额（必须为正数且为整分）
+        
+        返回:
+            如果存款成功返回True，否则返回False
+        """
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        if cents <= 0:
+            return False
+        self._cents = None
+        return self._store._add_cents(self.account_id, cents)
+    
+    def withdraw(self, amount: Decimal) -> bool:
+        """
+        从账户取款。
+        
+        参数:
+            amount: 取款金额（必须为正数、为整分且小于等于余额）
+        
+        返回:
+            如果取款成功返回True，否则返回False
+        """
+        try:
+            cents = to_cents(amount)
+        except (ValueError, OverflowError):
+            return False
+        if cents <= 0:
+            return False
+        self._cents = None
+        return self._store._subtract_cents(self.account_id, cents)
+    
+    def to_dict(self) -> Dict:
+        """将账户转换为字典以便存储。"""
+        return {
+            'account_id': self.account_id,
+            'owner_name': self.owner_name,
+            'balance': str(self.balance)
+        }
+    
+    def __eq__(self, other):
+        if isinstance(other, SQLiteAccount):
+            return self._store is other._store and self.account_id == other.account_id
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash((id(self._store), self.account_id))
+
+
+class _Connections:
+    """一个数据库文件的写连接、写锁和只读连接池，由正式存储和暂存存储共享。"""
+    
+    def __init__(self, path: str, readers: int, synchronous: str):
+        self.path = path
+        self.synchronous = synchronous
+        self.writer = self._connect()
+        self.writer.execute('PRAGMA journal_mode=WAL')
+        self.writer_lock = threading.RLock()
+        self.writer_owner: Optional[int] = None  # 正在执行事务的线程
+        # 空闲读连接；deque 的 pop 是原子操作，取连接的常见路径上不需要加锁
+        self._idle: Deque[sqlite3.Connection] = deque()
+        self._available = readers  # 尚未创建的读连接数量
+        self._pool_changed = threading.Condition()
+    
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None：不让 sqlite3 模块隐式开启事务，事务由 transaction() 显式控制
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                     cached_statements=256)
+        connection.execute(f'PRAGMA synchronous={self.synchronous}')
+        return connection
+    
+    def acquire_reader(self) -> sqlite3.Connection:
+        """从连接池取出一个读连接；池为空且未达上限时新建一个，否则等待归还。"""
+        try:
+            return self._idle.pop()
+        except IndexError:
+            pass
+        with self._pool_changed:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._available > 0:
+                    self._available -= 1
+                    return self._connect()
+                self._pool_changed.wait()
+    
+    def release_reader(self, connection: sqlite3.Connection):
+        # 在条件变量内归还并通知，等待者检查连接池和开始等待之间不会错过通知
+        with self._pool_changed:
+            self._idle.append(connection)
+            self._pool_changed.notify()
+    
+    def close(self):
+        with self.writer_lock:
+            self.writer.close()
+        while self._idle:
+            self._idle.pop().close()
+
+
+class _Transaction:
+    """在写连接上执行一个事务的上下文管理器，支持嵌套（内层不单独提交）。"""
+    
+    def __init__(self, connections: _Connections):
+        self._connections = connections
+        self._outermost = False
+    
+    def __enter__(self):
+        connections = self._connections
+        connections.writer_lock.acquire()
+        self._outermost = connections.writer_owner is None
+        if self._outermost:
+            try:
+                connections.writer.execute('BEGIN IMMEDIATE')
+            except BaseException:
+                connections.writer_lock.release()
+                raise
+            connections.writer_owner = threading.get_ident()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        connections = self._connections
+        try:
+            if self._outermost:
+                connections.writer_owner = None
+                writer = connections.writer
+                if exc_type is not None:
+                    writer.execute('ROLLBACK')
+                else:
+                    try:
+                        writer.execute('COMMIT')
+                    except BaseException:
+                        # 提交失败时事务仍然打开，不回滚的话之后的每次写入都无法开始新事务
+                        if writer.in_transaction:
+                            writer.execute('ROLLBACK')
+                        raise
+        finally:
+            connections.writer_lock.release()
+        return False
+
+
+class SQLiteAccountStore:
+    """
+    以 SQLite 数据库保存账户的存储，可替代 BankingSystem 中的账户字典。
+    
+    支持字典的常用接口（取值、赋值、in、len、迭代、get、values、items、
+    clear）。取值返回 SQLiteAccount 视图，其存取款直接更新数据库。
+    """
+    
+    def __init__(self, path: str, readers: int = 4, synchronous: str = 'NORMAL'):
+        """
+        打开（或创建）一个账户数据库。
+        
+        参数:
+            path: 数据库文件路径
+            readers: 只读连接池的最大连接数
+            synchronous: SQLite 的 synchronous 设置；WAL 模式下 NORMAL 在断电时
+                可能丢失最近提交的事务但不会损坏数据库，FULL 每次提交都落盘
+        """
+        self._init(_Connections(path, readers, synchronous), _TABLE)
+        with self._connections.writer_lock:
+            self._create_table(_TABLE)
+            self._count = self._connections.writer.execute(f'SELECT COUNT(*) FROM {_TABLE}').fetchone()[0]
+    
+    def _init(self, connections: _Connections, table: str):
+        self._connections = connections
+        self._count = 0
+        self._bulk: Optional[List[Tuple[str, str, int]]] = None  # 暂存表的待插入行
+        self._use_table(table)
+    
+    def _use_table(self, table: str):
+        """按表名生成本存储使用的参数化语句。"""
+        self._table = table
+        self._sql_get = f'SELECT owner_name, cents FROM {table} WHERE account_id = ?'
+        self._sql_balance = f'SELECT cents FROM {table} WHERE account_id = ?'
+        self._sql_add = f'UPDATE {table} SET cents = cents + ? WHERE account_id = ? AND cents <= ?'
+        self._sql_subtract = f'UPDATE {table} SET cents = cents - ? WHERE account_id = ? AND cents >= ?'
+        self._sql_insert = f'INSERT OR IGNORE INTO {table} (account_id, owner_name, cents) VALUES (?, ?, ?)'
+        self._sql_update = f'UPDATE {table} SET owner_name = ?, cents = ? WHERE account_id = ?'
+        self._sql_bulk = f'INSERT OR REPLACE INTO {table} (account_id, owner_name, cents) VALUES (?, ?, ?)'
+        self._sql_scan = (f'SELECT seq, account_id, owner_name, cents FROM {table} '
+                          f'WHERE seq > ? ORDER BY seq LIMIT {_BULK_ROWS}')
+    
+    def _create_table(self, table: str):
+        # 以自增的 seq 作为行号，遍历顺序与插入顺序一致（与字典相同）
+        self._connections.writer.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'seq INTEGER PRIMARY KEY, account_id TEXT NOT NULL UNIQUE, '
+            'owner_name TEXT NOT NULL, cents INTEGER NOT NULL)'
+        )
+    
+    @property
+    def path(self) -> str:
+        return self._connections.path
+    
+    def transaction(self) -> _Transaction:
+        """返回在写连接上执行一个事务的上下文管理器（异常时回滚）。"""
+        return _Transaction(self._connections)
+    
+    def empty_like(self) -> 'SQLiteAccountStore':
+        """
+        返回写入同一数据库暂存表的空存储，用于整体加载。
+        
+        调用 finish_load() 之前，暂存表中的数据对正式表没有任何影响。
+        """
+        staging = SQLiteAccountStore.__new__(SQLiteAccountStore)
+        staging._init(self._connections, _STAGING_TABLE)
+        with self._connections.writer_lock:
+            self._connections.writer.execute(f'DROP TABLE IF EXISTS {_STAGING_TABLE}')
+            staging._create_table(_STAGING_TABLE)
+        staging._bulk = []
+        return staging
+    
+    def finish_load(self):
+        """把暂存表原子地替换为正式表（对非暂存存储为空操作）。"""
+        if self._bulk is None:
+            return
+        with self.transaction():
+            self._flush_bulk()
+            writer = self._connections.writer
+            writer.execute(f'DROP TABLE IF EXISTS {_TABLE}')
+            writer.execute(f'ALTER TABLE {_STAGING_TABLE} RENAME TO {_TABLE}')
+            self._count = writer.execute(f'SELECT COUNT(*) FROM {_TABLE}').fetchone()[0]
+        self._bulk = None
+        self._use_table(_TABLE)
+    
+    def total_balance(self) -> Decimal:
+        """所有账户的余额合计（由数据库计算，不逐个创建视图）。"""
+        self._flush_bulk()
+        total = self._read(f'SELECT COALESCE(SUM(cents), 0) FROM {self._table}', ())[0]
+        return from_cents(total)
+    
+    def close(self):
+        """关闭所有数据库连接。"""
+        self._connections.close()
+    
+    def __len__(self) -> int:
+        if self._bulk is not None:
+            self._flush_bulk()
+            return self._read(f'SELECT COUNT(*) FROM {self._table}', ())[0]
+        return self._count
+    
+    def __contains__(self, account_id) -> bool:
+        self._flush_bulk()
+        return self._read(self._sql_balance, (account_id,)) is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        return (account.account_id for account in self.values())
+    
+    def __getitem__(self, account_id: str) -> SQLiteAccount:
+        account = self.get(account_id)
+        if account is None:
+            raise KeyError(account_id)
+        return account
+    
+    def get(self, account_id: str, default=None):
+        self._flush_bulk()
+        row = self._read(self._sql_get, (account_id,))
+        if row is None:
+            return default
+        return SQLiteAccount(self, account_id, row[0])
+    
+    def __setitem__(self, account_id: str, account):
+        cents = to_cents(account.balance)
+        if self._bulk is not None:
+            self._bulk.append((account_id, account.owner_name, cents))
+            if len(self._bulk) >= _BULK_ROWS:
+                self._flush_bulk()
+            return
+        with self.transaction():
+            writer = self._connections.writer
+            if writer.execute(self._sql_insert, (account_id, account.owner_name, cents)).rowcount:
+                self._count += 1
+            else:
+                writer.execute(self._sql_update, (account.owner_name, cents, account_id))
+    
+    def keys(self) -> List[str]:
+        return list(self)
+    
+    def values(self) -> Iterator[SQLiteAccount]:
+        # 按行号分段读取，每段之间归还读连接，未读完的迭代器不会占住连接
+        self._flush_bulk()
+        last = 0
+        while True:
+            rows = self._read_all(self._sql_scan, (last,))
+            for _, account_id, owner_name, cents in rows:
+                yield SQLiteAccount(self, account_id, owner_name, cents)
+            if len(rows) < _BULK_ROWS:
+                return
+            last = rows[-1][0]
+    
+    def items(self) -> Iterator:
+        return ((account.account_id, account) for account in self.values())
+    
+    def clear(self):
+        with self.transaction():
+            self._connections.writer.execute(f'DELETE FROM {self._table}')
+            self._count = 0
+    
+    # 以下方法供 SQLiteAccount 调用
+    
+    def _balance_cents(self, account_id: str) -> int:
+        row = self._read(self._sql_balance, (account_id,))
+        if row is None:
+            raise KeyError(account_id)
+        return row[0]
+    
+    def _add_cents(self, account_id: str, cents: int) -> bool:
+        # SQLite 整数溢出时会转为浮点数，因此在条件中预先排除
+        with self.transaction():
+            return self._connections.writer.execute(
+                self._sql_add, (cents, account_id, INT64_MAX - cents)).rowcount == 1
+    
+    def _subtract_cents(self, account_id: str, cents: int) -> bool:
+        with self.transaction():
+            return self._connections.writer.execute(
+                self._sql_subtract, (cents, account_id, cents)).rowcount == 1
+    
+    def _flush_bulk(self):
+        """把暂存的待插入行批量写入（在暂存存储上）。"""
+        bulk = self._bulk
+        if bulk:
+            self._bulk = []
+            with self.transaction():
+                self._connections.writer.executemany(self._sql_bulk, bulk)
+    
+    def _read(self, sql: str, parameters: tuple):
+        """执行查询并返回第一行；事务中的线程读取写连接以看到未提交的修改。"""
+        rows = self._read_all(sql, parameters)
+        return rows[0] if rows else None
+    
+    def _read_all(self, sql: str, parameters: tuple) -> list:
+        # 总是读完全部结果，语句随即结束，读连接不会一直停留在旧的快照上
+        connections = self._connections
+        if connections.writer_owner == threading.get_ident():
+            return connections.writer.execute(sql, parameters).fetchall()
+        connection = connections.acquire_reader()
+        try:
+            return connection.execute(sql, parameters).fetchall()
+        finally:
+            connections.release_reader(connection)
@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+import test_banking_system
+from account_store import CompactAccountStore, AccountView
+from banking_system import BankAccount, BankingSystem
+from money import from_cents
+
+
+class TestCompactAccountStore(unittest.TestCase):
+    """紧凑账户存储的测试用例。"""
+    
+    def setUp(self):
+        self.store = CompactAccountStore()
+        self.store["1"] = BankAccount("1", "张三", Decimal('100.00'))
+        self.store["2"] = BankAccount("2", "李四", Decimal('50.50'))
+    
+    def test_mapping_interface(self):
+        """存储应支持字典的常用操作。"""
+        self.assertEqual(len(self.store), 2)
+        self.assertIn("1", self.store)
+        self.assertNotIn("3", self.store)
+        self.assertIsNone(self.store.get("3"))
+        self.assertEqual(list(self.store), ["1", "2"])
+        self.assertEqual([view.owner_name for view in self.store.values()], ["张三", "李四"])
+        
+        view = self.store["2"]
+        self.assertIsInstance(view, AccountView)
+        self.assertEqual(view.to_dict(), {'account_id': "2", 'owner_name': "李四", 'balance': "50.50"})
+        
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+    
+    def test_view_deposit_and_withdraw(self):
+        """视图上的存取款应直接修改数组中的余额。"""
+        view = self.store.get("1")
+        self.assertTrue(view.deposit(Decimal('0.25')))
+        self.assertFalse(view.deposit(Decimal('0.00')))
+        self.assertFalse(view.deposit(Decimal('0.001')))
+        self.assertTrue(view.withdraw(Decimal('50.00')))
+        self.assertFalse(view.withdraw(Decimal('1000.00')))
+        
+        self.assertEqual(self.store["1"].balance, Decimal('50.25'))
+        self.assertEqual(view, self.store["1"])
+    
+    def test_deposit_overflow(self):
+        """余额超出int64范围的存款应失败且不改变余额。"""
+        self.store["big"] = BankAccount("big", "大户", from_cents(2 ** 63 - 10))
+        self.assertFalse(self.store["big"].deposit(Decimal('1.00')))
+        self.assertEqual(self.store["big"].balance, from_cents(2 ** 63 - 10))
+
+
+class TestBankingSystemCompactStore(test_banking_system.TestBankingSystem):
+    """使用紧凑账户存储时，银行系统的行为应与默认字典存储一致。"""
+    
+    def setUp(self):
+        self.banking = BankingSystem(store=CompactAccountStore())
+    
+    def test_load_keeps_store_type(self):
+        """加载文件后账户仍保存在紧凑存储中。"""
+        self.banking.create_account("1", "张三", Decimal('1.00'))
+        temp_dir = tempfile.mkdtemp()
+        temp_path = os.path.join(temp_dir, "compact.csv")
+        try:
+            self.banking.save_to_csv(temp_path)
+            for load in (self.banking.load_from_csv, self.banking.load_from_csv_streaming):
+                self.assertEqual(load(temp_path), (True, None))
+                self.assertIsInstance(self.banking.accounts, CompactAccountStore)
+                self.assertEqual(self.banking.get_account("1").balance, Decimal('1.00'))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_create_rejects_partial_cents(self):
+        """初始余额不是整分或超出范围时返回错误，不会插入账户。"""
+        self.assertEqual(self.banking.create_account("a", "x", Decimal('1.001')), (False, "初始余额必须为整分"))
+        self.assertEqual(self.banking.create_account("a", "x", Decimal('1e30')), (False, "金额超出范围"))
+        self.assertIsNone(self.banking.get_account("a"))
+        self.assertEqual(self.banking.account_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import bisect
+import random
+from decimal import Decimal
+
+from balance_index import BalanceIndex, SortedKeyList
+
+
+class TestSortedKeyList(unittest.TestCase):
+    """分块有序列表的测试用例。"""
+    
+    def test_matches_sorted_list(self):
+        """随机插入删除后，按位置访问、二分和切片应与普通有序列表一致。"""
+        rng = random.Random(12)
+        keys = SortedKeyList(load=4)
+        reference = []
+        keys.reset([5, 1, 3])
+        reference = [1, 3, 5]
+        for _ in range(2000):
+            if reference and rng.random() < 0.4:
+                value = rng.choice(reference)
+                keys.remove(value)
+                reference.remove(value)
+            else:
+                value = rng.randint(0, 200)
+                keys.add(value)
+                bisect.insort(reference, value)
+            
+            self.assertEqual(len(keys), len(reference))
+            probe = rng.randint(-5, 205)
+            self.assertEqual(keys.bisect_left(probe), bisect.bisect_left(reference, probe))
+            self.assertEqual(keys.bisect_right(probe), bisect.bisect_right(reference, probe))
+            if reference:
+                index = rng.randrange(len(reference))
+                self.assertEqual(keys[index], reference[index])
+                self.assertEqual(keys[-1], reference[-1])
+        
+        self.assertEqual(list(keys.islice(0, len(keys))), reference)
+        self.assertEqual(list(keys.islice(3, 40, reverse=True)), reference[3:40][::-1])
+        with self.assertRaises(ValueError):
+            keys.remove(1000)
+
+
+class TestBalanceIndex(unittest.TestCase):
+    """余额索引的测试用例。"""
+    
+    def setUp(self):
+        self.index = BalanceIndex(load=2)
+        for i, balance in enumerate(['5.00', '1.00', '3.00', '3.00', '9.50', '0.00']):
+            self.index.add(str(i), Decimal(balance))
+    
+    def test_queries(self):
+        """前N名、区间、排名和百分位数查询。"""
+        self.assertEqual(self.index.top(2), [(Decimal('9.50'), "4"), (Decimal('5.00'), "0")])
+        self.assertEqual([account_id for _, account_id in self.index.bottom(2)], ["5", "1"])
+        self.assertEqual([account_id for _, account_id in self.index.between(Decimal('1'), Decimal('5'))],
+                         ["1", "2", "3", "0"])
+        self.assertEqual(len(self.index.between(Decimal('1'), Decimal('5'), limit=2)), 2)
+        self.assertEqual(self.index.count_between(Decimal('3'), Decimal('3')), 2)
+        self.assertEqual(self.index.rank(Decimal('3.00')), 2)
+        self.assertEqual(self.index.percentile(50), Decimal('3.00'))
+        self.assertEqual(self.index.percentile(100), Decimal('9.50'))
+        self.assertEqual(self.index.percentile(0), Decimal('0.00'))
+        with self.assertRaises(ValueError):
+            self.index.percentile(101)
+    
+    def test_update(self):
+        """余额变更后索引应反映新的顺序。"""
+        self.index.update("5", Decimal('0.00'), Decimal('100.00'))
+        self.assertEqual(self.index.top(1), [(Decimal('100.00'), "5")])
+        self.assertEqual(len(self.index), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
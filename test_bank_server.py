@@ -0,0 +1,115 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from bank_server import BankServer
+from banking_system import BankingSystem
+
+
+class TestBankServer(unittest.IsolatedAsyncioTestCase):
+    """银行网络服务的测试用例。"""
+    
+    async def asyncSetUp(self):
+        self.banking = BankingSystem(concurrent=True)
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.server = BankServer(self.banking, port=0)
+        await self.server.start()
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+    
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.close()
+        self.banking.close_journal()
+    
+    async def request(self, *requests):
+        """流水线发送多个请求，再依次读取响应。"""
+        for request in requests:
+            self.writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        return [json.loads(await self.reader.readline()) for _ in requests]
+    
+    async def test_pipelined_operations(self):
+        """流水线请求应按顺序执行，响应顺序与请求一致。"""
+        responses = await self.request(
+            {'id': 1, 'op': 'create_account', 'account_id': "2", 'owner_name': "李四", 'initial_balance': "5"},
+            {'id': 2, 'op': 'deposit', 'account_id': "1", 'amount': "10.50"},
+            {'id': 3, 'op': 'withdraw', 'account_id': "1", 'amount': 1000},
+            {'id': 4, 'op': 'transfer', 'from_account_id': "1", 'to_account_id': "2", 'amount': 10.25},
+            {'id': 5, 'op': 'get_account', 'account_id': "2"},
+            {'id': 6, 'op': 'list'},
+        )
+        self.assertEqual([response['id'] for response in responses], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([response['ok'] for response in responses], [True, True, False, True, True, True])
+        self.assertEqual(responses[2]['error'], "余额不足")
+        self.assertEqual(responses[4]['account'], {'account_id': "2", 'owner_name': "李四", 'balance': "15.25"})
+        self.assertEqual([account['balance'] for account in responses[5]['accounts']], ["100.25", "15.25"])
+    
+    async def test_list_pages(self):
+        """list 按创建顺序分页返回账户，游标翻到最后一页时为null。"""
+        for account_id in ("2", "3"):
+            self.banking.create_account(account_id, "李四")
+        first, second, invalid = await self.request(
+            {'id': 1, 'op': 'list', 'page_size': 2},
+            {'id': 2, 'op': 'list', 'page_size': 2, 'cursor': 2},
+            {'id': 3, 'op': 'list', 'page_size': 0},
+        )
+        self.assertEqual([account['account_id'] for account in first['accounts']], ["1", "2"])
+        self.assertEqual((first['next_cursor'], first['total']), (2, 3))
+        self.assertEqual([account['account_id'] for account in second['accounts']], ["3"])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(invalid['error'], "无效的分页参数 'page_size'")
+    
+    async def test_idempotent_retry(self):
+        """带相同幂等键的重试只记账一次。"""
+        request = {'id': 1, 'op': 'deposit', 'account_id': "1", 'amount': "10.00", 'idempotency_key': "abc"}
+        responses = await self.request(request, request)
+        self.assertEqual([response['ok'] for response in responses], [True, True])
+        self.assertEqual(self.banking.get_account("1").balance, Decimal('110.00'))
+    
+    async def test_invalid_requests(self):
+        """格式错误的请求应返回错误，且不影响同一连接上的后续请求。"""
+        self.writer.write(b'not json\n')
+        responses = await self.request(
+            {'id': 1, 'op': 'explode'},
+            {'id': 2, 'op': 'deposit', 'account_id': "1"},
+            {'id': 3, 'op': 'deposit', 'account_id': "1", 'amount': "abc"},
+            {'id': 4, 'op': 'get_account', 'account_id': "404"},
+        )
+        responses.append(json.loads(await self.reader.readline()))
+        self.assertEqual(responses[0], {'id': None, 'ok': False, 'error': "无效的JSON请求"})
+        responses = responses[1:]
+        self.assertEqual([response['ok'] for response in responses], [False, False, False, False])
+        self.assertEqual(responses[0]['error'], "未知的操作 'explode'")
+        self.assertEqual(responses[1]['error'], "缺少参数 'amount'")
+        self.assertEqual(responses[2]['error'], "无效的金额")
+        self.assertEqual(responses[3]['error'], "未找到账户 '404'")
+    
+    async def test_journaled_operations_are_durable(self):
+        """启用事务日志时，收到成功响应的操作应已写入日志。"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            snapshot = os.path.join(temp_dir, "accounts.csv")
+            journal = os.path.join(temp_dir, "journal.log")
+            self.banking.save_to_csv(snapshot)
+            self.assertEqual(self.banking.recover(snapshot, journal), (True, None))
+            
+            responses = await self.request(*[
+                {'id': i, 'op': 'deposit', 'account_id': "1", 'amount': "1.00"} for i in range(20)
+            ])
+            self.assertTrue(all(response['ok'] for response in responses))
+            
+            recovered = BankingSystem()
+            self.assertEqual(recovered.recover(snapshot, journal), (True, None))
+            recovered.close_journal()
+            self.assertEqual(recovered.get_account("1").balance, Decimal('120.00'))
+        finally:
+            self.banking.close_journal()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
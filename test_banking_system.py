@@ -1,9 +1,16 @@
 import unittest
 import os
+import random
+import shutil
+import threading
+from datetime import date
 from decimal import Decimal
 from tempfile import NamedTemporaryFile
 
-from banking_system import BankAccount, BankingSystem
+from banking_system import (
+    BankAccount, BankingSystem, BATCH_OK, BATCH_NOT_FOUND, BATCH_INVALID_AMOUNT,
+    BATCH_INSUFFICIENT_FUNDS, BATCH_SAME_ACCOUNT, BATCH_UNKNOWN_OP
+)
 
 
 class TestBankAccount(unittest.TestCase):
@@ -210,6 +217,50 @@ class TestBankingSystem(unittest.TestCase):
         self.assertEqual(self.banking.get_account("1").balance, Decimal('70.00'))
         self.assertEqual(self.banking.get_account("2").balance, Decimal('80.00'))
     
+    def test_apply_batch(self):
+        """测试批量操作全部成功时按净变化应用。"""
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四", Decimal('50.00'))
+        self.banking.create_account("3", "王五")
+        
+        result = self.banking.apply_batch([
+            ('deposit', "1", Decimal('10.00')),
+            ('transfer', "1", "2", Decimal('110.00')),
+            ('withdraw', "2", Decimal('60.00')),
+            ('transfer', "2", "3", Decimal('100.00')),
+        ])
+        self.assertTrue(result.applied)
+        self.assertEqual(list(result.statuses), [BATCH_OK] * 4)
+        self.assertEqual(self.banking.get_account("1").balance, Decimal('0.00'))
+        self.assertEqual(self.banking.get_account("2").balance, Decimal('0.00'))
+        self.assertEqual(self.banking.get_account("3").balance, Decimal('100.00'))
+        
+        # 空批次直接成功
+        self.assertTrue(self.banking.apply_batch([]).applied)
+    
+    def test_apply_batch_is_all_or_nothing(self):
+        """测试批量操作中任何一个失败时整批都不应用。"""
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四", Decimal('50.00'))
+        
+        ops = [
+            ('deposit', "1", Decimal('10.00')),
+            ('withdraw', "2", Decimal('60.00')),  # 按顺序校验时余额不足
+            ('transfer', "1", "1", Decimal('1.00')),
+            ('deposit', "999", Decimal('1.00')),
+            ('withdraw', "1", Decimal('0.00')),
+            ('refund', "1", Decimal('1.00')),
+            ('transfer', "1", "2", Decimal('110.00')),
+        ]
+        result = self.banking.apply_batch(ops)
+        self.assertFalse(result.applied)
+        self.assertEqual(list(result.statuses), [
+            BATCH_OK, BATCH_INSUFFICIENT_FUNDS, BATCH_SAME_ACCOUNT, BATCH_NOT_FOUND,
+            BATCH_INVALID_AMOUNT, BATCH_UNKNOWN_OP, BATCH_OK
+        ])
+        self.assertEqual(self.banking.get_account("1").balance, Decimal('100.00'))
+        self.assertEqual(self.banking.get_account("2").balance, Decimal('50.00'))
+    
     def test_save_and_load(self):
         """测试保存和加载系统状态。"""
         # 创建测试账户
@@ -255,6 +306,87 @@ class TestBankingSystem(unittest.TestCase):
                 # 由于只是测试清理，忽略错误
                 pass
     
+    def test_save_with_progress(self):
+        """带进度保存时报告进度；进度回调抛出异常（取消）时原文件保持不变。"""
+        import tempfile
+        temp_dir = tempfile.mkdtemp()
+        temp_path = os.path.join(temp_dir, "banking_progress.csv")
+        for i in range(25):
+            self.banking.create_account(str(i), f"用户{i}", Decimal('1.00'))
+        
+        try:
+            progress = []
+            success, _ = self.banking.save_to_csv(temp_path, progress=lambda done, total: progress.append(done))
+            self.assertTrue(success)
+            self.assertEqual(progress, [25])
+            with open(temp_path, 'rb') as file:
+                saved = file.read()
+            
+            def cancel(done, total):
+                raise RuntimeError("已取消")
+            
+            self.banking.create_account("new", "新用户")
+            success, error = self.banking.save_to_csv(temp_path, progress=cancel)
+            self.assertFalse(success)
+            self.assertIn("已取消", error)
+            with open(temp_path, 'rb') as file:
+                self.assertEqual(file.read(), saved)
+            self.assertEqual(os.listdir(temp_dir), ["banking_progress.csv"])
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    def test_load_from_csv_streaming(self):
+        """测试分块流式加载与普通加载结果一致。"""
+        import tempfile
+        temp_dir = tempfile.mkdtemp()
+        temp_path = os.path.join(temp_dir, "banking_stream.csv")
+        
+        try:
+            with open(temp_path, 'w', newline='') as file:
+                file.write("account_id,owner_name,balance\r\n")
+                for i in range(25):
+                    file.write(f"{i},用户{i},{i * 10}.5\r\n")
+                file.write("neg,负数,-5.00\r\n")
+                file.write("int,整数,100\r\n")
+            
+            expected = BankingSystem()
+            expected.load_from_csv(temp_path)
+            
+            for fast in (True, False):
+                progress = []
+                banking = BankingSystem()
+                success, error = banking.load_from_csv_streaming(
+                    temp_path, chunk_size=10, fast=fast,
+                    progress=lambda rows, done, total: progress.append((rows, done, total))
+                )
+                self.assertTrue(success)
+                self.assertIsNone(error)
+                
+                self.assertEqual(len(banking.get_all_accounts()), 27)
+                for account in expected.get_all_accounts():
+                    loaded = banking.get_account(account.account_id)
+                    self.assertEqual(loaded.owner_name, account.owner_name)
+                    self.assertEqual(str(loaded.balance), str(account.balance))
+                
+                # 每块报告一次进度，最后一次应读完整个文件
+                self.assertEqual([rows for rows, _, _ in progress], [10, 20, 27])
+                self.assertEqual(progress[-1][1], progress[-1][2])
+            
+            # 加载失败时原有账户保持不变
+            with open(temp_path, 'a', newline='') as file:
+                file.write("bad,坏数据,not-a-number\r\n")
+            success, error = banking.load_from_csv_streaming(temp_path)
+            self.assertFalse(success)
+            self.assertIn("加载数据时出错", error)
+            self.assertEqual(len(banking.get_all_accounts()), 27)
+            
+            success, error = banking.load_from_csv_streaming("non_existent_file.csv")
+            self.assertFalse(success)
+            self.assertIn("未找到", error)
+        finally:
+            import shutil
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
     def test_get_all_accounts(self):
         """测试获取所有账户。"""
         # 应该从没有账户开始
@@ -272,6 +404,302 @@ class TestBankingSystem(unittest.TestCase):
         self.assertIn("1", account_ids)
         self.assertIn("2", account_ids)
 
+    def test_get_accounts_page(self):
+        """测试分页获取账户。"""
+        page = self.banking.get_accounts_page()
+        self.assertEqual(page, ([], None, 0))
+        
+        balances = ['30.00', '10.00', '20.00', '10.00', '50.00']
+        for i, balance in enumerate(balances):
+            self.banking.create_account(f"a{i}", f"用户{4 - i}", Decimal(balance))
+        
+        # 按创建顺序
+        page = self.banking.get_accounts_page(page_size=2)
+        self.assertEqual([acc.account_id for acc in page.accounts], ["a0", "a1"])
+        self.assertEqual(page.total, 5)
+        page = self.banking.get_accounts_page(page.next_cursor, page_size=4)
+        self.assertEqual([acc.account_id for acc in page.accounts], ["a2", "a3", "a4"])
+        self.assertIsNone(page.next_cursor)
+        
+        # 按余额排序，余额相同时按账户ID
+        page = self.banking.get_accounts_page(page_size=2, sort_by='balance')
+        self.assertEqual([acc.account_id for acc in page.accounts], ["a1", "a3"])
+        
+        # 翻页期间新建的账户不影响已返回的部分
+        self.banking.create_account("a5", "新用户", Decimal('5.00'))
+        page = self.banking.get_accounts_page(page.next_cursor, page_size=2, sort_by='balance')
+        self.assertEqual([acc.account_id for acc in page.accounts], ["a2", "a0"])
+        
+        with self.assertRaises(ValueError):
+            self.banking.get_accounts_page(sort_by='color')
+    
+    def test_iter_accounts(self):
+        """测试逐页遍历账户。"""
+        for i in range(7):
+            self.banking.create_account(str(i), f"用户{i % 3}", Decimal(i))
+        
+        ids = [acc.account_id for acc in self.banking.iter_accounts(page_size=3)]
+        self.assertEqual(ids, [str(i) for i in range(7)])
+        
+        ids = [acc.account_id for acc in self.banking.iter_accounts('balance', descending=True, page_size=2)]
+        self.assertEqual(ids, [str(i) for i in reversed(range(7))])
+        
+        owners = [(acc.owner_name, acc.account_id) for acc in self.banking.iter_accounts('owner_name', page_size=2)]
+        self.assertEqual(owners, sorted(owners))
+
+        # 索引建立后新建的账户和余额变化都反映在之后的分页中
+        self.banking.create_account("10", "用户0", Decimal('3.5'))
+        self.banking.deposit("0", Decimal('100'))
+        ids = [acc.account_id for acc in self.banking.iter_accounts('balance', page_size=3)]
+        self.assertEqual(ids, ["1", "2", "3", "10", "4", "5", "6", "0"])
+        ids = [acc.account_id for acc in self.banking.iter_accounts('account_id', descending=True, page_size=3)]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual([acc.account_id for acc in self.banking.iter_accounts(page_size=3)][-1], "10")
+    
+
+    def test_search_accounts(self):
+        """测试按所有者姓名查找账户，加载文件后索引应保持一致。"""
+        self.banking.create_account("1", "张三", Decimal('10.00'))
+        self.banking.create_account("2", "张三丰")
+        self.banking.create_account("3", "李四")
+        
+        self.assertEqual([acc.account_id for acc in self.banking.search_accounts("张三")], ["1"])
+        self.assertEqual([acc.account_id for acc in self.banking.search_accounts("张", 'prefix')], ["1", "2"])
+        self.assertEqual([acc.account_id for acc in self.banking.search_accounts("李思", 'fuzzy')], ["3"])
+        with self.assertRaises(ValueError):
+            self.banking.search_accounts("张", 'regex')
+        
+        with NamedTemporaryFile(suffix='.csv', delete=False) as temp:
+            temp_path = temp.name
+        try:
+            self.banking.save_to_csv(temp_path)
+            other = BankingSystem()
+            other.create_account("9", "王五")
+            other.load_from_csv(temp_path)
+            self.assertEqual(other.search_accounts("王五"), [])
+            self.assertEqual(other.search_accounts("张三")[0].balance, Decimal('10.00'))
+        finally:
+            os.unlink(temp_path)
+
+    def test_owner_index_built_on_first_search(self):
+        """打开已有数据的存储时不遍历账户，所有者姓名索引在第一次查找时才建立。"""
+        class CountingStore(dict):
+            scans = 0
+            
+            def values(self):
+                self.scans += 1
+                return super().values()
+            
+            def total_balance(self):
+                return sum(account.balance for account in super().values())
+        
+        store = CountingStore((str(i), BankAccount(str(i), f"用户{i}", Decimal(i))) for i in range(5))
+        banking = BankingSystem(store=store)
+        self.assertEqual(banking.total_balance(), Decimal('10'))
+        self.assertEqual(store.scans, 0)
+        
+        self.assertEqual(banking.search_accounts("用户3")[0].account_id, "3")
+        banking.create_account("9", "用户3")
+        self.assertEqual([acc.account_id for acc in banking.search_accounts("用户3")], ["3", "9"])
+        self.assertEqual(store.scans, 1)
+    
+    def test_balance_queries(self):
+        """启用余额索引前后，前N名、区间和百分位数查询的结果应一致。"""
+        rng = random.Random(3)
+        for i in range(30):
+            self.banking.create_account(str(i), f"用户{i}", Decimal(rng.randint(0, 5000)) / 100)
+        
+        def snapshot():
+            return (
+                [acc.account_id for acc in self.banking.top_balances(5)],
+                [acc.account_id for acc in self.banking.accounts_in_balance_range(Decimal('10'), Decimal('30'))],
+                [self.banking.balance_percentile(p) for p in (0, 25, 50, 99, 100)]
+            )
+        
+        self.banking.enable_balance_index()
+        for _ in range(300):
+            a, b = str(rng.randrange(30)), str(rng.randrange(30))
+            amount = Decimal(rng.randint(1, 2000)) / 100
+            kind = rng.random()
+            if kind < 0.3:
+                self.banking.deposit(a, amount)
+            elif kind < 0.6:
+                self.banking.withdraw(a, amount)
+            elif kind < 0.9:
+                self.banking.transfer(a, b, amount)
+            else:
+                self.banking.apply_batch([('deposit', a, amount), ('withdraw', b, amount)])
+        self.banking.create_account("new", "新用户", Decimal('20.00'))
+        
+        indexed = snapshot()
+        self.banking._balance_index = None
+        self.assertEqual(indexed, snapshot())
+        self.assertIn("new", indexed[1])
+
+    def test_aggregates(self):
+        """总余额、账户数量和当日成交量应随每种变更同步更新。"""
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四", Decimal('50.00'))
+        self.banking.deposit("1", Decimal('20.00'))
+        self.banking.withdraw("2", Decimal('5.00'))
+        self.banking.withdraw("2", Decimal('500.00'))  # 余额不足，不计入
+        self.banking.transfer("1", "2", Decimal('30.00'))
+        self.banking.apply_batch([('deposit', "2", Decimal('1.00')), ('transfer', "2", "1", Decimal('2.00'))])
+        
+        self.assertEqual(self.banking.account_count(), 2)
+        self.assertEqual(self.banking.total_balance(), Decimal('166.00'))
+        volumes = self.banking.daily_volumes()
+        self.assertEqual((volumes.deposits, volumes.withdrawals, volumes.transfers),
+                         (Decimal('21.00'), Decimal('5.00'), Decimal('32.00')))
+        self.assertEqual((volumes.deposit_count, volumes.withdraw_count, volumes.transfer_count), (2, 1, 2))
+        self.assertEqual(self.banking.daily_volumes(date(2000, 1, 1)).deposit_count, 0)
+        self.assertEqual(self.banking.verify_aggregates(), (True, None))
+        
+        # 保存后重新加载，总余额应从文件重新计算
+        with NamedTemporaryFile(suffix='.csv', delete=False) as file:
+            temp_path = file.name
+        try:
+            self.banking.save_to_csv(temp_path)
+            self.banking.create_account("3", "王五", Decimal('7.00'))
+            self.banking.load_from_csv(temp_path)
+        finally:
+            os.remove(temp_path)
+        self.assertEqual(self.banking.total_balance(), Decimal('166.00'))
+        self.assertEqual(self.banking.account_count(), 2)
+        
+        # 绕过系统直接修改余额后，校验应发现差异并可修正
+        self.banking.accounts["1"].deposit(Decimal('1.00'))
+        ok, error = self.banking.verify_aggregates(repair=True)
+        self.assertFalse(ok)
+        self.assertIn("总余额不一致", error)
+        self.assertEqual(self.banking.verify_aggregates(), (True, None))
+
+
+class TestConcurrentBankingSystem(unittest.TestCase):
+    """并发模式下银行系统的测试用例。"""
+    
+    def setUp(self):
+        """创建启用锁分段的银行系统和一批测试账户。"""
+        self.banking = BankingSystem(concurrent=True, lock_stripes=8)
+        self.account_ids = [str(i) for i in range(20)]
+        for account_id in self.account_ids:
+            self.banking.create_account(account_id, f"用户{account_id}", Decimal('1000.00'))
+    
+    def _total_balance(self) -> Decimal:
+        return sum((acc.balance for acc in self.banking.get_all_accounts()), Decimal('0.00'))
+    
+    def test_concurrent_transfers_conserve_money(self):
+        """多线程随机转账后总金额应保持不变，且没有负余额。"""
+        expected_total = self._total_balance()
+        errors = []
+        
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(2000):
+                    source, destination = rng.sample(self.account_ids, 2)
+                    amount = Decimal(rng.randint(1, 50000)) / 100
+                    self.banking.transfer(source, destination, amount)
+            except Exception as e:  # 记录异常以便主线程断言
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self._total_balance(), expected_total)
+        for account in self.banking.get_all_accounts():
+            self.assertGreaterEqual(account.balance, Decimal('0.00'))
+    
+    def test_concurrent_withdrawals_never_overdraw(self):
+        """多个线程同时从同一账户取款，不应出现透支。"""
+        successes = []
+        
+        def worker():
+            for _ in range(200):
+                success, _ = self.banking.withdraw("0", Decimal('1.00'))
+                if success:
+                    successes.append(1)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(successes), 1000)
+        self.assertEqual(self.banking.get_account("0").balance, Decimal('0.00'))
+    
+    def test_concurrent_create_same_id(self):
+        """多个线程以同一ID创建账户时只有一个能成功。"""
+        results = []
+        
+        def worker(index):
+            results.append(self.banking.create_account("new", f"用户{index}")[0])
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results.count(True), 1)
+
+    def test_lookup_under_account_lock(self):
+        """存款在账户锁内查找账户：同时进行的加载要等存款完成，汇总统计不会偏离。"""
+        with NamedTemporaryFile(suffix='.csv', delete=False) as file:
+            filename = file.name
+        self.banking.save_to_csv(filename)
+        banking = self.banking
+        loaders = []
+        
+        class RacingStore(dict):
+            """查找账户后立即在另一个线程中开始加载CSV。"""
+            
+            def get(self, key, default=None):
+                account = dict.get(self, key, default)
+                if not loaders:
+                    loader = threading.Thread(target=banking.load_from_csv, args=(filename,))
+                    loaders.append(loader)
+                    loader.start()
+                    loader.join(0.2)  # 加载不应在存款持有账户锁时完成
+                return account
+        
+        try:
+            banking.accounts = RacingStore(banking.accounts)
+            self.assertEqual(banking.deposit("0", Decimal('5.00')), (True, None))
+            loaders[0].join()
+            self.assertEqual(banking.verify_aggregates(), (True, None))
+            self.assertEqual(banking.get_account("0").balance, Decimal('1000.00'))
+        finally:
+            os.unlink(filename)
+
+    def test_concurrent_aggregates(self):
+        """各线程的变更累加到各自持有锁的分段上，合计后总余额和成交量准确。"""
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(500):
+                source, destination = rng.sample(self.account_ids, 2)
+                self.banking.deposit(source, Decimal('2.00'))
+                self.banking.withdraw(destination, Decimal('1.00'))
+                self.banking.transfer(source, destination, Decimal('0.50'))
+        
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.banking.verify_aggregates(), (True, None))
+        self.assertEqual(self.banking.total_balance(), Decimal('20000.00') + 4000 * Decimal('1.00'))
+        volumes = self.banking.daily_volumes()
+        self.assertEqual((volumes.deposit_count, volumes.withdraw_count, volumes.transfer_count),
+                         (4000, 4000, 4000))
+        self.assertEqual(volumes.transfers, Decimal('2000.00'))
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,139 @@
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from binary_format import BinaryAccount, BinaryAccountFile, BinaryAccountStore, write_accounts
+
+
+class TestBinaryAccountFile(unittest.TestCase):
+    """定长二进制账户文件的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "accounts.bin")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_round_trip_and_lookup(self):
+        """写入后应能通过哈希索引找到每个账户，不存在的账户返回-1。"""
+        accounts = [(f"acc-{i}", f"用户{i}", i * 101) for i in range(1000)]
+        write_accounts(self.path, accounts)
+        
+        file = BinaryAccountFile(self.path)
+        self.assertEqual(file.count, 1000)
+        for number, (account_id, owner_name, cents) in enumerate(accounts):
+            self.assertEqual(file.find(account_id), number)
+            self.assertEqual(file.owner_name(number), owner_name)
+            self.assertEqual(file.cents(number), cents)
+        self.assertEqual(file.find("missing"), -1)
+        self.assertEqual(file.total_cents(), sum(cents for _, _, cents in accounts))
+        file.close()
+    
+    def test_in_place_update_persists(self):
+        """原地修改的余额在 flush 后重新打开文件时仍然存在。"""
+        write_accounts(self.path, [("1", "张三", 10000), ("2", "李四", 500)])
+        file = BinaryAccountFile(self.path)
+        account = BinaryAccount(file, file.find("2"))
+        self.assertTrue(account.deposit(Decimal('1.50')))
+        self.assertFalse(account.withdraw(Decimal('100.00')))
+        self.assertFalse(account.deposit(Decimal('0.001')))
+        file.flush()
+        file.close()
+        
+        reopened = BinaryAccountFile(self.path)
+        self.assertEqual(reopened.cents(reopened.find("2")), 650)
+        self.assertEqual(reopened.total_cents(), 10650)
+        reopened.close()
+    
+    def test_version_1_header_is_upgraded(self):
+        """没有余额合计的旧版本文件头在打开时补上合计并升级。"""
+        write_accounts(self.path, [("1", "张三", 10000), ("2", "李四", 500)])
+        with open(self.path, 'r+b') as raw:
+            raw.seek(8)
+            raw.write(struct.pack('<I', 1))
+            raw.seek(56)
+            raw.write(bytes(8))
+        file = BinaryAccountFile(self.path)
+        self.assertEqual(file.total_cents(), 10500)
+        file.set_cents(0, 9000)
+        file.flush()
+        file.close()
+        
+        with open(self.path, 'rb') as raw:
+            header = raw.read(64)
+        self.assertEqual(struct.unpack_from('<I', header, 8)[0], 2)
+        self.assertEqual(struct.unpack_from('<q', header, 56)[0], 9500)
+    
+    def test_invalid_file(self):
+        """不是账户文件时应抛出 ValueError。"""
+        for content in (b"", b"account_id,owner_name,balance\r\n" * 4):
+            with open(self.path, 'wb') as file:
+                file.write(content)
+            with self.assertRaises(ValueError):
+                BinaryAccountFile(self.path)
+    
+    def test_banking_system_save_and_load(self):
+        """银行系统保存为二进制文件后，应能按需加载并继续存取款和转账。"""
+        banking = BankingSystem()
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四", Decimal('50.25'))
+        self.assertEqual(banking.save_to_binary(self.path), (True, None))
+        
+        loaded = BankingSystem(owner_index=False)
+        self.assertEqual(loaded.load_from_binary(self.path), (True, None))
+        self.assertIsInstance(loaded.accounts, BinaryAccountStore)
+        self.assertEqual(loaded.get_account("2").balance, Decimal('50.25'))
+        self.assertEqual(loaded.total_balance(), Decimal('150.25'))
+        
+        self.assertTrue(loaded.transfer("1", "2", Decimal('10.00'))[0])
+        self.assertTrue(loaded.create_account("3", "王五", Decimal('5.00'))[0])
+        self.assertEqual([account.account_id for account in loaded.get_all_accounts()], ["1", "2", "3"])
+        self.assertEqual(loaded.verify_aggregates(), (True, None))
+        
+        # 保存到正在映射的同一个文件后，后续修改应写入新文件
+        self.assertEqual(loaded.save_to_binary(self.path), (True, None))
+        self.assertTrue(loaded.deposit("3", Decimal('1.00'))[0])
+        loaded.accounts.flush()
+        loaded.accounts.close()
+        
+        reloaded = BankingSystem()
+        reloaded.load_from_binary(self.path)
+        self.assertEqual([account.balance for account in reloaded.get_all_accounts()],
+                         [Decimal('90.00'), Decimal('60.25'), Decimal('6.00')])
+        self.assertEqual(reloaded.search_accounts("王五")[0].account_id, "3")
+        reloaded.accounts.close()
+    
+    def test_reload_closes_previous_store(self):
+        """重新加载时关闭之前由 load_from_binary 打开的存储，不泄漏 mmap 和文件句柄。"""
+        banking = BankingSystem()
+        banking.create_account("1", "张三", Decimal('100.00'))
+        self.assertEqual(banking.save_to_binary(self.path), (True, None))
+        csv_path = os.path.join(self.temp_dir, "accounts.csv")
+        banking.save_to_csv(csv_path)
+        
+        banking.load_from_binary(self.path)
+        first = banking.accounts
+        banking.load_from_binary(self.path)
+        self.assertIsNone(first._file)
+        second = banking.accounts
+        self.assertEqual(banking.load_from_csv(csv_path), (True, None))
+        self.assertIsNone(second._file)
+        self.assertEqual(banking.get_account("1").balance, Decimal('100.00'))
+    
+    def test_save_rejects_fractional_cents(self):
+        """余额不是整分的账户无法保存为二进制文件。"""
+        banking = BankingSystem()
+        banking.create_account("1", "张三", Decimal('1.005'))
+        success, error = banking.save_to_binary(self.path)
+        self.assertFalse(success)
+        self.assertIn("保存数据时出错", error)
+        self.assertFalse(banking.load_from_binary(os.path.join(self.temp_dir, "missing.bin"))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
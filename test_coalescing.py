@@ -0,0 +1,177 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+
+from banking_system import BankingSystem, CentsBankAccount
+from coalescing import CoalescingBank
+
+
+class TestCoalescingBank(unittest.TestCase):
+    """热点账户操作合并的测试用例。"""
+    
+    def setUp(self):
+        self.banking = BankingSystem()
+        self.banking.create_account("shop", "商户", Decimal('10.00'))
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四", Decimal('50.00'))
+        self.banking.enable_history()
+        self.bank = CoalescingBank(self.banking, hot_accounts=["shop"], max_pending=100)
+    
+    def test_deposits_are_coalesced(self):
+        """热点账户的存款先记入队列，合并时一次入账。"""
+        for _ in range(40):
+            self.assertEqual(self.bank.deposit("shop", Decimal('0.25')), (True, None))
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('10.00'))
+        self.assertEqual(self.bank.balance("shop"), Decimal('20.00'))
+        self.assertEqual(self.bank.total_balance(), Decimal('170.00'))
+        
+        self.assertEqual(self.bank.flush(), 40)
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('20.00'))
+        self.assertEqual(self.banking.total_balance(), Decimal('170.00'))
+        self.assertEqual(self.bank.stats(), {'hot_accounts': 1, 'pending': 0, 'coalesced': 40, 'flushes': 1})
+        self.assertEqual([entry.kind for entry in self.banking.get_statement("shop")], ['deposit'])
+    
+    def test_overdraft_checked_in_arrival_order(self):
+        """取款按到达顺序在余额加待合并净额上检查透支。"""
+        self.assertTrue(self.bank.withdraw("shop", Decimal('6.00'))[0])
+        self.assertEqual(self.bank.withdraw("shop", Decimal('6.00')), (False, "余额不足"))
+        self.assertTrue(self.bank.deposit("shop", Decimal('5.00'))[0])
+        self.assertTrue(self.bank.withdraw("shop", Decimal('6.00'))[0])
+        self.assertEqual(self.bank.balance("shop"), Decimal('3.00'))
+        self.assertEqual(self.bank.deposit("shop", Decimal('-1')), (False, "存款金额必须为正数"))
+        self.bank.flush()
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('3.00'))
+    
+    def test_transfers(self):
+        """热点账户与普通账户之间的转账：普通一侧立即执行，热点一侧合并。"""
+        self.assertTrue(self.bank.transfer("1", "shop", Decimal('30.00'))[0])
+        self.assertEqual(self.banking.get_account("1").balance, Decimal('70.00'))
+        self.assertTrue(self.bank.transfer("shop", "2", Decimal('35.00'))[0])
+        self.assertEqual(self.bank.transfer("shop", "2", Decimal('6.00')), (False, "转账资金不足"))
+        self.assertEqual(self.bank.transfer("2", "shop", Decimal('999')), (False, "转账资金不足"))
+        self.assertEqual(self.bank.transfer("shop", "missing", Decimal('1')), (False, "未找到目标账户 'missing'"))
+        self.assertEqual(self.bank.transfer("missing", "shop", Decimal('1')), (False, "未找到来源账户 'missing'"))
+        self.assertFalse(self.bank.transfer("shop", "shop", Decimal('1'))[0])
+        self.assertTrue(self.bank.transfer("1", "2", Decimal('1.00'))[0])
+        
+        self.assertEqual(self.bank.balance("shop"), Decimal('5.00'))
+        self.assertEqual(self.bank.total_balance(), Decimal('160.00'))
+        self.bank.close()
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('5.00'))
+        self.assertEqual(self.banking.get_account("2").balance, Decimal('86.00'))
+        self.assertEqual(self.banking.total_balance(), Decimal('160.00'))
+    
+    def test_flush_when_full_and_remove(self):
+        """达到上限时立即合并；取消热点前合并剩余操作。"""
+        for _ in range(250):
+            self.bank.deposit("shop", Decimal('1'))
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('210.00'))
+        self.assertEqual(self.bank.stats()['pending'], 50)
+        self.bank.remove_hot_account("shop")
+        self.assertFalse(self.bank.is_hot("shop"))
+        self.assertEqual(self.banking.get_account("shop").balance, Decimal('260.00'))
+        self.assertFalse(self.bank.add_hot_account("missing")[0])
+    
+    def test_cents_accounts_require_whole_cents(self):
+        """整分账户作为热点时拒绝不是整分的金额。"""
+        banking = BankingSystem(account_class=CentsBankAccount)
+        banking.create_account("shop", "商户")
+        bank = CoalescingBank(banking, hot_accounts=["shop"], coalesce=True)
+        self.assertEqual(bank.deposit("shop", Decimal('0.001')), (False, "金额必须为整分"))
+        self.assertTrue(bank.deposit("shop", Decimal('0.01'))[0])
+        bank.close()
+        self.assertEqual(banking.get_account("shop").balance, Decimal('0.01'))
+    
+    def test_concurrent_payments(self):
+        """多个线程同时向热点账户付款时，合并后余额与总额都准确。"""
+        banking = BankingSystem(concurrent=True)
+        banking.create_account("shop", "商户")
+        for i in range(8):
+            banking.create_account(str(i), f"用户{i}", Decimal('100.00'))
+        bank = CoalescingBank(banking, hot_accounts=["shop"], max_pending=37,
+                              flush_interval=0.001, concurrent=True, coalesce=True)
+        
+        def pay(payer):
+            for _ in range(200):
+                bank.transfer(payer, "shop", Decimal('0.10'))
+                bank.withdraw("shop", Decimal('0.05'))
+        
+        threads = [threading.Thread(target=pay, args=(str(i),)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        bank.close()
+        self.assertEqual(banking.get_account("shop").balance, Decimal('80.00'))
+        self.assertEqual(banking.total_balance(), Decimal('720.00'))
+
+    def test_forwards_without_history_or_journal(self):
+        """银行系统没有启用交易历史和事务日志时默认不合并，操作直接转发。"""
+        banking = BankingSystem()
+        banking.create_account("shop", "商户")
+        banking.create_account("1", "张三", Decimal('10.00'))
+        bank = CoalescingBank(banking, hot_accounts=["shop"])
+        self.assertFalse(bank.coalescing)
+        self.assertTrue(bank.transfer("1", "shop", Decimal('4.00'))[0])
+        self.assertEqual(banking.get_account("shop").balance, Decimal('4.00'))
+        self.assertEqual(bank.balance("shop"), Decimal('4.00'))
+        self.assertEqual(bank.stats()['pending'], 0)
+
+    def test_transfers_survive_recover_with_journal(self):
+        """打开事务日志时不合并：热点和普通账户之间两个方向的转账恢复后都还在。"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            snapshot = os.path.join(temp_dir, "snapshot.csv")
+            journal = os.path.join(temp_dir, "journal.log")
+            banking = BankingSystem()
+            banking.enable_history()
+            self.assertEqual(banking.recover(snapshot, journal), (True, None))
+            banking.create_account("m", "商户")
+            banking.create_account("c", "张三", Decimal('100.00'))
+            with self.assertRaises(ValueError):
+                CoalescingBank(banking, hot_accounts=["m"], coalesce=True)
+            bank = CoalescingBank(banking, hot_accounts=["m"])
+            self.assertFalse(bank.coalescing)
+            self.assertEqual(bank.transfer("c", "m", Decimal('30.00')), (True, None))
+            self.assertEqual(bank.transfer("m", "c", Decimal('10.00')), (True, None))
+            banking.close_journal()  # 模拟崩溃：不调用 bank.close()
+            
+            recovered = BankingSystem()
+            self.assertEqual(recovered.recover(snapshot, journal), (True, None))
+            self.assertEqual(recovered.get_account("m").balance, Decimal('20.00'))
+            self.assertEqual(recovered.get_account("c").balance, Decimal('80.00'))
+            self.assertEqual(recovered.total_balance(), Decimal('100.00'))
+            recovered.close_journal()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    def test_journal_opened_later_stops_coalescing(self):
+        """包装之后才打开事务日志时，待合并操作先入账，之后的操作直接转发并记入日志。"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            snapshot = os.path.join(temp_dir, "snapshot.csv")
+            journal = os.path.join(temp_dir, "journal.log")
+            self.assertEqual(self.bank.transfer("1", "shop", Decimal('5.00')), (True, None))
+            self.assertEqual(self.bank.stats()['pending'], 1)
+            self.assertEqual(self.banking.save_to_csv(snapshot), (True, None))
+            self.assertEqual(self.banking.recover(snapshot, journal), (True, None))
+            self.assertEqual(self.bank.transfer("shop", "2", Decimal('15.00')), (True, None))
+            self.assertFalse(self.bank.coalescing)
+            self.assertEqual(self.banking.get_account("shop").balance, Decimal('0.00'))
+            self.banking.close_journal()
+            
+            recovered = BankingSystem()
+            self.assertEqual(recovered.recover(snapshot, journal), (True, None))
+            self.assertEqual(recovered.get_account("shop").balance, Decimal('0.00'))
+            self.assertEqual(recovered.get_account("2").balance, Decimal('65.00'))
+            self.assertEqual(recovered.total_balance(), Decimal('160.00'))
+            recovered.close_journal()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import threading
+import time
+
+from gui_tasks import TaskCancelled, TaskRunner
+
+
+class FakeRoot:
+    """代替 tk.Tk 记录 after() 调用，由测试手动执行。"""
+    
+    def __init__(self):
+        self.scheduled = []
+    
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+    
+    def run_until(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("等待超时")
+            if self.scheduled:
+                self.scheduled.pop(0)()
+            time.sleep(0.005)
+
+
+class TestTaskRunner(unittest.TestCase):
+    """图形界面后台任务的测试用例。"""
+    
+    def setUp(self):
+        self.root = FakeRoot()
+        self.runner = TaskRunner(self.root)
+        self.main_thread = threading.current_thread()
+    
+    def tearDown(self):
+        self.runner.shutdown(wait=True)
+    
+    def test_result_delivered_on_polling_thread(self):
+        """任务在工作线程中执行，回调在轮询的线程中执行。"""
+        seen = {}
+        
+        def work(x, y):
+            seen['worker'] = threading.current_thread()
+            return x + y
+        
+        def done(result):
+            seen['result'] = result
+            seen['callback'] = threading.current_thread()
+        
+        self.runner.submit(work, 2, 3, on_done=done)
+        self.root.run_until(lambda: 'result' in seen)
+        self.assertEqual(seen['result'], 5)
+        self.assertIsNot(seen['worker'], self.main_thread)
+        self.assertIs(seen['callback'], self.main_thread)
+        self.root.run_until(lambda: not self.root.scheduled)
+        self.assertEqual(self.runner.pending, 0)
+    
+    def test_progress_and_cancel(self):
+        """任务报告进度，取消后在下一次报告进度时停止。"""
+        events = []
+        started = threading.Event()
+        release = threading.Event()
+        
+        def work(progress):
+            progress(1, 10)
+            started.set()
+            release.wait(5)
+            for done in range(2, 11):
+                progress(done, 10)
+            return "finished"
+        
+        task = self.runner.submit(work, with_progress=True, on_progress=lambda d, t: events.append(d),
+                                  on_done=events.append, on_cancel=lambda: events.append("cancelled"))
+        started.wait(5)
+        task.cancel()
+        release.set()
+        self.root.run_until(lambda: task.finished)
+        self.assertEqual(events, [1, "cancelled"])
+    
+    def test_errors_go_to_error_callback(self):
+        """任务抛出的异常交给 on_error，后续任务不受影响。"""
+        errors = []
+        results = []
+        self.runner.submit(lambda: 1 / 0, on_error=errors.append)
+        self.runner.submit(lambda: "ok", on_done=results.append)
+        self.root.run_until(lambda: results)
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+        self.assertEqual(results, ["ok"])
+        self.assertTrue(issubclass(TaskCancelled, Exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
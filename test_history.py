@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from history import TransactionHistory
+
+
+class TestTransactionHistory(unittest.TestCase):
+    """交易历史环形缓冲区与段文件的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def fill(self, history, account_id, count, start=0):
+        for i in range(start, start + count):
+            history.record(account_id, 'deposit', Decimal(i), Decimal(i), timestamp=float(i))
+    
+    def test_memory_only_keeps_recent(self):
+        """不指定目录时每个账户只保留最近 capacity 条记录。"""
+        history = TransactionHistory(capacity=4)
+        self.fill(history, "1", 10)
+        self.assertEqual([entry.timestamp for entry in history.statement("1")], [6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(history.statement("missing"), [])
+    
+    def test_spill_and_range_query(self):
+        """溢出到段文件后，按时间范围查询应合并磁盘和内存中的记录。"""
+        history = TransactionHistory(self.temp_dir, capacity=8)
+        self.fill(history, "1", 100)
+        self.fill(history, "2", 5)
+        self.assertLess(history.in_memory(), 8 + 5)
+        
+        self.assertEqual([entry.timestamp for entry in history.statement("1")], [float(i) for i in range(100)])
+        self.assertEqual([entry.timestamp for entry in history.statement("1", 10, 20)],
+                         [float(i) for i in range(10, 21)])
+        self.assertEqual([entry.timestamp for entry in history.statement("1", start=97)], [97.0, 98.0, 99.0])
+        self.assertEqual(len(history.statement("2")), 5)
+        entry = history.statement("1", 42, 42)[0]
+        self.assertEqual((entry.kind, entry.amount, entry.balance), ('deposit', Decimal(42), Decimal(42)))
+        history.close()
+    
+    def test_reopen_rebuilds_index(self):
+        """重新打开目录时应从块头重建索引，并截掉写了一半的块。"""
+        history = TransactionHistory(self.temp_dir, capacity=4, segment_size=200)
+        self.fill(history, "1", 30)
+        history.close()
+        segments = sorted(os.listdir(self.temp_dir))
+        self.assertGreater(len(segments), 1)
+        
+        with open(os.path.join(self.temp_dir, segments[-1]), 'ab') as file:
+            file.write(b'{"account_id": "1", "count": 2, "first": 99')
+        
+        reopened = TransactionHistory(self.temp_dir, capacity=4, segment_size=200)
+        self.assertEqual([entry.timestamp for entry in reopened.statement("1")], [float(i) for i in range(30)])
+        self.fill(reopened, "1", 10, start=30)
+        self.assertEqual(len(reopened.statement("1", 25)), 15)
+        reopened.close()
+    
+    def test_banking_system_records_history(self):
+        """银行系统的每种变更都应写入交易历史，恢复时重放的记录不重复写入。"""
+        banking = BankingSystem()
+        banking.enable_history(self.temp_dir, capacity=4)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四", Decimal('50.00'))
+        banking.deposit("1", Decimal('10.00'))
+        banking.withdraw("1", Decimal('500.00'))  # 失败，不记录
+        banking.transfer("1", "2", Decimal('30.00'))
+        banking.apply_batch([('withdraw', "2", Decimal('5.00')), ('transfer', "2", "1", Decimal('1.00'))])
+        
+        statement = banking.get_statement("1")
+        self.assertEqual([(entry.kind, entry.amount, entry.balance, entry.counterparty) for entry in statement], [
+            ('open', Decimal('100.00'), Decimal('100.00'), None),
+            ('deposit', Decimal('10.00'), Decimal('110.00'), None),
+            ('transfer_out', Decimal('30.00'), Decimal('80.00'), "2"),
+            ('transfer_in', Decimal('1.00'), Decimal('81.00'), "2"),
+        ])
+        self.assertEqual([entry.balance for entry in banking.get_statement("2")],
+                         [Decimal('50.00'), Decimal('80.00'), Decimal('75.00'), Decimal('74.00')])
+        
+        self.assertEqual(banking._replay({'op': 'deposit', 'account_id': "1", 'amount': "1.00"}), (True, None))
+        self.assertEqual(len(banking.get_statement("1")), 4)
+        banking.close_history()
+        
+        with self.assertRaises(ValueError):
+            banking.get_statement("1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from idempotency import KEY_REUSED, IdempotencyCache
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    """幂等键缓存的测试用例。"""
+    
+    def test_capacity_and_ttl(self):
+        """超出容量时淘汰最久未使用的键，过期的键视为不存在。"""
+        cache = IdempotencyCache(capacity=2, ttl=10.0)
+        cache.put("a", (True, None), expires=100.0)
+        cache.put("b", (False, "余额不足"), expires=100.0)
+        self.assertEqual(cache.get("a", now=50.0), (True, None))  # a 变为最近使用
+        cache.put("c", (True, None), expires=100.0)
+        self.assertIsNone(cache.get("b", now=50.0))
+        self.assertEqual(cache.get("a", now=50.0), (True, None))
+        self.assertIsNone(cache.get("a", now=100.0))
+        self.assertEqual(len(cache), 1)
+    
+    def test_export_and_load(self):
+        """导出的键可以导入到新的缓存中，已过期的键被跳过。"""
+        cache = IdempotencyCache()
+        cache.put("a", (True, None), expires=200.0)
+        cache.put("b", (False, "余额不足"), expires=120.0)
+        rows = cache.export(now=100.0)
+        
+        restored = IdempotencyCache()
+        restored.load(rows, now=150.0)
+        self.assertEqual(restored.get("a", now=150.0), (True, None))
+        self.assertIsNone(restored.get("b", now=150.0))
+        with self.assertRaises(ValueError):
+            IdempotencyCache(capacity=0)
+    
+    def test_fingerprint_mismatch(self):
+        """键第一次执行的请求指纹不同时返回 KEY_REUSED；旧格式导入的键不检查指纹。"""
+        cache = IdempotencyCache()
+        cache.put("a", (True, None), expires=200.0, fingerprint="x")
+        self.assertEqual(cache.get("a", "x", now=100.0), (True, None))
+        self.assertEqual(cache.get("a", "y", now=100.0), KEY_REUSED)
+        self.assertEqual(cache.export(now=100.0), [["a", 200.0, True, None, "x"]])
+        cache.load([["b", 200.0, True, None]], now=100.0)
+        self.assertEqual(cache.get("b", "y", now=100.0), (True, None))
+
+
+class TestIdempotentOperations(unittest.TestCase):
+    """带幂等键的存款、取款和转账的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.temp_dir, "snapshot.csv")
+        self.journal = os.path.join(self.temp_dir, "journal.log")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_retries_apply_once(self):
+        """同一个键重试时返回第一次的结果，不会重复记账。"""
+        banking = BankingSystem(concurrent=True)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四")
+        for _ in range(3):
+            self.assertEqual(banking.deposit("1", Decimal('10.00'), idempotency_key="d1"), (True, None))
+            self.assertEqual(banking.transfer("1", "2", Decimal('30.00'), idempotency_key="t1"), (True, None))
+            self.assertEqual(banking.withdraw("2", Decimal('50.00'), idempotency_key="w1"), (False, "余额不足"))
+        self.assertEqual(banking.get_account("1").balance, Decimal('80.00'))
+        self.assertEqual(banking.get_account("2").balance, Decimal('30.00'))
+        
+        # 失败的结果同样被记住；换一个键才会重新执行
+        banking.deposit("2", Decimal('20.00'))
+        self.assertFalse(banking.withdraw("2", Decimal('50.00'), idempotency_key="w1")[0])
+        self.assertTrue(banking.withdraw("2", Decimal('50.00'), idempotency_key="w2")[0])
+    
+    def test_keys_survive_restart(self):
+        """键随事务日志和检查点保存，恢复后重试不会重复记账。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.deposit("1", Decimal('10.00'), idempotency_key="before-checkpoint")
+        self.assertEqual(banking.checkpoint(self.snapshot), (True, None))
+        banking.withdraw("1", Decimal('5.00'), idempotency_key="after-checkpoint")
+        banking.close_journal()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self.assertEqual(recovered.get_account("1").balance, Decimal('105.00'))
+        recovered.deposit("1", Decimal('10.00'), idempotency_key="before-checkpoint")
+        recovered.withdraw("1", Decimal('5.00'), idempotency_key="after-checkpoint")
+        self.assertEqual(recovered.get_account("1").balance, Decimal('105.00'))
+        recovered.close_journal()
+    
+    def test_key_reused_for_different_request(self):
+        """同一个键用于不同的请求时返回错误，不执行也不覆盖第一次的结果。"""
+        banking = BankingSystem()
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四")
+        self.assertEqual(banking.deposit("1", Decimal('10.00'), idempotency_key="k"), (True, None))
+        # 金额写法不同仍是同一个请求
+        self.assertEqual(banking.deposit("1", Decimal('10'), idempotency_key="k"), (True, None))
+        self.assertEqual(banking.deposit("1", Decimal('20.00'), idempotency_key="k"),
+                         (False, "幂等键已用于不同的请求"))
+        self.assertEqual(banking.withdraw("1", Decimal('10.00'), idempotency_key="k"),
+                         (False, "幂等键已用于不同的请求"))
+        self.assertEqual(banking.transfer("1", "2", Decimal('10.00'), idempotency_key="k"),
+                         (False, "幂等键已用于不同的请求"))
+        self.assertEqual(banking.get_account("1").balance, Decimal('110.00'))
+        self.assertEqual(banking.get_account("2").balance, Decimal('0.00'))
+    
+    def test_fingerprints_survive_restart(self):
+        """恢复后（检查点中的键和日志中的键）仍然拒绝用于不同请求的键。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.deposit("1", Decimal('10.00'), idempotency_key="before-checkpoint")
+        self.assertEqual(banking.checkpoint(self.snapshot), (True, None))
+        banking.withdraw("1", Decimal('5.00'), idempotency_key="after-checkpoint")
+        banking.close_journal()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self.assertEqual(recovered.deposit("1", Decimal('99.00'), idempotency_key="before-checkpoint"),
+                         (False, "幂等键已用于不同的请求"))
+        self.assertEqual(recovered.withdraw("1", Decimal('99.00'), idempotency_key="after-checkpoint"),
+                         (False, "幂等键已用于不同的请求"))
+        self.assertEqual(recovered.get_account("1").balance, Decimal('105.00'))
+        recovered.close_journal()
+    
+    def test_expired_keys_run_again(self):
+        """有效期过后同一个键会被当作新的操作执行。"""
+        banking = BankingSystem()
+        banking.create_account("1", "张三")
+        banking.configure_idempotency(capacity=10, ttl=1e-9)
+        banking.deposit("1", Decimal('1.00'), idempotency_key="k")
+        banking.deposit("1", Decimal('1.00'), idempotency_key="k")
+        self.assertEqual(banking.get_account("1").balance, Decimal('2.00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
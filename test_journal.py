@@ -0,0 +1,203 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from banking_system import BankingSystem
+from journal import TransactionJournal, read_journal
+
+
+class TestTransactionJournal(unittest.TestCase):
+    """事务日志的测试用例。"""
+    
+    def setUp(self):
+        """每个测试使用独立的临时目录。"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "journal.log")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_append_and_read(self):
+        """追加的记录落盘后应能按顺序读回。"""
+        journal = TransactionJournal(self.path)
+        first = journal.append({'op': 'deposit', 'account_id': '1', 'amount': '1.00'})
+        second = journal.append({'op': 'withdraw', 'account_id': '1', 'amount': '0.50'})
+        journal.wait(second)
+        journal.close()
+        
+        records = read_journal(self.path)
+        self.assertEqual([r['seq'] for r in records], [first, second])
+        self.assertEqual(records[1]['op'], 'withdraw')
+    
+    def test_torn_tail_is_discarded(self):
+        """崩溃留下的不完整记录应被忽略，并在重新打开时截掉。"""
+        journal = TransactionJournal(self.path)
+        journal.wait(journal.append({'op': 'deposit', 'account_id': '1', 'amount': '1.00'}))
+        journal.close()
+        with open(self.path, 'ab') as file:
+            file.write(b'{"op":"depo')
+        
+        self.assertEqual(len(read_journal(self.path)), 1)
+        
+        journal = TransactionJournal(self.path)
+        self.assertEqual(journal.last_seq, 1)
+        journal.wait(journal.append({'op': 'deposit', 'account_id': '1', 'amount': '2.00'}))
+        journal.close()
+        
+        self.assertEqual([r['seq'] for r in read_journal(self.path)], [1, 2])
+    
+    def test_group_commit_shares_fsync(self):
+        """并发追加的记录应共享fsync调用。"""
+        journal = TransactionJournal(self.path, commit_delay=0.01)
+        
+        with mock.patch('journal.os.fsync', wraps=os.fsync) as fsync:
+            def worker():
+                for _ in range(50):
+                    journal.wait(journal.append({'op': 'deposit', 'account_id': '1', 'amount': '1.00'}))
+            
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            journal.close()
+        
+        self.assertEqual(len(read_journal(self.path)), 400)
+        self.assertLess(fsync.call_count, 400)
+
+
+class TestJournalRecovery(unittest.TestCase):
+    """基于快照和事务日志恢复的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.temp_dir, "accounts.csv")
+        self.journal = os.path.join(self.temp_dir, "journal.log")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _populate(self, banking):
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四", Decimal('50.00'))
+        banking.deposit("1", Decimal('25.00'))
+        banking.withdraw("2", Decimal('10.00'))
+        banking.transfer("1", "2", Decimal('30.00'))
+    
+    def _assert_state(self, banking):
+        self.assertEqual(banking.get_account("1").balance, Decimal('95.00'))
+        self.assertEqual(banking.get_account("2").balance, Decimal('70.00'))
+        self.assertEqual(banking.get_account("2").owner_name, "李四")
+    
+    def test_recover_without_snapshot(self):
+        """没有快照时应仅凭日志恢复全部变更。"""
+        banking = BankingSystem()
+        self.assertEqual(banking.recover(self.snapshot, self.journal), (True, None))
+        self._populate(banking)
+        banking.close_journal()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self._assert_state(recovered)
+        recovered.close_journal()
+    
+    def test_recover_batch(self):
+        """批量操作应作为一条记录写入日志并能重放。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四", Decimal('50.00'))
+        banking.apply_batch([
+            ('deposit', "1", Decimal('25.00')),
+            ('withdraw', "2", Decimal('10.00')),
+            ('transfer', "1", "2", Decimal('30.00')),
+        ])
+        banking.close_journal()
+        
+        self.assertEqual([r['op'] for r in read_journal(self.journal)], ['create', 'create', 'batch'])
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self._assert_state(recovered)
+        recovered.close_journal()
+    
+    def test_failed_operations_are_not_logged(self):
+        """失败的操作不应写入日志。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三")
+        banking.withdraw("1", Decimal('10.00'))
+        banking.deposit("999", Decimal('10.00'))
+        banking.close_journal()
+        
+        self.assertEqual([r['op'] for r in read_journal(self.journal)], ['create'])
+    
+    def test_load_refused_while_journal_open(self):
+        """事务日志打开时不能整体加载账户，之后的操作恢复后仍然一致。"""
+        other = os.path.join(self.temp_dir, "other.csv")
+        source = BankingSystem()
+        source.create_account("9", "王五", Decimal('10.00'))
+        source.save_to_csv(other)
+        
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        error = (False, "事务日志已打开，不能整体加载账户")
+        self.assertEqual(banking.load_from_csv(other), error)
+        self.assertEqual(banking.load_from_csv_streaming(other), error)
+        self.assertIsNone(banking.get_account("9"))
+        self.assertFalse(banking.deposit("9", Decimal('5.00'))[0])
+        banking.deposit("1", Decimal('5.00'))
+        banking.close_journal()
+        
+        # 关闭日志后可以加载
+        self.assertEqual(banking.load_from_csv(other), (True, None))
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self.assertEqual(recovered.get_account("1").balance, Decimal('105.00'))
+        self.assertIsNone(recovered.get_account("9"))
+        recovered.close_journal()
+    
+    def test_checkpoint_then_recover(self):
+        """检查点之后日志被截断，恢复时快照加后续日志得到相同状态。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        banking.create_account("1", "张三", Decimal('100.00'))
+        banking.create_account("2", "李四", Decimal('50.00'))
+        self.assertEqual(banking.checkpoint(self.snapshot), (True, None))
+        self.assertEqual([r['op'] for r in read_journal(self.journal)], ['checkpoint'])
+        
+        banking.deposit("1", Decimal('25.00'))
+        banking.withdraw("2", Decimal('10.00'))
+        banking.transfer("1", "2", Decimal('30.00'))
+        banking.close_journal()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self._assert_state(recovered)
+        recovered.close_journal()
+    
+    def test_crash_before_snapshot_rename(self):
+        """检查点记录已写入但快照尚未替换时，应从旧快照重放全部日志。"""
+        banking = BankingSystem()
+        banking.recover(self.snapshot, self.journal)
+        self._populate(banking)
+        banking.close_journal()
+        
+        # 模拟崩溃：日志中有检查点记录，但对应的快照从未替换成功
+        journal = TransactionJournal(self.journal)
+        journal.wait(journal.append({'op': 'checkpoint', 'digest': 'not-written'}))
+        journal.close()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(self.snapshot, self.journal), (True, None))
+        self._assert_state(recovered)
+        recovered.close_journal()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import gc
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from binary_format import BinaryAccountFile, write_accounts
+from lazy_store import LazyAccountStore
+
+
+class TestLazyAccountStore(unittest.TestCase):
+    """按需加载账户存储的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "accounts.bin")
+        write_accounts(self.path, [(str(i), f"用户{i}", i * 100) for i in range(200)])
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def file_cents(self, account_id):
+        file = BinaryAccountFile(self.path)
+        try:
+            return file.cents(file.find(account_id))
+        finally:
+            file.close()
+    
+    def test_lookup_and_stats(self):
+        """按需读取账户，缓存不超过容量，命中和未命中被统计。"""
+        store = LazyAccountStore(self.path, capacity=10)
+        self.assertEqual(len(store), 200)
+        self.assertEqual(store.get("42").owner_name, "用户42")
+        self.assertEqual(store.get("42").balance, Decimal('42.00'))
+        self.assertIsNone(store.get("missing"))
+        self.assertNotIn("missing", store)
+        for i in range(50):
+            store.get(str(i))
+        
+        stats = store.cache_stats()
+        self.assertEqual(stats['size'], 10)
+        self.assertEqual(stats['capacity'], 10)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 53)
+        self.assertEqual(stats['evictions'], 41)
+        store.close()
+    
+    def test_eviction_writes_back(self):
+        """被淘汰的脏账户把余额写回文件；flush 写回其余的脏账户。"""
+        store = LazyAccountStore(self.path, capacity=2)
+        self.assertTrue(store.get("1").deposit(Decimal('5.00')))
+        self.assertEqual(self.file_cents("1"), 100)
+        store.get("2")
+        store.get("3")
+        self.assertEqual(self.file_cents("1"), 600)
+        self.assertEqual(store.get("1").balance, Decimal('6.00'))
+        
+        self.assertTrue(store.get("3").withdraw(Decimal('1.00')))
+        self.assertEqual(store.cache_stats()['dirty'], 1)
+        store.flush()
+        self.assertEqual(self.file_cents("3"), 200)
+        self.assertEqual(store.cache_stats()['dirty'], 0)
+        
+        # 余额合计在内存中维护，写回时同步更新文件头
+        total = sum(i * 100 for i in range(200)) + 400
+        self.assertTrue(store.get("4").deposit(Decimal('0.01')))
+        self.assertEqual(store.total_balance(), Decimal(total + 1).scaleb(-2))
+        store.close()
+        file = BinaryAccountFile(self.path)
+        self.assertEqual(file.total_cents(), total + 1)
+        file.close()
+    
+    def test_evicted_account_still_held(self):
+        """调用方仍持有的已淘汰账户再次查询时得到同一个对象，之后的修改不会丢失。"""
+        store = LazyAccountStore(self.path, capacity=1)
+        held = store.get("7")
+        store.get("8")
+        self.assertIs(store.get("7"), held)
+        store.get("8")
+        self.assertTrue(held.deposit(Decimal('1.00')))
+        store.get("9")
+        self.assertEqual(self.file_cents("7"), 800)
+        store.close()
+    
+    def test_scan_does_not_fill_cache(self):
+        """遍历所有账户不会挤掉缓存，并看到缓存中尚未写回的余额。"""
+        store = LazyAccountStore(self.path, capacity=5)
+        store.get("10").deposit(Decimal('1.00'))
+        accounts = dict(store.items())
+        self.assertEqual(len(accounts), 200)
+        self.assertEqual(accounts["10"].balance, Decimal('11.00'))
+        self.assertEqual(store.cache_stats()['size'], 1)
+        self.assertEqual(store.total_balance(), Decimal(sum(range(200)) + 1).quantize(Decimal('0.01')))
+        store.close()
+    
+    def test_invalid_file(self):
+        """不是账户文件时抛出 ValueError。"""
+        bad = os.path.join(self.temp_dir, "bad.bin")
+        with open(bad, 'wb') as file:
+            file.write(b"not an account file")
+        with self.assertRaises(ValueError):
+            LazyAccountStore(bad)
+        with self.assertRaises(ValueError):
+            LazyAccountStore(self.path, capacity=0)
+    
+    def test_banking_system_integration(self):
+        """BankingSystem 以小缓存按需加载时，操作结果与保存、重新打开后一致。"""
+        banking = BankingSystem(owner_index=False)
+        self.assertEqual(banking.load_from_binary(self.path, cache_size=8), (True, None))
+        self.assertIsInstance(banking.accounts, LazyAccountStore)
+        self.assertEqual(banking.total_balance(), Decimal('19900.00'))
+        
+        for i in range(1, 100):
+            self.assertTrue(banking.transfer(str(i), str(199 - i), Decimal('0.50'))[0])
+        self.assertTrue(banking.create_account("new", "新用户", Decimal('3.00'))[0])
+        self.assertFalse(banking.withdraw("0", Decimal('1.00'))[0])
+        self.assertEqual(banking.total_balance(), Decimal('19903.00'))
+        self.assertEqual(banking.accounts.total_balance(), Decimal('19903.00'))
+        self.assertIn("account_cache_hits", banking.metrics_text())
+        
+        self.assertEqual(banking.save_to_binary(self.path), (True, None))
+        gc.collect()
+        self.assertEqual(len(banking.accounts), 201)
+        self.assertEqual(banking.get_account("198").balance, Decimal('198.50'))
+        banking.accounts.close()
+        
+        reloaded = BankingSystem(owner_index=False)
+        reloaded.load_from_binary(self.path, cache_size=8)
+        self.assertEqual(reloaded.get_account("1").balance, Decimal('0.50'))
+        self.assertEqual(reloaded.get_account("new").balance, Decimal('3.00'))
+        self.assertEqual(reloaded.total_balance(), Decimal('19903.00'))
+        reloaded.accounts.close()
+
+    def test_reload_closes_previous_store(self):
+        """重新加载时写回并关闭之前按需加载的存储。"""
+        banking = BankingSystem(owner_index=False)
+        banking.load_from_binary(self.path, cache_size=8)
+        first = banking.accounts
+        self.assertTrue(banking.deposit("1", Decimal('1.00'))[0])
+        banking.load_from_binary(self.path, cache_size=8)
+        self.assertIsNone(first._file)
+        self.assertEqual(banking.get_account("1").balance, Decimal('2.00'))
+        self.assertEqual(banking.verify_aggregates(), (True, None))
+        banking.accounts.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
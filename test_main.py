@@ -0,0 +1,120 @@
+import unittest
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from main import command_main, parse_command, read_script
+
+
+class TestCommandMode(unittest.TestCase):
+    """命令行非交互模式的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = os.path.join(self.temp_dir, "accounts.csv")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def run_main(self, *argv):
+        """运行 command_main，返回（退出码，标准输出，标准错误）。"""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = command_main(['--data', self.data] + list(argv))
+        return code, stdout.getvalue(), stderr.getvalue()
+    
+    def write_script(self, text):
+        path = os.path.join(self.temp_dir, "script.txt")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+    
+    def balances(self):
+        banking = BankingSystem()
+        banking.load_from_csv(self.data)
+        return {account.account_id: account.balance for account in banking.get_all_accounts()}
+    
+    def test_parse_command(self):
+        """命令解析为操作元组，金额转换为 Decimal，格式错误时抛出 ValueError。"""
+        self.assertEqual(parse_command(['transfer', '1', '2', '10.5']), ('transfer', '1', '2', Decimal('10.5')))
+        self.assertEqual(parse_command(['create', '1', '张三']), ('create', '1', '张三'))
+        self.assertEqual(parse_command(['create', '1', '张三', '5']), ('create', '1', '张三', Decimal('5')))
+        for words in ([], ['bogus'], ['deposit', '1'], ['deposit', '1', 'abc'], ['withdraw', '1', 'NaN']):
+            with self.assertRaises(ValueError):
+                parse_command(words)
+    
+    def test_single_commands(self):
+        """每条命令加载、执行并保存数据文件；失败时退出码为1且不修改数据。"""
+        self.assertEqual(self.run_main('create', '1', '张 三', '100')[0], 0)
+        self.assertEqual(self.run_main('create', '2', '李四')[0], 0)
+        self.assertEqual(self.run_main('transfer', '1', '2', '30')[0], 0)
+        code, _, stderr = self.run_main('withdraw', '2', '999')
+        self.assertEqual(code, 1)
+        self.assertIn("不足", stderr)
+        self.assertEqual(self.balances(), {'1': Decimal('70.00'), '2': Decimal('30.00')})
+        
+        code, stdout, _ = self.run_main('show', '1')
+        self.assertEqual((code, stdout), (0, "1\t张 三\t70.00\n"))
+        self.assertEqual(self.run_main('list')[1].count("\n"), 2)
+        self.assertEqual(self.run_main('bogus')[0], 2)
+    
+    def test_script(self):
+        """脚本中的命令一次加载、一次保存地执行，失败的行被报告。"""
+        path = self.write_script("create 1 张三 100  # 注释\n\ncreate 2 李四\n"
+                                 "transfer 1 2 40\nwithdraw 2 500\ndeposit 2 1\n")
+        code, _, stderr = self.run_main('run', path)
+        self.assertEqual(code, 1)
+        self.assertIn("第5行", stderr)
+        self.assertEqual(self.balances(), {'1': Decimal('60.00'), '2': Decimal('41.00')})
+    
+    def test_script_errors_change_nothing(self):
+        """脚本有格式错误时不执行任何命令。"""
+        path = self.write_script("create 1 张三 100\ndeposit 1 abc\nfrobnicate\n")
+        code, _, stderr = self.run_main('run', path)
+        self.assertEqual(code, 2)
+        self.assertIn("第2行", stderr)
+        self.assertIn("第3行", stderr)
+        self.assertFalse(os.path.exists(self.data))
+        with self.assertRaises(ValueError):
+            read_script(path)
+    
+    def test_atomic_script(self):
+        """--atomic 时任何一条失败整个脚本都不生效。"""
+        self.run_main('create', '1', '张三', '100')
+        self.run_main('create', '2', '李四')
+        path = self.write_script("transfer 1 2 60\ntransfer 1 2 60\n")
+        code, _, stderr = self.run_main('--atomic', 'run', path)
+        self.assertEqual(code, 1)
+        self.assertIn("第2行", stderr)
+        self.assertEqual(self.balances(), {'1': Decimal('100.00'), '2': Decimal('0.00')})
+        
+        path = self.write_script("transfer 1 2 60\ndeposit 2 5\n")
+        self.assertEqual(self.run_main('--atomic', 'run', path)[0], 0)
+        self.assertEqual(self.balances(), {'1': Decimal('40.00'), '2': Decimal('65.00')})
+        self.assertEqual(self.run_main('--atomic', 'run', self.write_script("create 3 王五\n"))[0], 2)
+
+    def test_command_mode_skips_optional_modules(self):
+        """命令行模式只导入用到的模块，可选的子系统不会被加载。"""
+        optional = ['binary_format', 'lazy_store', 'history', 'snapshot', 'journal', 'metrics',
+                    'parallel_csv', 'idempotency', 'owner_index', 'hashlib']
+        code = (
+            "import sys, main\n"
+            f"main.command_main(['--data', {self.data!r}, 'create', '1', '张三', '100'])\n"
+            f"main.command_main(['--data', {self.data!r}, 'deposit', '1', '5'])\n"
+            f"print(sorted(name for name in {optional!r} if name in sys.modules))\n"
+        )
+        root = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "[]")
+        self.assertEqual(self.balances(), {'1': Decimal('105.00')})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from metrics import (INSUFFICIENT_FUNDS, UNKNOWN_ACCOUNT, LatencyHistogram, Metrics,
+                     bucket_index, bucket_upper_bound)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """延迟直方图的测试用例。"""
+    
+    def test_buckets_are_contiguous(self):
+        """每个值都落在上界大于它的桶中，相对误差不超过1/16。"""
+        for value in list(range(0, 5000)) + [10 ** 6, 123456789, 2 ** 40 + 1]:
+            index = bucket_index(value)
+            upper = bucket_upper_bound(index)
+            self.assertLess(value, upper)
+            self.assertLessEqual(upper - value, max(1, value / 16 + 1))
+            if index:
+                self.assertLessEqual(bucket_upper_bound(index - 1), value)
+    
+    def test_percentiles_and_cumulative(self):
+        """分位数误差在桶宽之内，2的幂上界的累计计数是精确的。"""
+        histogram = LatencyHistogram()
+        for value in range(1, 10001):
+            histogram.record(value * 100)
+        self.assertAlmostEqual(histogram.percentile(0.5), 500000, delta=500000 / 16)
+        self.assertAlmostEqual(histogram.percentile(0.99), 990000, delta=990000 / 16)
+        self.assertEqual(histogram.percentile(1.0), 1000000)
+        self.assertEqual(histogram.cumulative([1024, 2 ** 20]), [10, 10000])
+
+
+class TestBankingMetrics(unittest.TestCase):
+    """银行系统指标的测试用例。"""
+    
+    def setUp(self):
+        self.banking = BankingSystem()
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四")
+    
+    def test_counts_and_failure_reasons(self):
+        """启用后按操作统计调用次数，失败按原因分类。"""
+        metrics = self.banking.enable_metrics()
+        self.assertIs(self.banking.enable_metrics(), metrics)
+        self.banking.deposit("1", Decimal('10.00'))
+        self.banking.withdraw("2", Decimal('10.00'))
+        self.banking.withdraw("404", Decimal('10.00'))
+        self.banking.transfer("1", "2", Decimal('5.00'), idempotency_key="k")
+        self.banking.transfer("1", "2", Decimal('5.00'), idempotency_key="k")
+        self.assertIsNone(self.banking.get_account("404"))
+        
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['deposit']['calls'], 1)
+        self.assertEqual(snapshot['withdraw']['failures'], 2)
+        self.assertEqual(snapshot['withdraw']['reasons'], {INSUFFICIENT_FUNDS: 1, UNKNOWN_ACCOUNT: 1})
+        self.assertEqual(snapshot['transfer']['calls'], 2)  # 幂等重试不会被重复记录
+        self.assertEqual(snapshot['get_account']['reasons'], {UNKNOWN_ACCOUNT: 1})
+        self.assertGreater(snapshot['deposit']['p99_us'], 0)
+        self.assertEqual(self.banking.get_account("2").balance, Decimal('5.00'))
+    
+    def test_prometheus_text(self):
+        """Prometheus 文本包含计数器、失败原因、直方图和瞬时值。"""
+        self.banking.enable_metrics()
+        self.banking.deposit("1", Decimal('1.00'))
+        self.banking.withdraw("2", Decimal('1.00'))
+        text = self.banking.metrics_text()
+        self.assertIn('bank_operations_total{operation="deposit"} 1', text)
+        self.assertIn('bank_operation_failures_total{operation="withdraw",reason="insufficient_funds"} 1', text)
+        self.assertIn('bank_operation_duration_seconds_bucket{operation="deposit",le="+Inf"} 1', text)
+        self.assertIn('bank_operation_duration_seconds_count{operation="withdraw"} 1', text)
+        self.assertIn('bank_accounts 2', text)
+        self.assertIn('bank_total_balance 101.00', text)
+    
+    def test_disable_restores_methods(self):
+        """关闭指标后方法恢复为类上的原始方法。"""
+        self.banking.enable_metrics()
+        self.assertIn('deposit', vars(self.banking))
+        self.banking.disable_metrics()
+        self.assertNotIn('deposit', vars(self.banking))
+        self.assertIsNone(self.banking.metrics)
+        self.assertTrue(self.banking.deposit("1", Decimal('1.00'))[0])
+    
+    def test_exceptions_are_counted(self):
+        """方法抛出异常时记为 exception 并重新抛出。"""
+        metrics = Metrics()
+        
+        def explode():
+            raise RuntimeError("boom")
+        
+        with self.assertRaises(RuntimeError):
+            metrics.wrap('explode', explode)()
+        self.assertEqual(metrics.snapshot()['explode']['reasons'], {'exception': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+import test_banking_system
+from banking_system import BankingSystem, CentsBankAccount
+from money import INT64_MAX, from_cents, to_cents
+
+
+class TestCentsConversion(unittest.TestCase):
+    """金额与整数分转换的测试用例。"""
+    
+    def test_round_trip(self):
+        """整分金额应精确往返转换。"""
+        for text in ('0.00', '0.01', '123.45', '100', '-7.50', '1.230'):
+            cents = to_cents(Decimal(text))
+            self.assertEqual(from_cents(cents), Decimal(text))
+        self.assertEqual(str(from_cents(12345)), '123.45')
+        self.assertEqual(str(from_cents(0)), '0.00')
+        self.assertEqual(to_cents(from_cents(INT64_MAX)), INT64_MAX)
+    
+    def test_rejects_fractional_cents(self):
+        """未指定舍入方式时，不足一分的金额应被拒绝。"""
+        with self.assertRaises(ValueError):
+            to_cents(Decimal('0.001'))
+        with self.assertRaises(ValueError):
+            to_cents(Decimal('1E-999999'))
+        with self.assertRaises(ValueError):
+            to_cents(Decimal('NaN'))
+        with self.assertRaises(ValueError):
+            to_cents(Decimal('Infinity'))
+    
+    def test_rounding(self):
+        """指定舍入方式时按该方式舍入到分。"""
+        self.assertEqual(to_cents(Decimal('1.235'), ROUND_HALF_EVEN), 124)
+        self.assertEqual(to_cents(Decimal('1.225'), ROUND_HALF_EVEN), 122)
+        self.assertEqual(to_cents(Decimal('1.225'), ROUND_HALF_UP), 123)
+    
+    def test_overflow(self):
+        """超出int64范围的金额应抛出 OverflowError。"""
+        with self.assertRaises(OverflowError):
+            to_cents(Decimal('1e30'))
+        with self.assertRaises(OverflowError):
+            to_cents(from_cents(INT64_MAX) + Decimal('0.01'))
+
+
+class TestCentsBankAccount(unittest.TestCase):
+    """以整数分保存余额的账户的测试用例。"""
+    
+    def test_operations(self):
+        """存取款应与 BankAccount 行为一致，金额必须为整分。"""
+        account = CentsBankAccount("1", "张三", Decimal('100.00'))
+        self.assertEqual(account.cents, 10000)
+        self.assertTrue(account.deposit(Decimal('0.50')))
+        self.assertFalse(account.deposit(Decimal('0.005')))
+        self.assertFalse(account.deposit(Decimal('-1.00')))
+        self.assertTrue(account.withdraw(Decimal('20.25')))
+        self.assertFalse(account.withdraw(Decimal('1000.00')))
+        self.assertEqual(account.balance, Decimal('80.25'))
+        self.assertEqual(account.to_dict()['balance'], '80.25')
+    
+    def test_cents_api_and_overflow(self):
+        """整数分接口应检测溢出且失败时不改变余额。"""
+        account = CentsBankAccount("1", "张三")
+        self.assertTrue(account.deposit_cents(INT64_MAX - 1))
+        self.assertFalse(account.deposit_cents(2))
+        self.assertEqual(account.cents, INT64_MAX - 1)
+        self.assertTrue(account.withdraw_cents(INT64_MAX - 1))
+        self.assertFalse(account.withdraw_cents(1))
+        self.assertEqual(account.balance, Decimal('0.00'))
+
+    def test_invalid_opening_balance(self):
+        """初始余额不是整分或超出范围时构造失败，银行系统返回错误而不是记为0。"""
+        with self.assertRaises(ValueError):
+            CentsBankAccount("1", "张三", Decimal('1.001'))
+        with self.assertRaises(OverflowError):
+            CentsBankAccount("1", "张三", Decimal('1e30'))
+        banking = BankingSystem(account_class=CentsBankAccount)
+        self.assertEqual(banking.create_account("a", "x", Decimal('1.001')), (False, "初始余额必须为整分"))
+        self.assertEqual(banking.create_account("a", "x", Decimal('1e30')), (False, "金额超出范围"))
+        self.assertIsNone(banking.get_account("a"))
+        self.assertEqual(banking.total_balance(), Decimal('0.00'))
+
+
+class TestBankingSystemCentsAccounts(test_banking_system.TestBankingSystem):
+    """使用 CentsBankAccount 时，银行系统的行为应与默认账户一致。"""
+    
+    def setUp(self):
+        self.banking = BankingSystem(account_class=CentsBankAccount)
+
+
+if __name__ == '__main__':
+    unittest.main()
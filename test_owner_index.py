@@ -0,0 +1,46 @@
+import unittest
+from collections import namedtuple
+
+from owner_index import OwnerIndex, normalize_name
+
+Account = namedtuple('Account', ['account_id', 'owner_name'])
+
+
+class TestOwnerIndex(unittest.TestCase):
+    """所有者姓名索引的测试用例。"""
+    
+    def setUp(self):
+        self.index = OwnerIndex()
+        self.index.rebuild([Account("1", "张三"), Account("2", "张三丰"), Account("3", "李四")])
+        self.index.add("Alice Smith", "4")
+        self.index.add("张三", "5")
+    
+    def test_normalize(self):
+        """规范化应忽略大小写、空白和全角半角差异。"""
+        self.assertEqual(normalize_name(" Ａｌｉｃｅ  SMITH "), "alicesmith")
+        self.assertEqual(normalize_name("张 三"), "张三")
+    
+    def test_exact_and_prefix(self):
+        """精确和前缀查询应包括重建后新增的账户。"""
+        self.assertEqual(self.index.find_exact("张三"), ["1", "5"])
+        self.assertEqual(self.index.find_exact("alice smith"), ["4"])
+        self.assertEqual(self.index.find_exact("王五"), [])
+        self.assertEqual(self.index.find_prefix("张"), ["1", "5", "2"])
+        self.assertEqual(self.index.find_prefix("张", limit=2), ["1", "5"])
+        self.assertEqual(self.index.find_prefix("ALI"), ["4"])
+        self.assertEqual(len(self.index), 5)
+    
+    def test_fuzzy(self):
+        """模糊查询应找到只差一个字的姓名，并按相似度排序。"""
+        ids = [account_id for account_id, _ in self.index.find_fuzzy("张山")]
+        self.assertEqual(ids[:2], ["1", "5"])
+        self.assertNotIn("3", ids)
+        
+        results = self.index.find_fuzzy("alise smith")
+        self.assertEqual(results[0][0], "4")
+        self.assertGreater(results[0][1], 0.5)
+        self.assertEqual(self.index.find_fuzzy(""), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from decimal import Decimal
+
+from banking_system import BankAccount
+from page_index import PageIndex
+
+
+class TestPageIndex(unittest.TestCase):
+    """分页索引的测试用例。"""
+    
+    def setUp(self):
+        self.accounts = [BankAccount(str(i), f"用户{i % 4}", Decimal(i)) for i in range(10)]
+        self.index = PageIndex(load=2)
+    
+    def test_creation_order(self):
+        """创建顺序按偏移量切片，建立后新建的账户追加在末尾。"""
+        self.assertFalse(self.index.has(None))
+        self.index.build(None, self.accounts)
+        self.assertTrue(self.index.has(None))
+        self.index.add(BankAccount("new", "新用户"))
+        self.assertEqual(self.index.slice(8, 5), ["8", "9", "new"])
+    
+    def test_sorted_pages(self):
+        """按游标向后或向前取一页，新建的账户出现在正确的位置。"""
+        self.index.build('owner_name', self.accounts, lambda account: account.owner_name)
+        self.index.add(BankAccount("a", "用户1"))
+        keys = self.index.page('owner_name', None, 4)
+        self.assertEqual(keys, [("用户0", "0"), ("用户0", "4"), ("用户0", "8"), ("用户1", "1")])
+        keys = self.index.page('owner_name', keys[-1], 3)
+        self.assertEqual(keys, [("用户1", "5"), ("用户1", "9"), ("用户1", "a")])
+        keys = self.index.page('owner_name', ("用户1", "5"), 10, descending=True)
+        self.assertEqual([account_id for _, account_id in keys], ["1", "8", "4", "0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
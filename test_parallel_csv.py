@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+import parallel_csv
+from banking_system import BankingSystem
+
+
+class TestParallelCSV(unittest.TestCase):
+    """多进程并行CSV导出和导入的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.banking = BankingSystem()
+        for i in range(500):
+            self.banking.create_account(f"acc-{i}", f"用户{i}", Decimal(i * 37).scaleb(-2))
+        # 测试数据很小，取消规模下限以便走并行路径
+        patcher = mock.patch.multiple(parallel_csv, MIN_PARALLEL_ROWS=0, MIN_PARALLEL_BYTES=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+    
+    def read(self, name):
+        with open(self.path(name), 'rb') as file:
+            return file.read()
+    
+    def test_partitions(self):
+        """分区连续、非空并覆盖全部范围。"""
+        self.assertEqual(parallel_csv.partitions(10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(parallel_csv.partitions(2, 8), [(0, 1), (1, 2)])
+        self.assertEqual(parallel_csv.partitions(0, 4), [])
+    
+    def test_export_is_byte_identical(self):
+        """并行保存的文件与单进程保存的文件逐字节一致，并报告进度。"""
+        self.assertTrue(self.banking.save_to_csv(self.path("serial.csv"))[0])
+        progress = []
+        success, error = self.banking.save_to_csv(self.path("parallel.csv"), workers=3,
+                                                  progress=lambda done, total: progress.append((done, total)))
+        self.assertTrue(success, error)
+        self.assertEqual(self.read("parallel.csv"), self.read("serial.csv"))
+        self.assertEqual(progress[-1], (500, 500))
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["parallel.csv", "serial.csv"])
+    
+    def test_export_empty(self):
+        """没有账户时只写入表头。"""
+        empty = BankingSystem()
+        empty.save_to_csv(self.path("serial.csv"))
+        self.assertTrue(empty.save_to_csv(self.path("parallel.csv"), workers=2)[0])
+        self.assertEqual(self.read("parallel.csv"), self.read("serial.csv"))
+    
+    def test_import_matches_serial(self):
+        """并行加载的账户与单进程加载的账户相同（包括重复编号以后者为准）。"""
+        self.banking.save_to_csv(self.path("accounts.csv"))
+        with open(self.path("accounts.csv"), 'a', newline='') as file:
+            file.write("acc-3,重复,-5\r\n")
+        
+        serial = BankingSystem()
+        self.assertTrue(serial.load_from_csv(self.path("accounts.csv"))[0])
+        for workers in (2, 7):
+            loaded = BankingSystem()
+            success, error = loaded.load_from_csv(self.path("accounts.csv"), workers=workers)
+            self.assertTrue(success, error)
+            self.assertEqual([account.to_dict() for account in loaded.get_all_accounts()],
+                             [account.to_dict() for account in serial.get_all_accounts()])
+            self.assertEqual(loaded.get_account("acc-3").balance, Decimal('0'))
+    
+    def test_split_ranges_align_to_lines(self):
+        """字节区间从行首开始、首尾相接并覆盖表头之后的全部内容。"""
+        self.banking.save_to_csv(self.path("accounts.csv"))
+        data = self.read("accounts.csv")
+        ranges = parallel_csv.split_file(self.path("accounts.csv"), 16)
+        self.assertEqual(ranges[0][0], data.index(b"\n") + 1)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[start - 1:start], b"\n")
+    
+    def test_quoted_fields_fall_back_to_serial(self):
+        """包含加引号字段（可能跨行）的文件改用单进程加载，结果不变。"""
+        self.banking.create_account("quoted", "张\n三, 先生", Decimal('12.50'))
+        self.banking.save_to_csv(self.path("accounts.csv"))
+        
+        loaded = BankingSystem()
+        success, error = loaded.load_from_csv(self.path("accounts.csv"), workers=2)
+        self.assertTrue(success, error)
+        self.assertEqual(loaded.get_account("quoted").owner_name, "张\n三, 先生")
+        self.assertEqual(len(loaded.get_all_accounts()), 501)
+    
+    def test_malformed_row_fails_without_changes(self):
+        """格式错误的行使加载失败，原有账户保持不变。"""
+        with open(self.path("bad.csv"), 'w', newline='') as file:
+            file.write("account_id,owner_name,balance\r\n1,张三,10\r\n2,李四\r\n")
+        success, error = self.banking.load_from_csv(self.path("bad.csv"), workers=2)
+        self.assertFalse(success)
+        self.assertIn("加载数据时出错", error)
+        self.assertEqual(len(self.banking.get_all_accounts()), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
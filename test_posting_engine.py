@@ -0,0 +1,142 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from decimal import Decimal
+
+from account_store import CompactAccountStore
+from banking_system import (
+    BankingSystem, BATCH_INSUFFICIENT_FUNDS, BATCH_INVALID_AMOUNT, BATCH_NOT_FOUND,
+    BATCH_OK, BATCH_SAME_ACCOUNT, BATCH_UNKNOWN_OP
+)
+from posting_engine import EXTERNAL, UNKNOWN, PostingEngine, np
+
+
+def sequential_reference(balances, sources, destinations, amounts):
+    """逐笔执行的参考实现，返回最终余额和每笔是否被接受。"""
+    balances = list(balances)
+    accepted = []
+    for s, d, a in zip(sources, destinations, amounts):
+        ok = (a > 0 and s != d and not (s == EXTERNAL and d == EXTERNAL)
+              and (s == EXTERNAL or balances[s] >= a))
+        if ok:
+            if s != EXTERNAL:
+                balances[s] -= a
+            if d != EXTERNAL:
+                balances[d] += a
+        accepted.append(ok)
+    return balances, accepted
+
+
+@unittest.skipUnless(np, "需要 numpy")
+class TestPostingEngine(unittest.TestCase):
+    """向量化过账引擎的测试用例。"""
+    
+    def setUp(self):
+        self.banking = BankingSystem(store=CompactAccountStore())
+        for i in range(5):
+            self.banking.create_account(str(i), f"用户{i}", Decimal('10.00'))
+        self.engine = PostingEngine(self.banking)
+    
+    def balances(self):
+        return [self.banking.accounts[str(i)].balance for i in range(5)]
+    
+    def test_post_and_statuses(self):
+        """应正确应用存款、取款和转账，并报告被拒绝的原因。"""
+        result = self.engine.post(
+            [EXTERNAL, 0, 1, 2, 3, EXTERNAL, UNKNOWN],
+            [0, EXTERNAL, 2, 2, 4, EXTERNAL, 1],
+            [500, 300, 2000, 100, -5, 100, 100]
+        )
+        self.assertEqual(result.accepted, 2)
+        self.assertEqual(list(result.statuses), [
+            BATCH_OK, BATCH_OK, BATCH_INSUFFICIENT_FUNDS, BATCH_SAME_ACCOUNT,
+            BATCH_INVALID_AMOUNT, BATCH_UNKNOWN_OP, BATCH_NOT_FOUND
+        ])
+        self.assertEqual(self.balances()[:2], [Decimal('12.00'), Decimal('10.00')])
+    
+    def test_rejected_op_does_not_affect_later_ops(self):
+        """被拒绝的操作不应影响后续操作的透支检查。"""
+        result = self.engine.post([0, 0, 1, 0], [1, 2, 0, 3], [600, 600, 1000, 600])
+        self.assertEqual(list(result.statuses), [BATCH_OK, BATCH_INSUFFICIENT_FUNDS, BATCH_OK, BATCH_OK])
+        self.assertEqual(self.balances()[:4], [Decimal('8.00'), Decimal('6.00'), Decimal('10.00'), Decimal('16.00')])
+    
+    def test_matches_sequential_reference(self):
+        """随机批次的结果应与逐笔执行完全一致，无论走向量化还是逐笔路径。"""
+        rng = random.Random(8)
+        for min_window in (1, 64, 10 ** 9):
+            banking = BankingSystem(store=CompactAccountStore())
+            for i in range(50):
+                banking.create_account(str(i), "用户", Decimal(rng.randint(0, 500)) / 100)
+            engine = PostingEngine(banking, min_window=min_window)
+            initial = list(banking.accounts.balance_buffer())
+            
+            count = 2000
+            sources = [rng.randint(-1, 49) for _ in range(count)]
+            destinations = [rng.randint(-1, 49) for _ in range(count)]
+            amounts = [rng.randint(-10, 300) for _ in range(count)]
+            expected, accepted = sequential_reference(initial, sources, destinations, amounts)
+            
+            result = engine.post(sources, destinations, amounts)
+            self.assertEqual(list(banking.accounts.balance_buffer()), expected)
+            self.assertEqual([status == BATCH_OK for status in result.statuses], accepted)
+            self.assertEqual(result.accepted, sum(accepted))
+    
+    def test_updates_balance_index(self):
+        """过账后余额索引应与账户余额一致。"""
+        self.banking.enable_balance_index()
+        self.engine.post([EXTERNAL, 0, 1], [4, 3, EXTERNAL], [9000, 250, 100])
+        self.assertEqual([acc.account_id for acc in self.banking.top_balances(2)], ["4", "3"])
+        self.assertEqual(self.banking.balance_percentile(0), Decimal('7.50'))
+    
+    def test_updates_aggregates(self):
+        """过账后总余额和当日成交量应包含已接受的操作。"""
+        self.engine.post([EXTERNAL, 0, 1, 2], [4, 3, EXTERNAL, EXTERNAL], [9000, 250, 100, 99999])
+        self.assertEqual(self.banking.total_balance(), Decimal('139.00'))
+        self.assertEqual(self.banking.verify_aggregates(), (True, None))
+        volumes = self.banking.daily_volumes()
+        self.assertEqual((volumes.deposits, volumes.withdrawals, volumes.transfers),
+                         (Decimal('90.00'), Decimal('1.00'), Decimal('2.50')))
+        self.assertEqual((volumes.deposit_count, volumes.withdraw_count, volumes.transfer_count), (1, 1, 1))
+    
+    def test_records_history(self):
+        """启用交易历史时，过账应逐笔记录余额变化。"""
+        self.banking.enable_history()
+        self.engine.post([EXTERNAL, 0, 1, 0], [0, 1, EXTERNAL, 1], [500, 300, 100, 99999])
+        self.assertEqual([(entry.kind, entry.balance) for entry in self.banking.get_statement("0")],
+                         [('deposit', Decimal('15.00')), ('transfer_out', Decimal('12.00'))])
+        self.assertEqual([(entry.kind, entry.balance, entry.counterparty) for entry in self.banking.get_statement("1")],
+                         [('transfer_in', Decimal('13.00'), "0"), ('withdraw', Decimal('12.00'), None)])
+    
+    def test_slots(self):
+        """slots() 应把账户ID映射为槽位，不存在的账户为 UNKNOWN。"""
+        self.assertEqual(list(self.engine.slots(["3", "x", "0"])), [3, UNKNOWN, 0])
+    
+    def test_requires_compact_store(self):
+        """默认字典存储不支持向量化过账。"""
+        with self.assertRaises(TypeError):
+            PostingEngine(BankingSystem())
+    
+    def test_journal_recovery(self):
+        """过账写入日志后，应能在没有numpy参与的情况下重放恢复。"""
+        temp_dir = tempfile.mkdtemp()
+        snapshot = os.path.join(temp_dir, "accounts.csv")
+        journal = os.path.join(temp_dir, "journal.log")
+        try:
+            self.banking.save_to_csv(snapshot)
+            self.assertEqual(self.banking.recover(snapshot, journal), (True, None))
+            PostingEngine(self.banking).post([EXTERNAL, 0, 1], [0, EXTERNAL, 2], [100, 50, 2500])
+            expected = self.balances()
+            self.banking.close_journal()
+            
+            recovered = BankingSystem()
+            self.assertEqual(recovered.recover(snapshot, journal), (True, None))
+            recovered.close_journal()
+            self.assertEqual([recovered.get_account(str(i)).balance for i in range(5)], expected)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from decimal import Decimal
+
+from sharding import ShardedBankingSystem, shard_of
+
+
+class TestShardedBankingSystem(unittest.TestCase):
+    """多进程分片银行系统的测试用例。"""
+    
+    def setUp(self):
+        self.banking = ShardedBankingSystem(shards=3)
+        for i in range(12):
+            self.banking.create_account(str(i), f"用户{i}", Decimal('100.00'))
+        # 找出一对同分片和一对跨分片的账户
+        ids = [str(i) for i in range(12)]
+        self.same = next((a, b) for a in ids for b in ids if a != b and shard_of(a, 3) == shard_of(b, 3))
+        self.cross = next((a, b) for a in ids for b in ids if shard_of(a, 3) != shard_of(b, 3))
+    
+    def tearDown(self):
+        self.banking.close()
+    
+    def test_accounts_are_partitioned(self):
+        """账户按哈希分配到各分片，查询时返回正确的副本。"""
+        self.assertEqual(self.banking.account_count(), 12)
+        self.assertEqual(sorted(int(a.account_id) for a in self.banking.get_all_accounts()), list(range(12)))
+        self.assertEqual(self.banking.get_account("5").owner_name, "用户5")
+        self.assertIsNone(self.banking.get_account("missing"))
+        self.assertFalse(self.banking.create_account("5", "重复")[0])
+    
+    def test_same_and_cross_shard_transfers(self):
+        """分片内转账和跨分片转账都应正确更新两边的余额。"""
+        for source, destination in (self.same, self.cross):
+            self.assertEqual(self.banking.transfer(source, destination, Decimal('30.00')), (True, None))
+            self.assertEqual(self.banking.get_account(source).balance, Decimal('70.00'))
+            self.assertEqual(self.banking.get_account(destination).balance, Decimal('130.00'))
+            self.banking.transfer(destination, source, Decimal('30.00'))
+        self.assertEqual(self.banking.total_balance(), Decimal('1200.00'))
+    
+    def test_failed_cross_shard_transfer_is_rolled_back(self):
+        """跨分片转账任一边准备失败时，预留的金额应退回来源账户。"""
+        source, destination = self.cross
+        success, error = self.banking.transfer(source, destination, Decimal('500.00'))
+        self.assertFalse(success)
+        self.assertIn("资金不足", error)
+        
+        # 目标账户不存在：来源一侧已预留，提交阶段必须退回
+        missing = next(str(i) for i in range(100, 200) if shard_of(str(i), 3) != shard_of(source, 3))
+        success, error = self.banking.transfer(source, missing, Decimal('10.00'))
+        self.assertFalse(success)
+        self.assertIn("未找到目标账户", error)
+        self.assertEqual(self.banking.get_account(source).balance, Decimal('100.00'))
+        self.assertEqual(self.banking.total_balance(), Decimal('1200.00'))
+    
+    def test_execute_batch(self):
+        """一批混合操作返回与输入等长的结果，且总金额守恒。"""
+        source, destination = self.cross
+        ops = [
+            ('deposit', "0", Decimal('5.00')),
+            ('transfer', source, destination, Decimal('60.00')),
+            ('transfer', source, destination, Decimal('60.00')),
+            ('withdraw', "1", Decimal('1000.00')),
+            ('transfer', self.same[0], self.same[1], Decimal('1.00')),
+        ]
+        results = self.banking.execute(ops)
+        self.assertEqual([success for success, _ in results], [True, True, False, False, True])
+        self.assertEqual(self.banking.total_balance(), Decimal('1205.00'))
+        self.assertEqual(self.banking.get_account(destination).balance, Decimal('160.00'))
+
+    def test_malformed_ops_do_not_desync_shards(self):
+        """格式错误或执行出错的操作只让自己失败，跨分片转账照常提交，分片保持同步。"""
+        source, destination = self.cross
+        results = self.banking.execute([
+            ('transfer', source, destination, Decimal('10')),
+            ('deposit', source),
+            ('deposit', destination, "abc"),
+            ('bogus', source, Decimal('1')),
+        ])
+        self.assertEqual(results[0], (True, None))
+        self.assertEqual([success for success, _ in results[1:]], [False, False, False])
+        self.assertIn("格式错误", results[1][1])
+        self.assertIn("出错", results[2][1])
+        
+        self.assertEqual(self.banking.get_account(source).balance, Decimal('90.00'))
+        self.assertEqual(self.banking.get_account(destination).balance, Decimal('110.00'))
+        self.assertEqual(self.banking.account_count(), 12)
+        self.assertEqual(self.banking.total_balance(), Decimal('1200.00'))
+    
+    def test_failed_round_aborts_holds(self):
+        """一轮消息失败时，已预留的跨分片转账金额退回来源账户。"""
+        ids = [str(i) for i in range(12)]
+        source, destination = next((a, b) for a in ids for b in ids
+                                   if shard_of(a, 3) == 0 and shard_of(b, 3) != 0)
+        with self.assertRaises(Exception):
+            # 目标分片的消息无法序列化，来源分片已经预留
+            self.banking.execute([
+                ('transfer', source, destination, Decimal('10')),
+                ('deposit', destination, lambda: None),
+            ])
+        self.assertEqual(self.banking.get_account(source).balance, Decimal('100.00'))
+        self.assertEqual(self.banking.total_balance(), Decimal('1200.00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
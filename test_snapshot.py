@@ -0,0 +1,145 @@
+import unittest
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from banking_system import BankingSystem
+from snapshot import SnapshotStore
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """增量快照存储的测试用例。"""
+    
+    def setUp(self):
+        """每个测试使用独立的快照目录，并创建几个测试账户。"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SnapshotStore(os.path.join(self.temp_dir, "snapshots"))
+        self.banking = BankingSystem()
+        self.banking.create_account("1", "张三", Decimal('100.00'))
+        self.banking.create_account("2", "李四", Decimal('200.00'))
+        self.banking.create_account("3", "王五", Decimal('300.00'))
+    
+    def tearDown(self):
+        self.store.stop_compactor()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _delta_rows(self):
+        """读取最新增量文件中的行。"""
+        name = self.store._manifest['deltas'][-1]
+        with open(os.path.join(self.store.directory, name), 'r', newline='') as file:
+            return list(csv.DictReader(file))
+    
+    def _loaded(self):
+        banking = BankingSystem()
+        self.assertEqual(banking.load_from_snapshot(SnapshotStore(self.store.directory)), (True, None))
+        return banking
+    
+    def test_only_dirty_accounts_are_written(self):
+        """增量检查点只应写入变更过的账户。"""
+        self.assertEqual(self.banking.save_incremental(self.store), (True, None))
+        self.assertEqual(len(self._delta_rows()), 3)
+        
+        self.banking.deposit("2", Decimal('5.00'))
+        self.banking.save_incremental(self.store)
+        rows = self._delta_rows()
+        self.assertEqual([row['account_id'] for row in rows], ["2"])
+        self.assertEqual(rows[0]['balance'], "205.00")
+        
+        # 没有变更时写入空增量
+        self.banking.save_incremental(self.store)
+        self.assertEqual(self._delta_rows(), [])
+    
+    def test_load_applies_deltas_in_order(self):
+        """加载时后写入的增量应覆盖之前的记录。"""
+        self.banking.save_incremental(self.store)
+        self.banking.transfer("1", "3", Decimal('40.00'))
+        self.banking.save_incremental(self.store)
+        self.banking.create_account("4", "赵六", Decimal('1.00'))
+        self.banking.save_incremental(self.store)
+        
+        loaded = self._loaded()
+        self.assertEqual(len(loaded.get_all_accounts()), 4)
+        self.assertEqual(loaded.get_account("1").balance, Decimal('60.00'))
+        self.assertEqual(loaded.get_account("3").balance, Decimal('340.00'))
+        self.assertEqual(loaded.get_account("4").owner_name, "赵六")
+    
+    def test_compact_merges_deltas(self):
+        """压缩后只剩一个基础文件，内容与逻辑状态不变。"""
+        self.banking.save_incremental(self.store)
+        self.banking.withdraw("2", Decimal('50.00'))
+        self.banking.save_incremental(self.store)
+        state_id = self.store.state_id
+        
+        self.assertTrue(self.store.compact())
+        self.assertFalse(self.store.compact())
+        self.assertEqual(self.store.delta_count, 0)
+        self.assertEqual(self.store.state_id, state_id)
+        
+        files = sorted(name for name in os.listdir(self.store.directory) if name.endswith('.csv'))
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('base-'))
+        
+        loaded = self._loaded()
+        self.assertEqual(loaded.get_account("2").balance, Decimal('150.00'))
+        self.assertEqual(len(loaded.get_all_accounts()), 3)
+    
+    def test_compact_during_iteration(self):
+        """读取过程中另一个线程压缩快照，旧文件在读取结束后才删除。"""
+        self.banking.save_incremental(self.store)
+        self.banking.deposit("1", Decimal('5.00'))
+        self.banking.save_incremental(self.store)
+        
+        rows = self.store.iter_rows()
+        next(rows)
+        compactor = threading.Thread(target=self.store.compact)
+        compactor.start()
+        compactor.join()
+        self.assertEqual(self.store.delta_count, 0)
+        
+        # 压缩前的两个增量文件仍然可以读完
+        remaining = list(rows)
+        self.assertEqual(len(remaining) + 1, 4)
+        self.assertEqual(remaining[-1]['balance'], "105.00")
+        
+        files = sorted(name for name in os.listdir(self.store.directory) if name.endswith('.csv'))
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('base-'))
+        self.assertEqual(self._loaded().get_account("1").balance, Decimal('105.00'))
+    
+    def test_background_compactor(self):
+        """后台压缩线程应在增量足够多时合并它们。"""
+        for _ in range(3):
+            self.banking.deposit("1", Decimal('1.00'))
+            self.banking.save_incremental(self.store)
+        
+        self.store.start_compactor(interval=0.01, min_deltas=2)
+        deadline = time.time() + 5
+        while self.store.delta_count and time.time() < deadline:
+            time.sleep(0.01)
+        self.store.stop_compactor()
+        
+        self.assertEqual(self.store.delta_count, 0)
+        self.assertEqual(self._loaded().get_account("1").balance, Decimal('103.00'))
+    
+    def test_recover_with_snapshot_store(self):
+        """增量检查点与事务日志配合恢复。"""
+        journal = os.path.join(self.temp_dir, "journal.log")
+        banking = BankingSystem()
+        self.assertEqual(banking.recover(self.store, journal), (True, None))
+        banking.create_account("1", "张三", Decimal('100.00'))
+        self.assertEqual(banking.checkpoint(self.store), (True, None))
+        banking.deposit("1", Decimal('10.00'))
+        banking.close_journal()
+        
+        recovered = BankingSystem()
+        self.assertEqual(recovered.recover(SnapshotStore(self.store.directory), journal), (True, None))
+        self.assertEqual(recovered.get_account("1").balance, Decimal('110.00'))
+        recovered.close_journal()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from decimal import Decimal
+
+import test_banking_system
+from banking_system import BankAccount, BankingSystem
+from money import from_cents
+from sqlite_store import SQLiteAccount, SQLiteAccountStore
+
+
+class TestSQLiteAccountStore(unittest.TestCase):
+    """SQLite 账户存储的测试用例。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "accounts.db")
+        self.store = SQLiteAccountStore(self.path)
+        self.store["1"] = BankAccount("1", "张三", Decimal('100.00'))
+        self.store["2"] = BankAccount("2", "李四", Decimal('50.50'))
+    
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_mapping_interface(self):
+        """存储应支持字典的常用操作，遍历顺序与插入顺序一致。"""
+        self.assertEqual(len(self.store), 2)
+        self.assertIn("1", self.store)
+        self.assertNotIn("3", self.store)
+        self.assertIsNone(self.store.get("3"))
+        with self.assertRaises(KeyError):
+            self.store["3"]
+        self.assertEqual(list(self.store), ["1", "2"])
+        self.assertEqual([account.owner_name for account in self.store.values()], ["张三", "李四"])
+        
+        account = self.store["2"]
+        self.assertIsInstance(account, SQLiteAccount)
+        self.assertEqual(account.to_dict(), {'account_id': "2", 'owner_name': "李四", 'balance': "50.50"})
+        self.assertEqual(self.store.total_balance(), Decimal('150.50'))
+        
+        self.store["2"] = BankAccount("2", "李四四", Decimal('1.00'))
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store["2"].owner_name, "李四四")
+        
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+    
+    def test_deposit_withdraw_and_overflow(self):
+        """视图上的存取款应直接更新数据库，溢出和透支时失败且不改变余额。"""
+        account = self.store["1"]
+        self.assertTrue(account.deposit(Decimal('0.25')))
+        self.assertFalse(account.deposit(Decimal('0.001')))
+        self.assertTrue(account.withdraw(Decimal('50.00')))
+        self.assertFalse(account.withdraw(Decimal('1000.00')))
+        self.assertEqual(self.store["1"].balance, Decimal('50.25'))
+        
+        self.store["big"] = BankAccount("big", "大户", from_cents(2 ** 63 - 10))
+        self.assertFalse(self.store["big"].deposit(Decimal('1.00')))
+        self.assertEqual(self.store["big"].balance, from_cents(2 ** 63 - 10))
+    
+    def test_transaction_rollback(self):
+        """事务中抛出异常时，其中的所有更新都应回滚。"""
+        with self.assertRaises(RuntimeError):
+            with self.store.transaction():
+                self.store["1"].withdraw(Decimal('10.00'))
+                self.assertEqual(self.store["1"].balance, Decimal('90.00'))
+                raise RuntimeError("中止")
+        self.assertEqual(self.store["1"].balance, Decimal('100.00'))
+    
+    def test_failed_commit_rolls_back(self):
+        """提交失败时回滚事务，之后的写入仍能正常进行。"""
+        writer = self.store._connections.writer
+        # 延迟检查的外键约束在 COMMIT 时才失败
+        writer.execute('PRAGMA foreign_keys = ON')
+        writer.execute('CREATE TABLE parent (id INTEGER PRIMARY KEY)')
+        writer.execute('CREATE TABLE child (parent_id INTEGER REFERENCES parent(id) DEFERRABLE INITIALLY DEFERRED)')
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.store.transaction():
+                writer.execute('INSERT INTO child VALUES (1)')
+        self.assertFalse(writer.in_transaction)
+        
+        self.store["9"] = BankAccount("9", "赵六", Decimal('9.00'))
+        self.assertEqual(self.store["9"].balance, Decimal('9.00'))
+    
+    def test_reopen_without_loading(self):
+        """重新打开数据库时账户仍在，银行系统的汇总从数据库计算。"""
+        self.store.close()
+        self.store = SQLiteAccountStore(self.path)
+        banking = BankingSystem(store=self.store, owner_index=False)
+        self.assertEqual(banking.account_count(), 2)
+        self.assertEqual(banking.total_balance(), Decimal('150.50'))
+        self.assertEqual(banking.get_account("2").owner_name, "李四")
+    
+    def test_concurrent_transfers_conserve_money(self):
+        """多个线程并发转账时，总金额保持不变。"""
+        banking = BankingSystem(concurrent=True, store=self.store)
+        
+        def worker(seed):
+            for i in range(50):
+                source, destination = ("1", "2") if (seed + i) % 2 else ("2", "1")
+                banking.transfer(source, destination, Decimal('1.00'))
+        
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.store.total_balance(), Decimal('150.50'))
+        self.assertEqual(banking.verify_aggregates(), (True, None))
+
+    def test_reader_waits_for_release(self):
+        """读连接用完时等待者阻塞，直到有连接被归还时被唤醒。"""
+        store = SQLiteAccountStore(os.path.join(self.temp_dir, "pool.db"), readers=1)
+        connections = store._connections
+        held = connections.acquire_reader()
+        acquired = threading.Event()
+        
+        def waiter():
+            connections.release_reader(connections.acquire_reader())
+            acquired.set()
+        
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        connections.release_reader(held)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        store.close()
+
+
+class TestBankingSystemSQLiteStore(test_banking_system.TestBankingSystem):
+    """使用 SQLite 存储时，银行系统的行为应与默认字典存储一致。"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SQLiteAccountStore(os.path.join(self.temp_dir, "accounts.db"))
+        self.banking = BankingSystem(store=self.store)
+    
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_load_replaces_table(self):
+        """加载CSV后账户仍保存在同一个数据库中，加载失败时原有账户不变。"""
+        self.banking.create_account("1", "张三", Decimal('1.00'))
+        csv_path = os.path.join(self.temp_dir, "accounts.csv")
+        with open(csv_path, 'w', newline='') as file:
+            file.write("account_id,owner_name,balance\r\n2,李四,2.50\r\n")
+        
+        self.assertEqual(self.banking.load_from_csv(csv_path), (True, None))
+        self.assertIsInstance(self.banking.accounts, SQLiteAccountStore)
+        self.assertEqual(list(self.banking.accounts), ["2"])
+        
+        with open(csv_path, 'w', newline='') as file:
+            file.write("account_id,owner_name,balance\r\n3,王五,abc\r\n")
+        self.assertFalse(self.banking.load_from_csv_streaming(csv_path)[0])
+        self.assertEqual(list(self.banking.accounts), ["2"])
+        
+        reopened = SQLiteAccountStore(self.banking.accounts.path)
+        self.assertEqual(reopened["2"].balance, Decimal('2.50'))
+        reopened.close()
+
+    def test_create_rejects_partial_cents(self):
+        """初始余额不是整分或超出范围时返回错误，不会插入账户。"""
+        self.assertEqual(self.banking.create_account("a", "x", Decimal('1.001')), (False, "初始余额必须为整分"))
+        self.assertEqual(self.banking.create_account("a", "x", Decimal('1e30')), (False, "金额超出范围"))
+        self.assertIsNone(self.banking.get_account("a"))
+        self.assertEqual(self.banking.account_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()